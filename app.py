@@ -1,16 +1,53 @@
 import logging
 import os
 
-from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 
-from listeners import register_listeners
+from listeners import register_listeners, settings
+from listeners.events.entity_details_requested import close_unfurls
+from listeners.http_pool import PooledApp, create_web_client
+from listeners.metrics import start_metrics_server
+from listeners.sample_data_service import (
+    join_shared_sample_data,
+    share_sample_data,
+    start_corpus_refresher,
+    use_shared_cache,
+)
+from listeners.workers import Supervisor, WorkerSocketModeHandler, serve_worker
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-app = App(token=os.environ.get("SLACK_BOT_TOKEN"))
+app = PooledApp(client=create_web_client(token=os.environ.get("SLACK_BOT_TOKEN"), logger=logger), logger=logger)
 
 register_listeners(app)
 
+
+def run_worker(index: int, ready, shared):
+    # Worker metrics are served on the ports after the supervisor's
+    if settings.METRICS_PORT is not None:
+        start_metrics_server(logger=app.logger, port=settings.METRICS_PORT + index + 1)
+    join_shared_sample_data(shared, logger=app.logger)
+    handler = WorkerSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
+    serve_worker(handler, ready, drain_timeout=settings.WORKER_DRAIN_SECONDS, logger=app.logger)
+
+
 if __name__ == "__main__":
-    SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start()
+    start_metrics_server(logger=app.logger)
+    if settings.WORKER_PROCESSES > 1:
+        shared = share_sample_data(client=app.client, logger=app.logger)
+        Supervisor(
+            run_worker,
+            processes=settings.WORKER_PROCESSES,
+            logger=app.logger,
+            args=(shared,),
+            drain_timeout=settings.WORKER_DRAIN_SECONDS,
+        ).run()
+    else:
+        use_shared_cache(logger=app.logger)
+        start_corpus_refresher(client=app.client, logger=app.logger)
+        try:
+            SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start()
+        finally:
+            # Unfurls still waiting for their batch or being sent finish before exiting, allowing as long as a worker drains
+            close_unfurls(timeout=settings.WORKER_DRAIN_SECONDS)
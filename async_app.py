@@ -0,0 +1,34 @@
+import asyncio
+import logging
+import os
+
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from slack_bolt.async_app import AsyncApp
+
+from listeners import register_async_listeners
+from listeners.async_sample_data_service import run_corpus_refresher
+from listeners.events.async_entity_details_requested import unfurl_batcher
+from listeners.http_pool import create_client_session
+from listeners.metrics import start_metrics_server
+
+logging.basicConfig(level=logging.INFO)
+
+app = AsyncApp(token=os.environ.get("SLACK_BOT_TOKEN"))
+
+register_async_listeners(app)
+
+
+async def main():
+    start_metrics_server(logger=app.logger)
+    app.client.session = create_client_session()
+    refresher = asyncio.create_task(run_corpus_refresher(client=app.client, logger=app.logger))
+    try:
+        await AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN")).start_async()
+    finally:
+        refresher.cancel()
+        # Unfurls still waiting for their batch are sent before the loop stops
+        await unfurl_batcher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
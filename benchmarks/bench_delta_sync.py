@@ -0,0 +1,76 @@
+"""Compares the cost of refreshing the corpus index by rebuilding it and by merging only the changed samples into it.
+
+    python -m benchmarks.bench_delta_sync --samples 10000,100000 --changes 10,100,1000
+
+Each run changes `--changes` samples of the corpus, a tenth of them deleted and the rest retitled with a later
+`date_updated`, then times building a new `SearchIndex` from the whole changed corpus against `SearchIndex.update`
+with just the changes, as `DELTA_SYNC` does. Upstream calls are left out of both.
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.fixtures import WORDS, generate_samples
+from listeners.search_index import SearchIndex
+
+
+def facets_of(samples: list) -> dict:
+    facets = {}
+    for sample in samples:
+        for facet in (("languages", sample["language"]), ("type", sample["type"])):
+            facets.setdefault(facet, []).append(sample["external_ref"]["id"])
+    return facets
+
+
+def run(size: int, changes: int, rng: random.Random) -> dict:
+    samples = generate_samples(size)
+    index = SearchIndex(samples, facets_of(samples))
+
+    changed_rows = rng.sample(range(size), min(changes, size))
+    deleted = {samples[row]["external_ref"]["id"] for row in changed_rows[: len(changed_rows) // 10]}
+    updated = [
+        {**samples[row], "title": " ".join(rng.choices(WORDS, k=4)), "date_updated": "2025-02-01"}
+        for row in changed_rows[len(changed_rows) // 10 :]
+    ]
+    current = {sample["external_ref"]["id"]: sample for sample in samples}
+    for sample in updated:
+        current[sample["external_ref"]["id"]] = sample
+    for sample_id in deleted:
+        del current[sample_id]
+
+    started = time.perf_counter()
+    SearchIndex(list(current.values()), facets_of(current.values()))
+    rebuild = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index.update(updated, facets_of(updated), deleted=deleted)
+    update = time.perf_counter() - started
+
+    return {
+        "samples": size,
+        "changes": len(changed_rows),
+        "rebuild_ms": round(rebuild * 1000, 3),
+        "update_ms": round(update * 1000, 3),
+        "speedup": round(rebuild / update, 1),
+    }
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=parse_list, default=[10000, 100000])
+    parser.add_argument("--changes", type=parse_list, default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    for size in args.samples:
+        for changes in args.changes:
+            print(run(size, changes, rng))
+
+
+if __name__ == "__main__":
+    main()
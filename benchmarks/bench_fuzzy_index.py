@@ -0,0 +1,97 @@
+"""Times completing and correcting query terms against the vocabulary of a corpus of sample titles.
+
+python -m benchmarks.bench_fuzzy_index --titles 10000,100000
+
+Titles are drawn from a Zipf-like distribution over random words, so a few terms are very common and most are rare, as
+in real titles. Each lookup expands one query term: a known term, a short and a longer prefix of one, and a term with
+one or two typos. Latencies are reported as the median and 99th percentile over `--lookups` terms of each kind.
+"""
+
+import argparse
+import itertools
+import random
+import statistics
+import string
+import time
+from collections import Counter
+
+from listeners.fuzzy_index import FuzzyIndex
+from listeners.search_index import tokenize
+
+
+def generate_words(count: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 11))))
+    return sorted(words)
+
+
+def generate_titles(count: int, words: list, rng: random.Random) -> list:
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return [" ".join(rng.choices(words, cum_weights=cum_weights, k=5)) for _ in range(count)]
+
+
+def typo(word: str, edits: int, rng: random.Random) -> str:
+    for _ in range(edits):
+        position = rng.randrange(len(word))
+        word = word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1 :]
+    return word
+
+
+def percentiles(lookup, terms: list) -> dict:
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        lookup(term)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "p50_us": round(statistics.median(timings) * 1e6, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99)] * 1e6, 1),
+    }
+
+
+def run(size: int, lookups: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    words = generate_words(max(1000, size // 3), rng)
+    titles = generate_titles(size, words, rng)
+
+    started = time.perf_counter()
+    vocabulary = Counter(term for title in titles for term in set(tokenize(title)))
+    index = FuzzyIndex(vocabulary)
+    build_seconds = time.perf_counter() - started
+
+    terms = rng.choices(list(vocabulary), k=lookups)
+    long_terms = [term for term in terms if len(term) >= 6]
+
+    def expand(term):
+        return index.expand([term])
+
+    return {
+        "titles": size,
+        "vocabulary": len(index),
+        "build_seconds": round(build_seconds, 2),
+        "known": percentiles(expand, terms),
+        "prefix_2": percentiles(expand, [term[:2] for term in terms]),
+        "prefix_4": percentiles(expand, [term[:4] for term in terms]),
+        "typo_1": percentiles(index.correct, [typo(term, 1, rng) for term in terms]),
+        "typo_2": percentiles(index.correct, [typo(term, 2, rng) for term in long_terms]),
+    }
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=parse_list, default=[10000, 100000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    for size in args.titles:
+        print(run(size, args.lookups))
+
+
+if __name__ == "__main__":
+    main()
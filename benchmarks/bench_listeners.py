@@ -0,0 +1,228 @@
+"""Measures latency and throughput of the search, filters and unfurl listeners dispatched through a real `App`
+against a local fake Slack API server.
+
+    python -m benchmarks.bench_listeners --sizes 100,10000 --concurrency 1,16 --output results.json
+    python -m benchmarks.bench_listeners --sizes 100,10000 --concurrency 1,16 --baseline results.json
+
+Each case reports p50/p95/p99 latency in milliseconds and requests per second. With `--baseline`, the relative change
+against a previous run is printed for every case both runs share.
+"""
+
+import argparse
+import ast
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from slack_bolt import App, BoltRequest
+from slack_sdk import WebClient
+
+from benchmarks.fake_slack_api import FakeSlackAPI
+from benchmarks.fixtures import LANGUAGES, WORDS, filter_samples, generate_samples
+from listeners import register_listeners, sample_data_service
+from listeners.filters import LANGUAGES_FILTER
+
+SCENARIOS = ("search", "filters", "unfurl")
+
+
+def fake_slack_api(samples: list, latency: float) -> FakeSlackAPI:
+    def sample_data(body):
+        time.sleep(latency)
+        params = dict(body)
+        if isinstance(params.get("filters"), str):
+            # urlencoded params carry nested filters as their Python repr
+            params["filters"] = ast.literal_eval(params["filters"])
+        return {"ok": True, "samples": filter_samples(samples, params)}
+
+    def ok(body):
+        time.sleep(latency)
+        return {"ok": True}
+
+    return FakeSlackAPI(
+        {
+            "auth.test": lambda body: {"ok": True, "team_id": "T111", "user_id": "U111", "bot_id": "B111"},
+            "developer.sampleData.get": sample_data,
+            "functions.completeSuccess": ok,
+            "functions.completeError": ok,
+            "entity.presentDetails": ok,
+        }
+    )
+
+
+def function_executed_body(callback_id: str, inputs: dict, execution_id: str) -> dict:
+    return {
+        "team_id": "T111",
+        "api_app_id": "A111",
+        "type": "event_callback",
+        "event_id": f"Ev{execution_id}",
+        "event_time": int(time.time()),
+        "event": {
+            "type": "function_executed",
+            "function": {"callback_id": callback_id},
+            "inputs": inputs,
+            "function_execution_id": execution_id,
+            "workflow_execution_id": f"Wx{execution_id}",
+            "event_ts": str(time.time()),
+            "bot_access_token": "xwfp-benchmark",
+        },
+    }
+
+
+def entity_details_requested_body(sample_id: str, event_id: str) -> dict:
+    return {
+        "team_id": "T111",
+        "api_app_id": "A111",
+        "type": "event_callback",
+        "event_id": f"Ev{event_id}",
+        "event_time": int(time.time()),
+        "event": {
+            "type": "entity_details_requested",
+            "user": "U222",
+            "external_ref": {"id": sample_id},
+            "entity_url": f"https://example.com/{sample_id}",
+            "link": {"url": f"https://example.com/{sample_id}", "domain": "example.com"},
+            "trigger_id": f"{event_id}.benchmark",
+            "event_ts": str(time.time()),
+        },
+    }
+
+
+def build_bodies(scenario: str, samples: list, count: int, rng: random.Random) -> list:
+    if scenario == "search":
+        return [
+            function_executed_body(
+                "search",
+                {
+                    "query": " ".join(rng.choices(WORDS[:20], k=rng.randint(1, 2))),
+                    "filters": {LANGUAGES_FILTER["name"]: rng.sample(LANGUAGES, k=rng.randint(0, 2))},
+                    "user_context": {"id": "U222"},
+                },
+                f"Fx{i}",
+            )
+            for i in range(count)
+        ]
+
+    if scenario == "filters":
+        return [function_executed_body("filters", {"user_context": {"id": "U222"}}, f"Fx{i}") for i in range(count)]
+
+    return [entity_details_requested_body(rng.choice(samples)["external_ref"]["id"], str(i)) for i in range(count)]
+
+
+def run_case(scenario: str, size: int, concurrency: int, requests: int, latency: float) -> dict:
+    samples = generate_samples(size)
+    bodies = build_bodies(scenario, samples, requests, random.Random(size))
+
+    sample_data_service.sample_store.clear()
+    sample_data_service.response_cache.clear()
+    sample_data_service.corpus.clear()
+
+    with fake_slack_api(samples, latency) as api:
+        app = App(
+            client=WebClient(token="xoxb-benchmark", base_url=api.base_url),
+            token_verification_enabled=False,
+            request_verification_enabled=False,
+            process_before_response=True,
+        )
+        register_listeners(app)
+
+        def dispatch(body):
+            started = time.perf_counter()
+            response = app.dispatch(BoltRequest(body=body, mode="socket_mode"))
+            elapsed = time.perf_counter() - started
+            if response.status != 200:
+                raise RuntimeError(f"Dispatch failed with status {response.status}: {response.body}")
+            return elapsed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(executor.map(dispatch, bodies))
+        wall = time.perf_counter() - started
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+    return {
+        "scenario": scenario,
+        "corpus_size": size,
+        "concurrency": concurrency,
+        "requests": requests,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "requests_per_second": round(requests / wall, 1),
+        "api_requests": len(api.requests),
+    }
+
+
+def case_key(result: dict) -> tuple:
+    return result["scenario"], result["corpus_size"], result["concurrency"]
+
+
+def compare(results: list, baseline: dict):
+    previous = {case_key(result): result for result in baseline["results"]}
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None:
+            continue
+        changes = {
+            metric: f"{(result[metric] - before[metric]) / before[metric] * 100:+.1f}%"
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "requests_per_second")
+            if before[metric]
+        }
+        print(f"{result['scenario']} size={result['corpus_size']} concurrency={result['concurrency']}: {changes}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--sizes", type=parse_list, default=[100, 1000, 10000])
+    parser.add_argument("--concurrency", type=parse_list, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="Results JSON from a previous run to compare against")
+    args = parser.parse_args()
+
+    results = [
+        run_case(scenario, size, concurrency, args.requests, args.latency_ms / 1000)
+        for scenario in args.scenarios.split(",")
+        for size in args.sizes
+        for concurrency in args.concurrency
+    ]
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "latency_ms": args.latency_ms,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
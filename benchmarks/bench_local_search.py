@@ -0,0 +1,83 @@
+"""Compares search latency in remote and local `SEARCH_MODE` against a stub client with simulated upstream latency.
+
+python -m benchmarks.bench_local_search --samples 10000 --queries 200 --latency-ms 80
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from benchmarks.fixtures import LANGUAGES, WORDS, filter_samples, generate_samples
+from listeners import sample_data_service, settings
+from listeners.filters import LANGUAGES_FILTER
+from listeners.sample_data_service import fetch_sample_data
+
+
+class StubClient:
+    """Answers developer.sampleData.get from an in-memory corpus after sleeping for the simulated latency."""
+
+    def __init__(self, samples: list, latency: float):
+        self.samples = samples
+        self.latency = latency
+        self.calls = 0
+
+    def api_call(self, api_method, params):
+        self.calls += 1
+        time.sleep(self.latency)
+
+        samples = filter_samples(self.samples, params)
+        return {"ok": True, "samples": samples}
+
+
+def run(mode: str, client: StubClient, queries: list, logger: logging.Logger) -> dict:
+    settings.SEARCH_MODE = mode
+    sample_data_service.response_cache.clear()
+    sample_data_service.corpus.clear()
+
+    # The first local search pays for the snapshot, which is reported separately from steady state latency
+    started = time.perf_counter()
+    fetch_sample_data(client=client, query=queries[0]["query"], filters=queries[0]["filters"], logger=logger)
+    warmup = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        fetch_sample_data(client=client, query=query["query"], filters=query["filters"], logger=logger)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "warmup_ms": round(warmup * 1000, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        "upstream_calls": client.calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    logger = logging.getLogger(__name__)
+    samples = generate_samples(args.samples)
+    rng = random.Random(1)
+    queries = [
+        {
+            "query": " ".join(rng.choices(WORDS, k=2)),
+            "filters": {LANGUAGES_FILTER["name"]: rng.sample(LANGUAGES, k=rng.randint(0, 2))},
+        }
+        for _ in range(args.queries)
+    ]
+
+    for mode in ("remote", "local"):
+        print(run(mode, StubClient(samples, args.latency_ms / 1000), queries, logger))
+
+
+if __name__ == "__main__":
+    main()
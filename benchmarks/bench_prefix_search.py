@@ -0,0 +1,87 @@
+"""Compares upstream calls and search latency of search-as-you-type sessions with and without `PREFIX_RESULTS`.
+
+    python -m benchmarks.bench_prefix_search --samples 10000 --sessions 100 --latency-ms 80
+
+Each session types a query of one or two words one character at a time, searching for every prefix of it in remote
+mode, with a stub upstream that matches each query term against the start of a word after the simulated latency. The
+response cache is cleared between sessions, so no session reuses another's results.
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import time
+
+from benchmarks.fixtures import WORDS, generate_samples
+from listeners import sample_data_service, settings
+from listeners.ranking import matches_prefixes
+from listeners.sample_data_service import fetch_sample_data
+from listeners.search_index import tokenize
+
+
+class PrefixStubClient:
+    """Answers developer.sampleData.get by matching query terms as word prefixes after sleeping for the latency."""
+
+    def __init__(self, samples: list, latency: float):
+        self.samples = samples
+        self.latency = latency
+        self.calls = 0
+
+    def api_call(self, api_method, params):
+        self.calls += 1
+        time.sleep(self.latency)
+
+        terms = tuple(tokenize(params.get("query")))
+        return {"ok": True, "samples": [sample for sample in self.samples if matches_prefixes(sample, terms)]}
+
+
+def typed_prefixes(query: str) -> list:
+    return [query[:end] for end in range(1, len(query) + 1)]
+
+
+def run(prefix_results: bool, client: PrefixStubClient, queries: list, logger: logging.Logger) -> dict:
+    settings.SEARCH_MODE = "remote"
+    settings.PREFIX_RESULTS = prefix_results
+    client.calls = 0
+
+    latencies = []
+    searches = 0
+    for query in queries:
+        sample_data_service.response_cache.clear()
+        for prefix in typed_prefixes(query):
+            started = time.perf_counter()
+            fetch_sample_data(client=client, query=prefix, logger=logger)
+            latencies.append(time.perf_counter() - started)
+            searches += 1
+
+    latencies.sort()
+    return {
+        "prefix_results": prefix_results,
+        "searches": searches,
+        "upstream_calls": client.calls,
+        "calls_per_session": round(client.calls / len(queries), 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        "total_s": round(sum(latencies), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    args = parser.parse_args()
+
+    logger = logging.getLogger(__name__)
+    client = PrefixStubClient(generate_samples(args.samples), args.latency_ms / 1000)
+    rng = random.Random(1)
+    queries = [" ".join(rng.choices(WORDS[:20], k=rng.randint(1, 2))) for _ in range(args.sessions)]
+
+    for prefix_results in (False, True):
+        print(run(prefix_results, client, queries, logger))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compares the per-event CPU time of building entity.presentDetails payloads from scratch and from cached metadata.
+
+python -m benchmarks.bench_present_details --samples 100 --events 200000
+
+Events unfurl a small set of popular samples over and over. Times are the best CPU time per event over a few runs, both
+for building the payload alone and for building and serializing it to JSON as the Slack SDK does before sending it.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks.fixtures import generate_samples
+from listeners.events.entity_details_requested import (
+    build_entity_payload,
+    build_present_details_payload,
+    present_details_cache,
+)
+
+
+def build_uncached(event: dict, sample: dict) -> dict:
+    return {
+        "trigger_id": event["trigger_id"],
+        "metadata": {
+            "entity_type": "slack#/entities/item",
+            "url": event["link"]["url"],
+            "external_ref": {"id": sample["external_ref"]["id"]},
+            "entity_payload": build_entity_payload(sample),
+        },
+    }
+
+
+def per_event_us(build, events: list, serialize: bool, repeat: int) -> float:
+    """Returns the best of `repeat` runs, which is the least disturbed by other processes."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        for event, sample in events:
+            payload = build(event, sample)
+            if serialize:
+                json.dumps(payload)
+        best = min(best, time.process_time() - started)
+    return best / len(events) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    samples = generate_samples(args.samples)
+    for sample in samples:
+        sample["content"] = " ".join(rng.choices(sample["description"].split(), k=40))
+
+    events = []
+    for i in range(args.events):
+        sample = rng.choice(samples)
+        event = {"trigger_id": f"{i}.{i}.trigger", "link": {"url": sample["link"]}}
+        events.append((event, sample))
+
+    for serialize in (False, True):
+        present_details_cache.clear()
+        uncached = per_event_us(build_uncached, events, serialize, args.repeat)
+        cached = per_event_us(build_present_details_payload, events, serialize, args.repeat)
+        print(
+            {
+                "serialized": serialize,
+                "uncached_us": round(uncached, 2),
+                "cached_us": round(cached, 2),
+                "speedup": round(uncached / cached, 1),
+                "cache": present_details_cache.stats(),
+            }
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Replays recorded or generated Slack event envelopes against the listeners at increasing rates to find the highest
+event rate the app sustains within the ack timeout.
+
+    RECORD_PAYLOADS_PATH=payloads.jsonl python app.py
+    python -m benchmarks.bench_replay --payloads payloads.jsonl --rates 10,50,100,200 --duration 10
+    python -m benchmarks.bench_replay --mix search=6,filters=1,unfurl=3 --rates 10,50,100,200
+
+Envelopes come from a file `RECORD_PAYLOADS_PATH` recorded, with the words of their pseudonymous queries swapped for
+words of the generated samples, or are generated in the `--mix` proportions. Each rate is held for `--duration`
+seconds, with envelopes arriving at fixed intervals whether or not earlier ones were handled, and dispatched through an
+`App` with the listeners registered, on `--concurrency` threads like `SocketModeHandler`. The fake Slack API answers
+every call after a log-normal delay around `--latency-ms`, with the spread `--latency-sigma`.
+
+Ack latency runs from an envelope's arrival to its acknowledgement, and completion latency to its
+`functions.completeSuccess`, `functions.completeError` or `entity.presentDetails` call. A rate is sustained when the
+app handles envelopes as fast as they arrive and acks them within `--ack-timeout` seconds at p99. The saturation point
+is the highest sustained rate. Settings such as `DEFERRED_COMPLETION` or `SEARCH_MODE` apply as in the app.
+"""
+
+import argparse
+import ast
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from slack_bolt import App, BoltRequest
+from slack_sdk import WebClient
+
+from benchmarks.bench_listeners import build_bodies
+from benchmarks.fake_slack_api import FakeSlackAPI
+from benchmarks.fixtures import WORDS, filter_samples, generate_samples
+from listeners import register_listeners
+
+# How `listeners.recorder.query_pseudonym` writes each word of a recorded query
+QUERY_WORD_PSEUDONYM = re.compile(r"q[0-9a-f]{8}")
+
+# Calls that finish handling an envelope, and the field naming the envelope they finish
+COMPLETIONS = {
+    "functions.completeSuccess": "function_execution_id",
+    "functions.completeError": "function_execution_id",
+    "entity.presentDetails": "trigger_id",
+}
+
+
+class ReplayAPI:
+    """A fake Slack API whose calls take log-normally distributed time, recording when each envelope completed."""
+
+    def __init__(self, samples: list, latency: float, sigma: float, seed: int = 0):
+        self.samples = samples
+        self.latency = latency
+        self.sigma = sigma
+        self.completed: dict[str, float] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        handlers = {method: self._completion(field) for method, field in COMPLETIONS.items()}
+        handlers["auth.test"] = lambda body: {"ok": True, "team_id": "T111", "user_id": "U111", "bot_id": "B111"}
+        handlers["developer.sampleData.get"] = self._sample_data
+        self.server = FakeSlackAPI(handlers)
+
+    def __enter__(self):
+        self.server.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.stop()
+
+    def wait(self):
+        if self.latency:
+            with self._lock:
+                delay = self._rng.lognormvariate(math.log(self.latency), self.sigma)
+            time.sleep(delay)
+
+    def _sample_data(self, body):
+        self.wait()
+        params = dict(body)
+        if isinstance(params.get("filters"), str):
+            # urlencoded params carry nested filters as their Python repr
+            params["filters"] = ast.literal_eval(params["filters"])
+        return {"ok": True, "samples": filter_samples(self.samples, params)}
+
+    def _completion(self, field: str):
+        def complete(body):
+            self.wait()
+            with self._lock:
+                self.completed.setdefault(body.get(field), time.perf_counter())
+            return {"ok": True}
+
+        return complete
+
+
+def load_payloads(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def fixture_query(query: str) -> str:
+    """Returns a recorded query with each word pseudonym swapped for a word of the generated samples, the same one for
+    the same pseudonym, so replayed searches match samples as the recorded ones did."""
+    return " ".join(
+        WORDS[int(word[1:], 16) % 20] if QUERY_WORD_PSEUDONYM.fullmatch(word) else word for word in query.split()
+    )
+
+
+def with_fixture_queries(body: dict) -> dict:
+    inputs = body["event"].get("inputs") or {}
+    if not isinstance(inputs.get("query"), str):
+        return body
+    event = {**body["event"], "inputs": {**inputs, "query": fixture_query(inputs["query"])}}
+    return {**body, "event": event}
+
+
+def generated_payloads(mix: dict, samples: list, count: int, rng: random.Random) -> list:
+    payloads = []
+    for scenario, weight in mix.items():
+        payloads.extend(build_bodies(scenario, samples, weight * count, rng))
+    rng.shuffle(payloads)
+    return payloads
+
+
+def referenced_samples(payloads: list) -> list:
+    """Returns the IDs of the samples the payloads unfurl, so the fake API can serve samples with those IDs."""
+    return sorted({body["event"]["external_ref"]["id"] for body in payloads if "external_ref" in body["event"]})
+
+
+def recorded_samples(size: int, payloads: list) -> list:
+    samples = generate_samples(max(size, len(referenced_samples(payloads))))
+    for sample, sample_id in zip(samples, referenced_samples(payloads)):
+        sample["external_ref"] = {"id": sample_id}
+    return samples
+
+
+def replayed(body: dict, n: int) -> tuple:
+    """Returns a copy of `body` whose execution or trigger ID is unique to this replay, along with that ID."""
+    event = dict(body["event"])
+    field = "function_execution_id" if event["type"] == "function_executed" else "trigger_id"
+    event[field] = f"{event.get(field)}-{n}"
+    return {**body, "event_id": f"{body.get('event_id')}-{n}", "event": event}, event[field]
+
+
+def percentile(values: list, p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 1)
+
+
+def run_rate(app: App, api: ReplayAPI, payloads: list, rate: float, args, counter) -> dict:
+    arrivals = {}
+    ack_latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def dispatch(body: dict, arrived: float):
+        nonlocal errors
+        response = app.dispatch(BoltRequest(body=body, mode="socket_mode"))
+        acked = time.perf_counter()
+        with lock:
+            ack_latencies.append(acked - arrived)
+            if response.status != 200:
+                errors += 1
+
+    count = max(1, int(rate * args.duration))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for i, body in zip(range(count), itertools.cycle(payloads)):
+            arrival = started + i / rate
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            body, replay_id = replayed(body, next(counter))
+            arrivals[replay_id] = arrival
+            executor.submit(dispatch, body, arrival)
+    handled = time.perf_counter() - started
+
+    # Listeners may still be completing after their ack, on Bolt's own threads or the deferred pool
+    deadline = time.perf_counter() + args.ack_timeout
+    while time.perf_counter() < deadline and sum(replay_id in api.completed for replay_id in arrivals) < count:
+        time.sleep(0.05)
+    completion_latencies = [
+        api.completed[replay_id] - arrived for replay_id, arrived in arrivals.items() if replay_id in api.completed
+    ]
+
+    throughput = count / handled
+    p99_ack = percentile(ack_latencies, 0.99)
+    return {
+        "rate": rate,
+        "events": count,
+        "handled_per_second": round(throughput, 1),
+        "ack_p50_ms": percentile(ack_latencies, 0.5),
+        "ack_p99_ms": p99_ack,
+        "ack_timeouts": sum(latency > args.ack_timeout for latency in ack_latencies),
+        "completed": len(completion_latencies),
+        "completion_p50_ms": percentile(completion_latencies, 0.5),
+        "completion_p99_ms": percentile(completion_latencies, 0.99),
+        "errors": errors,
+        # A backlog that grows for the whole run would keep growing past the ack timeout in a longer one
+        "sustained": throughput >= 0.95 * rate and p99_ack < args.ack_timeout * 1000,
+    }
+
+
+def parse_list(value: str) -> list:
+    return [float(item) for item in value.split(",")]
+
+
+def parse_mix(value: str) -> dict:
+    return {scenario: int(weight) for scenario, weight in (item.split("=") for item in value.split(","))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", help="JSON lines file of envelopes recorded with RECORD_PAYLOADS_PATH")
+    parser.add_argument("--mix", type=parse_mix, default={"search": 6, "filters": 1, "unfurl": 3})
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--rates", type=parse_list, default=[10, 50, 100, 200])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--ack-timeout", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.payloads:
+        payloads = [with_fixture_queries(body) for body in load_payloads(args.payloads)]
+        samples = recorded_samples(args.samples, payloads)
+    else:
+        samples = generate_samples(args.samples)
+        payloads = generated_payloads(args.mix, samples, 50, random.Random(1))
+
+    results = []
+    with ReplayAPI(samples, args.latency_ms / 1000, args.latency_sigma) as api:
+        app = App(
+            client=WebClient(token="xoxb-replay", base_url=api.server.base_url),
+            token_verification_enabled=False,
+            request_verification_enabled=False,
+        )
+        register_listeners(app)
+
+        counter = itertools.count()
+        for rate in args.rates:
+            result = run_rate(app, api, payloads, rate, args, counter)
+            results.append(result)
+            print(result)
+
+    sustained = [result["rate"] for result in results if result["sustained"]]
+    print({"saturation_events_per_second": max(sustained, default=None), "payloads": len(payloads)})
+
+
+if __name__ == "__main__":
+    main()
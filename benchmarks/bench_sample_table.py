@@ -0,0 +1,77 @@
+"""Compares the memory held by a corpus of sample dicts with the same corpus packed into a `SampleTable`.
+
+python -m benchmarks.bench_sample_table --samples 10000,100000
+
+Memory is measured with `tracemalloc` as the allocations still alive after building each representation from JSON, as
+the samples arrive from developer.sampleData.get. Rebuilding every sample dict from the table is timed separately,
+since that is what each search result costs in exchange.
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.fixtures import generate_samples
+from listeners.sample_table import SampleTable
+
+
+def retained_mb(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size / 1024 / 1024, elapsed
+
+
+def run(size: int) -> dict:
+    payload = json.dumps(generate_samples(size))
+
+    samples, dicts_mb, _ = retained_mb(lambda: json.loads(payload))
+    table, table_mb, _ = retained_mb(lambda: SampleTable(json.loads(payload)))
+    assert list(table) == samples
+
+    started = time.perf_counter()
+    build = SampleTable(samples)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    materialized = [build[row] for row in range(len(build))]
+    table_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    copied = [dict(sample) for sample in samples]
+    dicts_seconds = time.perf_counter() - started
+    assert materialized == copied
+
+    return {
+        "samples": size,
+        "dicts_mb": round(dicts_mb, 1),
+        "table_mb": round(table_mb, 1),
+        "reduction": round(dicts_mb / table_mb, 1),
+        "build_seconds": round(build_seconds, 3),
+        "materialize_us_per_sample": round(table_seconds / size * 1e6, 2),
+        "dict_copy_us_per_sample": round(dicts_seconds / size * 1e6, 2),
+    }
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=parse_list, default=[10000, 100000])
+    args = parser.parse_args()
+
+    for size in args.samples:
+        print(run(size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compares search completion payloads before and after paging, as the number of matching samples grows.
+
+python -m benchmarks.bench_search_page --samples 1000,10000,100000
+
+For a remote search, "full" serializes every upstream sample as the listener used to, while "page" ranks them and
+serializes one page. For a local search, "full" ranks every match with a full sort and "page" keeps a heap of one page.
+Times are the best of a few runs.
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.fixtures import WORDS, generate_samples
+from listeners import settings
+from listeners.functions.search import search_outputs
+from listeners.search_index import SearchIndex
+
+REPEAT = 5
+
+
+def best_seconds(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(size: int) -> dict:
+    samples = generate_samples(size)
+    query = " ".join(WORDS[:3])
+    response = {"ok": True, "samples": samples}
+    page = search_outputs(response=response, query=query, filters=None, offset=0)
+    index = SearchIndex(samples)
+    limit = settings.SEARCH_PAGE_SIZE + 1
+
+    return {
+        "samples": size,
+        "remote_full_kb": round(len(json.dumps({"search_results": samples})) / 1024, 1),
+        "remote_page_kb": round(len(json.dumps(page)) / 1024, 1),
+        "remote_full_ms": round(best_seconds(lambda: json.dumps({"search_results": samples})) * 1000, 2),
+        "remote_page_ms": round(
+            best_seconds(lambda: json.dumps(search_outputs(response=response, query=query, filters=None, offset=0))) * 1000,
+            2,
+        ),
+        "local_full_ms": round(best_seconds(lambda: json.dumps(index.search(query))) * 1000, 2),
+        "local_page_ms": round(best_seconds(lambda: json.dumps(index.search(query, limit=limit))) * 1000, 2),
+    }
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=parse_list, default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    for size in args.samples:
+        print(run(size))
+
+
+if __name__ == "__main__":
+    main()
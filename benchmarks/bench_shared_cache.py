@@ -0,0 +1,119 @@
+"""Compares the response cache hit rate of several nodes with and without a shared cache backend.
+
+    python -m benchmarks.bench_shared_cache --nodes 1,2,4,8 --requests 20000 --queries 500
+
+Each run spreads `--requests` searches over `--nodes` response caches at random, a few popular queries asked far more
+often than the rest, on a simulated clock advancing `--interval-ms` per request so entries expire as they would. A miss
+is answered by a stand-in upstream with `--results` samples and set in the cache. Without a backend each node only
+hits what it fetched itself, so the hit rate falls as nodes are added. With `LocalCacheBackend`, or with
+`RedisCacheBackend` against a local fake server, every node hits what any node fetched. The sizes of a response
+encoded for the shared cache and as JSON are printed first.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import time
+
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.fixtures import generate_samples
+from listeners.cache import TTLCache
+from listeners.cache_backend import LocalCacheBackend, RedisCacheBackend, encode_value
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def encoded_sizes(results: int) -> dict:
+    response = {"ok": True, "samples": generate_samples(results)}
+    encoded = len(encode_value(response))
+    encoded_json = len(json.dumps(response).encode("utf-8"))
+    return {
+        "results": results,
+        "json_bytes": encoded_json,
+        "encoded_bytes": encoded,
+        "ratio": round(encoded_json / encoded, 1),
+    }
+
+
+def run(backend_name: str, nodes: int, requests: int, queries: int, results: int, interval: float, ttl: float) -> dict:
+    rng = random.Random(nodes)
+    clock = SimulatedClock()
+    server = None
+    backends = [None] * nodes
+    if backend_name == "local":
+        backends = [LocalCacheBackend(ttl=ttl, clock=clock)] * nodes
+    elif backend_name == "redis":
+        server = FakeRedis(clock=clock).start()
+        logger = logging.getLogger(__name__)
+        backends = [RedisCacheBackend("127.0.0.1", server.port, ttl=ttl, logger=logger) for _ in range(nodes)]
+
+    caches = []
+    for backend in backends:
+        cache = TTLCache(ttl=ttl, clock=clock)
+        cache.backend = backend
+        caches.append(cache)
+
+    # Popularity falls off with rank, as it does for real search queries
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(queries)))
+    responses = {}
+    upstream_calls = 0
+    started = time.perf_counter()
+    for query in rng.choices(range(queries), cum_weights=weights, k=requests):
+        cache = rng.choice(caches)
+        key = f"query-{query}"
+        if cache.get(key) is None:
+            upstream_calls += 1
+            if query not in responses:
+                responses[query] = {"ok": True, "samples": generate_samples(results, seed=query)}
+            cache.set(key, responses[query])
+        clock.now += interval
+    elapsed = time.perf_counter() - started
+
+    for backend in backends:
+        if isinstance(backend, RedisCacheBackend):
+            backend.close()
+    if server is not None:
+        server.stop()
+
+    hits = sum(cache.hits for cache in caches)
+    return {
+        "backend": backend_name,
+        "nodes": nodes,
+        "requests": requests,
+        "hit_rate": round(hits / requests, 3),
+        "upstream_calls": upstream_calls,
+        "us_per_request": round(elapsed / requests * 1e6, 1),
+    }
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=parse_list, default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--results", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=10)
+    parser.add_argument("--ttl", type=float, default=30)
+    args = parser.parse_args()
+
+    for results in (args.results, 10 * args.results):
+        print(encoded_sizes(results))
+    for backend_name in ("none", "local", "redis"):
+        for nodes in args.nodes:
+            print(run(backend_name, nodes, args.requests, args.queries, args.results, args.interval_ms / 1000, args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compares peak memory of loading developer.sampleData.get responses whole and streaming them sample by sample.
+
+    python -m benchmarks.bench_streaming --samples 10000,100000
+
+Each case runs in a fresh child process against a local fake Slack API served by this one, and reports how far the
+child's peak RSS rose above its RSS before the request, along with the wall time. The search case loads every sample;
+the unfurl case looks up the sample halfway through the response. Peak RSS is read from /proc, so this runs on Linux.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from slack_sdk import WebClient
+
+from benchmarks.fake_slack_api import FakeSlackAPI
+from benchmarks.fixtures import generate_samples
+from listeners import settings
+from listeners.sample_data_service import API_METHOD, fetch_sample, fetch_sample_data
+
+SCENARIOS = ("search", "unfurl")
+MODES = ("whole", "stream")
+
+
+def memory_status_mb(field: str) -> float:
+    """Reads `VmHWM` (peak RSS) or `VmRSS` from /proc. Unlike `ru_maxrss`, which Linux carries over from the parent
+    process, the peak there starts over when the child process starts."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} is missing from /proc/self/status")
+
+
+def run_child(base_url: str, scenario: str, mode: str, sample_id: str):
+    settings.STREAM_SAMPLE_DATA = mode == "stream"
+    client = WebClient(token="xoxb-benchmark", base_url=base_url)
+    before = memory_status_mb("VmRSS")
+
+    started = time.perf_counter()
+    if scenario == "search":
+        result = len(fetch_sample_data(client=client)["samples"])
+    else:
+        result = fetch_sample(client=client, sample_id=sample_id)["external_ref"]["id"]
+    elapsed = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {
+                "peak_rss_increase_mb": round(memory_status_mb("VmHWM") - before, 1),
+                "seconds": round(elapsed, 3),
+                "result": result,
+            }
+        )
+    )
+
+
+def run_case(base_url: str, size: int, scenario: str, mode: str) -> dict:
+    child = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_streaming",
+            "--child",
+            f"--base-url={base_url}",
+            f"--scenario={scenario}",
+            f"--mode={mode}",
+            f"--sample-id=sample-{size // 2}",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {"samples": size, "scenario": scenario, "mode": mode, **json.loads(child.stdout)}
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=parse_list, default=[10000, 100000])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--sample-id", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.base_url, args.scenario, args.mode, args.sample_id)
+        return
+
+    for size in args.samples:
+        samples = generate_samples(size)
+        with FakeSlackAPI({API_METHOD: lambda body: {"ok": True, "samples": samples}}) as api:
+            for scenario in SCENARIOS:
+                for mode in MODES:
+                    print(run_case(api.base_url, size, scenario, mode))
+
+
+if __name__ == "__main__":
+    main()
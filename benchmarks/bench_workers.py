@@ -0,0 +1,113 @@
+"""Measures how search throughput scales with the number of worker processes sharing one corpus snapshot.
+
+    python -m benchmarks.bench_workers --processes 1,2,4 --samples 10000 --duration 5
+
+The supervisor refreshes the corpus once from a local fake Slack API and shares it through the snapshot file and the
+response cache, as `WORKER_PROCESSES` does. Each worker then dispatches local mode searches through its own `App` for
+`--duration` seconds, completing them against a fake Slack API of its own so the parent is never the bottleneck.
+Speedup is relative to one process, and efficiency is speedup per process. Scaling is bounded by the CPU count.
+"""
+
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from slack_bolt import App, BoltRequest
+from slack_sdk import WebClient
+
+from benchmarks.bench_listeners import build_bodies, fake_slack_api
+from benchmarks.fixtures import generate_samples
+from listeners import register_listeners, sample_data_service, settings
+from listeners.workers import Supervisor
+
+
+def dispatch_searches(index: int, ready, shared, size: int, duration: float, start, results):
+    settings.SEARCH_MODE = "local"
+    sample_data_service.join_shared_sample_data(shared, logger=logging.getLogger(__name__))
+    samples = generate_samples(size)
+    bodies = build_bodies("search", samples, 500, random.Random(index))
+
+    with fake_slack_api(samples, latency=0) as api:
+        app = App(
+            client=WebClient(token="xoxb-benchmark", base_url=api.base_url),
+            token_verification_enabled=False,
+            request_verification_enabled=False,
+            process_before_response=True,
+        )
+        register_listeners(app)
+        # The first search of each worker pays for its share of warming up, which is not part of the steady state
+        app.dispatch(BoltRequest(body=bodies[0], mode="socket_mode"))
+
+        ready.set()
+        start.wait()
+        requests = 0
+        deadline = time.perf_counter() + duration
+        for body in itertools.cycle(bodies):
+            if time.perf_counter() >= deadline:
+                break
+            app.dispatch(BoltRequest(body=body, mode="socket_mode"))
+            requests += 1
+
+    results.put(requests)
+
+
+def run(processes: int, size: int, duration: float, shared, context) -> dict:
+    start = context.Event()
+    results = context.Queue()
+    supervisor = Supervisor(
+        dispatch_searches,
+        processes=processes,
+        logger=logging.getLogger(__name__),
+        args=(shared, size, duration, start, results),
+        context=context,
+    )
+
+    supervisor.start()
+    for worker in supervisor.workers:
+        worker.ready.wait()
+    start.set()
+    requests = sum(results.get() for _ in range(processes))
+    supervisor.stop()
+
+    return {"processes": processes, "samples": size, "requests_per_second": round(requests / duration, 1)}
+
+
+def parse_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=parse_list, default=[1, 2, 4])
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    settings.SEARCH_MODE = "local"
+    settings.CORPUS_SNAPSHOT_PATH = os.path.join(tempfile.mkdtemp(), "corpus.snapshot")
+    samples = generate_samples(args.samples)
+
+    with fake_slack_api(samples, latency=0) as api:
+        client = WebClient(token="xoxb-benchmark", base_url=api.base_url)
+        sample_data_service.refresh_corpus(client=client, logger=logging.getLogger(__name__))
+        shared = sample_data_service.share_sample_data(client=client, logger=logging.getLogger(__name__))
+
+    print({"cpu_count": os.cpu_count()})
+    context = multiprocessing.get_context("spawn")
+    baseline = None
+    for processes in args.processes:
+        result = run(processes, args.samples, args.duration, shared, context)
+        baseline = baseline or result["requests_per_second"] / processes
+        result["speedup"] = round(result["requests_per_second"] / baseline, 2)
+        result["efficiency"] = round(result["speedup"] / processes, 2)
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import socket
+import threading
+import time
+from socketserver import BaseRequestHandler, ThreadingTCPServer
+
+
+class FakeRedis:
+    """A local TCP server answering the Redis protocol commands the shared cache uses from an in-memory dict.
+
+    Every command is recorded, and so is each batch of commands answered together, so tests can assert on pipelining.
+    Commands the client sends in one write are answered with one write, as a real server answers a pipeline. Setting
+    `password` requires an `AUTH` first.
+
+        with FakeRedis() as server:
+            RedisCacheBackend("127.0.0.1", server.port, ttl=30, logger=logger).set("key", "value")
+    """
+
+    def __init__(self, password: str = None, latency: float = 0, clock=time.monotonic):
+        self.password = password
+        self.latency = latency
+        self.data: dict[bytes, tuple[float, bytes]] = {}
+        self.commands = []
+        self.batches = []
+        self.connections = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._server = ThreadingTCPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.01,), daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def execute(self, command: list, session: dict) -> bytes:
+        name = command[0].upper()
+        args = command[1:]
+        with self._lock:
+            self.commands.append([name.decode(), *args])
+            if name == b"AUTH":
+                session["authenticated"] = args[-1].decode() == self.password
+                return b"+OK\r\n" if session["authenticated"] else b"-WRONGPASS invalid password\r\n"
+            if self.password and not session.get("authenticated"):
+                return b"-NOAUTH Authentication required.\r\n"
+            if name in (b"PING", b"SELECT"):
+                return b"+OK\r\n"
+            if name == b"SET":
+                expires_at = self._clock() + int(args[3]) / 1000 if len(args) > 3 else float("inf")
+                self.data[args[0]] = (expires_at, args[1])
+                return b"+OK\r\n"
+            if name == b"DEL":
+                return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in args)
+
+            entry = self.data.get(args[0])
+            if entry is not None and entry[0] <= self._clock():
+                del self.data[args[0]]
+                entry = None
+            if name == b"GET":
+                return b"$-1\r\n" if entry is None else b"$%d\r\n%s\r\n" % (len(entry[1]), entry[1])
+            if name == b"PTTL":
+                if entry is None:
+                    return b":-2\r\n"
+                if entry[0] == float("inf"):
+                    return b":-1\r\n"
+                return b":%d\r\n" % round((entry[0] - self._clock()) * 1000)
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseRequestHandler):
+            def handle(self):
+                with server._lock:
+                    server.connections += 1
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                session = {}
+                buffer = b""
+                while data := self.request.recv(65536):
+                    buffer += data
+                    commands, buffer = parse_commands(buffer)
+                    if not commands:
+                        continue
+                    with server._lock:
+                        server.batches.append(len(commands))
+                    if server.latency:
+                        time.sleep(server.latency)
+                    self.request.sendall(b"".join(server.execute(command, session) for command in commands))
+
+        return Handler
+
+
+def parse_commands(buffer: bytes) -> tuple:
+    """Returns the complete RESP commands at the start of `buffer` and the bytes after them."""
+    commands = []
+    while buffer.startswith(b"*"):
+        position = buffer.find(b"\r\n")
+        if position < 0:
+            break
+        count = int(buffer[1:position])
+        position += 2
+        command = []
+        for _ in range(count):
+            end = buffer.find(b"\r\n", position)
+            if end < 0:
+                return commands, buffer
+            length = int(buffer[position + 1 : end])
+            start = end + 2
+            if len(buffer) < start + length + 2:
+                return commands, buffer
+            command.append(buffer[start : start + length])
+            position = start + length + 2
+        commands.append(command)
+        buffer = buffer[position:]
+    return commands, buffer
@@ -0,0 +1,92 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class FakeSlackAPI:
+    """A local HTTP/1.1 server answering Slack Web API calls with canned responses.
+
+    `handlers` maps an API method name to a callable taking the parsed request body and returning either a response
+    dict or a `(status, headers, response dict)` tuple. Each accepted connection and request is counted so callers can
+    assert on connection reuse.
+
+        with FakeSlackAPI({"developer.sampleData.get": lambda body: {"ok": True, "samples": []}}) as api:
+            WebClient(base_url=api.base_url).api_call("developer.sampleData.get")
+    """
+
+    def __init__(self, handlers: dict = None, close_connections: bool = False):
+        self.handlers = handlers or {}
+        self.close_connections = close_connections
+        self.connections = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.01,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with api._lock:
+                    api.connections += 1
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get_content_type() == "application/json":
+                    body = json.loads(raw or b"{}")
+                else:
+                    body = dict(parse_qsl(raw.decode("utf-8")))
+
+                # AsyncWebClient sends its params in the query string instead
+                url = urlsplit(self.path)
+                body.update(parse_qsl(url.query))
+                method = url.path.rsplit("/", 1)[-1]
+                with api._lock:
+                    api.requests.append((method, body))
+
+                handler = api.handlers.get(method)
+                result = handler(body) if handler else {"ok": False, "error": "unknown_method"}
+                status, headers, response = result if isinstance(result, tuple) else (200, {}, result)
+
+                payload = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+                if api.close_connections:
+                    # Drop the connection without announcing it, as a server timing out idle keep-alives would
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,43 @@
+import random
+
+from listeners.filters import LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
+
+# A few thousand distinct terms keep posting lists about as sparse as in real sample descriptions
+WORDS = [
+    "bolt", "slack", "python", "java", "search", "template", "workflow", "function", "socket", "mode",
+    "event", "message", "block", "kit", "modal", "shortcut", "command", "oauth", "token", "webhook",
+] + [f"term{i}" for i in range(5000)]  # fmt: skip
+
+LANGUAGES = [option["value"] for option in LANGUAGES_FILTER["options"]]
+
+
+def generate_samples(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "title": " ".join(rng.choices(WORDS, k=4)),
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "link": f"https://example.com/{i}",
+            "date_updated": "2025-01-01",
+            "external_ref": {"id": f"sample-{i}"},
+            "language": rng.choice(LANGUAGES),
+            "type": rng.choice([TEMPLATES_FILTER["name"], SAMPLES_FILTER["name"]]),
+        }
+        for i in range(count)
+    ]
+
+
+def filter_samples(samples: list, params: dict) -> list:
+    """Approximates developer.sampleData.get matching for samples from `generate_samples`."""
+    terms = set((params.get("query") or "").lower().split())
+    filters = params.get("filters") or {}
+    languages = filters.get(LANGUAGES_FILTER["name"])
+    sample_type = filters.get("type")
+
+    return [
+        sample
+        for sample in samples
+        if (not terms or terms & set(sample["title"].split() + sample["description"].split()))
+        and (not languages or sample["language"] in languages)
+        and (not sample_type or sample["type"] == sample_type)
+    ]
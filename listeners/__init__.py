@@ -1,6 +1,16 @@
-from listeners import events, functions
+from listeners import events, functions, settings
+from listeners.recorder import PayloadRecorder
 
 
 def register_listeners(app):
+    if settings.RECORD_PAYLOADS_PATH:
+        app.use(PayloadRecorder(settings.RECORD_PAYLOADS_PATH, settings.RECORD_PAYLOADS_SALT).middleware)
     functions.register(app)
     events.register(app)
+
+
+def register_async_listeners(app):
+    if settings.RECORD_PAYLOADS_PATH:
+        app.use(PayloadRecorder(settings.RECORD_PAYLOADS_PATH, settings.RECORD_PAYLOADS_SALT).async_middleware)
+    functions.register_async(app)
+    events.register_async(app)
@@ -0,0 +1,275 @@
+import asyncio
+import datetime
+import logging
+from contextlib import aclosing
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from listeners import settings
+from listeners.corpus import refresh_delay
+from listeners.http_pool import stream_async_api_call
+from listeners.json_stream import ArrayStreamParser
+from listeners.metrics import corpus_refreshes, slack_api_duration
+from listeners.rate_limit import UpstreamUnavailable
+from listeners.sample_data_service import (
+    API_METHOD,
+    CORPUS_FACETS,
+    CORPUS_FLIGHT_KEY,
+    STREAM_CHUNK_SIZE,
+    build_corpus_index,
+    build_params,
+    cache_corpus_responses,
+    cache_key,
+    corpus,
+    find_stored_sample,
+    find_unavailable_samples,
+    found_samples,
+    handle_response,
+    ignore_delta_sync,
+    initial_refresh_delay,
+    prefix_response,
+    raise_response_error,
+    response_cache,
+    restore_corpus,
+    sample_store,
+    save_corpus,
+    search_corpus,
+    search_expanded_corpus,
+    search_unavailable_corpus,
+    syncs_corpus,
+    update_corpus,
+    updated_samples,
+    updated_since,
+    upstream,
+    uses_corpus,
+)
+from listeners.single_flight import AsyncSingleFlight
+
+flights = AsyncSingleFlight()
+# The background refresh of a stale corpus, held until done since the event loop only keeps weak references to tasks
+revalidation: asyncio.Task = None
+
+
+async def fetch_sample_data(
+    client: AsyncWebClient, query: str = None, filters: dict = None, logger: logging.Logger = None, limit: int = None
+):
+    params = build_params(query=query, filters=filters)
+
+    if settings.SEARCH_MODE == "local":
+        index = await fetch_corpus_index(client=client, logger=logger)
+        return search_expanded_corpus(index=index, params=params, limit=limit) or search_corpus(
+            index=index, params=params, limit=limit
+        )
+
+    if not corpus.is_stale():
+        response = search_expanded_corpus(index=corpus.index, params=params, limit=limit)
+        if response is not None:
+            return response
+
+    try:
+        return await fetch_remote_sample_data(client=client, params=params, logger=logger)
+    except UpstreamUnavailable as e:
+        return search_unavailable_corpus(params=params, limit=limit, error=e, logger=logger)
+
+
+async def fetch_remote_sample_data(client: AsyncWebClient, params: dict, logger: logging.Logger = None, cache: bool = True):
+    key = cache_key(params)
+
+    response = response_cache.get(key) or prefix_response(params)
+    if response is not None:
+        return response
+
+    async def fetch():
+        with slack_api_duration.time(method=API_METHOD):
+            if settings.STREAM_SAMPLE_DATA:
+                samples = [sample async for sample in stream_sample_data(client=client, params=params, logger=logger)]
+                response = {"ok": True, "samples": samples}
+            else:
+                response = await client.api_call(API_METHOD, params=params)
+        return handle_response(key=key, response=response, logger=logger, cache=cache)
+
+    async def fetch_uncached():
+        # A caller missing the cache just before the previous flight for `key` ended starts a flight of its own, which
+        # the response that flight cached answers without another upstream call. It was cached here, so the shared
+        # backend is not asked again, and the lookup already counted as a miss is not counted twice
+        entry = response_cache.entry(key)
+        if entry is not None:
+            return entry[1]
+        return await call_upstream(client=client, request=fetch)
+
+    return await flights.do(key, fetch_uncached)
+
+
+async def call_upstream(client: AsyncWebClient, request):
+    if not settings.RATE_LIMITING:
+        return await request()
+    return await upstream.call_async(client.token, request, deadline=settings.RETRY_DEADLINE_SECONDS)
+
+
+async def stream_sample_data(client: AsyncWebClient, params: dict, logger: logging.Logger = None):
+    parser = ArrayStreamParser("samples")
+
+    async with stream_async_api_call(client, API_METHOD, params) as response:
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            samples = parser.feed(chunk)
+            if parser.fields.get("ok") is False:
+                raise_response_error(response=parser.fields, logger=logger)
+            for sample in samples:
+                yield sample
+
+        samples = parser.close()
+        if not parser.fields.get("ok", False):
+            raise_response_error(response=parser.fields, logger=logger)
+        for sample in samples:
+            yield sample
+
+
+async def fetch_corpus_index(client: AsyncWebClient, logger: logging.Logger = None):
+    if corpus.index is None:
+        return await refresh_corpus(client=client, logger=logger)
+
+    index = corpus.index
+    if corpus.is_stale():
+        revalidate_corpus(client=client, logger=logger)
+    return index
+
+
+def revalidate_corpus(client: AsyncWebClient, logger: logging.Logger = None) -> asyncio.Task:
+    """Refreshes the corpus in a background task unless such a refresh is already running, returning its task."""
+    global revalidation
+    if revalidation is not None and not revalidation.done():
+        return revalidation
+
+    async def revalidate():
+        try:
+            await refresh_corpus(client=client, logger=logger)
+        except Exception as e:
+            logger.warning(f"Serving a stale sample corpus after a failed refresh: {e}")
+
+    revalidation = asyncio.ensure_future(revalidate())
+    return revalidation
+
+
+async def refresh_corpus(client: AsyncWebClient, logger: logging.Logger = None):
+    cache = cache_corpus_responses()
+
+    async def refresh():
+        if syncs_corpus():
+            index = await sync_corpus(client=client, logger=logger)
+            if index is not None:
+                return index
+
+        response, *facet_responses = await asyncio.gather(
+            fetch_remote_sample_data(client=client, params=build_params(), logger=logger, cache=cache),
+            *(
+                fetch_remote_sample_data(client=client, params=build_params(filters=filters), logger=logger, cache=cache)
+                for _, filters in CORPUS_FACETS
+            ),
+        )
+        facets = [facet for facet, _ in CORPUS_FACETS]
+        corpus_refreshes.inc(kind="full")
+        # Building the index takes seconds for a large corpus, which would hold up every request on the loop, so it is
+        # built on a thread and only swapped in here
+        index = await asyncio.to_thread(
+            build_corpus_index, response=response, facet_responses=dict(zip(facets, facet_responses))
+        )
+        corpus.publish(index)
+        await asyncio.to_thread(save_corpus)
+        return index
+
+    return await flights.do(CORPUS_FLIGHT_KEY, refresh)
+
+
+async def sync_corpus(client: AsyncWebClient, logger: logging.Logger = None):
+    since = corpus.index.watermark
+    samples, *facet_samples = await asyncio.gather(
+        fetch_updated_samples(client=client, since=since, logger=logger),
+        *(fetch_updated_samples(client=client, since=since, filters=filters, logger=logger) for _, filters in CORPUS_FACETS),
+    )
+    if samples is None or None in facet_samples:
+        return ignore_delta_sync(logger)
+    facets = [facet for facet, _ in CORPUS_FACETS]
+    corpus_refreshes.inc(kind="delta")
+    # The index is updated in place, which searches running on the loop meanwhile see either before or after each change
+    return await asyncio.to_thread(update_corpus, samples=samples, facet_samples=dict(zip(facets, facet_samples)))
+
+
+async def fetch_updated_samples(
+    client: AsyncWebClient, since: datetime.date, filters: dict = None, logger: logging.Logger = None
+) -> list:
+    params = {**build_params(filters=filters), "updated_since": since.isoformat()}
+
+    async def fetch():
+        with slack_api_duration.time(method=API_METHOD):
+            if settings.STREAM_SAMPLE_DATA:
+                samples = stream_sample_data(client=client, params=params, logger=logger)
+                try:
+                    updated = []
+                    async for sample in samples:
+                        if not updated_since(sample, since):
+                            return None
+                        updated.append(sample)
+                    return updated
+                finally:
+                    await samples.aclose()
+            response = await client.api_call(API_METHOD, params=params)
+        response = handle_response(key=cache_key(params), response=response, logger=logger, cache=False)
+        return updated_samples(response.get("samples", []), since)
+
+    return await call_upstream(client=client, request=fetch)
+
+
+async def run_corpus_refresher(client: AsyncWebClient, logger: logging.Logger):
+    if not uses_corpus():
+        return
+    await asyncio.to_thread(restore_corpus, logger=logger)
+    await asyncio.sleep(initial_refresh_delay())
+
+    while True:
+        try:
+            await refresh_corpus(client=client, logger=logger)
+        except Exception as e:
+            logger.warning(f"Failed to refresh the sample corpus, keeping the previous snapshot: {e}")
+
+        await asyncio.sleep(refresh_delay(settings.CORPUS_REFRESH_SECONDS, settings.CORPUS_REFRESH_JITTER_SECONDS))
+
+
+async def fetch_sample(client: AsyncWebClient, sample_id: str, logger: logging.Logger = None):
+    return (await fetch_samples(client=client, sample_ids=[sample_id], logger=logger)).get(sample_id)
+
+
+async def fetch_samples(client: AsyncWebClient, sample_ids: list, logger: logging.Logger = None) -> dict:
+    if settings.SEARCH_MODE == "local":
+        index = await fetch_corpus_index(client=client, logger=logger)
+        return found_samples(index.get, sample_ids)
+
+    samples = found_samples(find_stored_sample, sample_ids)
+    missing = {sample_id for sample_id in sample_ids if sample_id not in samples}
+
+    try:
+        if missing and settings.STREAM_SAMPLE_DATA:
+            samples.update(await find_streamed_samples(client=client, sample_ids=missing, logger=logger))
+        elif missing:
+            await fetch_remote_sample_data(client=client, params=build_params(), logger=logger)
+            samples.update(found_samples(sample_store.get, missing))
+    except UpstreamUnavailable as e:
+        samples.update(find_unavailable_samples(sample_ids=missing, error=e, logger=logger))
+
+    return samples
+
+
+async def find_streamed_samples(client: AsyncWebClient, sample_ids: set, logger: logging.Logger = None) -> dict:
+    async def find():
+        found = {}
+        with slack_api_duration.time(method=API_METHOD):
+            async with aclosing(stream_sample_data(client=client, params=build_params(), logger=logger)) as samples:
+                async for sample in samples:
+                    if sample["external_ref"]["id"] in sample_ids:
+                        found[sample["external_ref"]["id"]] = sample
+                        if len(found) == len(sample_ids):
+                            break
+        return found
+
+    found = await call_upstream(client=client, request=find)
+    sample_store.add_all(found.values())
+    return found
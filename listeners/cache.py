@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_TTL_SECONDS = 30
+
+
+class TTLCache:
+    """Bounded least-recently-used cache whose entries also expire `ttl` seconds after they are set.
+
+    A `backend`, such as another process's cache or a `CacheBackend`, can be set as a second level shared with other
+    caches: local misses are looked up in it, keeping what it has only for as long as it has left, and sets and
+    invalidations go to both.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.backend = None
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        entry = self.entry(key)
+        if entry is None and self.backend is not None:
+            entry = self.backend.entry(key)
+            if entry is not None:
+                self._put(key, entry[1], entry[0])
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def prefetch(self, keys: list) -> int:
+        """Copies the backend's entries for those of `keys` missing here with one lookup, so gets that follow for them
+        hit without a round trip each. Returns how many were found."""
+        missing = [key for key, entry in zip(keys, self.entries(keys)) if entry is None]
+        if not missing or self.backend is None:
+            return 0
+
+        found = 0
+        for key, entry in zip(missing, self.backend.entries(missing)):
+            if entry is not None:
+                self._put(key, entry[1], entry[0])
+                found += 1
+        return found
+
+    def entries(self, keys: list) -> list:
+        return [self.entry(key) for key in keys]
+
+    def entry(self, key: str):
+        """Returns `(seconds_left, value)` for an unexpired entry, or None, without counting a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            seconds_left = expires_at - self._clock()
+            if seconds_left <= 0:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return seconds_left, value
+
+    def set(self, key: str, value, ttl: float = None):
+        self._put(key, value, self.ttl if ttl is None else ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def _put(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.invalidate(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class VersionedCache:
+    """Keeps the value last built for each key along with the version it was built from, so a lookup for any other
+    version misses. Entries expire `ttl` seconds after they are set and the oldest are evicted beyond `max_size`.
+
+    Reads take no lock, which keeps a hit cheaper than rebuilding a small value. Racing writers may build the same value
+    twice, and the last one wins.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: dict[str, tuple[object, float, object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] <= self._clock():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key: str, version, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (version, self._clock() + self.ttl, value)
+
+            while len(self._entries) > self.max_size:
+                del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
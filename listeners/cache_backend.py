@@ -0,0 +1,383 @@
+import json
+import logging
+import socket
+import threading
+import time
+import zlib
+from urllib.parse import unquote, urlsplit
+
+from listeners.sample_table import SampleTable
+
+# Bumped whenever encoded values change shape, so values written by other versions of the app are ignored
+CODEC_VERSION = 2
+
+# How the rest of an encoded value is laid out: JSON as is, or with its samples packed into a `SampleTable`
+PLAIN = 0
+PACKED_SAMPLES = 1
+
+# Values are compressed at the fastest level, which already shrinks sample text several times over
+COMPRESSION_LEVEL = 1
+
+# Bytes taking the length of the JSON header of packed samples, which their table's buffers follow
+HEADER_SIZE_BYTES = 4
+
+
+class CacheCodecError(Exception):
+    pass
+
+
+def encode_value(value) -> bytes:
+    """Returns `value`, made of JSON types only, as compact bytes, raising `CacheCodecError` for any other value. The
+    samples of a response are packed into a `SampleTable`, which stores their text in one buffer and their dates and
+    languages as small codes.
+
+    Values cross the network to other nodes, so they are encoded as data only: JSON, and for packed samples the raw
+    buffers of their table, whose sizes the JSON header gives. Decoding one never runs or builds anything else.
+    """
+    try:
+        if isinstance(value, dict) and isinstance(value.get("samples"), list):
+            layout, payload = PACKED_SAMPLES, encode_samples(value)
+        else:
+            layout, payload = PLAIN, encode_json(value)
+        return bytes((CODEC_VERSION, layout)) + zlib.compress(payload, COMPRESSION_LEVEL)
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        raise CacheCodecError(f"Cannot encode a {type(value).__name__} for the cache: {e}") from e
+
+
+def encode_json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_samples(value: dict) -> bytes:
+    state = SampleTable(value["samples"]).to_state()
+    buffers = [state["data"], state["offsets"], state["flags"], state["dates"]]
+    categories = {}
+    for field, (values, codes) in state["categories"].items():
+        categories[field] = values
+        buffers.append(codes)
+
+    header = encode_json(
+        {
+            "value": {key: item for key, item in value.items() if key != "samples"},
+            "categories": categories,
+            "raw": state["raw"],
+            "sizes": [len(buffer) for buffer in buffers],
+        }
+    )
+    return len(header).to_bytes(HEADER_SIZE_BYTES, "big") + header + b"".join(buffers)
+
+
+def decode_value(data: bytes):
+    """Returns the value `encode_value` encoded as `data`, raising `CacheCodecError` when it cannot be decoded or is
+    not shaped like a value `encode_value` returns."""
+    if len(data) < 2 or data[0] != CODEC_VERSION:
+        raise CacheCodecError(f"Unsupported cache value version {data[:1].hex() or 'none'}")
+    if data[1] not in (PLAIN, PACKED_SAMPLES):
+        raise CacheCodecError(f"Unsupported cache value layout {data[1]}")
+    try:
+        payload = zlib.decompress(data[2:])
+        if data[1] == PLAIN:
+            return json.loads(payload)
+        return decode_samples(payload)
+    except CacheCodecError:
+        raise
+    except Exception as e:
+        raise CacheCodecError(f"Corrupt cache value: {type(e).__name__} - {e}") from e
+
+
+def decode_samples(payload: bytes) -> dict:
+    size = int.from_bytes(payload[:HEADER_SIZE_BYTES], "big")
+    header = json.loads(payload[HEADER_SIZE_BYTES : HEADER_SIZE_BYTES + size])
+    value, categories, raw, sizes = header["value"], header["categories"], header["raw"], header["sizes"]
+    if (
+        not isinstance(value, dict)
+        or not isinstance(categories, dict)
+        or not isinstance(raw, dict)
+        or not all(isinstance(sample, dict) for sample in raw.values())
+        or len(sizes) != 4 + len(categories)
+        or sum(sizes) != len(payload) - HEADER_SIZE_BYTES - size
+    ):
+        raise CacheCodecError("Corrupt cache value: malformed header of packed samples")
+
+    buffers, start = [], HEADER_SIZE_BYTES + size
+    for length in sizes:
+        buffers.append(payload[start : start + length])
+        start += length
+    data, offsets, flags, dates, *codes = buffers
+    table = SampleTable.from_state(
+        {
+            "data": data,
+            "offsets": offsets,
+            "flags": flags,
+            "dates": dates,
+            "categories": {field: (values, code) for (field, values), code in zip(categories.items(), codes)},
+            "raw": {int(row): sample for row, sample in raw.items()},
+        }
+    )
+
+    rows = len(table)
+    if (
+        len(table.offsets) != rows + 1
+        or table.offsets[-1] != len(table.data)
+        or len(table.dates) != rows
+        or any(len(column.codes) != rows for column in table.categories.values())
+        or any(not 0 <= row < rows for row in table.raw)
+    ):
+        raise CacheCodecError("Corrupt cache value: packed samples of inconsistent sizes")
+    return {**value, "samples": list(table)}
+
+
+class CacheBackend:
+    """A second level for `TTLCache`, shared by the caches of several processes or nodes.
+
+    Entries are `(seconds_left, value)` pairs, so a cache keeping a value it looked up expires it along with the
+    backend's copy. A backend that cannot be reached answers with misses and drops writes, rather than failing the
+    lookup that would have fallen back to the upstream anyway. Values that cannot be encoded are not stored either.
+    """
+
+    def entry(self, key: str):
+        """Returns `(seconds_left, value)` for an unexpired entry, or None."""
+        return self.entries([key])[0]
+
+    def entries(self, keys: list) -> list:
+        """Returns the entry, or None, of each of `keys`, in order."""
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float = None):
+        raise NotImplementedError
+
+    def invalidate(self, key: str):
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """A backend held in this process, which stands in for a networked one where there is none, such as in tests and
+    benchmarks simulating several nodes. Values are stored encoded, so every cache using it gets a copy of its own, as
+    it would from a server."""
+
+    def __init__(self, ttl: float, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: dict[str, tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def entries(self, keys: list) -> list:
+        now = self._clock()
+        entries = []
+        with self._lock:
+            for key in keys:
+                expires_at, data = self._entries.get(key, (now, None))
+                if expires_at <= now:
+                    self._entries.pop(key, None)
+                    entries.append(None)
+                else:
+                    entries.append((expires_at - now, data))
+        return [entry and (entry[0], decode_value(entry[1])) for entry in entries]
+
+    def set(self, key: str, value, ttl: float = None):
+        try:
+            data = encode_value(value)
+        except CacheCodecError:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), data)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*args) -> bytes:
+    """Returns a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def read_reply(reader):
+    """Reads one RESP reply from a buffered binary `reader`. Error replies are returned as `RedisError`s rather than
+    raised, so the rest of a pipeline's replies are still read."""
+    line = reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the cache server")
+    kind, rest = line[:1], line[1:-2]
+
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RedisError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed by the cache server")
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        return None if length < 0 else [read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply from the cache server: {line!r}")
+
+
+class RedisConnection:
+    def __init__(self, host: str, port: int, timeout: float, password: str = None, db: int = 0):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._socket.makefile("rb")
+
+        setup = []
+        if password:
+            setup.append(("AUTH", password))
+        if db:
+            setup.append(("SELECT", db))
+        if setup:
+            self.pipeline(setup)
+
+    def pipeline(self, commands: list) -> list:
+        """Sends every command before reading any reply, so a batch costs one round trip. Raises the first error
+        reply, if any, once all replies are read."""
+        self._socket.sendall(b"".join(encode_command(*command) for command in commands))
+        replies = [read_reply(self._reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """A backend on a server speaking the Redis protocol, shared by every node configured with it.
+
+    Each entry is stored under `prefix` plus its key with a millisecond expiry, encoded by `encode_value`. Lookups
+    pipeline `PTTL` and `GET` for every key, so looking up a whole batch takes one round trip. Connections are pooled,
+    one per concurrent caller. After a call fails, the server is left alone for `retry_after` seconds, during which
+    lookups miss without waiting on it.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ttl: float,
+        logger: logging.Logger,
+        password: str = None,
+        db: int = 0,
+        prefix: str = "sample-data:",
+        timeout: float = 0.25,
+        max_idle: int = 8,
+        retry_after: float = 5,
+        clock=time.monotonic,
+    ):
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.password = password
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.retry_after = retry_after
+        self._logger = logger
+        self._clock = clock
+        self._idle: list[RedisConnection] = []
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float, logger: logging.Logger, **kwargs):
+        """Configures a backend from a `redis://[:password@]host[:port][/db]` URL."""
+        parts = urlsplit(url)
+        if parts.scheme != "redis":
+            raise ValueError(f"Unsupported shared cache URL scheme: {parts.scheme}")
+        return cls(
+            host=parts.hostname or "localhost",
+            port=parts.port or 6379,
+            ttl=ttl,
+            logger=logger,
+            password=unquote(parts.password) if parts.password else None,
+            db=int(parts.path.lstrip("/") or 0),
+            **kwargs,
+        )
+
+    def entries(self, keys: list) -> list:
+        commands = []
+        for key in keys:
+            commands.append(("PTTL", self.prefix + key))
+            commands.append(("GET", self.prefix + key))
+        replies = self._call(commands)
+        if replies is None:
+            return [None] * len(keys)
+
+        entries = []
+        for key, milliseconds_left, data in zip(keys, replies[::2], replies[1::2]):
+            entries.append(self._entry(key, milliseconds_left, data))
+        return entries
+
+    def set(self, key: str, value, ttl: float = None):
+        try:
+            data = encode_value(value)
+        except CacheCodecError as e:
+            self._logger.warning(f"Not storing {key} in the shared cache: {e}")
+            return
+        milliseconds = max(1, round(1000 * (self.ttl if ttl is None else ttl)))
+        self._call([("SET", self.prefix + key, data, "PX", milliseconds)])
+
+    def invalidate(self, key: str):
+        self._call([("DEL", self.prefix + key)])
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _entry(self, key: str, milliseconds_left: int, data: bytes):
+        # The key may expire between the two commands, and keys set without an expiry are kept for the default ttl
+        if data is None or milliseconds_left == -2:
+            return None
+        try:
+            value = decode_value(data)
+        except CacheCodecError as e:
+            self._logger.warning(f"Ignoring the shared cache entry for {key}: {e}")
+            return None
+        return (milliseconds_left / 1000 if milliseconds_left >= 0 else self.ttl), value
+
+    def _call(self, commands: list):
+        if self._clock() < self._down_until:
+            return None
+
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        try:
+            if connection is None:
+                connection = RedisConnection(self.host, self.port, self.timeout, self.password, self.db)
+            replies = connection.pipeline(commands)
+        except (OSError, ValueError, RedisError) as e:
+            if connection is not None:
+                connection.close()
+            self._down_until = self._clock() + self.retry_after
+            self._logger.warning(f"Shared cache {commands[0][0]} failed, using the local cache only: {e}")
+            return None
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                connection = None
+        if connection is not None:
+            connection.close()
+        return replies
@@ -0,0 +1,152 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from listeners.search_index import SearchIndex
+from listeners.snapshot_file import load_snapshot, save_snapshot
+
+
+def refresh_delay(interval: float, jitter: float) -> float:
+    return max(0.0, interval + random.uniform(-jitter, jitter))
+
+
+class Corpus:
+    """Holds the latest snapshot of the full sample corpus along with the search index built over it."""
+
+    def __init__(self, max_age: float, clock=time.monotonic):
+        self.max_age = max_age
+        self.index: SearchIndex = None
+        self.loaded_at: float = None
+        # When the index was last rebuilt from the full corpus, rather than updated with changes since
+        self.reconciled_at: float = None
+        # Identifies the snapshot file this process last wrote or read, to tell when another process replaces it
+        self.snapshot_version: tuple = None
+        self._clock = clock
+
+    def load(self, samples: list, facets: dict) -> SearchIndex:
+        return self.publish(SearchIndex(samples, facets))
+
+    def publish(self, index: SearchIndex) -> SearchIndex:
+        """Swaps in an index built elsewhere over the full corpus, so searches see either the previous index or this
+        one."""
+        self.index = index
+        self.loaded_at = self.reconciled_at = self._clock()
+        return index
+
+    def update(self, samples: list, facets: dict, deleted=()) -> int:
+        """Merges the changes since the last refresh into the index in place, as `SearchIndex.update` describes, and
+        counts the corpus as refreshed. Returns how many samples changed."""
+        changes = self.index.update(samples, facets, deleted)
+        self.loaded_at = self._clock()
+        return changes
+
+    def age(self) -> float:
+        return self._clock() - self.loaded_at if self.index is not None else float("inf")
+
+    def reconciled_age(self) -> float:
+        return self._clock() - self.reconciled_at if self.index is not None else float("inf")
+
+    def is_stale(self) -> bool:
+        return self.age() >= self.max_age
+
+    def save(self, path: str):
+        state = {"index": self.index.to_state(), "reconciled_at": time.time() - self.reconciled_age()}
+        save_snapshot(path, state, saved_at=time.time() - self.age())
+        self.snapshot_version = snapshot_version(path)
+
+    def restore(self, path: str) -> SearchIndex:
+        """Loads the snapshot at `path`, raising `SnapshotError` when it is missing, corrupt or already stale."""
+        # Recorded even when loading fails, so a watcher only tries again once the file is replaced
+        self.snapshot_version = snapshot_version(path)
+        state, saved_at = load_snapshot(path, max_age=self.max_age)
+        self.index = SearchIndex.from_state(state["index"])
+        self.loaded_at = self._clock() - (time.time() - saved_at)
+        self.reconciled_at = self._clock() - (time.time() - state["reconciled_at"])
+        return self.index
+
+    def snapshot_changed(self, path: str) -> bool:
+        version = snapshot_version(path)
+        return version is not None and version != self.snapshot_version
+
+    def clear(self):
+        self.index = None
+        self.loaded_at = None
+        self.reconciled_at = None
+        self.snapshot_version = None
+
+
+def snapshot_version(path: str):
+    # Snapshots are replaced by renaming a new file over the old one, so a new inode means a new snapshot
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class CorpusRefresher:
+    """Calls `refresh` on a daemon thread after `initial_delay` and then every `interval` +/- `jitter` seconds.
+
+    A failed refresh is logged and leaves the previous snapshot in place until the next attempt.
+    """
+
+    def __init__(self, refresh, interval: float, jitter: float, logger: logging.Logger, initial_delay: float = 0):
+        self.initial_delay = initial_delay
+        self.interval = interval
+        self.jitter = jitter
+        self._refresh = refresh
+        self._logger = logger
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="corpus-refresher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        if self.initial_delay and self._stopped.wait(self.initial_delay):
+            return
+
+        while True:
+            try:
+                self._refresh()
+            except Exception as e:
+                self._logger.warning(f"Failed to refresh the sample corpus, keeping the previous snapshot: {e}")
+
+            if self._stopped.wait(refresh_delay(self.interval, self.jitter)):
+                return
+
+
+class SnapshotWatcher:
+    """Calls `reload` on a daemon thread whenever `changed()` says another process wrote a new snapshot, checking every
+    `interval` seconds. A failed reload is logged and tried again at the next check."""
+
+    def __init__(self, changed, reload, interval: float, logger: logging.Logger):
+        self.interval = interval
+        self._changed = changed
+        self._reload = reload
+        self._logger = logger
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="snapshot-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                if self._changed():
+                    self._reload()
+            except Exception as e:
+                self._logger.warning(f"Failed to reload the sample corpus snapshot, keeping the previous one: {e}")
@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+from listeners import settings
+from listeners.metrics import deferred_deadline_exceeded, deferred_jobs, deferred_queue_wait, deferred_rejected
+
+
+class ExecutorSaturated(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class DeferredExecutor:
+    """Runs listener work after the request was acked, on at most `max_workers` threads.
+
+    At most `max_pending` jobs may be queued or running at once, and further jobs are rejected with `ExecutorSaturated`
+    rather than queued behind them. A job still running at its deadline resolves with `DeadlineExceeded` so the listener
+    can respond without it, while the work itself runs to completion in the background. The `finish` of such jobs runs
+    on up to `deadline_workers` threads of its own, since the pool's threads are still busy with their work.
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 64, deadline_workers: int = 4, clock=time.monotonic):
+        self.max_pending = max_pending
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deferred")
+        # Timed out jobs are resolved off the watchdog thread, and several at once, so a slow `finish` neither delays
+        # other deadlines nor the fallbacks of other jobs that timed out along with it
+        self._expirer = ThreadPoolExecutor(max_workers=deadline_workers, thread_name_prefix="deferred-deadline")
+        self._pending = 0
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._watchdog = None
+
+    def defer(self, work, finish, deadline: float):
+        """Runs `work()` on the pool, then calls `finish(result)` where `result()` returns what `work` returned or
+        raises what it raised, `DeadlineExceeded` or `ExecutorSaturated`."""
+        try:
+            future = self.submit(work, deadline)
+        except ExecutorSaturated as e:
+            future = Future()
+            future.set_exception(e)
+
+        future.add_done_callback(lambda done: finish(done.result))
+
+    def submit(self, work, deadline: float) -> Future:
+        with self._condition:
+            if self._pending >= self.max_pending:
+                deferred_rejected.inc(executor="thread")
+                raise ExecutorSaturated(f"{self._pending} deferred jobs are already queued or running")
+
+            self._pending += 1
+            deferred_jobs.inc(executor="thread")
+
+            future = Future()
+            heapq.heappush(self._deadlines, (self._clock() + deadline, next(self._sequence), future))
+            if self._watchdog is None:
+                self._watchdog = threading.Thread(target=self._expire, name="deferred-watchdog", daemon=True)
+                self._watchdog.start()
+            self._condition.notify()
+
+        self._pool.submit(self._run, work, future, time.perf_counter())
+        return future
+
+    def pending(self) -> int:
+        return self._pending
+
+    def drain(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for every queued and running job to finish, returning whether they did."""
+        deadline = self._clock() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _run(self, work, future: Future, submitted: float):
+        deferred_queue_wait.observe(time.perf_counter() - submitted)
+        try:
+            result = work()
+        except BaseException as e:
+            resolve(future, exception=e)
+        else:
+            resolve(future, result=result)
+        finally:
+            with self._condition:
+                self._pending -= 1
+                deferred_jobs.dec(executor="thread")
+                self._condition.notify_all()
+
+    def _expire(self):
+        while True:
+            with self._condition:
+                while not self._deadlines or self._deadlines[0][0] > self._clock():
+                    timeout = self._deadlines[0][0] - self._clock() if self._deadlines else None
+                    self._condition.wait(timeout)
+                _, _, future = heapq.heappop(self._deadlines)
+
+            if not future.done():
+                self._expirer.submit(self._deadline_exceeded, future)
+
+    @staticmethod
+    def _deadline_exceeded(future: Future):
+        if resolve(future, exception=DeadlineExceeded("The deferred job did not finish before its deadline")):
+            deferred_deadline_exceeded.inc(executor="thread")
+
+
+def resolve(future: Future, result=None, exception: BaseException = None) -> bool:
+    """Sets the outcome of `future` unless it already has one, returning whether it was set."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        return False
+    return True
+
+
+class AsyncDeferredExecutor:
+    """The asyncio counterpart of `DeferredExecutor`, where `work` and `finish` are coroutine functions and jobs run as
+    tasks on the running event loop rather than on a thread pool."""
+
+    def __init__(self, max_pending: int = 64):
+        self.max_pending = max_pending
+        self._jobs = set()
+        self._finishers = set()
+
+    def defer(self, work, finish, deadline: float):
+        if len(self._jobs) >= self.max_pending:
+            deferred_rejected.inc(executor="asyncio")
+            error = ExecutorSaturated(f"{len(self._jobs)} deferred jobs are already queued or running")
+            self._track(self._finishers, finish(raising(error)))
+            return
+
+        job = self._track(self._jobs, work())
+        deferred_jobs.inc(executor="asyncio")
+        job.add_done_callback(lambda _: deferred_jobs.dec(executor="asyncio"))
+
+        async def result():
+            try:
+                return await asyncio.wait_for(asyncio.shield(job), deadline)
+            except asyncio.TimeoutError:
+                deferred_deadline_exceeded.inc(executor="asyncio")
+                raise DeadlineExceeded("The deferred job did not finish before its deadline") from None
+
+        self._track(self._finishers, finish(result))
+
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    @staticmethod
+    def _track(tasks: set, coroutine) -> asyncio.Task:
+        # The event loop only keeps weak references to tasks, so each one is held until it is done
+        task = asyncio.ensure_future(coroutine)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        # A job whose deadline passed may fail after its listener stopped waiting for it
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+
+def raising(error: Exception):
+    async def result():
+        raise error
+
+    return result
+
+
+executor = DeferredExecutor(
+    max_workers=settings.DEFERRED_WORKERS,
+    max_pending=settings.DEFERRED_MAX_PENDING,
+    deadline_workers=settings.DEFERRED_DEADLINE_WORKERS,
+)
+async_executor = AsyncDeferredExecutor(max_pending=settings.DEFERRED_MAX_PENDING)
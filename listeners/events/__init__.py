@@ -1,7 +1,17 @@
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 
+from listeners.metrics import instrumented
+
+from . import async_entity_details_requested
 from .entity_details_requested import entity_details_requested_callback
 
 
 def register(app: App):
-    app.event("entity_details_requested")(entity_details_requested_callback)
+    app.event("entity_details_requested")(instrumented("entity_details_requested", entity_details_requested_callback))
+
+
+def register_async(app: AsyncApp):
+    app.event("entity_details_requested")(
+        instrumented("entity_details_requested", async_entity_details_requested.entity_details_requested_callback)
+    )
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from listeners import settings
+from listeners.async_sample_data_service import fetch_sample, fetch_samples
+from listeners.events.entity_details_requested import (
+    Unfurl,
+    build_present_details_payload,
+    group_by_token,
+    reporting_errors,
+)
+from listeners.metrics import slack_api_duration
+from listeners.micro_batch import AsyncMicroBatcher
+
+
+async def entity_details_requested_callback(event: dict, client: AsyncWebClient, logger: logging.Logger):
+    with reporting_errors(logger):
+        unfurl = Unfurl(event=event, client=client, logger=logger)
+
+        if settings.UNFURL_BATCHING:
+            unfurl_batcher.submit(unfurl)
+            return
+
+        sample = await fetch_sample(client=client, sample_id=unfurl.sample_id, logger=logger)
+        await present_details(unfurl, sample)
+
+
+async def present_details(unfurl: Unfurl, sample: dict):
+    if not sample:
+        unfurl.logger.warning(f"Unable to find sample with ID '{unfurl.sample_id}' in the fetched samples data")
+        return
+
+    payload = build_present_details_payload(event=unfurl.event, sample=sample)
+    with slack_api_duration.time(method="entity.presentDetails"):
+        await unfurl.client.api_call(
+            api_method="entity.presentDetails",
+            json=payload,
+        )
+
+
+async def present_details_batch(unfurls: list):
+    for group in group_by_token(unfurls):
+        client, logger = group[0].client, group[0].logger
+        with reporting_errors(logger, count=len(group)):
+            samples = await fetch_samples(
+                client=client, sample_ids=list(dict.fromkeys(unfurl.sample_id for unfurl in group)), logger=logger
+            )
+            await asyncio.gather(*(present_batched_details(unfurl, samples.get(unfurl.sample_id)) for unfurl in group))
+
+
+async def present_batched_details(unfurl: Unfurl, sample: dict):
+    with reporting_errors(unfurl.logger):
+        await present_details(unfurl, sample)
+
+
+unfurl_batcher = AsyncMicroBatcher(
+    present_details_batch,
+    window=settings.UNFURL_BATCH_WINDOW_MS / 1000,
+    max_size=settings.UNFURL_BATCH_MAX_SIZE,
+    max_latency=settings.UNFURL_BATCH_MAX_LATENCY_MS / 1000,
+    name="unfurl-batch",
+)
@@ -1,69 +1,179 @@
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from slack_sdk import WebClient
 
-from listeners.sample_data_service import SlackResponseError, fetch_sample_data
+from listeners import settings
+from listeners.cache import VersionedCache
+from listeners.metrics import listener_errors, slack_api_duration
+from listeners.micro_batch import MicroBatcher
+from listeners.sample_data_service import SlackResponseError, fetch_sample, fetch_samples
 
+# Entity metadata built for the current version of each unfurled sample, shared by every unfurl of it
+present_details_cache = VersionedCache(
+    max_size=settings.PRESENT_DETAILS_CACHE_SIZE, ttl=settings.PRESENT_DETAILS_CACHE_TTL_SECONDS
+)
 
-def entity_details_requested_callback(event: dict, client: WebClient, logger: logging.Logger):
-    try:
-        sample_id = event["external_ref"]["id"]
-        response = fetch_sample_data(client=client, logger=logger)
-        samples = response.get("samples", [])
 
-        sample = next((s for s in samples if s["external_ref"]["id"] == sample_id), None)
+def build_present_details_payload(event: dict, sample: dict) -> dict:
+    """Splices the event's `trigger_id` and link into the cached metadata for `sample`. The nested dicts are shared with
+    other payloads for the same sample, so they must not be modified."""
+    external_ref, entity_payload = present_details_metadata(sample)
+    return {
+        "trigger_id": event["trigger_id"],
+        "metadata": {
+            "entity_type": "slack#/entities/item",
+            "url": event["link"]["url"],
+            "external_ref": external_ref,
+            "entity_payload": entity_payload,
+        },
+    }
 
-        if not sample:
-            logger.warning(f"Unable to find sample with ID '{sample_id}' in the fetched samples data")
-            return
 
-        custom_fields = [
-            {
-                "key": "description",
-                "label": "Description of sample",
-                "type": "string",
-                "value": sample["description"],
-            },
+def present_details_metadata(sample: dict) -> tuple:
+    """Returns the `external_ref` and `entity_payload` for `sample`, built once per `(id, date_updated)`. A sample
+    edited without a new `date_updated` is picked up once its entry expires."""
+    sample_id = sample["external_ref"]["id"]
+    version = sample["date_updated"]
+    metadata = present_details_cache.get(sample_id, version)
+    if metadata is None:
+        metadata = ({"id": sample_id}, build_entity_payload(sample))
+        present_details_cache.set(sample_id, version, metadata)
+    return metadata
+
+
+def build_entity_payload(sample: dict) -> dict:
+    custom_fields = [
+        {
+            "key": "description",
+            "label": "Description of sample",
+            "type": "string",
+            "value": sample["description"],
+        },
+        {
+            "key": "date_updated",
+            "label": "Last updated",
+            "type": "string",
+            "value": sample["date_updated"],
+        },
+    ]
+
+    if "content" in sample:
+        custom_fields.append(
             {
-                "key": "date_updated",
-                "label": "Last updated",
+                "key": "content",
+                "label": "Details of sample",
                 "type": "string",
-                "value": sample["date_updated"],
-            },
-        ]
-
-        if "content" in sample:
-            custom_fields.append(
-                {
-                    "key": "content",
-                    "label": "Details of sample",
-                    "type": "string",
-                    "value": sample["content"],
-                }
-            )
+                "value": sample["content"],
+            }
+        )
+
+    return {
+        "attributes": {
+            "title": {"text": sample["title"], "edit": {"enabled": False, "text": {"max_length": 50}}},
+        },
+        "custom_fields": custom_fields,
+    }
+
+
+def entity_details_requested_callback(event: dict, client: WebClient, logger: logging.Logger):
+    with reporting_errors(logger):
+        unfurl = Unfurl(event=event, client=client, logger=logger)
+
+        if settings.UNFURL_BATCHING:
+            unfurl_batcher.submit(unfurl)
+            return
+
+        sample = fetch_sample(client=client, sample_id=unfurl.sample_id, logger=logger)
+        present_details(unfurl, sample)
+
+
+class Unfurl:
+    __slots__ = ("sample_id", "event", "client", "logger")
 
-        payload = {
-            "trigger_id": event["trigger_id"],
-            "metadata": {
-                "entity_type": "slack#/entities/item",
-                "url": event["link"]["url"],
-                "external_ref": {"id": sample_id},
-                "entity_payload": {
-                    "attributes": {
-                        "title": {"text": sample["title"], "edit": {"enabled": False, "text": {"max_length": 50}}},
-                    },
-                    "custom_fields": custom_fields,
-                },
-            },
-        }
-        client.api_call(
+    def __init__(self, event: dict, client, logger: logging.Logger):
+        self.sample_id = event["external_ref"]["id"]
+        self.event = event
+        self.client = client
+        self.logger = logger
+
+
+def present_details(unfurl: Unfurl, sample: dict):
+    if not sample:
+        unfurl.logger.warning(f"Unable to find sample with ID '{unfurl.sample_id}' in the fetched samples data")
+        return
+
+    payload = build_present_details_payload(event=unfurl.event, sample=sample)
+    with slack_api_duration.time(method="entity.presentDetails"):
+        unfurl.client.api_call(
             api_method="entity.presentDetails",
             json=payload,
         )
+
+
+def present_details_batch(unfurls: list):
+    """Looks up the samples of a batch of unfurls at once for each workspace token, then sends every unfurl's details
+    concurrently."""
+    for group in group_by_token(unfurls):
+        client, logger = group[0].client, group[0].logger
+        with reporting_errors(logger, count=len(group)):
+            samples = fetch_samples(
+                client=client, sample_ids=list(dict.fromkeys(unfurl.sample_id for unfurl in group)), logger=logger
+            )
+            for unfurl in group:
+                fanout.submit(present_batched_details, unfurl, samples.get(unfurl.sample_id))
+
+
+def present_batched_details(unfurl: Unfurl, sample: dict):
+    with reporting_errors(unfurl.logger):
+        present_details(unfurl, sample)
+
+
+def group_by_token(unfurls: list) -> list:
+    # Bolt hands every request its own client, so unfurls for the same workspace are grouped by token instead
+    groups = {}
+    for unfurl in unfurls:
+        groups.setdefault(unfurl.client.token, []).append(unfurl)
+    return list(groups.values())
+
+
+def close_unfurls(timeout: float) -> bool:
+    """Sends the unfurls still waiting for their batch and waits up to `timeout` seconds for every batch and every
+    `entity.presentDetails` call fanned out from one to finish, returning whether they did."""
+    deadline = time.monotonic() + timeout
+    drained = unfurl_batcher.close(timeout)
+
+    # Batches fan their calls out to `fanout`, so it is only shut down once no batch is left to submit to it
+    shutdown = threading.Thread(target=fanout.shutdown, daemon=True)
+    shutdown.start()
+    shutdown.join(max(0.0, deadline - time.monotonic()))
+    return drained and not shutdown.is_alive()
+
+
+@contextmanager
+def reporting_errors(logger: logging.Logger, count: int = 1):
+    """Logs and counts what went wrong handling `count` unfurls instead of raising it."""
+    try:
+        yield
     except SlackResponseError as e:
+        listener_errors.inc(count, listener="entity_details_requested", kind="slack_response")
         logger.error(f"Failed to fetch or parse sample data. Error details: {e}", exc_info=e)
     except Exception as e:
+        listener_errors.inc(count, listener="entity_details_requested", kind="unexpected")
         logger.error(
             f"An unexpected error occurred handling entity_details_requested event: {type(e).__name__} - {e}",
             exc_info=e,
         )
+
+
+unfurl_batcher = MicroBatcher(
+    present_details_batch,
+    window=settings.UNFURL_BATCH_WINDOW_MS / 1000,
+    max_size=settings.UNFURL_BATCH_MAX_SIZE,
+    max_latency=settings.UNFURL_BATCH_MAX_LATENCY_MS / 1000,
+    name="unfurl-batch",
+)
+fanout = ThreadPoolExecutor(max_workers=settings.UNFURL_FANOUT_WORKERS, thread_name_prefix="unfurl-fanout")
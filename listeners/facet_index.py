@@ -0,0 +1,88 @@
+import re
+
+ONE_BIT = re.compile("1")
+
+
+def bitset(doc_ids) -> int:
+    # Setting bits in a bytearray avoids reallocating a wide int for every member
+    flags = bytearray()
+    for doc_id in doc_ids:
+        byte = doc_id >> 3
+        if byte >= len(flags):
+            flags.extend(bytes(byte - len(flags) + 1))
+        flags[byte] |= 1 << (doc_id & 7)
+    return int.from_bytes(flags, "little")
+
+
+def bitset_members(mask: int) -> list:
+    # Scanning the binary representation from the low bit keeps the loop in C even for very wide masks
+    return [match.start() for match in ONE_BIT.finditer(bin(mask)[:1:-1])]
+
+
+def bitset_flags(mask: int, size: int) -> bytes:
+    """Returns a `size`-bit `mask` as little-endian bytes, testable in constant time with `flags[i >> 3] >> (i & 7) & 1`."""
+    return mask.to_bytes((size + 7) // 8 or 1, "little")
+
+
+class FacetIndex:
+    """One int bitset per `(filter name, value)` facet, with bit `i` set when doc `i` carries that value.
+
+    Selected languages are OR'ed together and the result is AND'ed with the selected type, so filtering costs a
+    handful of bitwise ops over `len(docs) / 64` machine words regardless of how many docs match.
+    """
+
+    def __init__(self, doc_count: int, facets: dict = None):
+        self.doc_count = doc_count
+        self.all = (1 << doc_count) - 1
+        self.bitmaps = {facet: bitset(doc_ids) for facet, doc_ids in (facets or {}).items()}
+
+    @classmethod
+    def from_bitmaps(cls, doc_count: int, bitmaps: dict):
+        index = cls(doc_count)
+        index.bitmaps = bitmaps
+        return index
+
+    def update(self, added: dict, removed=()):
+        """Sets the docs `added`, each mapped to the facets it carries, and clears the `removed` ones. Each bitmap is
+        rebuilt once and then swapped in, so a concurrent `match` sees it either before or after the update."""
+        cleared = ~bitset(removed)
+        carrying = {facet: [] for facet in self.bitmaps}
+        for doc_id, facets in added.items():
+            for facet in facets:
+                carrying.setdefault(facet, []).append(doc_id)
+
+        self.bitmaps = {facet: self.bitmaps.get(facet, 0) & cleared | bitset(doc_ids) for facet, doc_ids in carrying.items()}
+        self.doc_count = max(self.doc_count, max(added, default=-1) + 1)
+        self.all = self.all & cleared | bitset(added)
+
+    def facets_of(self, doc_id: int) -> set:
+        return {facet for facet, bitmap in self.bitmaps.items() if bitmap >> doc_id & 1}
+
+    def match(self, filters: dict = None):
+        """Returns the bitset of docs passing `filters`, shaped like the `filters` param of `developer.sampleData.get`,
+        or None when nothing is filtered."""
+        if not filters:
+            return None
+
+        mask = self.all
+
+        languages = filters.get("languages")
+        if languages:
+            selected = 0
+            for language in languages:
+                selected |= self.bitmaps.get(("languages", language), 0)
+            mask &= selected
+
+        sample_type = filters.get("type")
+        if sample_type:
+            mask &= self.bitmaps.get(("type", sample_type), 0)
+
+        return mask
+
+    def counts(self, filters: dict = None) -> dict:
+        """Returns how many of the docs passing `filters` carry each facet."""
+        mask = self.match(filters)
+        if mask is None:
+            return {facet: bitmap.bit_count() for facet, bitmap in self.bitmaps.items()}
+
+        return {facet: (bitmap & mask).bit_count() for facet, bitmap in self.bitmaps.items()}
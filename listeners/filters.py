@@ -14,3 +14,19 @@ LANGUAGES_FILTER = {
 TEMPLATES_FILTER = {"name": "template", "display_name": "Templates", "type": "toggle"}
 
 SAMPLES_FILTER = {"name": "sample", "display_name": "Samples", "type": "toggle"}
+
+# The static filters step outputs, built once rather than per request
+FILTERS_OUTPUTS = {"filters": [LANGUAGES_FILTER, TEMPLATES_FILTER, SAMPLES_FILTER]}
+
+
+def build_filters_outputs(counts: dict) -> dict:
+    """Returns filters step outputs offering only the languages and types some sample has, naming each language with
+    its sample count, given the `(filter name, value)` facet counts of a corpus."""
+    options = [
+        {"name": f"{option['name']} ({counts[(LANGUAGES_FILTER['name'], option['value'])]})", "value": option["value"]}
+        for option in LANGUAGES_FILTER["options"]
+        if counts.get((LANGUAGES_FILTER["name"], option["value"]))
+    ]
+    filters = [{**LANGUAGES_FILTER, "options": options}] if options else []
+    filters.extend(toggle for toggle in (TEMPLATES_FILTER, SAMPLES_FILTER) if counts.get(("type", toggle["name"])))
+    return {"filters": filters}
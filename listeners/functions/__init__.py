@@ -1,9 +1,20 @@
 from slack_bolt import App
+from slack_bolt.async_app import AsyncApp
 
+from listeners.metrics import instrumented
+
+from . import async_filters, async_search
 from .filters import filters_step_callback
 from .search import search_step_callback
 
 
 def register(app: App):
-    app.function("search", auto_acknowledge=False, ack_timeout=10)(search_step_callback)
-    app.function("filters", auto_acknowledge=False, ack_timeout=10)(filters_step_callback)
+    app.function("search", auto_acknowledge=False, ack_timeout=10)(instrumented("search", search_step_callback))
+    app.function("filters", auto_acknowledge=False, ack_timeout=10)(instrumented("filters", filters_step_callback))
+
+
+def register_async(app: AsyncApp):
+    app.function("search", auto_acknowledge=False, ack_timeout=10)(instrumented("search", async_search.search_step_callback))
+    app.function("filters", auto_acknowledge=False, ack_timeout=10)(
+        instrumented("filters", async_filters.filters_step_callback)
+    )
@@ -0,0 +1,42 @@
+import logging
+
+from slack_bolt.context.ack.async_ack import AsyncAck
+from slack_bolt.context.complete.async_complete import AsyncComplete
+from slack_bolt.context.fail.async_fail import AsyncFail
+
+from listeners import settings
+from listeners.metrics import listener_errors
+from listeners.sample_data_service import filters_outputs
+
+
+async def filters_step_callback(
+    ack: AsyncAck, inputs: dict, fail: AsyncFail, complete: AsyncComplete, logger: logging.Logger
+):
+    if settings.DEFERRED_COMPLETION:
+        # The filters are built before any request, so acking before completing is all deferring them needs
+        await ack()
+        await complete_filters(inputs=inputs, fail=fail, complete=complete, logger=logger)
+        return
+
+    try:
+        await complete_filters(inputs=inputs, fail=fail, complete=complete, logger=logger)
+    finally:
+        await ack()
+
+
+async def complete_filters(inputs: dict, fail: AsyncFail, complete: AsyncComplete, logger: logging.Logger):
+    try:
+        user_context = inputs.get("user_context", {})
+        logger.debug(f"User {user_context.get('id')} executing filter request")
+
+        await complete(outputs=filters_outputs())
+    except Exception as e:
+        listener_errors.inc(listener="filters", kind="unexpected")
+        logger.error(
+            f"Unexpected error occurred while processing filter request: {type(e).__name__} - {e}",
+            exc_info=e,
+        )
+        await fail(
+            error="We encountered an issue processing filter results. "
+            "Please try again or contact the app owner if the problem persists."
+        )
@@ -0,0 +1,86 @@
+import logging
+
+from slack_bolt.context.ack.async_ack import AsyncAck
+from slack_bolt.context.complete.async_complete import AsyncComplete
+from slack_bolt.context.fail.async_fail import AsyncFail
+from slack_sdk.web.async_client import AsyncWebClient
+
+from listeners import deferred, settings
+from listeners.async_sample_data_service import fetch_sample_data
+from listeners.deferred import DeadlineExceeded, ExecutorSaturated
+from listeners.functions.search import EXPIRED_CURSOR_ERROR, page_offset, search_outputs
+from listeners.metrics import listener_errors
+from listeners.ranking import InvalidCursor
+from listeners.sample_data_service import SlackResponseError, fetch_cached_sample_data
+
+
+async def search_step_callback(
+    ack: AsyncAck,
+    inputs: dict,
+    fail: AsyncFail,
+    complete: AsyncComplete,
+    client: AsyncWebClient,
+    logger: logging.Logger,
+):
+    query = inputs.get("query")
+    filters = inputs.get("filters")
+
+    try:
+        offset = page_offset(inputs)
+    except InvalidCursor as e:
+        logger.warning(f"Rejected search cursor: {e}")
+        try:
+            await fail(error=EXPIRED_CURSOR_ERROR)
+        finally:
+            await ack()
+        return
+
+    limit = offset + settings.SEARCH_PAGE_SIZE + 1
+
+    async def fetch():
+        return await fetch_sample_data(client=client, query=query, filters=filters, logger=logger, limit=limit)
+
+    async def finish(result):
+        await complete_search(
+            result=result, query=query, filters=filters, offset=offset, fail=fail, complete=complete, logger=logger
+        )
+
+    if settings.DEFERRED_COMPLETION:
+        await ack()
+        deferred.async_executor.defer(fetch, finish, deadline=settings.DEFERRED_DEADLINE_SECONDS)
+        return
+
+    try:
+        await finish(fetch)
+    finally:
+        await ack()
+
+
+async def complete_search(
+    result, query: str, filters: dict, offset: int, fail: AsyncFail, complete: AsyncComplete, logger: logging.Logger
+):
+    try:
+        try:
+            response = await result()
+        except (DeadlineExceeded, ExecutorSaturated) as e:
+            limit = offset + settings.SEARCH_PAGE_SIZE + 1
+            response = fetch_cached_sample_data(query=query, filters=filters, limit=limit)
+            if response is None:
+                raise
+            logger.warning(f"Serving cached search results: {e}")
+
+        await complete(outputs=search_outputs(response=response, query=query, filters=filters, offset=offset))
+    except SlackResponseError as e:
+        listener_errors.inc(listener="search", kind="slack_response")
+        logger.error(f"Failed to fetch or parse sample data. Error details: {e}", exc_info=e)
+        await fail(
+            error="We encountered an issue processing your search results. "
+            "Please try again or contact the app owner if the problem persists."
+        )
+    except (DeadlineExceeded, ExecutorSaturated) as e:
+        listener_errors.inc(listener="search", kind="deadline")
+        logger.error(f"Search request could not be completed in time: {e}")
+        await fail(error="Your search took too long to complete. Please try again in a moment.")
+    except Exception as e:
+        listener_errors.inc(listener="search", kind="unexpected")
+        logger.error(f"Unexpected error processing search request: {type(e).__name__} - {e}", exc_info=e)
@@ -2,16 +2,32 @@ import logging
 
 from slack_bolt import Ack, Complete, Fail
 
-from listeners.filters import LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
+from listeners import settings
+from listeners.metrics import listener_errors
+from listeners.sample_data_service import filters_outputs
 
 
 def filters_step_callback(ack: Ack, inputs: dict, fail: Fail, complete: Complete, logger: logging.Logger):
+    if settings.DEFERRED_COMPLETION:
+        # The filters are built before any request, so acking before completing is all deferring them needs
+        ack()
+        complete_filters(inputs=inputs, fail=fail, complete=complete, logger=logger)
+        return
+
+    try:
+        complete_filters(inputs=inputs, fail=fail, complete=complete, logger=logger)
+    finally:
+        ack()
+
+
+def complete_filters(inputs: dict, fail: Fail, complete: Complete, logger: logging.Logger):
     try:
         user_context = inputs.get("user_context", {})
         logger.debug(f"User {user_context.get('id')} executing filter request")
 
-        complete(outputs={"filters": [LANGUAGES_FILTER, TEMPLATES_FILTER, SAMPLES_FILTER]})
+        complete(outputs=filters_outputs())
     except Exception as e:
+        listener_errors.inc(listener="filters", kind="unexpected")
         logger.error(
             f"Unexpected error occurred while processing filter request: {type(e).__name__} - {e}",
             exc_info=e,
@@ -20,5 +36,3 @@ def filters_step_callback(ack: Ack, inputs: dict, fail: Fail, complete: Complete
             error="We encountered an issue processing filter results. "
             "Please try again or contact the app owner if the problem persists."
         )
-    finally:
-        ack()
@@ -3,7 +3,13 @@ import logging
 from slack_bolt import Ack, Complete, Fail
 from slack_sdk import WebClient
 
-from listeners.sample_data_service import SlackResponseError, fetch_sample_data
+from listeners import deferred, settings
+from listeners.deferred import DeadlineExceeded, ExecutorSaturated
+from listeners.metrics import listener_errors, search_results
+from listeners.ranking import InvalidCursor, decode_cursor, paginate
+from listeners.sample_data_service import SlackResponseError, fetch_cached_sample_data, fetch_sample_data
+
+EXPIRED_CURSOR_ERROR = "These search results are no longer available. Please run your search again."
 
 
 def search_step_callback(
@@ -14,22 +20,90 @@ def search_step_callback(
     client: WebClient,
     logger: logging.Logger,
 ):
+    query = inputs.get("query")
+    filters = inputs.get("filters")
+
+    try:
+        offset = page_offset(inputs)
+    except InvalidCursor as e:
+        logger.warning(f"Rejected search cursor: {e}")
+        try:
+            fail(error=EXPIRED_CURSOR_ERROR)
+        finally:
+            ack()
+        return
+
+    # One result past the page tells whether there is a next one
+    limit = offset + settings.SEARCH_PAGE_SIZE + 1
+
+    def fetch():
+        return fetch_sample_data(client=client, query=query, filters=filters, logger=logger, limit=limit)
+
+    def finish(result):
+        complete_search(
+            result=result, query=query, filters=filters, offset=offset, fail=fail, complete=complete, logger=logger
+        )
+
+    if settings.DEFERRED_COMPLETION:
+        ack()
+        deferred.executor.defer(fetch, finish, deadline=settings.DEFERRED_DEADLINE_SECONDS)
+        return
+
     try:
-        query = inputs.get("query")
-        filters = inputs.get("filters")
+        finish(fetch)
+    finally:
+        ack()
+
+
+def page_offset(inputs: dict) -> int:
+    """Returns where the requested page of results starts, raising `InvalidCursor` for a cursor of another search."""
+    cursor = inputs.get("cursor")
+    return decode_cursor(cursor, inputs.get("query"), inputs.get("filters")) if cursor else 0
+
 
-        response = fetch_sample_data(client=client, query=query, filters=filters, logger=logger)
+def search_outputs(response: dict, query: str, filters: dict, offset: int) -> dict:
+    """Ranks the response samples and returns the page starting at `offset`, with a cursor when more results follow."""
+    samples, next_cursor = paginate(
+        response.get("samples", []),
+        query=query,
+        filters=filters,
+        offset=offset,
+        page_size=settings.SEARCH_PAGE_SIZE,
+        ranked=response.get("ranked", False),
+    )
+    search_results.observe(len(samples))
 
-        samples = response.get("samples", [])
+    outputs = {"search_results": samples}
+    if next_cursor:
+        outputs["next_cursor"] = next_cursor
+    return outputs
 
-        complete(outputs={"search_results": samples})
+
+def complete_search(result, query: str, filters: dict, offset: int, fail: Fail, complete: Complete, logger: logging.Logger):
+    """Completes the search with a page of the response `result()` returns, falling back to cached results when a
+    deferred search ran past its deadline or could not be scheduled."""
+    try:
+        try:
+            response = result()
+        except (DeadlineExceeded, ExecutorSaturated) as e:
+            limit = offset + settings.SEARCH_PAGE_SIZE + 1
+            response = fetch_cached_sample_data(query=query, filters=filters, limit=limit)
+            if response is None:
+                raise
+            logger.warning(f"Serving cached search results: {e}")
+
+        complete(outputs=search_outputs(response=response, query=query, filters=filters, offset=offset))
     except SlackResponseError as e:
+        listener_errors.inc(listener="search", kind="slack_response")
         logger.error(f"Failed to fetch or parse sample data. Error details: {e}", exc_info=e)
         fail(
             error="We encountered an issue processing your search results. "
             "Please try again or contact the app owner if the problem persists."
         )
+    except (DeadlineExceeded, ExecutorSaturated) as e:
+        listener_errors.inc(listener="search", kind="deadline")
+        logger.error(f"Search request could not be completed in time: {e}")
+        fail(error="Your search took too long to complete. Please try again in a moment.")
     except Exception as e:
+        listener_errors.inc(listener="search", kind="unexpected")
         logger.error(f"Unexpected error processing search request: {type(e).__name__} - {e}", exc_info=e)
-    finally:
-        ack()
@@ -0,0 +1,152 @@
+import bisect
+import heapq
+from collections import Counter, defaultdict
+from itertools import chain
+
+# Prefixes this short match too many terms to rank on every keystroke, so their best completions are precomputed
+SHORT_PREFIX_LENGTH = 2
+
+# Terms shorter than this are too ambiguous to correct
+MIN_FUZZY_LENGTH = 3
+
+
+def max_edits(term: str, limit: int) -> int:
+    """Allows one typo in short terms and up to `limit` in longer ones."""
+    return min(limit, 1 if len(term) <= 5 else 2)
+
+
+def trigrams(term: str) -> list:
+    # A single space of padding marks where the term starts and ends, while leaving out the trigram of just its first
+    # letter, which every term starting with that letter would share
+    padded = f" {term} "
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Returns the Levenshtein distance between `a` and `b`, or `limit + 1` if it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a:
+        return len(b)
+    return bit_parallel_distance(char_masks(a), len(a), b, limit)
+
+
+def char_masks(pattern: str) -> dict:
+    masks = {}
+    for position, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | 1 << position
+    return masks
+
+
+def bit_parallel_distance(masks: dict, length: int, text: str, limit: int) -> int:
+    """Myers' bit-vector Levenshtein distance from the pattern described by `masks` and `length` to `text`, tracking a
+    whole column of the edit distance matrix in a couple of integers instead of filling it cell by cell."""
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative, distance = full, 0, length
+    for char in text:
+        eq = masks.get(char, 0)
+        vertical = eq | negative
+        horizontal = (((eq & positive) + positive) ^ positive) | eq
+        horizontal_positive = negative | ~(horizontal | positive) & full
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = (horizontal_positive << 1 | 1) & full
+        horizontal_negative = (horizontal_negative << 1) & full
+        positive = horizontal_negative | ~(vertical | horizontal_positive) & full
+        negative = horizontal_positive & vertical
+    return distance if distance <= limit else limit + 1
+
+
+class FuzzyIndex:
+    """Completes and corrects query terms against a vocabulary, ranking candidates by how many documents use them.
+
+    Prefix completion searches the sorted vocabulary, which finds the same terms as walking a trie with a fraction of
+    the memory. Fuzzy matching looks up candidates of about the same length that share enough trigrams with the term,
+    or that are short enough to share none, then keeps those within the allowed edit distance.
+    """
+
+    def __init__(self, frequencies: dict, max_completions: int = 5, edit_limit: int = 2):
+        self.frequencies = frequencies
+        self.max_completions = max_completions
+        self.edit_limit = edit_limit
+        self.terms = sorted(frequencies)
+
+        # Trigram postings are split by term length, so lookups only count terms of a length within reach of the edits
+        self.trigrams: dict[tuple[str, int], list[int]] = defaultdict(list)
+        self.gram_counts = []
+        # Terms with this few trigrams may be within the edits of a term without sharing any trigram with it
+        self.few_gram_terms: dict[int, list[int]] = defaultdict(list)
+        short_prefixes = defaultdict(list)
+        for term_id, term in enumerate(self.terms):
+            grams = set(trigrams(term))
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.trigrams[gram, len(term)].append(term_id)
+            if len(grams) <= 3 * edit_limit:
+                self.few_gram_terms[len(term)].append(term_id)
+            for length in range(1, min(SHORT_PREFIX_LENGTH, len(term)) + 1):
+                short_prefixes[term[:length]].append(term)
+        self.short_prefixes = {prefix: self._most_frequent(terms) for prefix, terms in short_prefixes.items()}
+
+    def complete(self, prefix: str) -> list:
+        """Returns the most frequent terms starting with `prefix`."""
+        if len(prefix) <= SHORT_PREFIX_LENGTH:
+            return self.short_prefixes.get(prefix, [])
+
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff", start)
+        return self._most_frequent(self.terms[start:end])
+
+    def correct(self, term: str) -> list:
+        """Returns the terms within the allowed edit distance of `term`, closest and then most frequent first."""
+        if len(term) < MIN_FUZZY_LENGTH:
+            return []
+
+        limit = max_edits(term, self.edit_limit)
+        grams = set(trigrams(term))
+        masks = char_masks(term)
+        lengths = range(len(term) - limit, len(term) + limit + 1)
+        postings = (self.trigrams.get((gram, length), ()) for gram in grams for length in lengths)
+        overlaps = Counter(chain.from_iterable(postings))
+        if len(grams) <= 3 * limit:
+            # The edits may replace every trigram of a term this short, such as "aap" for "app", so the terms of about
+            # its length that have as few trigrams are candidates whether or not any postings turned them up
+            for term_id in chain.from_iterable(self.few_gram_terms.get(length, ()) for length in lengths):
+                overlaps.setdefault(term_id, 0)
+
+        matches = []
+        for term_id, overlap in overlaps.items():
+            # Each edit removes at most three distinct trigrams from either term, so a match shares all the others
+            if overlap < max(len(grams), self.gram_counts[term_id]) - 3 * limit:
+                continue
+            candidate = self.terms[term_id]
+            distance = bit_parallel_distance(masks, len(term), candidate, limit)
+            if distance <= limit:
+                matches.append((distance, -self.frequencies[candidate], candidate))
+
+        return [candidate for _, _, candidate in heapq.nsmallest(self.max_completions, matches)]
+
+    def expand(self, tokens: list, known=None) -> list:
+        """Returns the query `tokens` with those not `known`, the vocabulary by default, replaced by their corrections,
+        or by their completions for the last one, which may still be being typed. Tokens without any candidates are
+        kept as they are."""
+        known = self.frequencies if known is None else known
+        expanded = []
+        for position, token in enumerate(tokens):
+            if token in known:
+                expanded.append(token)
+                continue
+
+            candidates = self.complete(token) if position == len(tokens) - 1 else []
+            expanded.extend(candidates or self.correct(token) or [token])
+        return expanded
+
+    def _most_frequent(self, terms: list) -> list:
+        return heapq.nlargest(self.max_completions, terms, key=self.frequencies.__getitem__)
+
+    def __len__(self):
+        return len(self.terms)
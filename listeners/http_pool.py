@@ -0,0 +1,292 @@
+import http.client
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from io import BytesIO
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPSHandler, ProxyHandler, Request, build_opener
+
+import aiohttp
+from slack_bolt import App, BoltRequest
+from slack_bolt.version import __version__ as bolt_version
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackRequestError
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.internal_utils import _get_headers, _get_url, convert_bool_to_0_or_1
+
+from listeners import settings
+
+# Errors raised when a pooled keep-alive connection was closed by the server while it sat idle
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive `http.client` connections, keyed by `(scheme, host, port)`.
+
+    At most `max_per_host` connections to one host are open at once, with further callers waiting for one to be
+    released. Up to `max_idle` released connections are kept for reuse and are closed once idle for `idle_timeout`.
+    """
+
+    def __init__(
+        self,
+        max_idle: int = 10,
+        max_per_host: int = 10,
+        idle_timeout: float = 60,
+        timeout: float = 30,
+        ssl_context=None,
+        clock=time.monotonic,
+    ):
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self._clock = clock
+        self._idle: dict[tuple, deque] = {}
+        self._open: dict[tuple, int] = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, key: tuple):
+        """Returns `(connection, reused)` for `key`, blocking while the host is at its connection limit."""
+        with self._condition:
+            while True:
+                idle = self._idle.get(key)
+                while idle:
+                    connection, released_at = idle.pop()
+                    if self._clock() - released_at < self.idle_timeout:
+                        self.reused += 1
+                        return connection, True
+                    self._close(key, connection)
+
+                if self._open.get(key, 0) < self.max_per_host:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    self.created += 1
+                    break
+
+                self._condition.wait()
+
+        return self._connect(key), False
+
+    def release(self, key: tuple, connection, reusable: bool = True):
+        with self._condition:
+            if reusable and self._idle_count() < self.max_idle:
+                self._idle.setdefault(key, deque()).append((connection, self._clock()))
+            else:
+                self._close(key, connection)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            for key, idle in self._idle.items():
+                while idle:
+                    self._close(key, idle.pop()[0])
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "idle": self._idle_count(),
+                "open": sum(self._open.values()),
+            }
+
+    def _connect(self, key: tuple):
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _close(self, key: tuple, connection):
+        connection.close()
+        self._open[key] -= 1
+        self.discarded += 1
+
+    def _idle_count(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+
+class PooledWebClient(WebClient):
+    """A `WebClient` that sends requests over keep-alive connections from a `ConnectionPool` instead of opening a new
+    connection through `urllib` for each one. Proxied clients fall back to the default transport.
+
+    `WebClient` has no supported hook for its transport, so this overrides a private method of it, as `form_request`
+    uses private helpers of `slack_sdk`. Both are why `slack-sdk` is pinned, and their signatures are tested, so an
+    upgrade changing them fails the tests rather than silently bypassing the pool.
+    """
+
+    def __init__(self, *args, pool: ConnectionPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool or ConnectionPool(timeout=self.timeout, ssl_context=self.ssl)
+
+    def _perform_urllib_http_request_internal(self, url: str, req):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise SlackRequestError(f"Invalid URL detected: {url}")
+        if self.proxy is not None:
+            return super()._perform_urllib_http_request_internal(url, req)
+
+        key, connection, resp = self._send(url, req.get_method(), req.data, dict(req.header_items()))
+        try:
+            body = resp.read()
+        except BaseException:
+            self.pool.release(key, connection, reusable=False)
+            raise
+        self.pool.release(key, connection, reusable=not resp.will_close)
+
+        if resp.status >= 400:
+            raise HTTPError(url, resp.status, resp.reason, resp.headers, BytesIO(body))
+
+        if resp.headers.get_content_type() == "application/gzip":
+            return {"status": resp.status, "headers": resp.headers, "body": body}
+
+        charset = resp.headers.get_content_charset() or "utf-8"
+        return {"status": resp.status, "headers": resp.headers, "body": body.decode(charset)}
+
+    @contextmanager
+    def stream(self, url: str, body: bytes, headers: dict):
+        """POSTs `body` to `url` and yields the response before its body is read. The connection is only reused when
+        the caller read the whole body."""
+        key, connection, resp = self._send(url, "POST", body, headers)
+        try:
+            if resp.status >= 400:
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, BytesIO(resp.read()))
+            yield resp
+        except BaseException:
+            self.pool.release(key, connection, reusable=False)
+            raise
+        # `read1` leaves a fully read response with a known length open, so check the remaining length as well
+        fully_read = resp.isclosed() or resp.length == 0
+        self.pool.release(key, connection, reusable=fully_read and not resp.will_close)
+
+    def _send(self, url: str, method: str, body: bytes, headers: dict):
+        """Sends a request over a pooled connection and returns `(key, connection, response)` once the response
+        headers arrived. The caller must release the connection."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = f"{parts.path}?{parts.query}" if parts.query else parts.path or "/"
+
+        while True:
+            connection, reused = self.pool.acquire(key)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                return key, connection, connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                self.pool.release(key, connection, reusable=False)
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                self.pool.release(key, connection, reusable=False)
+                raise
+
+
+class PooledApp(App):
+    """An `App` whose listeners get a `PooledWebClient` sharing the pool of the app's client, when it has one.
+
+    Bolt gives every request a client of its own, a plain `WebClient` copied from the app's, so that a listener setting
+    its token does not change the app's. The copy here keeps that but sends its requests over the shared pool.
+    """
+
+    def _init_context(self, req: BoltRequest):
+        super()._init_context(req)
+        if not isinstance(self._client, PooledWebClient):
+            return
+
+        client = req.context.client
+        req.context["client"] = PooledWebClient(
+            token=client.token,
+            base_url=client.base_url,
+            timeout=client.timeout,
+            ssl=client.ssl,
+            proxy=client.proxy,
+            headers=client.headers,
+            team_id=req.context.team_id,
+            logger=client.logger,
+            retry_handlers=client.retry_handlers,
+            pool=self._client.pool,
+        )
+
+
+def form_request(client, api_method: str, params: dict = None):
+    """Returns the `(url, body, headers)` of the form-encoded POST `client.api_call(api_method, params=params)` sends."""
+    params = convert_bool_to_0_or_1({name: value for name, value in (params or {}).items() if value is not None}) or {}
+    headers = _get_headers(
+        headers=client.headers, token=client.token, has_json=False, has_files=False, request_specific_headers=None
+    )
+    return _get_url(client.base_url, api_method), urlencode(params).encode("utf-8"), headers
+
+
+@contextmanager
+def stream_api_call(client: WebClient, api_method: str, params: dict = None):
+    """Calls `api_method` like `client.api_call(api_method, params=params)` but yields the HTTP response before its
+    body is read, so large responses can be parsed as they arrive with `read1`. Raises `HTTPError` on error statuses."""
+    url, body, headers = form_request(client, api_method, params)
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise SlackRequestError(f"Invalid URL detected: {url}")
+
+    if isinstance(client, PooledWebClient) and client.proxy is None:
+        with client.stream(url, body, headers) as response:
+            yield response
+        return
+
+    handlers = [ProxyHandler({"http": client.proxy, "https": client.proxy})] if client.proxy else []
+    opener = build_opener(*handlers, HTTPSHandler(context=client.ssl))
+    with opener.open(Request(url, data=body, headers=headers, method="POST"), timeout=client.timeout) as response:
+        yield response
+
+
+@asynccontextmanager
+async def stream_async_api_call(client: AsyncWebClient, api_method: str, params: dict = None):
+    """The `AsyncWebClient` counterpart of `stream_api_call`, yielding an `aiohttp` response whose `content` can be
+    read as it arrives."""
+    url, body, headers = form_request(client, api_method, params)
+    session = client.session or aiohttp.ClientSession()
+    try:
+        async with session.post(
+            url,
+            data=body,
+            headers=headers,
+            proxy=client.proxy,
+            ssl=client.ssl,
+            timeout=aiohttp.ClientTimeout(total=client.timeout),
+        ) as response:
+            response.raise_for_status()
+            yield response
+    finally:
+        if session is not client.session:
+            await session.close()
+
+
+def create_web_client(token: str = None, logger: logging.Logger = None) -> WebClient:
+    """Returns the client passed to listeners, pooled when `HTTP_CONNECTION_POOL` is enabled, logging to `logger`."""
+    if not settings.HTTP_CONNECTION_POOL:
+        return WebClient(token=token, user_agent_prefix=f"Bolt/{bolt_version}", logger=logger)
+
+    pool = ConnectionPool(
+        max_idle=settings.HTTP_POOL_SIZE,
+        max_per_host=settings.HTTP_POOL_MAX_PER_HOST,
+        idle_timeout=settings.HTTP_POOL_IDLE_TIMEOUT_SECONDS,
+    )
+    return PooledWebClient(token=token, user_agent_prefix=f"Bolt/{bolt_version}", logger=logger, pool=pool)
+
+
+def create_client_session():
+    """Returns a keep-alive `aiohttp` session for `AsyncWebClient` when `HTTP_CONNECTION_POOL` is enabled, otherwise
+    None so the client opens a session per request. Must be called from within the running event loop."""
+    if not settings.HTTP_CONNECTION_POOL:
+        return None
+
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_POOL_SIZE,
+        limit_per_host=settings.HTTP_POOL_MAX_PER_HOST,
+        keepalive_timeout=settings.HTTP_POOL_IDLE_TIMEOUT_SECONDS,
+    )
+    return aiohttp.ClientSession(connector=connector)
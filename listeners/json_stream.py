@@ -0,0 +1,142 @@
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",:]}"
+
+decoder = json.JSONDecoder()
+
+# Returned by `_decode` when the buffer ends before the value does, as None is a valid JSON value
+INCOMPLETE = object()
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class ArrayStreamParser:
+    """Incrementally parses a JSON object fed in chunks, yielding the items of its top-level `key` array one at a time
+    instead of building the array.
+
+    Every other top-level field is collected in `fields`. Only the item being parsed is buffered, so memory stays
+    proportional to the largest item rather than to the whole document.
+
+        parser = ArrayStreamParser("samples")
+        for chunk in chunks:
+            for sample in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.fields = {}
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._state = "start"
+        self._field = None
+
+    def feed(self, data: bytes) -> list:
+        """Returns the array items completed by `data`."""
+        self._buffer = self._buffer[self._position :] + self._decoder.decode(data)
+        self._position = 0
+        return self._parse(final=False)
+
+    def close(self) -> list:
+        """Returns the remaining items once the whole document was fed, raising `JSONStreamError` if it is incomplete."""
+        self._buffer = self._buffer[self._position :] + self._decoder.decode(b"", final=True)
+        self._position = 0
+        items = self._parse(final=True)
+        if self._state != "done" or self._buffer[self._position :].strip(WHITESPACE):
+            raise JSONStreamError(f"Incomplete or malformed JSON document (stopped while expecting {self._state})")
+        return items
+
+    def _parse(self, final: bool) -> list:
+        items = []
+        while True:
+            char = self._next_char()
+            if char is None or self._state == "done":
+                return items
+
+            if self._state == "start":
+                self._expect(char, "{")
+                self._state = "key_or_end"
+            elif self._state in ("key_or_end", "key"):
+                if char == "}" and self._state == "key_or_end":
+                    self._position += 1
+                    self._state = "done"
+                    continue
+                key = self._decode(final)
+                if key is INCOMPLETE:
+                    return items
+                if not isinstance(key, str):
+                    raise JSONStreamError("Expected an object key")
+                self._field = key
+                self._state = "colon"
+            elif self._state == "colon":
+                self._expect(char, ":")
+                self._state = "value"
+            elif self._state == "value":
+                if self._field == self.key and char == "[":
+                    self._position += 1
+                    self._state = "item_or_end"
+                    continue
+                value = self._decode(final)
+                if value is INCOMPLETE:
+                    return items
+                self.fields[self._field] = value
+                self._state = "field_separator"
+            elif self._state in ("item_or_end", "item"):
+                if char == "]" and self._state == "item_or_end":
+                    self._position += 1
+                    self._state = "field_separator"
+                    continue
+                item = self._decode(final)
+                if item is INCOMPLETE:
+                    return items
+                items.append(item)
+                self._state = "item_separator"
+            elif self._state == "item_separator":
+                self._position += 1
+                if char == "]":
+                    self._state = "field_separator"
+                elif char == ",":
+                    self._state = "item"
+                else:
+                    raise JSONStreamError(f"Expected ',' or ']' but found {char!r}")
+            elif self._state == "field_separator":
+                self._position += 1
+                if char == "}":
+                    self._state = "done"
+                elif char == ",":
+                    self._state = "key"
+                else:
+                    raise JSONStreamError(f"Expected ',' or '}}' but found {char!r}")
+
+    def _next_char(self):
+        while self._position < len(self._buffer) and self._buffer[self._position] in WHITESPACE:
+            self._position += 1
+        return self._buffer[self._position] if self._position < len(self._buffer) else None
+
+    def _expect(self, char: str, expected: str):
+        if char != expected:
+            raise JSONStreamError(f"Expected {expected!r} but found {char!r}")
+        self._position += 1
+
+    def _decode(self, final: bool):
+        """Decodes the value at the current position, or returns `INCOMPLETE` when more data is needed."""
+        try:
+            value, end = decoder.raw_decode(self._buffer, self._position)
+        except json.JSONDecodeError as e:
+            if final:
+                raise JSONStreamError(str(e)) from e
+            return INCOMPLETE
+
+        # A number cut off by the end of the buffer, such as "12" of "12.5", decodes fine but may continue in the next
+        # chunk, so a value only counts once the delimiter after it has arrived
+        if not final and (end == len(self._buffer) or self._buffer[end] not in DELIMITERS):
+            return INCOMPLETE
+
+        self._position = end
+        return value
@@ -0,0 +1,351 @@
+import bisect
+import functools
+import inspect
+import logging
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from listeners import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 100000)
+
+
+def format_labels(labels: tuple, extra: str = None) -> str:
+    pairs = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """A Prometheus-style histogram with fixed bucket bounds, so observing a value is a bisect plus two additions."""
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # One count per bucket plus the +Inf bucket, followed by the running sum
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        return Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._values.get(tuple(sorted(labels.items())))
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series):
+                    cumulative += count
+                    bucket_label = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{format_labels(key, bucket_label)} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+
+class Timer:
+    """Context manager observing the time spent inside it. A plain class, as `contextlib.contextmanager` costs several
+    times more per use."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        metric = Counter(name, documentation)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        metric = Gauge(name, documentation)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+listener_duration = registry.histogram("listener_duration_seconds", "Time spent running each listener")
+listener_ack_latency = registry.histogram(
+    "listener_ack_latency_seconds", "Time from the start of a function listener until it acknowledged the request"
+)
+listener_errors = registry.counter(
+    "listener_errors_total", "Errors handled by listeners, by kind (slack_response, deadline or unexpected)"
+)
+slack_api_duration = registry.histogram("slack_api_request_seconds", "Slack Web API call latency, by method")
+sample_data_samples = registry.histogram(
+    "sample_data_response_samples", "Number of samples in each developer.sampleData.get response", COUNT_BUCKETS
+)
+search_results = registry.histogram("search_results", "Number of results returned by each search", COUNT_BUCKETS)
+deferred_jobs = registry.gauge("deferred_jobs", "Deferred listener jobs queued or running, by executor")
+deferred_queue_wait = registry.histogram(
+    "deferred_queue_wait_seconds", "Time deferred listener jobs spent queued before a worker picked them up"
+)
+deferred_rejected = registry.counter(
+    "deferred_rejected_total", "Deferred listener jobs rejected because the executor was saturated, by executor"
+)
+deferred_deadline_exceeded = registry.counter(
+    "deferred_deadline_exceeded_total", "Deferred listener jobs still running at their deadline, by executor"
+)
+micro_batch_size = registry.histogram("micro_batch_size", "Number of items in each flushed micro-batch", COUNT_BUCKETS)
+micro_batch_wait = registry.histogram(
+    "micro_batch_wait_seconds", "Time from the first item of each micro-batch until it was flushed"
+)
+upstream_retries = registry.counter("upstream_retries_total", "Upstream API calls retried after a retryable failure")
+upstream_unavailable = registry.counter(
+    "upstream_unavailable_total", "Upstream API calls given up on or never made, by reason"
+)
+corpus_refreshes = registry.counter("corpus_refreshes_total", "Sample corpus refreshes, by kind (full or delta)")
+corpus_sync_changes = registry.counter(
+    "corpus_sync_changes_total", "Samples added, replaced or dropped by delta refreshes of the corpus"
+)
+query_expansions = registry.counter(
+    "query_expansions_total", "Searches answered from the corpus after completing or correcting their query terms"
+)
+prefix_results = registry.counter("prefix_results_total", "Searches answered from the cached results of a query they extend")
+
+
+def timed_call(fn, histogram: Histogram, coroutine: bool, **labels):
+    """Wraps `fn`, such as a listener's `complete` argument, to record the latency of each call."""
+    if coroutine:
+
+        async def async_call(*args, **kwargs):
+            with histogram.time(**labels):
+                return await fn(*args, **kwargs)
+
+        return async_call
+
+    def call(*args, **kwargs):
+        with histogram.time(**labels):
+            return fn(*args, **kwargs)
+
+    return call
+
+
+def ack_timer(ack, listener: str, started: float, coroutine: bool):
+    """Wraps `ack` to record how long after `started` the listener acknowledged the request."""
+    if coroutine:
+
+        async def async_ack(*args, **kwargs):
+            listener_ack_latency.observe(time.perf_counter() - started, listener=listener)
+            return await ack(*args, **kwargs)
+
+        return async_ack
+
+    def sync_ack(*args, **kwargs):
+        listener_ack_latency.observe(time.perf_counter() - started, listener=listener)
+        return ack(*args, **kwargs)
+
+    return sync_ack
+
+
+def instrumented(listener: str, callback):
+    """Wraps a listener callback to record its duration and, for function listeners, its ack latency and the latency
+    of `complete`/`fail`. Bolt unwraps the callback to inject arguments, so its signature is preserved."""
+    coroutine = inspect.iscoroutinefunction(callback)
+
+    def wrap_arguments(kwargs: dict, started: float):
+        # Bolt passes async utilities to async listeners only, so the callback decides how each one is awaited
+        if "ack" in kwargs:
+            kwargs["ack"] = ack_timer(kwargs["ack"], listener, started, coroutine)
+        if "complete" in kwargs:
+            kwargs["complete"] = timed_call(
+                kwargs["complete"], slack_api_duration, coroutine, method="functions.completeSuccess"
+            )
+        if "fail" in kwargs:
+            kwargs["fail"] = timed_call(kwargs["fail"], slack_api_duration, coroutine, method="functions.completeError")
+
+    if coroutine:
+
+        @functools.wraps(callback)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            wrap_arguments(kwargs, started)
+            try:
+                return await callback(*args, **kwargs)
+            finally:
+                listener_duration.observe(time.perf_counter() - started, listener=listener)
+
+        return async_wrapper
+
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        wrap_arguments(kwargs, started)
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            listener_duration.observe(time.perf_counter() - started, listener=listener)
+
+    return wrapper
+
+
+class SamplingProfiler:
+    """Samples the stack of every other thread every `interval` seconds and counts each distinct stack, rendered in
+    the collapsed format flame graph tools read."""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = StackCounter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def render(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                with self._lock:
+                    self.samples[";".join(reversed(stack))] += 1
+
+
+def start_metrics_server(logger: logging.Logger, port: int = None, profiler: SamplingProfiler = None):
+    """Serves `/metrics` in the Prometheus text format, and `/debug/profile` when a profiler is given, from a daemon
+    thread. Returns None without serving anything unless a port is given or `METRICS_PORT` is set."""
+    port = port if port is not None else settings.METRICS_PORT
+    if port is None:
+        return None
+
+    if profiler is None and settings.PROFILER_INTERVAL_SECONDS:
+        profiler = SamplingProfiler(interval=settings.PROFILER_INTERVAL_SECONDS).start()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.render()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/debug/profile" and profiler is not None:
+                body = profiler.render()
+                content_type = "text/plain; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((settings.METRICS_HOST, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{settings.METRICS_HOST}:{server.server_address[1]}/metrics")
+    return server
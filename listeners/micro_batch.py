@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from listeners.metrics import micro_batch_size, micro_batch_wait
+
+
+class MicroBatcher:
+    """Groups items submitted in quick succession and hands each group to `flush(items)` on a small thread pool.
+
+    A group is flushed once no item arrived for `window` seconds, once it holds `max_size` items, or `max_latency`
+    seconds after its first item arrived, whichever comes first, so a steady stream of items cannot hold it back.
+    `close` flushes the group still forming, since its items would be lost with the process.
+    """
+
+    def __init__(
+        self,
+        flush,
+        window: float,
+        max_size: int,
+        max_latency: float,
+        max_workers: int = 4,
+        name: str = "micro-batch",
+        clock=time.monotonic,
+    ):
+        self.window = window
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.name = name
+        self._flush = flush
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._items = []
+        self._first = self._last = 0.0
+        self._condition = threading.Condition()
+        self._collector = None
+        self._closed = False
+
+    def submit(self, item):
+        with self._condition:
+            if not self._closed:
+                now = self._clock()
+                if not self._items:
+                    self._first = now
+                self._last = now
+                self._items.append(item)
+
+                if self._collector is None:
+                    self._collector = threading.Thread(target=self._collect, name=self.name, daemon=True)
+                    self._collector.start()
+                self._condition.notify()
+                return
+
+        # Nothing groups items once the batcher is closed, so a late one is flushed on its own
+        self._flush([item])
+
+    def pending(self) -> int:
+        return len(self._items)
+
+    def close(self, timeout: float) -> bool:
+        """Flushes the items still waiting for their group to be flushed and waits up to `timeout` seconds for every
+        flush to finish, returning whether they did."""
+        with self._condition:
+            self._closed = True
+            while self._items:
+                self._dispatch()
+            self._condition.notify()
+
+        shutdown = threading.Thread(target=self._pool.shutdown, daemon=True)
+        shutdown.start()
+        shutdown.join(timeout)
+        return not shutdown.is_alive()
+
+    def _collect(self):
+        with self._condition:
+            while not self._closed:
+                if not self._items:
+                    self._condition.wait()
+                    continue
+                timeout = min(self._last + self.window, self._first + self.max_latency) - self._clock()
+                if len(self._items) < self.max_size and timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+                self._dispatch()
+
+    def _dispatch(self):
+        # Called with the condition held, so `close` cannot shut the pool down between taking a group and submitting it
+        items, self._items = self._items[: self.max_size], self._items[self.max_size :]
+        micro_batch_size.observe(len(items), batcher=self.name)
+        micro_batch_wait.observe(self._clock() - self._first, batcher=self.name)
+        # Items left over from a full group start a group of their own
+        self._first = self._last = self._clock()
+        self._pool.submit(self._flush, items)
+
+
+class AsyncMicroBatcher:
+    """The asyncio counterpart of `MicroBatcher`, where `flush` is a coroutine function run as a task on the event loop
+    of the first item in each group."""
+
+    def __init__(
+        self,
+        flush,
+        window: float,
+        max_size: int,
+        max_latency: float,
+        name: str = "micro-batch",
+        clock=time.monotonic,
+    ):
+        self.window = window
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.name = name
+        self._flush = flush
+        self._clock = clock
+        self._items = []
+        self._first = self._last = 0.0
+        self._timer: asyncio.Task = None
+        self._flushes = set()
+
+    def submit(self, item):
+        now = self._clock()
+        if not self._items:
+            self._first = now
+        self._last = now
+        self._items.append(item)
+
+        if len(self._items) >= self.max_size:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.ensure_future(self._wait())
+
+    def pending(self) -> int:
+        return len(self._items)
+
+    async def close(self):
+        """Flushes the items still waiting for their group to be flushed and waits for every flush to finish."""
+        if self._items:
+            self._flush_now()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _wait(self):
+        while self._items:
+            timeout = min(self._last + self.window, self._first + self.max_latency) - self._clock()
+            if timeout <= 0:
+                break
+            await asyncio.sleep(timeout)
+
+        self._timer = None
+        if self._items:
+            self._flush_now()
+
+    def _flush_now(self):
+        items, self._items = self._items, []
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+
+        micro_batch_size.observe(len(items), batcher=self.name)
+        micro_batch_wait.observe(self._clock() - self._first, batcher=self.name)
+
+        # The event loop only keeps weak references to tasks, so each flush is held until it is done
+        task = asyncio.ensure_future(self._flush(items))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import heapq
+import json
+import re
+
+from listeners.search_index import FIELD_WEIGHTS, normalize_query, tokenize
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def top_k(items, k: int, key) -> list:
+    """Returns the `k` smallest `items` by `key` in order, keeping a heap of `k` items rather than sorting them all."""
+    return heapq.nsmallest(k, items, key=key)
+
+
+def term_pattern(terms) -> re.Pattern:
+    """Matches any of the query `terms` in lowercased text as a whole token, the way `tokenize` would find it."""
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})\b")
+
+
+def score_sample(sample: dict, terms: tuple, pattern: re.Pattern) -> int:
+    """Scores how well `sample` matches the query `terms`, weighting each occurrence by the field it appears in. Most
+    fields contain no term at all, which a substring check rules out far faster than the `term_pattern` scan."""
+    score = 0
+    for field, weight in FIELD_WEIGHTS.items():
+        text = sample.get(field)
+        if text:
+            text = text.lower()
+            if any(term in text for term in terms):
+                score += weight * len(pattern.findall(text))
+    return score
+
+
+def matches_prefixes(sample: dict, terms: tuple) -> bool:
+    """Tells whether every one of the query `terms` starts a word of `sample`, the way searches are matched as they are
+    typed. A substring check across all fields rules out most samples before any are tokenized."""
+    text = " ".join(normalize_query(sample.get(field)) or "" for field in FIELD_WEIGHTS)
+    if not all(term in text for term in terms):
+        return False
+    words = tokenize(text)
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+
+def rank(samples: list, query: str, k: int) -> list:
+    """Returns the `k` samples that best match `query`. Samples scoring the same keep their upstream order, which is all
+    that orders them without query terms."""
+    terms = tuple(set(tokenize(query)))
+    if not terms:
+        return samples[:k]
+
+    pattern = term_pattern(terms)
+    scores = [score_sample(sample, terms, pattern) for sample in samples]
+    return [samples[position] for position in top_k(range(len(samples)), k, key=lambda i: (-scores[i], i))]
+
+
+def paginate(samples: list, query: str, filters: dict, offset: int, page_size: int, ranked: bool = False) -> tuple:
+    """Returns the page of at most `page_size` of the best matching `samples` from `offset` on, along with the cursor of
+    the next page or None on the last one. `ranked` samples are already in order of relevance."""
+    end = offset + page_size
+    ranked_samples = samples[:end] if ranked else rank(samples, query, end)
+    next_cursor = encode_cursor(end, query, filters) if len(samples) > end else None
+    return ranked_samples[offset:end], next_cursor
+
+
+def encode_cursor(offset: int, query: str, filters: dict) -> str:
+    payload = json.dumps([offset, search_fingerprint(query, filters)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, query: str, filters: dict) -> int:
+    """Returns the offset `cursor` points to, raising `InvalidCursor` if it is malformed or belongs to another search."""
+    try:
+        offset, fingerprint = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed search cursor: {cursor!r}") from e
+
+    if not isinstance(offset, int) or offset < 0 or fingerprint != search_fingerprint(query, filters):
+        raise InvalidCursor("The search cursor does not belong to this search")
+    return offset
+
+
+def search_fingerprint(query: str, filters: dict) -> str:
+    search = json.dumps({"query": query, "filters": filters}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(search.encode()).hexdigest()[:12]
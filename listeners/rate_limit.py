@@ -0,0 +1,334 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.error import URLError
+
+import aiohttp
+
+from listeners.metrics import upstream_retries, upstream_unavailable
+
+# HTTP statuses and Slack API errors that say the upstream is busy or briefly down, rather than that the request is bad
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_ERRORS = frozenset({"ratelimited", "internal_error", "fatal_error", "service_unavailable", "request_timeout"})
+CONNECTION_ERRORS = (ConnectionError, TimeoutError, URLError, aiohttp.ClientConnectionError)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling the upstream when its circuit is open, or when it could not be called successfully
+    within the request's deadline, rate limit and retry budget."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def retry_after(error: Exception):
+    """Returns how many seconds the server asked to wait before retrying after `error`, 0 if it did not say, or None when
+    `error` is not worth retrying. Understands `SlackApiError`, `HTTPError`, `aiohttp.ClientResponseError` and any error
+    with the Slack API `error` code as an attribute."""
+    response = getattr(error, "response", None)
+    if response is not None and hasattr(response, "status_code"):
+        status, headers = response.status_code, response.headers
+        code = response.data.get("error") if isinstance(response.data, dict) else None
+    else:
+        status, headers = getattr(error, "status", None) or getattr(error, "code", None), getattr(error, "headers", None)
+        code = getattr(error, "error", None)
+
+    if status in RETRYABLE_STATUSES or code in RETRYABLE_ERRORS:
+        for name, value in (headers or {}).items():
+            if name.lower() == "retry-after":
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    break
+        return 0.0
+
+    if isinstance(error, CONNECTION_ERRORS) and status is None:
+        return 0.0
+    return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng=random) -> float:
+    """Full jitter: a random delay up to an exponentially growing bound, so clients retrying together spread out."""
+    return rng.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """Lets through `rate` calls a second on average and bursts of up to `capacity` calls.
+
+    `reserve` takes a token without sleeping and returns how long the caller must wait before using it, so the same
+    bucket serves threads and coroutines. `pause` holds every call back until a server-imposed `Retry-After` has passed.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = float("inf")):
+        """Takes a token and returns the seconds to wait for it, or None without taking one if that is over `max_wait`."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = max(0.0, self._updated - now) + max(0.0, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def pause(self, seconds: float):
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            # One call may go out as soon as the pause is over, and the rest at the usual rate after it
+            self.tokens = min(self.tokens, 1.0)
+            self._updated = max(self._updated, now + seconds)
+
+    def _refill(self, now: float):
+        # While paused, `_updated` lies in the future and no tokens accrue until then
+        if now > self._updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+
+class RetryBudget:
+    """Caps retries at `ratio` of calls once the `reserve` of retries banked while things went well is spent, so a
+    struggling upstream sees a bounded multiple of its normal traffic rather than every caller retrying in lockstep."""
+
+    def __init__(self, ratio: float, reserve: float):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.reserve, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self.balance = self.reserve
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` calls in a row failed and rejects calls until `reset_timeout` seconds later, when
+    it lets a single probe through. A successful probe closes the circuit, a failed one opens it again."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float = None
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._probing or self._clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        return self.acquire() is not None
+
+    def acquire(self):
+        """Returns None when a call is rejected, "probe" when it is the single probe of a half-open circuit, and "call"
+        otherwise. A probe must end in `record_success`, `record_failure` or, when it got no answer, `release`."""
+        with self._lock:
+            if self.opened_at is None:
+                return "call"
+            if self._probing or self._clock() - self.opened_at < self.reset_timeout:
+                return None
+            self._probing = True
+            return "probe"
+
+    def release(self):
+        """Lets another probe through after one that ended without an answer, such as one rate limited or cancelled."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+                self._probing = False
+
+
+class Workspace:
+    __slots__ = ("bucket", "breaker")
+
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.bucket = bucket
+        self.breaker = breaker
+
+
+class UpstreamGuard:
+    """Calls an upstream API on behalf of many workspaces without letting any of them overload it or starve the others.
+
+    Each workspace gets its own token bucket of `rate` calls a second, bursting to `burst`, and its own circuit breaker,
+    so one busy or rate-limited workspace only ever waits on or trips its own. A call waits for a token only while it
+    would still start before its deadline, which also bounds how many threads a busy workspace can hold. Failures the
+    upstream would answer differently later, such as 429s, 5xx responses and dropped connections, are retried after a
+    jittered backoff, or its `Retry-After` when longer, for at most `max_attempts` attempts, within the deadline and
+    while the shared `budget` allows. The states of the `max_workspaces` most recently seen workspaces are kept.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        failure_threshold: int,
+        reset_timeout: float,
+        budget: RetryBudget,
+        max_attempts: int = 4,
+        base_delay: float = 0.1,
+        max_delay: float = 2.0,
+        max_workspaces: int = 1024,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        async_sleep=asyncio.sleep,
+        rng=random,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_workspaces = max_workspaces
+        self._clock = clock
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self._rng = rng
+        self._workspaces: OrderedDict[str, Workspace] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def workspace(self, key: str) -> Workspace:
+        with self._lock:
+            workspace = self._workspaces.get(key)
+            if workspace is None:
+                workspace = self._workspaces[key] = Workspace(
+                    TokenBucket(self.rate, self.burst, clock=self._clock),
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout, clock=self._clock),
+                )
+                while len(self._workspaces) > self.max_workspaces:
+                    self._workspaces.popitem(last=False)
+            else:
+                self._workspaces.move_to_end(key)
+            return workspace
+
+    def call(self, key: str, request, deadline: float):
+        """Returns `request()`, called for workspace `key` within `deadline` seconds, raising `UpstreamUnavailable` when
+        it could not be and the error of the last attempt when it is not worth retrying."""
+        workspace, deadline_at, probe = self._start(key, deadline)
+        attempt = 0
+        try:
+            while True:
+                self._sleep(self._reserve(workspace, deadline_at))
+                try:
+                    response = request()
+                except Exception as e:
+                    delay = self._retry_delay(workspace, e, attempt, deadline_at)
+                    attempt += 1
+                    self._sleep(delay)
+                    continue
+
+                workspace.breaker.record_success()
+                return response
+        except BaseException:
+            if probe:
+                workspace.breaker.release()
+            raise
+
+    async def call_async(self, key: str, request, deadline: float):
+        """The asyncio counterpart of `call`, where `request` is a coroutine function."""
+        workspace, deadline_at, probe = self._start(key, deadline)
+        attempt = 0
+        try:
+            while True:
+                await self._async_sleep(self._reserve(workspace, deadline_at))
+                try:
+                    response = await request()
+                except Exception as e:
+                    delay = self._retry_delay(workspace, e, attempt, deadline_at)
+                    attempt += 1
+                    await self._async_sleep(delay)
+                    continue
+
+                workspace.breaker.record_success()
+                return response
+        except BaseException:
+            # Cancellation included, a probe that was not answered must not keep the circuit half-open for good
+            if probe:
+                workspace.breaker.release()
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._workspaces.clear()
+        self.budget.clear()
+
+    def _start(self, key: str, deadline: float) -> tuple:
+        workspace = self.workspace(key)
+        admission = workspace.breaker.acquire()
+        if admission is None:
+            raise self._unavailable("The upstream circuit is open after repeated failures", "circuit_open")
+        self.budget.deposit()
+        return workspace, self._clock() + deadline, admission == "probe"
+
+    def _reserve(self, workspace: Workspace, deadline_at: float) -> float:
+        wait = workspace.bucket.reserve(max_wait=deadline_at - self._clock())
+        if wait is None:
+            raise self._unavailable("The workspace is over its rate limit until past the deadline", "rate_limited")
+        return wait
+
+    def _retry_delay(self, workspace: Workspace, error: Exception, attempt: int, deadline_at: float) -> float:
+        """Returns how long to back off before retrying after `error`, re-raising it or raising `UpstreamUnavailable`
+        when there should be no retry."""
+        requested = retry_after(error)
+        if requested is None:
+            # The upstream answered, just not with what was asked for
+            workspace.breaker.record_success()
+            raise error
+        if requested:
+            workspace.bucket.pause(requested)
+
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay, self._rng)
+        if attempt + 1 >= self.max_attempts:
+            reason = "attempts"
+        elif self._clock() + max(delay, requested) >= deadline_at:
+            reason = "deadline"
+        elif not self.budget.withdraw():
+            reason = "budget"
+        else:
+            upstream_retries.inc()
+            return delay
+
+        workspace.breaker.record_failure()
+        raise self._unavailable(f"The upstream request failed after {attempt + 1} attempts: {error}", reason) from error
+
+    def _unavailable(self, message: str, reason: str) -> UpstreamUnavailable:
+        upstream_unavailable.inc(reason=reason)
+        return UpstreamUnavailable(message, reason)
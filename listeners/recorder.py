@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+from urllib.parse import urlsplit
+
+from listeners.search_index import normalize_query
+
+# Envelopes of these events are recorded, the only ones the app listens to
+RECORDED_EVENTS = ("function_executed", "entity_details_requested")
+
+# Values under these keys identify a workspace, user, channel or app, and are replaced by stable pseudonyms
+ID_KEYS = {
+    "api_app_id",
+    "app_id",
+    "bot_id",
+    "bot_user_id",
+    "channel",
+    "channel_id",
+    "enterprise",
+    "enterprise_id",
+    "team",
+    "team_id",
+    "trigger_id",
+    "user",
+    "user_id",
+}
+
+# Values under these keys are links a user shared, and keep only their scheme and host
+URL_KEYS = {"entity_url", "url"}
+
+
+def pseudonym(value: str, salt: str) -> str:
+    """Returns a stand-in for an ID that is the same for the same ID and salt. An ID's leading letter, such as the `U`
+    of a user ID, is kept so the stand-in still reads as that kind of ID."""
+    digest = hashlib.sha256(f"{salt}:{value}".encode("utf-8")).hexdigest()[:12].upper()
+    return value[0] + digest if value[:1].isalpha() else digest
+
+
+def query_pseudonym(query: str, salt: str) -> str:
+    """Returns a stand-in for a search query with each of its words replaced by a stable pseudonym, so the stand-in
+    keeps the number of words and repeats whenever the query does, but not what was searched for or which queries
+    extend others."""
+    words = normalize_query(query).split()
+    return " ".join("q" + hashlib.sha256(f"{salt}:{word}".encode("utf-8")).hexdigest()[:8] for word in words)
+
+
+def url_pseudonym(url: str, salt: str) -> str:
+    """Returns a stand-in for a link keeping its scheme and host, with the rest replaced by a stable pseudonym."""
+    parts = urlsplit(url)
+    digest = hashlib.sha256(f"{salt}:{url}".encode("utf-8")).hexdigest()[:12]
+    return f"{parts.scheme}://{parts.netloc}/{digest}" if parts.scheme and parts.netloc else digest
+
+
+def anonymize(value, salt: str, key: str = None):
+    """Returns a copy of a request body with its IDs, queries and links replaced by pseudonyms and its tokens and
+    secrets redacted. Filters and sample references are kept as they are, since they decide what replaying the request
+    costs, as does the shape of each query."""
+    if isinstance(value, dict):
+        # The `id` of a function's user context is a user ID
+        return {
+            name: anonymize(item, salt, "user_id" if key == "user_context" and name == "id" else name)
+            for name, item in value.items()
+        }
+    if isinstance(value, list):
+        return [anonymize(item, salt, key) for item in value]
+    if isinstance(value, str) and key is not None:
+        if key == "secret" or key.endswith("token"):
+            return "redacted"
+        if key in ID_KEYS:
+            return pseudonym(value, salt)
+        if key == "query":
+            return query_pseudonym(value, salt)
+        if key in URL_KEYS:
+            return url_pseudonym(value, salt)
+    return value
+
+
+def recorded_event(body: dict) -> bool:
+    event = body.get("event")
+    return body.get("type") == "event_callback" and isinstance(event, dict) and event.get("type") in RECORDED_EVENTS
+
+
+class PayloadRecorder:
+    """Appends the anonymized envelope of every recorded event to a JSON lines file, for `benchmarks.bench_replay` to
+    replay. Each envelope is written with a single append, so worker processes can share one file.
+
+    Pseudonyms are only stable for one `salt`, which is random unless given.
+    """
+
+    def __init__(self, path: str, salt: str = None):
+        self.path = path
+        self.salt = salt or secrets.token_hex(16)
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def record(self, body: dict) -> bool:
+        if not recorded_event(body):
+            return False
+
+        line = json.dumps(anonymize(body, self.salt), separators=(",", ":")) + "\n"
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+            self.recorded += 1
+        return True
+
+    def middleware(self, logger: logging.Logger, body: dict, next):
+        self.record_safely(body, logger)
+        return next()
+
+    async def async_middleware(self, logger: logging.Logger, body: dict, next):
+        self.record_safely(body, logger)
+        return await next()
+
+    def record_safely(self, body: dict, logger: logging.Logger):
+        # A recording that cannot be written must not hold up the request it records
+        try:
+            self.record(body)
+        except OSError as e:
+            logger.warning(f"Failed to record a request payload to {self.path}: {e}")
@@ -1,18 +1,82 @@
+import datetime
+import json
 import logging
+import os
+import tempfile
+import threading
+from contextlib import closing
 
 from slack_sdk import WebClient
 
-from listeners.filters import LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
+from listeners import settings
+from listeners.cache import TTLCache
+from listeners.cache_backend import RedisCacheBackend
+from listeners.corpus import Corpus, CorpusRefresher, SnapshotWatcher
+from listeners.filters import FILTERS_OUTPUTS, LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
+from listeners.http_pool import stream_api_call
+from listeners.json_stream import ArrayStreamParser
+from listeners.metrics import (
+    corpus_refreshes,
+    corpus_sync_changes,
+    prefix_results,
+    query_expansions,
+    sample_data_samples,
+    slack_api_duration,
+)
+from listeners.ranking import matches_prefixes
+from listeners.rate_limit import RetryBudget, UpstreamGuard, UpstreamUnavailable
+from listeners.sample_store import SampleStore
+from listeners.sample_table import parse_date
+from listeners.search_index import SearchIndex, normalize_query, tokenize
+from listeners.shared_cache import CacheClient, CacheServer
+from listeners.single_flight import SingleFlight
+from listeners.snapshot_file import SnapshotError
 
 API_METHOD = "developer.sampleData.get"
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+CORPUS_FLIGHT_KEY = "corpus"
+
+# Each facet of the corpus paired with the search filters whose upstream results make up its posting list
+CORPUS_FACETS = [
+    *(
+        ((LANGUAGES_FILTER["name"], option["value"]), {LANGUAGES_FILTER["name"]: [option["value"]]})
+        for option in LANGUAGES_FILTER["options"]
+    ),
+    (("type", TEMPLATES_FILTER["name"]), {TEMPLATES_FILTER["name"]: True}),
+    (("type", SAMPLES_FILTER["name"]), {SAMPLES_FILTER["name"]: True}),
+]
+
+sample_store = SampleStore(max_size=settings.SAMPLE_STORE_MAX_SIZE)
+response_cache = TTLCache()
+flights = SingleFlight()
+corpus = Corpus(max_age=settings.CORPUS_MAX_AGE_SECONDS)
+# Held while a stale corpus is refreshed in the background, so the requests finding it stale start one refresh at most
+revalidating = threading.Lock()
+revalidation: threading.Thread = None
+# Set once the upstream answers a delta sync with samples older than `updated_since`, so the corpus is refetched in full
+delta_sync_unsupported = threading.Event()
+upstream = UpstreamGuard(
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+    budget=RetryBudget(ratio=settings.RETRY_BUDGET_RATIO, reserve=settings.RETRY_BUDGET_RESERVE),
+    max_attempts=settings.RETRY_MAX_ATTEMPTS,
+    base_delay=settings.RETRY_BASE_DELAY_MS / 1000,
+    max_delay=settings.RETRY_MAX_DELAY_MS / 1000,
+)
+
 
 class SlackResponseError(Exception):
-    pass
+    def __init__(self, message: str, error: str = None):
+        super().__init__(message)
+        self.error = error
 
 
-def fetch_sample_data(client: WebClient, query: str = None, filters: dict = None, logger: logging.Logger = None):
-    params = {"query": query}
+def build_params(query: str = None, filters: dict = None) -> dict:
+    params = {"query": normalize_query(query)}
 
     if filters:
         selected_filters = {}
@@ -33,10 +97,551 @@ def fetch_sample_data(client: WebClient, query: str = None, filters: dict = None
         if selected_filters:
             params["filters"] = selected_filters
 
-    response = client.api_call(API_METHOD, params=params)
+    return params
+
+
+def cache_key(params: dict) -> str:
+    filters = dict(params.get("filters", {}))
+
+    if LANGUAGES_FILTER["name"] in filters:
+        filters[LANGUAGES_FILTER["name"]] = sorted(set(filters[LANGUAGES_FILTER["name"]]))
+
+    return json.dumps({"query": params.get("query"), "filters": filters}, sort_keys=True, separators=(",", ":"))
+
+
+def fetch_sample_data(
+    client: WebClient, query: str = None, filters: dict = None, logger: logging.Logger = None, limit: int = None
+):
+    """Returns the response to a search. In local mode, `limit` keeps only that many of the best results."""
+    params = build_params(query=query, filters=filters)
+
+    if settings.SEARCH_MODE == "local":
+        index = fetch_corpus_index(client=client, logger=logger)
+        return search_expanded_corpus(index=index, params=params, limit=limit) or search_corpus(
+            index=index, params=params, limit=limit
+        )
+
+    if not corpus.is_stale():
+        response = search_expanded_corpus(index=corpus.index, params=params, limit=limit)
+        if response is not None:
+            return response
+
+    try:
+        return fetch_remote_sample_data(client=client, params=params, logger=logger)
+    except UpstreamUnavailable as e:
+        return search_unavailable_corpus(params=params, limit=limit, error=e, logger=logger)
+
+
+def search_unavailable_corpus(params: dict, limit: int, error: UpstreamUnavailable, logger: logging.Logger = None):
+    """Answers a search from the corpus, however stale, while the upstream cannot be called."""
+    if corpus.index is None:
+        raise SlackResponseError(f"Failed to fetch sample data from Slack API: {error}") from error
+
+    logger.warning(f"Serving the sample corpus while {API_METHOD} is unavailable: {error}")
+    return search_corpus(index=corpus.index, params=params, limit=limit)
+
+
+def fetch_cached_sample_data(query: str = None, filters: dict = None, limit: int = None):
+    """Answers a search without calling the Slack API, from the corpus even when it is stale or from a response another
+    request already cached. Returns None when neither can."""
+    params = build_params(query=query, filters=filters)
+
+    if corpus.index is not None:
+        return search_corpus(index=corpus.index, params=params, limit=limit)
+
+    return response_cache.get(cache_key(params)) or prefix_response(params)
+
+
+def search_corpus(index, params: dict, limit: int = None) -> dict:
+    """Answers a search from the corpus index, whose results are already `ranked` best first."""
+    samples = index.search(query=params["query"], filters=params.get("filters"), limit=limit)
+    return {"ok": True, "samples": samples, "ranked": True}
+
+
+def search_expanded_corpus(index, params: dict, limit: int = None):
+    """With `FUZZY_SEARCH`, answers a search whose query has terms no sample contains from the corpus index, with those
+    terms completed or corrected. Returns None otherwise, as upstream matches such queries no better."""
+    if not settings.FUZZY_SEARCH:
+        return None
+
+    terms = tokenize(params["query"])
+    expanded = index.expand(terms)
+    if expanded == terms:
+        return None
+
+    query_expansions.inc()
+    return search_corpus(index=index, params={**params, "query": " ".join(expanded)}, limit=limit)
+
+
+def fetch_remote_sample_data(client: WebClient, params: dict, logger: logging.Logger = None, cache: bool = True):
+    key = cache_key(params)
+
+    response = response_cache.get(key) or prefix_response(params)
+    if response is not None:
+        return response
+
+    def fetch():
+        with slack_api_duration.time(method=API_METHOD):
+            if settings.STREAM_SAMPLE_DATA:
+                response = {"ok": True, "samples": list(stream_sample_data(client=client, params=params, logger=logger))}
+            else:
+                response = client.api_call(API_METHOD, params=params)
+        return handle_response(key=key, response=response, logger=logger, cache=cache)
+
+    def fetch_uncached():
+        # A caller missing the cache just before the previous flight for `key` ended starts a flight of its own, which
+        # the response that flight cached answers without another upstream call. It was cached here, so the shared
+        # backend is not asked again, and the lookup already counted as a miss is not counted twice
+        entry = response_cache.entry(key)
+        if entry is not None:
+            return entry[1]
+        return call_upstream(client=client, request=fetch)
+
+    return flights.do(key, fetch_uncached)
+
+
+def prefix_response(params: dict):
+    """With `PREFIX_RESULTS`, answers a search from the cached response of the longest prefix of its query with the same
+    filters, as typing a query searches for each prefix in turn. Samples matching the prefix but not the whole query are
+    dropped, and the result is cached for as long as the prefix's response has left. Returns None when no complete
+    response of a prefix is cached."""
+    query = params.get("query")
+    if not settings.PREFIX_RESULTS or not query:
+        return None
 
+    prefixes = dict.fromkeys(query[:end].rstrip() for end in range(len(query) - 1, 0, -1))
+    keys = [cache_key({**params, "query": prefix}) for prefix in prefixes if prefix]
+    response_cache.prefetch(keys)
+    for entry in response_cache.entries(keys):
+        if entry is None:
+            continue
+        seconds_left, response = entry
+        response = getattr(response, "data", response)
+        if not complete_response(response):
+            continue
+
+        terms = tuple(tokenize(query))
+        response = {**response, "samples": [sample for sample in response["samples"] if matches_prefixes(sample, terms)]}
+        response_cache.set(cache_key(params), response, ttl=seconds_left)
+        prefix_results.inc()
+        return response
+    return None
+
+
+def complete_response(response: dict) -> bool:
+    """Tells whether a response holds every sample matching its search, rather than one page of them."""
+    return "samples" in response and not (response.get("response_metadata") or {}).get("next_cursor")
+
+
+def call_upstream(client: WebClient, request):
+    """Returns `request()`, made within the rate limit, retries and circuit breaker of the client's workspace when
+    `RATE_LIMITING` is enabled. Bolt gives each workspace's requests a client with that workspace's token."""
+    if not settings.RATE_LIMITING:
+        return request()
+    return upstream.call(client.token, request, deadline=settings.RETRY_DEADLINE_SECONDS)
+
+
+def stream_sample_data(client: WebClient, params: dict, logger: logging.Logger = None):
+    """Yields the samples of a `developer.sampleData.get` response as they are parsed, so only one sample at a time is
+    held in memory until the caller keeps it. Closing the generator early closes the connection."""
+    parser = ArrayStreamParser("samples")
+
+    with stream_api_call(client, API_METHOD, params) as response:
+        while chunk := response.read1(STREAM_CHUNK_SIZE):
+            samples = parser.feed(chunk)
+            # "ok" comes first in Slack API responses, so a failure is caught before any sample is parsed
+            if parser.fields.get("ok") is False:
+                raise_response_error(response=parser.fields, logger=logger)
+            yield from samples
+
+        samples = parser.close()
+        if not parser.fields.get("ok", False):
+            raise_response_error(response=parser.fields, logger=logger)
+        yield from samples
+
+
+def handle_response(key: str, response, logger: logging.Logger = None, cache: bool = True):
+    # Only the data of a `SlackResponse` is kept, as a plain dict any cache backend can encode
+    response = getattr(response, "data", response)
     if not response.get("ok", False):
-        logger.error(f"Search API request failed with error: {response.get('error', 'no error found')}")
-        raise SlackResponseError(f"Failed to fetch sample data from Slack API: ok=false for method={API_METHOD}")
+        raise_response_error(response=response, logger=logger)
+
+    samples = response.get("samples", [])
+    sample_data_samples.observe(len(samples))
+    if cache:
+        sample_store.add_all(samples)
+        response_cache.set(key, response)
 
     return response
+
+
+def raise_response_error(response, logger: logging.Logger = None):
+    logger.error(f"Search API request failed with error: {response.get('error', 'no error found')}")
+    raise SlackResponseError(
+        f"Failed to fetch sample data from Slack API: ok=false for method={API_METHOD}", error=response.get("error")
+    )
+
+
+def fetch_corpus_index(client: WebClient, logger: logging.Logger = None):
+    """Returns the corpus index, fetching it first when none is loaded. A stale one is returned as it is while a
+    background refresh replaces it, so only a request finding no corpus at all waits on the upstream."""
+    if corpus.index is None:
+        return refresh_corpus(client=client, logger=logger)
+
+    index = corpus.index
+    if corpus.is_stale():
+        revalidate_corpus(client=client, logger=logger)
+    return index
+
+
+def revalidate_corpus(client: WebClient, logger: logging.Logger = None) -> threading.Thread:
+    """Refreshes the corpus on a background thread unless such a refresh is already running, returning its thread."""
+    global revalidation
+    if not revalidating.acquire(blocking=False):
+        return revalidation
+
+    def revalidate():
+        try:
+            refresh_corpus(client=client, logger=logger)
+        except Exception as e:
+            logger.warning(f"Serving a stale sample corpus after a failed refresh: {e}")
+        finally:
+            revalidating.release()
+
+    revalidation = threading.Thread(target=revalidate, name="corpus-revalidation", daemon=True)
+    revalidation.start()
+    return revalidation
+
+
+def refresh_corpus(client: WebClient, logger: logging.Logger = None):
+    cache = cache_corpus_responses()
+
+    def refresh():
+        if syncs_corpus():
+            index = sync_corpus(client=client, logger=logger)
+            if index is not None:
+                return index
+
+        if cache:
+            # Responses another node or worker fetched since come from the shared cache in one round trip
+            response_cache.prefetch(
+                [cache_key(build_params()), *(cache_key(build_params(filters=filters)) for _, filters in CORPUS_FACETS)]
+            )
+        response = fetch_remote_sample_data(client=client, params=build_params(), logger=logger, cache=cache)
+        facet_responses = {
+            facet: fetch_remote_sample_data(client=client, params=build_params(filters=filters), logger=logger, cache=cache)
+            for facet, filters in CORPUS_FACETS
+        }
+        corpus_refreshes.inc(kind="full")
+        return load_corpus(response=response, facet_responses=facet_responses)
+
+    return flights.do(CORPUS_FLIGHT_KEY, refresh)
+
+
+def syncs_corpus() -> bool:
+    """With `DELTA_SYNC`, a loaded corpus is refreshed with its changes until it is due a full refetch. One with no
+    `date_updated` to sync from is always refetched."""
+    return (
+        settings.DELTA_SYNC
+        and not delta_sync_unsupported.is_set()
+        and corpus.index is not None
+        and corpus.index.watermark is not None
+        and corpus.reconciled_age() < settings.FULL_SYNC_SECONDS
+    )
+
+
+def sync_corpus(client: WebClient, logger: logging.Logger = None):
+    """Merges the samples updated since the corpus watermark into its index in place. `date_updated` is a day, so the
+    samples of the watermark day are fetched again, and skipped by the index unless they changed. Samples the upstream
+    marks `deleted` are dropped, while those deleted without a trace stay until the next full refetch. Returns None
+    instead when the upstream ignored `updated_since`, which turns delta sync off for the process."""
+    since = corpus.index.watermark
+    samples = fetch_updated_samples(client=client, since=since, logger=logger)
+    if samples is None:
+        return ignore_delta_sync(logger)
+    facet_samples = {}
+    for facet, filters in CORPUS_FACETS:
+        facet_samples[facet] = fetch_updated_samples(client=client, since=since, filters=filters, logger=logger)
+        if facet_samples[facet] is None:
+            return ignore_delta_sync(logger)
+    corpus_refreshes.inc(kind="delta")
+    return update_corpus(samples=samples, facet_samples=facet_samples)
+
+
+def ignore_delta_sync(logger: logging.Logger = None):
+    delta_sync_unsupported.set()
+    logger.warning(
+        "The upstream returned samples last updated before the requested updated_since, so it does not support it. "
+        "Delta sync is turned off, and the corpus is refetched in full on every refresh."
+    )
+
+
+def fetch_updated_samples(
+    client: WebClient, since: datetime.date, filters: dict = None, logger: logging.Logger = None
+) -> list:
+    """Returns the samples updated on or after `since`, asking the upstream for only those with `updated_since`, which
+    is not part of its documented contract. Returns None as soon as it returns an older sample, as it then ignored the
+    parameter and is returning every sample, which is not read any further when streaming."""
+    params = {**build_params(filters=filters), "updated_since": since.isoformat()}
+
+    def fetch():
+        with slack_api_duration.time(method=API_METHOD):
+            if settings.STREAM_SAMPLE_DATA:
+                samples = stream_sample_data(client=client, params=params, logger=logger)
+                try:
+                    return updated_samples(samples, since)
+                finally:
+                    samples.close()
+            response = client.api_call(API_METHOD, params=params)
+        response = handle_response(key=cache_key(params), response=response, logger=logger, cache=False)
+        return updated_samples(response.get("samples", []), since)
+
+    return call_upstream(client=client, request=fetch)
+
+
+def updated_samples(samples, since: datetime.date) -> list:
+    updated = []
+    for sample in samples:
+        if not updated_since(sample, since):
+            return None
+        updated.append(sample)
+    return updated
+
+
+def updated_since(sample: dict, since: datetime.date) -> bool:
+    # Samples whose date cannot be compared are kept, and left to the index to tell whether they changed
+    date = parse_date(sample.get("date_updated"))
+    return date is None or date >= since
+
+
+def update_corpus(samples: list, facet_samples: dict):
+    facets = {facet: [sample["external_ref"]["id"] for sample in matches] for facet, matches in facet_samples.items()}
+    deleted = [sample["external_ref"]["id"] for sample in samples if sample.get("deleted")]
+    updated = [sample for sample in samples if not sample.get("deleted")]
+
+    changes = corpus.update(samples=updated, facets=facets, deleted=deleted)
+    corpus_sync_changes.inc(changes)
+    index = corpus.index
+    prepare_index(index)
+
+    if cache_corpus_responses():
+        sample_store.add_all(updated)
+    # Saved even without changes, so the workers restoring it see the corpus as refreshed too
+    save_corpus()
+
+    return index
+
+
+def cache_corpus_responses() -> bool:
+    """Remote searches and unfurls are answered from the response cache and sample store, so a refresh warms them. In
+    local mode the corpus answers both, and caching its responses would keep a second copy of every sample alive."""
+    return settings.SEARCH_MODE != "local"
+
+
+def uses_corpus() -> bool:
+    """Whether anything reads the corpus: local searches, fuzzy searches or dynamic filters. Otherwise every search goes
+    upstream, and refreshing the corpus would only add upstream calls."""
+    return settings.SEARCH_MODE == "local" or settings.FUZZY_SEARCH or settings.DYNAMIC_FILTERS
+
+
+def start_corpus_refresher(client: WebClient, logger: logging.Logger) -> CorpusRefresher:
+    """Keeps the corpus fresh in the background, when it is used at all. Returns None when it is not."""
+    if not uses_corpus():
+        return None
+    restore_corpus(logger=logger)
+
+    return CorpusRefresher(
+        refresh=lambda: refresh_corpus(client=client, logger=logger),
+        interval=settings.CORPUS_REFRESH_SECONDS,
+        jitter=settings.CORPUS_REFRESH_JITTER_SECONDS,
+        logger=logger,
+        initial_delay=initial_refresh_delay(),
+    ).start()
+
+
+class SharedSampleData:
+    """Where worker processes find the corpus snapshot and response cache their supervisor shares."""
+
+    def __init__(self, snapshot_path: str, cache_address, cache_authkey: bytes):
+        self.snapshot_path = snapshot_path
+        self.cache_address = cache_address
+        self.cache_authkey = cache_authkey
+
+
+def share_sample_data(client: WebClient, logger: logging.Logger) -> SharedSampleData:
+    """Serves the response cache to worker processes and refreshes the corpus snapshot they load, in the supervisor,
+    so the upstream is called once per refresh or cache miss rather than once per worker. With a shared cache, the
+    workers use it directly instead."""
+    if not settings.CORPUS_SNAPSHOT_PATH:
+        settings.CORPUS_SNAPSHOT_PATH = os.path.join(tempfile.gettempdir(), f"sample-corpus-{os.getpid()}.snapshot")
+
+    if use_shared_cache(logger=logger):
+        shared = SharedSampleData(settings.CORPUS_SNAPSHOT_PATH, cache_address=None, cache_authkey=None)
+    else:
+        server = CacheServer(response_cache).start()
+        shared = SharedSampleData(settings.CORPUS_SNAPSHOT_PATH, server.address, server.authkey)
+
+    start_corpus_refresher(client=client, logger=logger)
+    return shared
+
+
+def join_shared_sample_data(shared: SharedSampleData, logger: logging.Logger) -> SnapshotWatcher:
+    """Backs this worker's response cache with the supervisor's and keeps its corpus in step with the shared snapshot.
+    A worker still refreshes a stale corpus itself when it needs one, writing the snapshot for the others."""
+    settings.CORPUS_SNAPSHOT_PATH = shared.snapshot_path
+    if shared.cache_address is None:
+        use_shared_cache(logger=logger)
+    else:
+        response_cache.backend = CacheClient(shared.cache_address, shared.cache_authkey, logger=logger)
+    if not uses_corpus():
+        return None
+    restore_corpus(logger=logger)
+
+    return SnapshotWatcher(
+        changed=lambda: corpus.snapshot_changed(shared.snapshot_path),
+        reload=lambda: restore_corpus(logger=logger),
+        interval=settings.WORKER_SNAPSHOT_POLL_SECONDS,
+        logger=logger,
+    ).start()
+
+
+def use_shared_cache(logger: logging.Logger) -> bool:
+    """Backs the response cache with the server `SHARED_CACHE_URL` points at, shared with every node configured with it.
+    Returns False when none is configured."""
+    if not settings.SHARED_CACHE_URL:
+        return False
+
+    response_cache.backend = RedisCacheBackend.from_url(
+        settings.SHARED_CACHE_URL,
+        ttl=response_cache.ttl,
+        logger=logger,
+        timeout=settings.SHARED_CACHE_TIMEOUT_SECONDS,
+        retry_after=settings.SHARED_CACHE_RETRY_SECONDS,
+    )
+    return True
+
+
+def restore_corpus(logger: logging.Logger) -> bool:
+    if not settings.CORPUS_SNAPSHOT_PATH:
+        return False
+
+    try:
+        index = corpus.restore(settings.CORPUS_SNAPSHOT_PATH)
+    except SnapshotError as e:
+        logger.info(f"Fetching a fresh sample corpus instead of restoring {settings.CORPUS_SNAPSHOT_PATH}: {e}")
+        return False
+
+    prepare_index(index)
+    return True
+
+
+def prepare_index(index):
+    """Builds what is derived from a newly loaded corpus up front, rather than in the first request that needs it."""
+    if settings.FUZZY_SEARCH:
+        index.fuzzy_index()
+    if settings.DYNAMIC_FILTERS:
+        index.filters_outputs()
+
+
+def filters_outputs() -> dict:
+    """Returns the filters step outputs: those of the corpus when `DYNAMIC_FILTERS` is enabled and one is loaded, even
+    if stale, and the static filters otherwise. Either way they were built before the request. There is one corpus for
+    every workspace and user, so they all share the same outputs rather than a copy each."""
+    index = corpus.index
+    if not settings.DYNAMIC_FILTERS or index is None:
+        return FILTERS_OUTPUTS
+    return index.filters_outputs()
+
+
+def initial_refresh_delay() -> float:
+    return max(0.0, settings.CORPUS_REFRESH_SECONDS - corpus.age())
+
+
+def load_corpus(response, facet_responses: dict):
+    index = corpus.publish(build_corpus_index(response=response, facet_responses=facet_responses))
+    save_corpus()
+    return index
+
+
+def build_corpus_index(response, facet_responses: dict) -> SearchIndex:
+    """Builds and prepares the index over a full corpus fetch without publishing it, so it can be built off the thread
+    that serves searches."""
+    facets = {
+        facet: [sample["external_ref"]["id"] for sample in facet_response.get("samples", [])]
+        for facet, facet_response in facet_responses.items()
+    }
+    index = SearchIndex(response.get("samples", []), facets)
+    prepare_index(index)
+    return index
+
+
+def save_corpus():
+    if settings.CORPUS_SNAPSHOT_PATH:
+        corpus.save(settings.CORPUS_SNAPSHOT_PATH)
+
+
+def fetch_sample(client: WebClient, sample_id: str, logger: logging.Logger = None):
+    return fetch_samples(client=client, sample_ids=[sample_id], logger=logger).get(sample_id)
+
+
+def fetch_samples(client: WebClient, sample_ids: list, logger: logging.Logger = None) -> dict:
+    """Looks up several samples by `external_ref.id` with at most one request for those not already in memory, returning
+    the ones found by ID."""
+    if settings.SEARCH_MODE == "local":
+        index = fetch_corpus_index(client=client, logger=logger)
+        return found_samples(index.get, sample_ids)
+
+    samples = found_samples(find_stored_sample, sample_ids)
+    missing = {sample_id for sample_id in sample_ids if sample_id not in samples}
+
+    try:
+        if missing and settings.STREAM_SAMPLE_DATA:
+            samples.update(find_streamed_samples(client=client, sample_ids=missing, logger=logger))
+        elif missing:
+            fetch_remote_sample_data(client=client, params=build_params(), logger=logger)
+            samples.update(found_samples(sample_store.get, missing))
+    except UpstreamUnavailable as e:
+        samples.update(find_unavailable_samples(sample_ids=missing, error=e, logger=logger))
+
+    return samples
+
+
+def found_samples(get, sample_ids) -> dict:
+    return {sample_id: sample for sample_id in sample_ids if (sample := get(sample_id)) is not None}
+
+
+def find_stored_sample(sample_id: str):
+    """Looks `sample_id` up in the sample store, then in the corpus while it is fresh."""
+    sample = sample_store.get(sample_id)
+    if sample is None and not corpus.is_stale():
+        sample = corpus.index.get(sample_id)
+    return sample
+
+
+def find_unavailable_samples(sample_ids: set, error: UpstreamUnavailable, logger: logging.Logger = None) -> dict:
+    """Looks `sample_ids` up in the corpus, however stale, while the upstream cannot be called."""
+    if corpus.index is None:
+        raise SlackResponseError(f"Failed to fetch sample data from Slack API: {error}") from error
+
+    logger.warning(f"Looking samples up in the sample corpus while {API_METHOD} is unavailable: {error}")
+    return found_samples(corpus.index.get, sample_ids)
+
+
+def find_streamed_samples(client: WebClient, sample_ids: set, logger: logging.Logger = None) -> dict:
+    """Streams the unfiltered sample data until every one of `sample_ids` turned up, without keeping the other
+    samples."""
+
+    def find():
+        found = {}
+        with slack_api_duration.time(method=API_METHOD):
+            with closing(stream_sample_data(client=client, params=build_params(), logger=logger)) as samples:
+                for sample in samples:
+                    if sample["external_ref"]["id"] in sample_ids:
+                        found[sample["external_ref"]["id"]] = sample
+                        if len(found) == len(sample_ids):
+                            break
+        return found
+
+    found = call_upstream(client=client, request=find)
+    sample_store.add_all(found.values())
+    return found
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_SIZE = 100_000
+
+
+class SampleStore:
+    """Samples indexed by their `external_ref.id`, each entry expiring `ttl` seconds after it was last written.
+
+    Entries are kept in the order they were written, which is also the order they expire in, so each write first drops
+    the expired entries at the front and then the oldest ones past `max_size`. Entries that are never read again are
+    dropped that way too, rather than only when a read finds them expired.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_size: int = DEFAULT_MAX_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add_all(self, samples: list):
+        now = self._clock()
+        expires_at = now + self.ttl
+        with self._lock:
+            for sample in samples:
+                sample_id = sample["external_ref"]["id"]
+                self._entries[sample_id] = (expires_at, sample)
+                self._entries.move_to_end(sample_id)
+
+            while self._entries:
+                oldest_expires_at, _ = next(iter(self._entries.values()))
+                if oldest_expires_at > now and len(self._entries) <= self.max_size:
+                    break
+                self._entries.popitem(last=False)
+
+    def get(self, sample_id: str):
+        entry = self._entries.get(sample_id)
+        if entry is None:
+            return None
+
+        expires_at, sample = entry
+        if expires_at <= self._clock():
+            with self._lock:
+                if self._entries.get(sample_id) is entry:
+                    del self._entries[sample_id]
+            return None
+
+        return sample
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
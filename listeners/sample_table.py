@@ -0,0 +1,218 @@
+import datetime
+import sys
+from array import array
+
+# Fields that must be plain strings for a sample to be packed. The fields of a packed sample are rebuilt in this order.
+TEXT_FIELDS = ("title", "description", "link", "date_updated", "content")
+
+# Bit per field in the presence flags kept for every row
+PRESENT = {field: 1 << bit for bit, field in enumerate(TEXT_FIELDS)}
+
+# Joins the text of one row in the shared buffer. Samples containing it are stored unpacked.
+SEPARATOR = "\x1f"
+
+# Extra string fields with at most this many distinct values, such as a language or type, are stored as codes
+MAX_CATEGORY_VALUES = 0xFFFF
+
+
+def parse_date(value: str):
+    """Returns `value` as a `datetime.date` if it is an ISO date that formats back to exactly the same string."""
+    try:
+        date = datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return date if date.isoformat() == value else None
+
+
+class CategoryColumn:
+    """A low-cardinality string field stored as a two-byte code per row, with code 0 marking rows without it."""
+
+    def __init__(self, row_count: int = 0):
+        self.values = [None]
+        self.codes = array("H", bytes(2 * row_count))
+        self._lookup = {}
+
+    def set(self, row: int, value: str) -> bool:
+        """Returns False when the column already holds as many distinct values as it can."""
+        code = self._lookup.get(value)
+        if code is None:
+            if len(self.values) > MAX_CATEGORY_VALUES:
+                return False
+            code = self._lookup[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes[row] = code
+        return True
+
+    def to_state(self) -> tuple:
+        return self.values[1:], self.codes.tobytes()
+
+    @classmethod
+    def from_state(cls, state: tuple):
+        column = cls()
+        column.values = [None, *(sys.intern(value) for value in state[0])]
+        column._lookup = {value: code for code, value in enumerate(column.values) if code}
+        column.codes = array("H")
+        column.codes.frombytes(state[1])
+        return column
+
+
+class SampleTable:
+    """A compact, append-only store for a large list of samples.
+
+    The text of every sample is packed into one shared UTF-8 buffer with an offset per row, dates are kept as day
+    ordinals and other string fields as interned category codes. That takes a fraction of the memory of one dict per
+    sample, and indexing a row rebuilds the sample dict exactly as it was added. Samples that do not fit, such as ones
+    with nested extra fields, are kept as they are.
+    """
+
+    def __init__(self, samples: list = ()):
+        self.data = bytearray()
+        self.offsets = array("Q", [0])
+        self.flags = bytearray()
+        self.dates = array("i")
+        self.categories: dict[str, CategoryColumn] = {}
+        self.raw: dict[int, dict] = {}
+
+        for sample in samples:
+            self.append(sample)
+
+    def append(self, sample: dict):
+        row = len(self.flags)
+        for column in self.categories.values():
+            column.codes.append(0)
+
+        packed = self._pack(row, sample)
+        if packed is None:
+            self.raw[row] = sample
+            self.flags.append(0)
+            self.dates.append(0)
+            self.offsets.append(len(self.data))
+            return
+
+        flags, date, text = packed
+        self.flags.append(flags)
+        self.dates.append(date.toordinal() if date else 0)
+        self.data += text.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, row: int) -> dict:
+        if row < 0:
+            row += len(self.flags)
+        raw = self.raw.get(row)
+        if raw is not None:
+            return raw
+
+        flags = self.flags[row]
+        sample_id, title, description, link, date_updated, content = self._text(row)
+        sample = {}
+        if flags & 1:
+            sample["title"] = title
+        if flags & 2:
+            sample["description"] = description
+        if flags & 4:
+            sample["link"] = link
+        if flags & 8:
+            ordinal = self.dates[row]
+            sample["date_updated"] = datetime.date.fromordinal(ordinal).isoformat() if ordinal else date_updated
+        sample["external_ref"] = {"id": sample_id}
+        if flags & 16:
+            sample["content"] = content
+        for field, column in self.categories.items():
+            code = column.codes[row]
+            if code:
+                sample[field] = column.values[code]
+
+        return sample
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self.flags)))
+
+    def __len__(self):
+        return len(self.flags)
+
+    def sample_id(self, row: int) -> str:
+        raw = self.raw.get(row)
+        return raw["external_ref"]["id"] if raw is not None else self._text(row)[0]
+
+    def date_updated(self, row: int):
+        """Returns the `date_updated` of a row as a `datetime.date`, or None when it is missing or not an ISO date."""
+        ordinal = self.dates[row]
+        if ordinal:
+            return datetime.date.fromordinal(ordinal)
+        raw = self.raw.get(row)
+        return parse_date(raw.get("date_updated")) if raw is not None else None
+
+    def latest_date(self):
+        """Returns the latest `date_updated` of any row as a `datetime.date`, or None when no row has one."""
+        ordinal = max(self.dates, default=0)
+        dates = [datetime.date.fromordinal(ordinal)] if ordinal else []
+        dates.extend(date for row in self.raw if (date := self.date_updated(row)) is not None)
+        return max(dates, default=None)
+
+    def to_state(self) -> dict:
+        """Returns the table as plain builtins, suitable for `marshal`."""
+        return {
+            "data": bytes(self.data),
+            "offsets": self.offsets.tobytes(),
+            "flags": bytes(self.flags),
+            "dates": self.dates.tobytes(),
+            "categories": {field: column.to_state() for field, column in self.categories.items()},
+            "raw": self.raw,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        table = cls()
+        table.data = bytearray(state["data"])
+        table.offsets = array("Q")
+        table.offsets.frombytes(state["offsets"])
+        table.flags = bytearray(state["flags"])
+        table.dates = array("i")
+        table.dates.frombytes(state["dates"])
+        table.categories = {field: CategoryColumn.from_state(column) for field, column in state["categories"].items()}
+        table.raw = state["raw"]
+        return table
+
+    def _text(self, row: int) -> list:
+        return self.data[self.offsets[row] : self.offsets[row + 1]].decode("utf-8").split(SEPARATOR)
+
+    def _pack(self, row: int, sample: dict):
+        """Returns `(flags, date, text)` for a sample that fits the table, or None."""
+        external_ref = sample.get("external_ref")
+        if not isinstance(external_ref, dict) or len(external_ref) != 1 or not isinstance(external_ref.get("id"), str):
+            return None
+
+        flags = 0
+        values = [external_ref["id"]]
+        for field in TEXT_FIELDS:
+            if field not in sample:
+                values.append("")
+                continue
+            value = sample[field]
+            if not isinstance(value, str):
+                return None
+            flags |= PRESENT[field]
+            values.append(value)
+
+        # Dates that round trip through `datetime.date` are kept as ordinals only, the rest as text
+        date = parse_date(values[4]) if flags & PRESENT["date_updated"] else None
+        if date is not None:
+            values[4] = ""
+
+        text = SEPARATOR.join(values)
+        if text.count(SEPARATOR) != len(TEXT_FIELDS):
+            return None
+
+        for field, value in sample.items():
+            if field in PRESENT or field == "external_ref":
+                continue
+            if not isinstance(value, str) or not self._category(field).set(row, value):
+                return None
+
+        return flags, date, text
+
+    def _category(self, field: str) -> CategoryColumn:
+        column = self.categories.get(field)
+        if column is None:
+            column = self.categories[field] = CategoryColumn(len(self.flags) + 1)
+        return column
@@ -0,0 +1,270 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from listeners import settings
+from listeners.facet_index import FacetIndex, bitset, bitset_flags, bitset_members
+from listeners.filters import build_filters_outputs
+from listeners.fuzzy_index import FuzzyIndex
+from listeners.sample_table import SampleTable
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Only terms from these fields are offered as completions and corrections of query terms
+VOCABULARY_FIELDS = ("title", "description")
+
+# Term frequencies are weighted by the field a term appears in, so title matches outrank body matches
+FIELD_WEIGHTS = {"title": 3, "description": 2, "content": 1}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def normalize_query(query: str):
+    """Returns `query` NFKC-normalized and case-folded, with runs of whitespace collapsed into single spaces, so queries
+    typed differently but searching for the same thing are sent and cached as one."""
+    if query is None:
+        return None
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def analyze(sample: dict) -> tuple:
+    """Returns the field-weighted frequency of each term of `sample`, and the set of its title and description terms."""
+    frequencies = Counter()
+    terms = set()
+    for field, weight in FIELD_WEIGHTS.items():
+        tokens = tokenize(sample.get(field))
+        for token in tokens:
+            frequencies[token] += weight
+        if field in VOCABULARY_FIELDS:
+            terms.update(tokens)
+    return frequencies, terms
+
+
+class SearchIndex:
+    """An inverted index over sample text with BM25 ranking and precomputed facet posting lists.
+
+    `facets` maps a `(filter name, value)` pair, such as `("languages", "python")` or `("type", "template")`,
+    to the `external_ref.id` of every sample carrying that value. Samples are kept in a `SampleTable` and rebuilt as
+    dicts only when a search or lookup returns them. `vocabulary` counts the samples using each title and description
+    term, from which a `FuzzyIndex` is built the first time a query needs expanding. `watermark` is the latest
+    `date_updated` of any sample indexed, from which `update` can merge later changes in place.
+    """
+
+    def __init__(self, samples: list, facets: dict = None):
+        self.samples = SampleTable(samples)
+        self.postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self.doc_lengths = []
+        self.vocabulary = Counter()
+        # Rows of replaced and deleted samples, which stay in the sample table until the index is rebuilt
+        self.tombstones = set()
+        self._fuzzy = None
+        self._filters_outputs = None
+
+        for doc_id, sample in enumerate(samples):
+            frequencies, terms = analyze(sample)
+            self.vocabulary.update(terms)
+            self.doc_lengths.append(sum(frequencies.values()))
+            for term, frequency in frequencies.items():
+                self.postings[term][doc_id] = frequency
+
+        self.doc_ids = self._map_doc_ids()
+        self.facets = FacetIndex(
+            len(samples),
+            {
+                facet: (self.doc_ids[sample_id] for sample_id in sample_ids if sample_id in self.doc_ids)
+                for facet, sample_ids in (facets or {}).items()
+            },
+        )
+        self._compute_statistics()
+
+    @classmethod
+    def from_state(cls, state: dict):
+        """Rebuilds an index from `to_state()` output without re-tokenizing any sample."""
+        index = cls.__new__(cls)
+        index.samples = SampleTable.from_state(state["samples"])
+        index.postings = state["postings"]
+        index.doc_lengths = state["doc_lengths"]
+        index.vocabulary = Counter(state["vocabulary"])
+        index.tombstones = set(state["tombstones"])
+        index._fuzzy = None
+        index._filters_outputs = None
+        index.doc_ids = index._map_doc_ids()
+        index.facets = FacetIndex.from_bitmaps(len(index.samples), state["facets"])
+        index.facets.all &= ~bitset(index.tombstones)
+        index._compute_statistics()
+        return index
+
+    def to_state(self) -> dict:
+        """Returns the index as plain builtins, suitable for `marshal`."""
+        return {
+            "samples": self.samples.to_state(),
+            "postings": dict(self.postings),
+            "doc_lengths": self.doc_lengths,
+            "vocabulary": dict(self.vocabulary),
+            "facets": self.facets.bitmaps,
+            "tombstones": sorted(self.tombstones),
+        }
+
+    def _map_doc_ids(self) -> dict:
+        return {
+            self.samples.sample_id(doc_id): doc_id for doc_id in range(len(self.samples)) if doc_id not in self.tombstones
+        }
+
+    def _compute_statistics(self):
+        self.total_length = sum(self.doc_lengths)
+        self.watermark = self.samples.latest_date()
+
+    @property
+    def avg_doc_length(self) -> float:
+        return (self.total_length / len(self) if len(self) else 0) or 1
+
+    def idf(self, term: str) -> float:
+        # Computed per query term rather than kept for every term, since each update changes the doc count they all use
+        matches = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self) - matches + 0.5) / (matches + 0.5))
+
+    def get(self, sample_id: str):
+        doc_id = self.doc_ids.get(sample_id)
+        return self.samples[doc_id] if doc_id is not None else None
+
+    def update(self, samples: list, facets: dict = None, deleted=()) -> int:
+        """Merges changed `samples` into the index in place, replacing the earlier version of any already indexed, and
+        drops the samples whose IDs are `deleted`. `facets` maps each facet to the IDs of the changed samples carrying
+        it. Samples indexed as they are, with the same facets, are skipped. Returns how many samples were added,
+        replaced or dropped.
+
+        Only the posting lists, vocabulary counts and facet bitmaps of the samples touched are updated, so the cost of
+        an update follows the number of changes rather than the size of the corpus. Each posting list is copied once
+        and swapped in, so a concurrent search sees it either before or after the update."""
+        carried = defaultdict(set)
+        for facet, sample_ids in (facets or {}).items():
+            for sample_id in sample_ids:
+                carried[sample_id].add(facet)
+
+        changed = {}
+        for sample in samples:
+            sample_id = sample["external_ref"]["id"]
+            doc_id = self.doc_ids.get(sample_id)
+            if doc_id is None or self.samples[doc_id] != sample or self.facets.facets_of(doc_id) != carried[sample_id]:
+                changed[sample_id] = sample
+        dropped = {sample_id for sample_id in deleted if sample_id in self.doc_ids and sample_id not in changed}
+        removed = {self.doc_ids[sample_id] for sample_id in (*changed, *dropped) if sample_id in self.doc_ids}
+        if not changed and not removed:
+            return 0
+
+        # Removed rows are tombstoned first, so searches listing every sample stop using the row count right away
+        self.tombstones.update(removed)
+        removals = defaultdict(set)
+        unused = set()
+        for doc_id in removed:
+            frequencies, terms = analyze(self.samples[doc_id])
+            for term in frequencies:
+                removals[term].add(doc_id)
+            self.vocabulary.subtract(terms)
+            unused.update(terms)
+            self.total_length -= self.doc_lengths[doc_id]
+            self.doc_lengths[doc_id] = 0
+
+        # New rows are appended before any posting list refers to them
+        additions = defaultdict(dict)
+        added = {}
+        for sample_id, sample in changed.items():
+            doc_id = len(self.samples)
+            self.samples.append(sample)
+            frequencies, terms = analyze(sample)
+            for term, frequency in frequencies.items():
+                additions[term][doc_id] = frequency
+            self.vocabulary.update(terms)
+            self.doc_lengths.append(sum(frequencies.values()))
+            self.total_length += self.doc_lengths[doc_id]
+            added[doc_id] = carried[sample_id]
+
+        for term in removals.keys() | additions.keys():
+            postings = dict(self.postings.get(term, ()))
+            for doc_id in removals.get(term, ()):
+                del postings[doc_id]
+            postings.update(additions.get(term, ()))
+            if postings:
+                self.postings[term] = postings
+            else:
+                self.postings.pop(term, None)
+
+        self.facets.update(added, removed)
+        for sample_id in dropped:
+            del self.doc_ids[sample_id]
+        for doc_id in added:
+            self.doc_ids[self.samples.sample_id(doc_id)] = doc_id
+            date = self.samples.date_updated(doc_id)
+            if date is not None and (self.watermark is None or date > self.watermark):
+                self.watermark = date
+        for term in unused:
+            if self.vocabulary[term] <= 0:
+                del self.vocabulary[term]
+
+        self._fuzzy = None
+        self._filters_outputs = None
+        return len(changed) + len(dropped)
+
+    def fuzzy_index(self) -> FuzzyIndex:
+        # Threads racing to build it each build the same index, so the last one to finish is as good as any
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyIndex(
+                self.vocabulary, max_completions=settings.FUZZY_MAX_EXPANSIONS, edit_limit=settings.FUZZY_MAX_EDITS
+            )
+        return self._fuzzy
+
+    def filters_outputs(self) -> dict:
+        """Returns the filters step outputs for this corpus, built on first use and then returned as is."""
+        if self._filters_outputs is None:
+            self._filters_outputs = build_filters_outputs(self.facets.counts())
+        return self._filters_outputs
+
+    def expand(self, terms: list) -> list:
+        """Returns the query `terms` with those no sample contains replaced by the title and description terms they
+        complete or are a typo of."""
+        if all(term in self.postings for term in terms):
+            return terms
+        return self.fuzzy_index().expand(terms, known=self.postings)
+
+    def search(self, query: str = None, filters: dict = None, limit: int = None) -> list:
+        """Returns the matching samples, best first, or only the `limit` best ones. Only returned samples are rebuilt from
+        the sample table, and a limit ranks them with a heap of `limit` entries instead of sorting every match."""
+        terms = set(tokenize(query))
+        # Posting lists are fetched before the doc count is read, so every doc they hold is within the candidate flags
+        postings_by_term = [(term, postings) for term in terms if (postings := self.postings.get(term))]
+        candidates = self.facets.match(filters)
+
+        if not terms:
+            if candidates is None and self.tombstones:
+                candidates = self.facets.all
+            doc_ids = range(len(self.samples)) if candidates is None else bitset_members(candidates)
+            return [self.samples[doc_id] for doc_id in doc_ids[:limit]]
+
+        flags = bitset_flags(candidates, len(self.samples)) if candidates is not None else None
+        avg_doc_length = self.avg_doc_length
+
+        scores = defaultdict(float)
+        for term, postings in postings_by_term:
+            idf = self.idf(term)
+            for doc_id, frequency in postings.items():
+                if flags is not None and not flags[doc_id >> 3] >> (doc_id & 7) & 1:
+                    continue
+
+                length_norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_doc_length
+                scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+
+        def relevance(doc_id):
+            return -scores[doc_id], doc_id
+
+        ranked = sorted(scores, key=relevance) if limit is None else heapq.nsmallest(limit, scores, key=relevance)
+        return [self.samples[doc_id] for doc_id in ranked]
+
+    def __len__(self):
+        return len(self.samples) - len(self.tombstones)
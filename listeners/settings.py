@@ -0,0 +1,107 @@
+import os
+
+# "remote" sends every search to developer.sampleData.get, "local" answers searches from an in-memory corpus snapshot
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "remote")
+
+CORPUS_MAX_AGE_SECONDS = float(os.environ.get("CORPUS_MAX_AGE_SECONDS", 300))
+
+# The background refresher should run well within CORPUS_MAX_AGE_SECONDS so listeners never wait on a refresh
+CORPUS_REFRESH_SECONDS = float(os.environ.get("CORPUS_REFRESH_SECONDS", 240))
+CORPUS_REFRESH_JITTER_SECONDS = float(os.environ.get("CORPUS_REFRESH_JITTER_SECONDS", 30))
+
+# When set, every corpus refresh is also written here so restarted workers on the same host can load it warm
+CORPUS_SNAPSHOT_PATH = os.environ.get("CORPUS_SNAPSHOT_PATH")
+
+# Reuse keep-alive connections to the Slack API instead of opening one per request
+HTTP_CONNECTION_POOL = os.environ.get("HTTP_CONNECTION_POOL", "false").lower() == "true"
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+HTTP_POOL_MAX_PER_HOST = int(os.environ.get("HTTP_POOL_MAX_PER_HOST", 10))
+HTTP_POOL_IDLE_TIMEOUT_SECONDS = float(os.environ.get("HTTP_POOL_IDLE_TIMEOUT_SECONDS", 60))
+
+# Serve Prometheus metrics on this port when set, optionally with a sampling profiler at /debug/profile
+METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+PROFILER_INTERVAL_SECONDS = float(os.environ.get("PROFILER_INTERVAL_SECONDS", 0))
+
+# Ack search and filters executions right away and finish them on a bounded pool instead of the listener thread
+DEFERRED_COMPLETION = os.environ.get("DEFERRED_COMPLETION", "false").lower() == "true"
+DEFERRED_WORKERS = int(os.environ.get("DEFERRED_WORKERS", 8))
+DEFERRED_MAX_PENDING = int(os.environ.get("DEFERRED_MAX_PENDING", 64))
+# Deferred searches still running after this long complete with cached results, if there are any, instead
+DEFERRED_DEADLINE_SECONDS = float(os.environ.get("DEFERRED_DEADLINE_SECONDS", 5))
+# Searches past their deadline complete with fallback results on this many threads, apart from the pool still running them
+DEFERRED_DEADLINE_WORKERS = int(os.environ.get("DEFERRED_DEADLINE_WORKERS", 4))
+
+# Parse developer.sampleData.get responses sample by sample as they arrive instead of loading each whole response
+STREAM_SAMPLE_DATA = os.environ.get("STREAM_SAMPLE_DATA", "false").lower() == "true"
+
+# Samples fetched for searches and corpus refreshes are kept for unfurls, up to this many of the latest
+SAMPLE_STORE_MAX_SIZE = int(os.environ.get("SAMPLE_STORE_MAX_SIZE", 100_000))
+
+# Entity metadata built for unfurled samples is reused for this many samples, each for up to this long
+PRESENT_DETAILS_CACHE_SIZE = int(os.environ.get("PRESENT_DETAILS_CACHE_SIZE", 4096))
+PRESENT_DETAILS_CACHE_TTL_SECONDS = float(os.environ.get("PRESENT_DETAILS_CACHE_TTL_SECONDS", 300))
+
+# Group bursts of unfurls so each group resolves its samples with one lookup, then send their details concurrently
+UNFURL_BATCHING = os.environ.get("UNFURL_BATCHING", "false").lower() == "true"
+# A group is sent once no unfurl arrived for the window, it is full, or its first unfurl waited the max latency
+UNFURL_BATCH_WINDOW_MS = float(os.environ.get("UNFURL_BATCH_WINDOW_MS", 10))
+UNFURL_BATCH_MAX_SIZE = int(os.environ.get("UNFURL_BATCH_MAX_SIZE", 50))
+UNFURL_BATCH_MAX_LATENCY_MS = float(os.environ.get("UNFURL_BATCH_MAX_LATENCY_MS", 50))
+UNFURL_FANOUT_WORKERS = int(os.environ.get("UNFURL_FANOUT_WORKERS", 8))
+
+# Searches return at most this many results, ranked against the query, with a cursor for the next page
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 50))
+
+# Complete partial and correct misspelled query terms against the corpus, answering such searches from it
+FUZZY_SEARCH = os.environ.get("FUZZY_SEARCH", "false").lower() == "true"
+# Terms are corrected within this many edits, one for terms of five letters or fewer
+FUZZY_MAX_EDITS = int(os.environ.get("FUZZY_MAX_EDITS", 2))
+# Each term is expanded into at most this many completions or corrections
+FUZZY_MAX_EXPANSIONS = int(os.environ.get("FUZZY_MAX_EXPANSIONS", 5))
+
+# Rate limit, retry and circuit-break developer.sampleData.get calls per workspace, serving the corpus when they fail
+RATE_LIMITING = os.environ.get("RATE_LIMITING", "false").lower() == "true"
+RATE_LIMIT_PER_SECOND = float(os.environ.get("RATE_LIMIT_PER_SECOND", 2))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", 10))
+# Retries back off exponentially with jitter, and stop at the deadline or once retries exceed the budget ratio of calls
+RETRY_DEADLINE_SECONDS = float(os.environ.get("RETRY_DEADLINE_SECONDS", 5))
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", 4))
+RETRY_BASE_DELAY_MS = float(os.environ.get("RETRY_BASE_DELAY_MS", 100))
+RETRY_MAX_DELAY_MS = float(os.environ.get("RETRY_MAX_DELAY_MS", 2000))
+RETRY_BUDGET_RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", 0.2))
+RETRY_BUDGET_RESERVE = float(os.environ.get("RETRY_BUDGET_RESERVE", 10))
+# A workspace's calls are rejected for the reset time after this many failed in a row, until a probe call succeeds
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", 30))
+
+# Run this many worker processes, each with its own Socket Mode connection, sharing the corpus and response cache
+WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", 1))
+# A stopping or restarted worker waits this long for the function executions it started to complete
+WORKER_DRAIN_SECONDS = float(os.environ.get("WORKER_DRAIN_SECONDS", 30))
+# Workers check this often whether the supervisor wrote a newer corpus snapshot
+WORKER_SNAPSHOT_POLL_SECONDS = float(os.environ.get("WORKER_SNAPSHOT_POLL_SECONDS", 1))
+
+# Offer only the languages and types the corpus has, with sample counts, built once per corpus rather than per request
+DYNAMIC_FILTERS = os.environ.get("DYNAMIC_FILTERS", "false").lower() == "true"
+
+# Refresh the corpus with only the samples updated since the latest date_updated it holds, merged into it in place.
+# This assumes the upstream honors an updated_since param and flags deleted samples, neither of which it documents
+DELTA_SYNC = os.environ.get("DELTA_SYNC", "false").lower() == "true"
+# With delta sync, the corpus is still refetched in full this often, which also drops samples deleted without a trace
+FULL_SYNC_SECONDS = float(os.environ.get("FULL_SYNC_SECONDS", 3600))
+
+# Share the response cache between nodes through a server speaking the Redis protocol, such as redis://cache:6379/0
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL")
+# Shared cache calls slower than this count as misses, and one that fails skips the shared cache for the retry time
+SHARED_CACHE_TIMEOUT_SECONDS = float(os.environ.get("SHARED_CACHE_TIMEOUT_SECONDS", 0.25))
+SHARED_CACHE_RETRY_SECONDS = float(os.environ.get("SHARED_CACHE_RETRY_SECONDS", 5))
+
+# Append the anonymized envelope of every function execution and unfurl here, for benchmarks.bench_replay to replay
+RECORD_PAYLOADS_PATH = os.environ.get("RECORD_PAYLOADS_PATH")
+# IDs are replaced by pseudonyms derived from this salt, random per process unless set
+RECORD_PAYLOADS_SALT = os.environ.get("RECORD_PAYLOADS_SALT")
+
+# Answer a search from the cached results of a query it extends, such as "pyth" from those of "py", by keeping those
+# matching the rest of the query. Only correct while the upstream matches each query term as the start of a word
+PREFIX_RESULTS = os.environ.get("PREFIX_RESULTS", "false").lower() == "true"
@@ -0,0 +1,64 @@
+import logging
+import os
+import threading
+from multiprocessing.managers import BaseManager
+
+from listeners.cache import TTLCache
+from listeners.cache_backend import CacheBackend
+
+SHARED_METHODS = ("entry", "entries", "set", "invalidate")
+
+
+class CacheServer:
+    """Serves `cache` to other processes on this host from a daemon thread, over a Unix socket only clients given the
+    random `authkey` may connect to. Each connecting thread is served on a thread of its own."""
+
+    def __init__(self, cache: TTLCache):
+        self.authkey = os.urandom(32)
+
+        class Manager(BaseManager):
+            pass
+
+        Manager.register("cache", callable=lambda: cache, exposed=SHARED_METHODS)
+        self._server = Manager(authkey=self.authkey).get_server()
+        self.address = self._server.address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="cache-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+
+class CacheClient(CacheBackend):
+    """The backend for a `TTLCache` served by a `CacheServer` in another process. Values travel pickled, one round trip
+    per call. A call that fails because the server went away is logged and treated as a miss, so the local cache keeps
+    working on its own."""
+
+    def __init__(self, address, authkey: bytes, logger: logging.Logger):
+        class Manager(BaseManager):
+            pass
+
+        Manager.register("cache")
+        self._manager = Manager(address=address, authkey=authkey)
+        self._manager.connect()
+        self._cache = self._manager.cache()
+        self._logger = logger
+
+    def entry(self, key: str):
+        return self._call("entry", key)
+
+    def entries(self, keys: list) -> list:
+        return self._call("entries", keys) or [None] * len(keys)
+
+    def set(self, key: str, value, ttl: float = None):
+        self._call("set", key, value, ttl)
+
+    def invalidate(self, key: str):
+        self._call("invalidate", key)
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self._cache, method)(*args)
+        except (OSError, EOFError) as e:
+            self._logger.warning(f"Shared cache {method} failed, using the local cache only: {e}")
+            return None
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into one execution whose result or error every caller receives."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, Future] = {}
+
+    def do(self, key: str, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = Future()
+
+        if not is_leader:
+            return flight.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
+
+
+class AsyncSingleFlight:
+    """The asyncio counterpart of `SingleFlight`, where `fn` is a coroutine function."""
+
+    def __init__(self):
+        self._flights: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn):
+        flight = self._flights.get(key)
+        if flight is not None:
+            return await asyncio.shield(flight)
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark the exception as retrieved so a flight without followers does not log a warning
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
@@ -0,0 +1,86 @@
+import importlib.util
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+MAGIC = b"BPSC"
+FORMAT_VERSION = 4
+
+# magic, format version, interpreter magic number, saved at (epoch seconds), payload length, payload CRC-32
+HEADER = struct.Struct("<4sH4sdQI")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def save_snapshot(path: str, state: dict, saved_at: float = None):
+    """Writes `state` to `path` as a checksummed `marshal` payload, atomically replacing any previous snapshot."""
+    payload = marshal.dumps(state)
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        importlib.util.MAGIC_NUMBER,
+        saved_at if saved_at is not None else time.time(),
+        len(payload),
+        zlib.crc32(payload),
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_snapshot(path: str, max_age: float, clock=time.time) -> tuple:
+    """Returns the `(state, saved_at)` stored at `path`, raising `SnapshotError` when the snapshot is missing,
+    corrupt, written by an incompatible version or older than `max_age` seconds.
+
+    The file is memory-mapped and checksummed and decoded in place, so loading it takes one pass over the file with no
+    read buffer and no re-tokenizing of samples. The decoded state is still a private copy in each process that loads
+    it, as `marshal` builds new objects, so workers restoring one snapshot do not share its memory.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError as e:
+        raise SnapshotError(f"Unable to open snapshot: {e}") from e
+
+    with f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise SnapshotError("Snapshot is truncated")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, interpreter, saved_at, length, checksum = HEADER.unpack_from(mapped)
+
+            if magic != MAGIC:
+                raise SnapshotError("File is not a sample corpus snapshot")
+
+            if version != FORMAT_VERSION or interpreter != importlib.util.MAGIC_NUMBER:
+                raise SnapshotError(f"Snapshot format version {version} is not supported by this interpreter")
+
+            if clock() - saved_at >= max_age:
+                raise SnapshotError("Snapshot is stale")
+
+            if len(mapped) - HEADER.size != length:
+                raise SnapshotError("Snapshot is truncated")
+
+            with memoryview(mapped)[HEADER.size :] as payload:
+                if zlib.crc32(payload) != checksum:
+                    raise SnapshotError("Snapshot checksum does not match")
+
+                try:
+                    state = marshal.loads(payload)
+                except (EOFError, ValueError, TypeError) as e:
+                    raise SnapshotError(f"Unable to decode snapshot: {e}") from e
+
+    return state, saved_at
@@ -0,0 +1,242 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from slack_bolt.adapter.socket_mode import SocketModeHandler
+
+from listeners import deferred
+from listeners.events import entity_details_requested
+
+# Slack allows an app this many Socket Mode connections at once, and a rolling restart briefly opens one more
+MAX_SOCKET_MODE_CONNECTIONS = 10
+
+
+class InFlight:
+    """Counts requests being handled until `close` stops admitting new ones and waits for the rest to finish."""
+
+    def __init__(self, clock=time.monotonic):
+        self.count = 0
+        self.closed = False
+        self._clock = clock
+        self._condition = threading.Condition()
+
+    def enter(self) -> bool:
+        with self._condition:
+            if self.closed:
+                return False
+            self.count += 1
+            return True
+
+    def exit(self):
+        with self._condition:
+            self.count -= 1
+            self._condition.notify_all()
+
+    def close(self, timeout: float) -> bool:
+        deadline = self._clock() + timeout
+        with self._condition:
+            self.closed = True
+            while self.count:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+
+class WorkerSocketModeHandler(SocketModeHandler):
+    """A `SocketModeHandler` that can drain: stop taking envelopes, close its connection once those it took are acked,
+    and wait for the listeners, unfurl batches and deferred jobs they started to finish.
+
+    Envelopes that arrive while draining are left unacknowledged, so Slack redelivers them on another connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = InFlight()
+
+    def handle(self, client, req):
+        if not self.in_flight.enter():
+            return
+        try:
+            super().handle(client, req)
+        finally:
+            self.in_flight.exit()
+
+    def drain(self, timeout: float) -> bool:
+        """Returns whether everything in flight finished within `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        drained = self.in_flight.close(timeout)
+        self.close()
+
+        # Listeners that acked before they finished keep running on the app's executor, as lazy listeners do
+        shutdown = threading.Thread(target=self.app.listener_runner.listener_executor.shutdown, daemon=True)
+        shutdown.start()
+        shutdown.join(max(0.0, deadline - time.monotonic()))
+        drained = drained and not shutdown.is_alive()
+        drained = entity_details_requested.close_unfurls(max(0.0, deadline - time.monotonic())) and drained
+
+        return deferred.executor.drain(max(0.0, deadline - time.monotonic())) and drained
+
+
+def serve_worker(handler: WorkerSocketModeHandler, ready, drain_timeout: float, logger: logging.Logger):
+    """Connects a worker process's handler and serves until the supervisor sends SIGTERM, then drains it."""
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    # Ctrl+C reaches every process in the group, and the supervisor decides when its workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    handler.connect()
+    ready.set()
+    stopping.wait()
+
+    if not handler.drain(drain_timeout):
+        logger.warning(f"Stopping a worker with requests still in flight after draining for {drain_timeout}s")
+
+
+class Worker:
+    __slots__ = ("process", "ready", "started_at")
+
+    def __init__(self, process, ready, started_at: float):
+        self.process = process
+        self.ready = ready
+        self.started_at = started_at
+
+
+class Supervisor:
+    """Runs `processes` worker processes, each calling `target(index, ready, *args)`, where `target` sets the `ready`
+    event once it is serving and returns after draining on SIGTERM.
+
+    Workers that exit on their own are started again, after a delay that doubles up to `max_restart_delay` while they
+    keep exiting within `min_uptime` seconds. On SIGHUP, workers are replaced one at a time, each replacement serving
+    before its predecessor starts draining, so no capacity is lost. On SIGTERM or SIGINT, all workers drain and `run`
+    returns. Workers are spawned rather than forked, since the supervisor itself runs threads.
+    """
+
+    def __init__(
+        self,
+        target,
+        processes: int,
+        logger: logging.Logger,
+        args: tuple = (),
+        drain_timeout: float = 30,
+        ready_timeout: float = 60,
+        restart_delay: float = 1,
+        max_restart_delay: float = 60,
+        min_uptime: float = 10,
+        context=None,
+        clock=time.monotonic,
+    ):
+        if processes + 1 > MAX_SOCKET_MODE_CONNECTIONS:
+            raise ValueError(f"Slack allows at most {MAX_SOCKET_MODE_CONNECTIONS - 1} workers with room for a restart")
+        self.target = target
+        self.args = args
+        self.drain_timeout = drain_timeout
+        self.ready_timeout = ready_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.min_uptime = min_uptime
+        self.workers: list[Worker] = [None] * processes
+        self._logger = logger
+        self._context = context or multiprocessing.get_context("spawn")
+        self._clock = clock
+        self._crashes = [0] * processes
+        self._restart_at = [0.0] * processes
+        self._stopping = threading.Event()
+        self._restarting = threading.Event()
+        self._wake = threading.Event()
+
+    def run(self):
+        """Starts the workers and supervises them until SIGTERM or SIGINT. Call from the main thread."""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._request(self._stopping))
+        signal.signal(signal.SIGINT, lambda signum, frame: self._request(self._stopping))
+        signal.signal(signal.SIGHUP, lambda signum, frame: self._request(self._restarting))
+
+        self.start()
+        while not self._stopping.is_set():
+            if self._restarting.is_set():
+                self._restarting.clear()
+                self.restart()
+            self.supervise()
+            self._wake.wait(1)
+            self._wake.clear()
+        self.stop()
+
+    def start(self):
+        for index in range(len(self.workers)):
+            self.workers[index] = self._spawn(index)
+
+    def supervise(self):
+        """Schedules a restart for every worker that exited, and starts those whose delay has passed."""
+        now = self._clock()
+        for index, worker in enumerate(self.workers):
+            if worker.process.is_alive():
+                continue
+
+            if not self._restart_at[index]:
+                uptime = now - worker.started_at
+                self._crashes[index] = self._crashes[index] + 1 if uptime < self.min_uptime else 0
+                delay = min(self.max_restart_delay, self.restart_delay * 2 ** max(0, self._crashes[index] - 1))
+                self._restart_at[index] = now + delay
+                self._logger.warning(
+                    f"Worker {index} exited with code {worker.process.exitcode}, restarting it in {delay:.1f}s"
+                )
+            elif now >= self._restart_at[index]:
+                self._restart_at[index] = 0.0
+                self.workers[index] = self._spawn(index)
+
+    def restart(self):
+        """Replaces the workers one at a time, keeping a worker that is not replaced within `ready_timeout`."""
+        for index, worker in enumerate(self.workers):
+            if self._stopping.is_set():
+                return
+
+            replacement = self._spawn(index)
+            if self._wait_ready(replacement):
+                self.workers[index] = replacement
+                self._stop_workers([worker])
+            else:
+                self._logger.warning(f"Keeping worker {index}, its replacement was not ready in {self.ready_timeout}s")
+                self._stop_workers([replacement])
+
+    def stop(self):
+        self._stop_workers(self.workers)
+
+    def _spawn(self, index: int) -> Worker:
+        ready = self._context.Event()
+        # Daemonic, so workers are stopped rather than orphaned when the supervisor exits without stopping them
+        process = self._context.Process(
+            target=self.target, args=(index, ready, *self.args), name=f"worker-{index}", daemon=True
+        )
+        process.start()
+        return Worker(process, ready, self._clock())
+
+    def _wait_ready(self, worker: Worker) -> bool:
+        deadline = self._clock() + self.ready_timeout
+        while self._clock() < deadline and not self._stopping.is_set():
+            if worker.ready.wait(0.1):
+                return True
+            if not worker.process.is_alive():
+                return False
+        return False
+
+    def _stop_workers(self, workers: list):
+        # Every worker drains at the same time, and those still running after the drain timeout are killed
+        for worker in workers:
+            if worker is not None and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = self._clock() + self.drain_timeout + 5
+        for worker in workers:
+            if worker is None:
+                continue
+            worker.process.join(max(0.0, deadline - self._clock()))
+            if worker.process.is_alive():
+                self._logger.warning(f"Killing {worker.process.name}, it did not drain in {self.drain_timeout}s")
+                worker.process.kill()
+                worker.process.join()
+
+    def _request(self, event: threading.Event):
+        event.set()
+        self._wake.set()
@@ -0,0 +1,20 @@
+import pytest
+
+from listeners import sample_data_service
+from listeners.events import entity_details_requested
+
+
+def clear_sample_data_service():
+    sample_data_service.sample_store.clear()
+    sample_data_service.response_cache.clear()
+    sample_data_service.corpus.clear()
+    sample_data_service.upstream.clear()
+    sample_data_service.delta_sync_unsupported.clear()
+    entity_details_requested.present_details_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_sample_data_service():
+    clear_sample_data_service()
+    yield
+    clear_sample_data_service()
@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from listeners import settings
+from listeners.events.async_entity_details_requested import entity_details_requested_callback
+from listeners.sample_data_service import SlackResponseError
+
+
+class TestAsyncEntityDetailsRequested:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=AsyncWebClient)
+        self.mock_client.api_call = AsyncMock()
+        self.mock_logger = MagicMock()
+
+        self.mock_sample_data = {
+            "ok": True,
+            "samples": [
+                {
+                    "title": "Sample 1",
+                    "description": "Description 1",
+                    "link": "https://example.com/1",
+                    "date_updated": "2023-01-01",
+                    "external_ref": {"id": "sample1"},
+                },
+                {
+                    "title": "Sample 2",
+                    "description": "Description 2",
+                    "link": "https://example.com/2",
+                    "date_updated": "2023-01-02",
+                    "external_ref": {"id": "sample2"},
+                    "content": "Full content here",
+                },
+            ],
+        }
+
+        self.event_payload = {
+            "trigger_id": "123.456.abc",
+            "link": {"url": "https://example.com/1"},
+            "external_ref": {"id": "sample1"},
+        }
+
+    def find_sample(self, client, sample_id, logger):
+        return next((s for s in self.mock_sample_data["samples"] if s["external_ref"]["id"] == sample_id), None)
+
+    @patch("listeners.events.async_entity_details_requested.fetch_sample", new_callable=AsyncMock)
+    def test_entity_details_requested_success(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = self.find_sample
+
+        asyncio.run(
+            entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
+        )
+
+        mock_fetch_sample.assert_awaited_once_with(client=self.mock_client, sample_id="sample1", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_awaited_once()
+        call_args = self.mock_client.api_call.call_args
+
+        assert call_args.kwargs["api_method"] == "entity.presentDetails"
+
+        assert call_args.kwargs["json"] == {
+            "trigger_id": "123.456.abc",
+            "metadata": {
+                "entity_type": "slack#/entities/item",
+                "url": "https://example.com/1",
+                "external_ref": {"id": "sample1"},
+                "entity_payload": {
+                    "attributes": {"title": {"text": "Sample 1", "edit": {"enabled": False, "text": {"max_length": 50}}}},
+                    "custom_fields": [
+                        {"key": "description", "label": "Description of sample", "type": "string", "value": "Description 1"},
+                        {"key": "date_updated", "label": "Last updated", "type": "string", "value": "2023-01-01"},
+                    ],
+                },
+            },
+        }
+
+    @patch("listeners.events.async_entity_details_requested.fetch_sample", new_callable=AsyncMock)
+    def test_entity_details_requested_with_content(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = self.find_sample
+
+        event_payload = dict(self.event_payload)
+        event_payload["external_ref"]["id"] = "sample2"
+
+        asyncio.run(entity_details_requested_callback(event=event_payload, client=self.mock_client, logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_awaited_once()
+        call_args = self.mock_client.api_call.call_args
+
+        custom_fields = call_args.kwargs["json"]["metadata"]["entity_payload"]["custom_fields"]
+        assert len(custom_fields) == 3  # Description, date_updated, and content
+
+        content_fields = [field for field in custom_fields if field["key"] == "content"]
+        assert len(content_fields) == 1
+        assert content_fields[0]["value"] == "Full content here"
+
+    @patch("listeners.events.async_entity_details_requested.fetch_sample", new_callable=AsyncMock)
+    def test_entity_details_requested_sample_not_found(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = self.find_sample
+
+        event_payload = dict(self.event_payload)
+        event_payload["external_ref"]["id"] = "nonexistent"
+
+        asyncio.run(entity_details_requested_callback(event=event_payload, client=self.mock_client, logger=self.mock_logger))
+
+        self.mock_logger.warning.assert_called_once()
+        self.mock_client.api_call.assert_not_awaited()
+
+    @patch("listeners.events.async_entity_details_requested.fetch_sample", new_callable=AsyncMock)
+    def test_entity_details_requested_slack_response_error(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = SlackResponseError("API error")
+
+        asyncio.run(
+            entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
+        )
+
+        self.mock_logger.error.assert_called_once()
+        self.mock_client.api_call.assert_not_awaited()
+
+    @patch("listeners.events.async_entity_details_requested.fetch_sample", new_callable=AsyncMock)
+    def test_entity_details_requested_unexpected_exception(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = Exception("Unexpected error")
+
+        asyncio.run(
+            entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
+        )
+
+        self.mock_logger.error.assert_called_once()
+        self.mock_client.api_call.assert_not_awaited()
+
+    @patch("listeners.events.async_entity_details_requested.fetch_samples", new_callable=AsyncMock)
+    def test_batched_unfurls_share_one_lookup(self, mock_fetch_samples, monkeypatch):
+        monkeypatch.setattr(settings, "UNFURL_BATCHING", True)
+        self.mock_client.token = "xoxb-test"
+        samples = {sample["external_ref"]["id"]: sample for sample in self.mock_sample_data["samples"]}
+        mock_fetch_samples.side_effect = lambda client, sample_ids, logger: {
+            sample_id: samples[sample_id] for sample_id in sample_ids
+        }
+
+        async def main():
+            for sample_id in ("sample1", "sample2", "sample1"):
+                event = {**self.event_payload, "external_ref": {"id": sample_id}}
+                await entity_details_requested_callback(event=event, client=self.mock_client, logger=self.mock_logger)
+            while self.mock_client.api_call.await_count < 3:
+                await asyncio.sleep(0.005)
+
+        asyncio.run(asyncio.wait_for(main(), 2))
+
+        mock_fetch_samples.assert_awaited_once_with(
+            client=self.mock_client, sample_ids=["sample1", "sample2"], logger=self.mock_logger
+        )
@@ -1,8 +1,22 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
+import pytest
 from slack_sdk import WebClient
 
-from listeners.events.entity_details_requested import entity_details_requested_callback
+from listeners import settings
+from listeners.events import entity_details_requested
+from listeners.events.entity_details_requested import (
+    Unfurl,
+    build_present_details_payload,
+    close_unfurls,
+    entity_details_requested_callback,
+    present_details_batch,
+    present_details_cache,
+)
+from listeners.micro_batch import MicroBatcher
 from listeners.sample_data_service import SlackResponseError
 
 
@@ -38,13 +52,16 @@ class TestEntityDetailsRequested:
             "external_ref": {"id": "sample1"},
         }
 
-    @patch("listeners.events.entity_details_requested.fetch_sample_data")
-    def test_entity_details_requested_success(self, mock_fetch_sample_data):
-        mock_fetch_sample_data.return_value = self.mock_sample_data
+    def find_sample(self, client, sample_id, logger):
+        return next((s for s in self.mock_sample_data["samples"] if s["external_ref"]["id"] == sample_id), None)
+
+    @patch("listeners.events.entity_details_requested.fetch_sample")
+    def test_entity_details_requested_success(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = self.find_sample
 
         entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
 
-        mock_fetch_sample_data.assert_called_once_with(client=self.mock_client, logger=self.mock_logger)
+        mock_fetch_sample.assert_called_once_with(client=self.mock_client, sample_id="sample1", logger=self.mock_logger)
 
         self.mock_client.api_call.assert_called_once()
         call_args = self.mock_client.api_call.call_args
@@ -67,9 +84,9 @@ class TestEntityDetailsRequested:
             },
         }
 
-    @patch("listeners.events.entity_details_requested.fetch_sample_data")
-    def test_entity_details_requested_with_content(self, mock_fetch_sample_data):
-        mock_fetch_sample_data.return_value = self.mock_sample_data
+    @patch("listeners.events.entity_details_requested.fetch_sample")
+    def test_entity_details_requested_with_content(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = self.find_sample
 
         event_payload = dict(self.event_payload)
         event_payload["external_ref"]["id"] = "sample2"
@@ -86,9 +103,9 @@ class TestEntityDetailsRequested:
         assert len(content_fields) == 1
         assert content_fields[0]["value"] == "Full content here"
 
-    @patch("listeners.events.entity_details_requested.fetch_sample_data")
-    def test_entity_details_requested_sample_not_found(self, mock_fetch_sample_data):
-        mock_fetch_sample_data.return_value = self.mock_sample_data
+    @patch("listeners.events.entity_details_requested.fetch_sample")
+    def test_entity_details_requested_sample_not_found(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = self.find_sample
 
         event_payload = dict(self.event_payload)
         event_payload["external_ref"]["id"] = "nonexistent"
@@ -98,20 +115,166 @@ class TestEntityDetailsRequested:
         self.mock_logger.warning.assert_called_once()
         self.mock_client.api_call.assert_not_called()
 
-    @patch("listeners.events.entity_details_requested.fetch_sample_data")
-    def test_entity_details_requested_slack_response_error(self, mock_fetch_sample_data):
-        mock_fetch_sample_data.side_effect = SlackResponseError("API error")
+    @patch("listeners.events.entity_details_requested.fetch_sample")
+    def test_entity_details_requested_slack_response_error(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = SlackResponseError("API error")
 
         entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
 
         self.mock_logger.error.assert_called_once()
         self.mock_client.api_call.assert_not_called()
 
-    @patch("listeners.events.entity_details_requested.fetch_sample_data")
-    def test_entity_details_requested_unexpected_exception(self, mock_fetch_sample_data):
-        mock_fetch_sample_data.side_effect = Exception("Unexpected error")
+    @patch("listeners.events.entity_details_requested.fetch_sample")
+    def test_entity_details_requested_unexpected_exception(self, mock_fetch_sample):
+        mock_fetch_sample.side_effect = Exception("Unexpected error")
 
         entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
 
         self.mock_logger.error.assert_called_once()
         self.mock_client.api_call.assert_not_called()
+
+    def test_present_details_metadata_cached_per_sample_version(self):
+        sample = self.mock_sample_data["samples"][0]
+        other_event = {"trigger_id": "789.012.def", "link": {"url": "https://example.com/1?ref=2"}}
+
+        first = build_present_details_payload(event=self.event_payload, sample=sample)
+        second = build_present_details_payload(event=other_event, sample=dict(sample))
+
+        assert second["trigger_id"] == "789.012.def"
+        assert second["metadata"]["url"] == "https://example.com/1?ref=2"
+        assert second["metadata"]["entity_payload"] is first["metadata"]["entity_payload"]
+        assert present_details_cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_present_details_metadata_rebuilt_when_sample_changes(self):
+        sample = self.mock_sample_data["samples"][0]
+        first = build_present_details_payload(event=self.event_payload, sample=sample)
+
+        updated = {**sample, "title": "Sample 1 v2", "date_updated": "2023-02-01"}
+        second = build_present_details_payload(event=self.event_payload, sample=updated)
+
+        assert second["metadata"]["entity_payload"]["attributes"]["title"]["text"] == "Sample 1 v2"
+        assert first["metadata"]["entity_payload"]["attributes"]["title"]["text"] == "Sample 1"
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class TestBatchedEntityDetailsRequested:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=WebClient)
+        self.mock_client.token = "xoxb-test"
+        self.mock_logger = MagicMock()
+
+        self.samples = {
+            "sample1": {
+                "title": "Sample 1",
+                "description": "Description 1",
+                "date_updated": "2023-01-01",
+                "external_ref": {"id": "sample1"},
+            },
+            "sample2": {
+                "title": "Sample 2",
+                "description": "Description 2",
+                "date_updated": "2023-01-02",
+                "external_ref": {"id": "sample2"},
+            },
+        }
+
+        self.event_payload = {
+            "trigger_id": "123.456.abc",
+            "link": {"url": "https://example.com/1"},
+            "external_ref": {"id": "sample1"},
+        }
+
+    def find_samples(self, client, sample_ids, logger):
+        return {sample_id: self.samples[sample_id] for sample_id in sample_ids if sample_id in self.samples}
+
+    def unfurl(self, sample_id: str, trigger_id: str) -> Unfurl:
+        event = {"trigger_id": trigger_id, "link": {"url": "https://example.com"}, "external_ref": {"id": sample_id}}
+        return Unfurl(event=event, client=self.mock_client, logger=self.mock_logger)
+
+    @pytest.fixture(autouse=True)
+    def inline_fanout(self, monkeypatch):
+        monkeypatch.setattr(entity_details_requested, "fanout", InlineExecutor())
+
+    def test_callback_submits_to_batcher(self, monkeypatch):
+        monkeypatch.setattr(settings, "UNFURL_BATCHING", True)
+        batcher = MagicMock()
+        monkeypatch.setattr(entity_details_requested, "unfurl_batcher", batcher)
+
+        entity_details_requested_callback(event=self.event_payload, client=self.mock_client, logger=self.mock_logger)
+
+        unfurl = batcher.submit.call_args.args[0]
+        assert unfurl.sample_id == "sample1"
+        self.mock_client.api_call.assert_not_called()
+
+    @patch("listeners.events.entity_details_requested.fetch_samples")
+    def test_batch_looks_up_samples_once(self, mock_fetch_samples):
+        mock_fetch_samples.side_effect = self.find_samples
+        unfurls = [self.unfurl("sample1", "t1"), self.unfurl("sample2", "t2"), self.unfurl("sample1", "t3")]
+
+        present_details_batch(unfurls)
+
+        mock_fetch_samples.assert_called_once_with(
+            client=self.mock_client, sample_ids=["sample1", "sample2"], logger=self.mock_logger
+        )
+        sent = [call.kwargs["json"]["trigger_id"] for call in self.mock_client.api_call.call_args_list]
+        assert sent == ["t1", "t2", "t3"]
+
+    @patch("listeners.events.entity_details_requested.fetch_samples")
+    def test_batch_groups_by_token(self, mock_fetch_samples):
+        mock_fetch_samples.side_effect = self.find_samples
+        other_client = MagicMock(spec=WebClient)
+        other_client.token = "xoxb-other"
+        other = Unfurl(event=dict(self.event_payload), client=other_client, logger=self.mock_logger)
+
+        present_details_batch([self.unfurl("sample1", "t1"), other])
+
+        assert mock_fetch_samples.call_count == 2
+        self.mock_client.api_call.assert_called_once()
+        other_client.api_call.assert_called_once()
+
+    @patch("listeners.events.entity_details_requested.fetch_samples")
+    def test_batch_reports_missing_sample_and_lookup_errors(self, mock_fetch_samples):
+        mock_fetch_samples.side_effect = self.find_samples
+
+        present_details_batch([self.unfurl("nonexistent", "t1"), self.unfurl("sample1", "t2")])
+
+        self.mock_logger.warning.assert_called_once()
+        self.mock_client.api_call.assert_called_once()
+
+        mock_fetch_samples.side_effect = SlackResponseError("API error")
+        present_details_batch([self.unfurl("sample1", "t3")])
+
+        self.mock_logger.error.assert_called_once()
+        self.mock_client.api_call.assert_called_once()
+
+    @patch("listeners.events.entity_details_requested.fetch_samples")
+    def test_close_waits_for_fanned_out_unfurls(self, mock_fetch_samples, monkeypatch):
+        mock_fetch_samples.side_effect = self.find_samples
+        batcher = MicroBatcher(present_details_batch, window=10, max_size=10, max_latency=10, name="test-close")
+        monkeypatch.setattr(entity_details_requested, "unfurl_batcher", batcher)
+        monkeypatch.setattr(entity_details_requested, "fanout", ThreadPoolExecutor(max_workers=1))
+        sent = threading.Event()
+
+        def present(api_method, json):
+            time.sleep(0.1)
+            sent.set()
+
+        self.mock_client.api_call.side_effect = present
+        batcher.submit(self.unfurl("sample1", "t1"))
+
+        assert close_unfurls(timeout=2)
+        assert sent.is_set()
+
+    def test_close_gives_up_after_timeout(self, monkeypatch):
+        monkeypatch.setattr(entity_details_requested, "fanout", ThreadPoolExecutor(max_workers=1))
+        release = threading.Event()
+        entity_details_requested.fanout.submit(release.wait, 2)
+
+        try:
+            assert not close_unfurls(timeout=0.05)
+        finally:
+            release.set()
@@ -0,0 +1,120 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from slack_bolt.context.ack.async_ack import AsyncAck
+from slack_bolt.context.complete.async_complete import AsyncComplete
+from slack_bolt.context.fail.async_fail import AsyncFail
+
+from listeners import settings
+from listeners.functions.async_filters import filters_step_callback
+from listeners.sample_data_service import corpus
+
+
+class TestAsyncFilters:
+    def setup_method(self):
+        self.mock_ack = AsyncMock(spec=AsyncAck)
+        self.mock_fail = AsyncMock(spec=AsyncFail)
+        self.mock_complete = AsyncMock(spec=AsyncComplete)
+        self.mock_logger = MagicMock()
+
+        self.expected_filters = [
+            {
+                "name": "languages",
+                "display_name": "Language",
+                "type": "multi_select",
+                "display_name_plural": "Languages",
+                "options": [
+                    {"name": "Python", "value": "python"},
+                    {"name": "Java", "value": "java"},
+                    {"name": "JavaScript", "value": "javascript"},
+                    {"name": "TypeScript", "value": "typescript"},
+                ],
+            },
+            {
+                "name": "template",
+                "display_name": "Templates",
+                "type": "toggle",
+            },
+            {
+                "name": "sample",
+                "display_name": "Samples",
+                "type": "toggle",
+            },
+        ]
+
+    def test_filters_step_callback_success(self):
+        inputs = {"user_context": {"id": "U123456"}}
+
+        asyncio.run(
+            filters_step_callback(
+                ack=self.mock_ack,
+                inputs=inputs,
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                logger=self.mock_logger,
+            )
+        )
+
+        self.mock_complete.assert_called_once()
+        call_args = self.mock_complete.call_args
+        outputs = call_args.kwargs["outputs"]
+        assert outputs["filters"] == self.expected_filters
+
+        self.mock_ack.assert_called_once()
+        self.mock_fail.assert_not_called()
+
+    def test_filters_step_callback_empty_user_context(self):
+        asyncio.run(
+            filters_step_callback(
+                ack=self.mock_ack,
+                inputs={},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                logger=self.mock_logger,
+            )
+        )
+
+        self.mock_complete.assert_called_once()
+        call_args = self.mock_complete.call_args
+        outputs = call_args.kwargs["outputs"]
+        assert outputs["filters"] == self.expected_filters
+
+        self.mock_ack.assert_called_once()
+
+    def test_filters_step_callback_unexpected_exception(self):
+        self.mock_complete.side_effect = Exception("Unexpected error")
+
+        asyncio.run(
+            filters_step_callback(
+                ack=self.mock_ack,
+                inputs={},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                logger=self.mock_logger,
+            )
+        )
+
+        self.mock_fail.assert_called_once()
+        self.mock_ack.assert_called_once()
+
+    def test_filters_step_callback_dynamic_filters(self, monkeypatch):
+        monkeypatch.setattr(settings, "DYNAMIC_FILTERS", True)
+        corpus.load(
+            [{"title": "Bolt for Java", "external_ref": {"id": "bolt-java"}}],
+            {("languages", "java"): ["bolt-java"], ("type", "sample"): ["bolt-java"]},
+        )
+
+        asyncio.run(
+            filters_step_callback(
+                ack=self.mock_ack,
+                inputs={"user_context": {"id": "U123456"}},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                logger=self.mock_logger,
+            )
+        )
+
+        assert self.mock_complete.call_args.kwargs["outputs"]["filters"] == [
+            {**self.expected_filters[0], "options": [{"name": "Java (1)", "value": "java"}]},
+            self.expected_filters[2],
+        ]
@@ -0,0 +1,304 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from slack_bolt.context.ack.async_ack import AsyncAck
+from slack_bolt.context.complete.async_complete import AsyncComplete
+from slack_bolt.context.fail.async_fail import AsyncFail
+from slack_sdk.web.async_client import AsyncWebClient
+
+from listeners import deferred, sample_data_service, settings
+from listeners.deferred import AsyncDeferredExecutor
+from listeners.filters import LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
+from listeners.functions.async_search import search_step_callback
+from listeners.sample_data_service import SlackResponseError
+
+
+class TestAsyncSearch:
+    def setup_method(self):
+        self.mock_ack = AsyncMock(spec=AsyncAck)
+        self.mock_fail = AsyncMock(spec=AsyncFail)
+        self.mock_complete = AsyncMock(spec=AsyncComplete)
+        self.mock_client = MagicMock(spec=AsyncWebClient)
+        self.mock_logger = MagicMock()
+
+        self.mock_sample_data = {
+            "ok": True,
+            "samples": [
+                {
+                    "title": "Sample 1",
+                    "description": "Description 1",
+                    "link": "https://example.com/1",
+                    "date_updated": "2023-01-01",
+                    "external_ref": {"id": "sample1"},
+                },
+                {
+                    "title": "Sample 2",
+                    "description": "Description 2",
+                    "link": "https://example.com/2",
+                    "date_updated": "2023-01-02",
+                    "external_ref": {"id": "sample2"},
+                    "content": "Full content here",
+                },
+            ],
+        }
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_search_step_callback_success(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = self.mock_sample_data
+
+        filters = {LANGUAGES_FILTER["name"]: ["python"]}
+
+        inputs = {"query": "test query", "filters": filters}
+
+        asyncio.run(
+            search_step_callback(
+                ack=self.mock_ack,
+                inputs=inputs,
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=self.mock_client,
+                logger=self.mock_logger,
+            )
+        )
+
+        mock_fetch_sample_data.assert_called_once_with(
+            client=self.mock_client,
+            query="test query",
+            filters=filters,
+            logger=self.mock_logger,
+            limit=settings.SEARCH_PAGE_SIZE + 1,
+        )
+
+        self.mock_complete.assert_called_once()
+        call_args = self.mock_complete.call_args
+        outputs = call_args.kwargs["outputs"]
+
+        assert outputs["search_results"] == self.mock_sample_data["samples"]
+
+        self.mock_ack.assert_called_once()
+        self.mock_fail.assert_not_called()
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_search_step_callback_multiple_filter_types(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = self.mock_sample_data
+
+        filters = {
+            TEMPLATES_FILTER["name"]: True,
+            SAMPLES_FILTER["name"]: True,
+            LANGUAGES_FILTER["name"]: ["python", "javascript"],
+        }
+
+        inputs = {"query": "test query", "filters": filters}
+
+        asyncio.run(
+            search_step_callback(
+                ack=self.mock_ack,
+                inputs=inputs,
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=self.mock_client,
+                logger=self.mock_logger,
+            )
+        )
+
+        mock_fetch_sample_data.assert_called_once_with(
+            client=self.mock_client,
+            query="test query",
+            filters=filters,
+            logger=self.mock_logger,
+            limit=settings.SEARCH_PAGE_SIZE + 1,
+        )
+
+        self.mock_complete.assert_called_once()
+        self.mock_ack.assert_called_once()
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_search_step_callback_no_filters(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = {"samples": []}
+
+        asyncio.run(
+            search_step_callback(
+                ack=self.mock_ack,
+                inputs={"query": "test query"},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=self.mock_client,
+                logger=self.mock_logger,
+            )
+        )
+
+        mock_fetch_sample_data.assert_called_once_with(
+            client=self.mock_client,
+            query="test query",
+            filters=None,
+            logger=self.mock_logger,
+            limit=settings.SEARCH_PAGE_SIZE + 1,
+        )
+
+        self.mock_complete.assert_called_once()
+        call_args = self.mock_complete.call_args
+        outputs = call_args.kwargs["outputs"]
+        assert outputs["search_results"] == []
+
+        self.mock_ack.assert_called_once()
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_search_step_callback_slack_response_error(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = SlackResponseError("API error")
+
+        asyncio.run(
+            search_step_callback(
+                ack=self.mock_ack,
+                inputs={"query": "test query"},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=self.mock_client,
+                logger=self.mock_logger,
+            )
+        )
+
+        self.mock_fail.assert_called_once()
+        self.mock_complete.assert_not_called()
+        self.mock_ack.assert_called_once()
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_search_step_callback_unexpected_exception(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = Exception("Unexpected error")
+
+        asyncio.run(
+            search_step_callback(
+                ack=self.mock_ack,
+                inputs={"query": "test query"},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=self.mock_client,
+                logger=self.mock_logger,
+            )
+        )
+
+        self.mock_logger.error.assert_called_once()
+
+        self.mock_fail.assert_not_called()
+        self.mock_complete.assert_not_called()
+        self.mock_ack.assert_called_once()
+
+
+async def slow_fetch_sample_data(**kwargs):
+    await asyncio.sleep(1)
+
+
+class TestAsyncPaginatedSearch:
+    def setup_method(self):
+        self.mock_ack = AsyncMock(spec=AsyncAck)
+        self.mock_fail = AsyncMock(spec=AsyncFail)
+        self.mock_complete = AsyncMock(spec=AsyncComplete)
+        self.mock_logger = MagicMock()
+        self.samples = [{"title": f"Sample {i}", "external_ref": {"id": f"sample{i}"}} for i in range(3)]
+
+    @pytest.fixture(autouse=True)
+    def small_pages(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_PAGE_SIZE", 2)
+
+    def search(self, inputs: dict):
+        asyncio.run(
+            search_step_callback(
+                ack=self.mock_ack,
+                inputs=inputs,
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=MagicMock(spec=AsyncWebClient),
+                logger=self.mock_logger,
+            )
+        )
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_pages_with_cursor(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = {"ok": True, "samples": self.samples}
+
+        self.search({"query": "sample"})
+        first = self.mock_complete.call_args.kwargs["outputs"]
+        self.search({"query": "sample", "cursor": first["next_cursor"]})
+        second = self.mock_complete.call_args.kwargs["outputs"]
+
+        assert first["search_results"] == self.samples[:2]
+        assert second == {"search_results": self.samples[2:]}
+
+    def test_cursor_of_another_search_fails(self):
+        self.search({"query": "java", "cursor": "bm90IGEgY3Vyc29y"})
+
+        self.mock_fail.assert_awaited_once()
+        self.mock_ack.assert_awaited_once()
+        self.mock_complete.assert_not_awaited()
+
+
+class TestAsyncDeferredSearch:
+    def setup_method(self):
+        self.mock_ack = AsyncMock(spec=AsyncAck)
+        self.mock_fail = AsyncMock(spec=AsyncFail)
+        self.mock_complete = AsyncMock(spec=AsyncComplete)
+        self.mock_client = MagicMock(spec=AsyncWebClient)
+        self.mock_logger = MagicMock()
+
+    @pytest.fixture(autouse=True)
+    def deferred_completion(self, monkeypatch):
+        monkeypatch.setattr(settings, "DEFERRED_COMPLETION", True)
+        monkeypatch.setattr(settings, "DEFERRED_DEADLINE_SECONDS", 0.05)
+        monkeypatch.setattr(deferred, "async_executor", AsyncDeferredExecutor(max_pending=1))
+
+    def search(self, query="test query"):
+        async def main():
+            finished = asyncio.Event()
+            self.mock_complete.side_effect = lambda **kwargs: finished.set()
+            self.mock_fail.side_effect = lambda **kwargs: finished.set()
+
+            await search_step_callback(
+                ack=self.mock_ack,
+                inputs={"query": query},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                client=self.mock_client,
+                logger=self.mock_logger,
+            )
+            self.mock_ack.assert_awaited_once()
+            await asyncio.wait_for(finished.wait(), 2)
+
+        asyncio.run(main())
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_acks_before_completing(self, mock_fetch_sample_data):
+        samples = [{"title": "Sample 1", "external_ref": {"id": "sample1"}}]
+        mock_fetch_sample_data.return_value = {"ok": True, "samples": samples}
+
+        self.search()
+
+        self.mock_complete.assert_awaited_once()
+        assert self.mock_complete.call_args.kwargs["outputs"] == {"search_results": samples}
+        self.mock_fail.assert_not_called()
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_fails_when_deadline_exceeded_without_cache(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = slow_fetch_sample_data
+
+        self.search()
+
+        self.mock_fail.assert_awaited_once()
+        self.mock_complete.assert_not_called()
+
+    @patch("listeners.functions.async_search.fetch_sample_data", new_callable=AsyncMock)
+    def test_serves_corpus_when_deadline_exceeded(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = slow_fetch_sample_data
+        sample_data_service.corpus.load(
+            samples=[
+                {"title": "Matching sample", "external_ref": {"id": "sample1"}},
+                {"title": "Other", "external_ref": {"id": "sample2"}},
+            ],
+            facets={},
+        )
+
+        self.search(query="matching")
+
+        assert self.mock_complete.call_args.kwargs["outputs"] == {
+            "search_results": [{"title": "Matching sample", "external_ref": {"id": "sample1"}}]
+        }
+        self.mock_logger.warning.assert_called_once()
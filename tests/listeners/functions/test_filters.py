@@ -2,7 +2,9 @@ from unittest.mock import MagicMock
 
 from slack_bolt import Ack, Complete, Fail
 
+from listeners import settings
 from listeners.functions.filters import filters_step_callback
+from listeners.sample_data_service import corpus
 
 
 class TestFilters:
@@ -85,3 +87,56 @@ class TestFilters:
 
         self.mock_fail.assert_called_once()
         self.mock_ack.assert_called_once()
+
+    def test_filters_step_callback_deferred_acks_first(self, monkeypatch):
+        monkeypatch.setattr(settings, "DEFERRED_COMPLETION", True)
+        self.mock_complete.side_effect = lambda **kwargs: self.mock_ack.assert_called_once()
+
+        filters_step_callback(
+            ack=self.mock_ack,
+            inputs={},
+            fail=self.mock_fail,
+            complete=self.mock_complete,
+            logger=self.mock_logger,
+        )
+
+        self.mock_complete.assert_called_once()
+        self.mock_fail.assert_not_called()
+
+    def test_filters_step_callback_dynamic_filters(self, monkeypatch):
+        monkeypatch.setattr(settings, "DYNAMIC_FILTERS", True)
+        corpus.load(
+            [{"title": "Bolt for Java", "external_ref": {"id": "bolt-java"}}],
+            {("languages", "java"): ["bolt-java"], ("type", "sample"): ["bolt-java"]},
+        )
+
+        # Every workspace and user is offered the filters of the one corpus
+        for user_context in ({"id": "U123456", "team_id": "T123456"}, {"id": "U654321", "team_id": "T654321"}):
+            filters_step_callback(
+                ack=self.mock_ack,
+                inputs={"user_context": user_context},
+                fail=self.mock_fail,
+                complete=self.mock_complete,
+                logger=self.mock_logger,
+            )
+
+        first, second = [call.kwargs["outputs"] for call in self.mock_complete.call_args_list]
+        assert first["filters"] == [
+            {**self.expected_filters[0], "options": [{"name": "Java (1)", "value": "java"}]},
+            self.expected_filters[2],
+        ]
+        assert second is first
+        self.mock_fail.assert_not_called()
+
+    def test_filters_step_callback_dynamic_filters_without_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "DYNAMIC_FILTERS", True)
+
+        filters_step_callback(
+            ack=self.mock_ack,
+            inputs={},
+            fail=self.mock_fail,
+            complete=self.mock_complete,
+            logger=self.mock_logger,
+        )
+
+        assert self.mock_complete.call_args.kwargs["outputs"]["filters"] == self.expected_filters
@@ -1,8 +1,12 @@
+import threading
 from unittest.mock import MagicMock, patch
 
+import pytest
 from slack_bolt import Ack, Complete, Fail
 from slack_sdk import WebClient
 
+from listeners import deferred, sample_data_service, settings
+from listeners.deferred import DeferredExecutor
 from listeners.filters import LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
 from listeners.functions.search import search_step_callback
 from listeners.sample_data_service import SlackResponseError
@@ -59,6 +63,7 @@ class TestSearch:
             query="test query",
             filters=filters,
             logger=self.mock_logger,
+            limit=settings.SEARCH_PAGE_SIZE + 1,
         )
 
         self.mock_complete.assert_called_once()
@@ -96,6 +101,7 @@ class TestSearch:
             query="test query",
             filters=filters,
             logger=self.mock_logger,
+            limit=settings.SEARCH_PAGE_SIZE + 1,
         )
 
         self.mock_complete.assert_called_once()
@@ -115,7 +121,11 @@ class TestSearch:
         )
 
         mock_fetch_sample_data.assert_called_once_with(
-            client=self.mock_client, query="test query", filters=None, logger=self.mock_logger
+            client=self.mock_client,
+            query="test query",
+            filters=None,
+            logger=self.mock_logger,
+            limit=settings.SEARCH_PAGE_SIZE + 1,
         )
 
         self.mock_complete.assert_called_once()
@@ -160,3 +170,166 @@ class TestSearch:
         self.mock_fail.assert_not_called()
         self.mock_complete.assert_not_called()
         self.mock_ack.assert_called_once()
+
+
+class TestPaginatedSearch:
+    def setup_method(self):
+        self.mock_ack = MagicMock(spec=Ack)
+        self.mock_fail = MagicMock(spec=Fail)
+        self.mock_complete = MagicMock(spec=Complete)
+        self.mock_logger = MagicMock()
+        self.samples = [{"title": f"Sample {i}", "external_ref": {"id": f"sample{i}"}} for i in range(5)]
+        self.samples[3]["title"] = "Python sample"
+
+    @pytest.fixture(autouse=True)
+    def small_pages(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_PAGE_SIZE", 2)
+
+    def search(self, inputs: dict) -> dict:
+        self.mock_complete.reset_mock()
+        search_step_callback(
+            ack=self.mock_ack,
+            inputs=inputs,
+            fail=self.mock_fail,
+            complete=self.mock_complete,
+            client=MagicMock(spec=WebClient),
+            logger=self.mock_logger,
+        )
+        return self.mock_complete.call_args.kwargs["outputs"]
+
+    def ids(self, outputs: dict) -> list:
+        return [sample["external_ref"]["id"] for sample in outputs["search_results"]]
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_pages_through_ranked_results(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = {"ok": True, "samples": self.samples}
+        inputs = {"query": "python", "filters": {}}
+
+        pages = [self.search(inputs)]
+        while "next_cursor" in pages[-1]:
+            pages.append(self.search({**inputs, "cursor": pages[-1]["next_cursor"]}))
+
+        assert [self.ids(page) for page in pages] == [["sample3", "sample0"], ["sample1", "sample2"], ["sample4"]]
+        assert mock_fetch_sample_data.call_args_list[-1].kwargs["limit"] == 7
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_ranked_results_are_not_reranked(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = {"ok": True, "samples": self.samples[:3], "ranked": True}
+
+        outputs = self.search({"query": "python"})
+
+        assert self.ids(outputs) == ["sample0", "sample1"]
+        assert "next_cursor" in outputs
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_cursor_of_another_search_fails(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.return_value = {"ok": True, "samples": self.samples}
+        cursor = self.search({"query": "python"})["next_cursor"]
+        mock_fetch_sample_data.reset_mock()
+
+        search_step_callback(
+            ack=self.mock_ack,
+            inputs={"query": "java", "cursor": cursor},
+            fail=self.mock_fail,
+            complete=self.mock_complete,
+            client=MagicMock(spec=WebClient),
+            logger=self.mock_logger,
+        )
+
+        mock_fetch_sample_data.assert_not_called()
+        assert "no longer available" in self.mock_fail.call_args.kwargs["error"]
+        assert self.mock_ack.call_count == 2
+
+
+class TestDeferredSearch:
+    def setup_method(self):
+        self.mock_ack = MagicMock(spec=Ack)
+        self.mock_fail = MagicMock(spec=Fail)
+        self.mock_complete = MagicMock(spec=Complete)
+        self.mock_client = MagicMock(spec=WebClient)
+        self.mock_logger = MagicMock()
+        self.finished = threading.Event()
+        self.mock_complete.side_effect = lambda **kwargs: self.finished.set()
+        self.mock_fail.side_effect = lambda **kwargs: self.finished.set()
+        self.release = threading.Event()
+
+    def teardown_method(self):
+        self.release.set()
+
+    @pytest.fixture(autouse=True)
+    def deferred_completion(self, monkeypatch):
+        monkeypatch.setattr(settings, "DEFERRED_COMPLETION", True)
+        monkeypatch.setattr(settings, "DEFERRED_DEADLINE_SECONDS", 0.05)
+        monkeypatch.setattr(deferred, "executor", DeferredExecutor(max_workers=1, max_pending=1))
+
+    def search(self, query="test query"):
+        search_step_callback(
+            ack=self.mock_ack,
+            inputs={"query": query},
+            fail=self.mock_fail,
+            complete=self.mock_complete,
+            client=self.mock_client,
+            logger=self.mock_logger,
+        )
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_acks_before_completing(self, mock_fetch_sample_data):
+        def fetch_sample_data(**kwargs):
+            self.mock_ack.assert_called_once()
+            return {"ok": True, "samples": [{"title": "Sample 1", "external_ref": {"id": "sample1"}}]}
+
+        mock_fetch_sample_data.side_effect = fetch_sample_data
+
+        self.search()
+
+        assert self.finished.wait(2)
+        self.mock_complete.assert_called_once()
+        assert self.mock_complete.call_args.kwargs["outputs"] == {
+            "search_results": [{"title": "Sample 1", "external_ref": {"id": "sample1"}}]
+        }
+        self.mock_fail.assert_not_called()
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_fails_when_deadline_exceeded_without_cache(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = lambda **kwargs: self.release.wait()
+
+        self.search()
+
+        assert self.finished.wait(2)
+        self.mock_ack.assert_called_once()
+        self.mock_fail.assert_called_once()
+        self.mock_complete.assert_not_called()
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_serves_corpus_when_deadline_exceeded(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = lambda **kwargs: self.release.wait()
+        sample_data_service.corpus.load(
+            samples=[
+                {"title": "Matching sample", "external_ref": {"id": "sample1"}},
+                {"title": "Other", "external_ref": {"id": "sample2"}},
+            ],
+            facets={},
+        )
+
+        self.search(query="matching")
+
+        assert self.finished.wait(2)
+        self.mock_complete.assert_called_once()
+        assert self.mock_complete.call_args.kwargs["outputs"] == {
+            "search_results": [{"title": "Matching sample", "external_ref": {"id": "sample1"}}]
+        }
+        self.mock_logger.warning.assert_called_once()
+
+    @patch("listeners.functions.search.fetch_sample_data")
+    def test_serves_cached_response_when_saturated(self, mock_fetch_sample_data):
+        mock_fetch_sample_data.side_effect = lambda **kwargs: self.release.wait()
+        deferred.executor.submit(self.release.wait, deadline=2)
+        cached = {"ok": True, "samples": [{"title": "Cached", "external_ref": {"id": "sample1"}}]}
+        sample_data_service.response_cache.set(sample_data_service.cache_key({"query": "test query"}), cached)
+
+        self.search()
+
+        assert self.finished.wait(2)
+        self.mock_complete.assert_called_once()
+        assert self.mock_complete.call_args.kwargs["outputs"] == {"search_results": cached["samples"]}
+        mock_fetch_sample_data.assert_not_called()
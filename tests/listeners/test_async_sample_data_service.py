@@ -0,0 +1,337 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from slack_sdk.web.async_client import AsyncWebClient
+
+from benchmarks.fake_slack_api import FakeSlackAPI
+from listeners import async_sample_data_service, sample_data_service, settings
+from listeners.async_sample_data_service import fetch_sample, fetch_sample_data, refresh_corpus, run_corpus_refresher
+from listeners.filters import LANGUAGES_FILTER, TEMPLATES_FILTER
+from listeners.sample_data_service import (
+    API_METHOD,
+    CORPUS_FACETS,
+    SlackResponseError,
+    cache_key,
+    corpus,
+    response_cache,
+    sample_store,
+)
+from tests.listeners.test_rate_limit import FakeClock
+from tests.listeners.test_sample_data_service import DatedAPI, fake_upstream, local_api_call
+
+
+class TestAsyncSampleDataService:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=AsyncWebClient)
+        self.mock_client.api_call = AsyncMock()
+        self.mock_logger = MagicMock()
+
+        self.mock_response = {
+            "ok": True,
+            "samples": [
+                {
+                    "title": "Sample 1",
+                    "description": "Description 1",
+                    "link": "https://example.com/1",
+                    "date_updated": "2023-01-01",
+                    "external_ref": {"id": "sample1"},
+                },
+                {
+                    "title": "Sample 2",
+                    "description": "Description 2",
+                    "link": "https://example.com/2",
+                    "date_updated": "2023-01-02",
+                    "external_ref": {"id": "sample2"},
+                    "content": "Full content here",
+                },
+            ],
+        }
+
+        self.mock_client.api_call.return_value = self.mock_response
+
+    def test_fetch_sample_data_no_filters(self):
+        result = asyncio.run(fetch_sample_data(client=self.mock_client, logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_awaited_once_with(API_METHOD, params={"query": None})
+        assert result == self.mock_response
+
+    def test_fetch_sample_data_with_combined_filters(self):
+        filters = {LANGUAGES_FILTER["name"]: ["python"], TEMPLATES_FILTER["name"]: True}
+
+        result = asyncio.run(
+            fetch_sample_data(client=self.mock_client, query="test query", filters=filters, logger=self.mock_logger)
+        )
+
+        self.mock_client.api_call.assert_awaited_once_with(
+            API_METHOD,
+            params={
+                "query": "test query",
+                "filters": {LANGUAGES_FILTER["name"]: ["python"], "type": TEMPLATES_FILTER["name"]},
+            },
+        )
+        assert result == self.mock_response
+
+    def test_fetch_sample_data_cached(self):
+        asyncio.run(fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger))
+        asyncio.run(fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_awaited_once()
+
+    def test_fetch_sample_data_late_joiner_reads_leaders_response(self, monkeypatch):
+        def leader_finishes(params):
+            # The late joiner has missed the cache, and the leader's flight caches its response before it joins one
+            response_cache.set(cache_key(params), self.mock_response)
+
+        monkeypatch.setattr(async_sample_data_service, "prefix_response", leader_finishes)
+
+        result = asyncio.run(fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_not_awaited()
+        assert result == self.mock_response
+
+    def test_fetch_sample_data_api_error(self):
+        self.mock_client.api_call.return_value = {"ok": False, "error": "invalid_auth"}
+
+        with pytest.raises(SlackResponseError) as excinfo:
+            asyncio.run(fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger))
+
+        self.mock_logger.error.assert_called_once()
+        assert f"Failed to fetch sample data from Slack API: ok=false for method={API_METHOD}" in str(excinfo.value)
+
+    def test_fetch_sample_from_store(self):
+        sample_store.add_all(self.mock_response["samples"])
+
+        result = asyncio.run(fetch_sample(client=self.mock_client, sample_id="sample1", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_not_awaited()
+        assert result == self.mock_response["samples"][0]
+
+    def test_fetch_sample_not_in_store(self):
+        result = asyncio.run(fetch_sample(client=self.mock_client, sample_id="sample2", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_awaited_once_with(API_METHOD, params={"query": None})
+        assert result == self.mock_response["samples"][1]
+
+    def test_fetch_sample_from_fresh_corpus(self):
+        corpus.load(samples=self.mock_response["samples"], facets={})
+
+        result = asyncio.run(fetch_sample(client=self.mock_client, sample_id="sample2", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_not_awaited()
+        assert result == self.mock_response["samples"][1]
+
+    def test_fetch_sample_data_answers_expanded_query_from_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        corpus.load(samples=self.mock_response["samples"], facets={})
+
+        result = asyncio.run(fetch_sample_data(client=self.mock_client, query="descripton 2", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_not_awaited()
+        assert result == {"ok": True, "samples": self.mock_response["samples"][::-1], "ranked": True}
+
+    def test_fetch_sample_data_answers_typed_query_from_prefix(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+
+        asyncio.run(fetch_sample_data(client=self.mock_client, query="Sample", logger=self.mock_logger))
+        result = asyncio.run(fetch_sample_data(client=self.mock_client, query="sample 2", logger=self.mock_logger))
+
+        self.mock_client.api_call.assert_awaited_once_with(API_METHOD, params={"query": "sample"})
+        assert result == {"ok": True, "samples": self.mock_response["samples"][1:]}
+
+    def test_fetch_sample_data_local_mode(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        result = asyncio.run(fetch_sample_data(client=self.mock_client, query="python", logger=self.mock_logger))
+
+        assert [sample["external_ref"]["id"] for sample in result["samples"]] == ["sample1"]
+        assert self.mock_client.api_call.await_count == 1 + len(CORPUS_FACETS)
+
+    def test_fetch_sample_local_mode(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        result = asyncio.run(fetch_sample(client=self.mock_client, sample_id="sample2", logger=self.mock_logger))
+
+        assert result["title"] == "Java template"
+
+    def test_fetch_sample_data_local_mode_serves_stale_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        corpus.load(samples=self.mock_response["samples"], facets={})
+        corpus.loaded_at -= corpus.max_age
+        self.mock_client.api_call.return_value = {"ok": False, "error": "ratelimited"}
+
+        async def search():
+            result = await fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+            await async_sample_data_service.revalidation
+            return result
+
+        result = asyncio.run(search())
+
+        assert result["samples"] == self.mock_response["samples"]
+        self.mock_logger.warning.assert_called_once()
+
+    def test_run_corpus_refresher_only_when_the_corpus_is_used(self):
+        asyncio.run(asyncio.wait_for(run_corpus_refresher(client=self.mock_client, logger=self.mock_logger), 5))
+
+        self.mock_client.api_call.assert_not_called()
+
+    def test_run_corpus_refresher_prefetches_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        self.mock_client.api_call.side_effect = local_api_call
+
+        async def run():
+            refresher = asyncio.create_task(run_corpus_refresher(client=self.mock_client, logger=self.mock_logger))
+            while corpus.index is None:
+                await asyncio.sleep(0)
+            refresher.cancel()
+
+        asyncio.run(run())
+
+        assert corpus.index.get("sample1")["title"] == "Python sample"
+
+    def test_refresh_builds_corpus_off_the_loop(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", str(tmp_path / "corpus.snapshot"))
+        self.mock_client.api_call.side_effect = local_api_call
+        build_corpus_index = sample_data_service.build_corpus_index
+        threads = []
+
+        def build(**kwargs):
+            threads.append(threading.get_ident())
+            return build_corpus_index(**kwargs)
+
+        monkeypatch.setattr(async_sample_data_service, "build_corpus_index", build)
+
+        async def refresh():
+            index = await async_sample_data_service.refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+            return index, threading.get_ident()
+
+        index, loop_thread = asyncio.run(refresh())
+
+        assert threads and threads[0] != loop_thread
+        assert corpus.index is index and not corpus.is_stale()
+        assert (tmp_path / "corpus.snapshot").exists()
+
+    def test_fetch_sample_data_local_mode_syncs_stale_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        monkeypatch.setattr(settings, "DELTA_SYNC", True)
+        api = DatedAPI(self.mock_response["samples"])
+        self.mock_client.api_call.side_effect = api
+        asyncio.run(fetch_sample_data(client=self.mock_client, logger=self.mock_logger))
+        corpus.loaded_at -= corpus.max_age
+        api.samples = [{**self.mock_response["samples"][0], "title": "Updated", "date_updated": "2023-02-01"}]
+        api.calls.clear()
+
+        async def search():
+            stale = await fetch_sample_data(client=self.mock_client, query="updated", logger=self.mock_logger)
+            await async_sample_data_service.revalidation
+            return stale, await fetch_sample_data(client=self.mock_client, query="updated", logger=self.mock_logger)
+
+        stale, result = asyncio.run(search())
+
+        assert stale["samples"] == []
+        assert [sample["external_ref"]["id"] for sample in result["samples"]] == ["sample1"]
+        assert all(params["updated_since"] == "2023-01-02" for params in api.calls)
+        assert len(corpus.index) == 2
+
+    def test_refresh_corpus_refetches_in_full_when_updated_since_is_ignored(self, monkeypatch):
+        monkeypatch.setattr(settings, "DELTA_SYNC", True)
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        api = DatedAPI(self.mock_response["samples"], ignore_updated_since=True)
+        self.mock_client.api_call.side_effect = api
+        index = asyncio.run(refresh_corpus(client=self.mock_client, logger=self.mock_logger))
+        api.calls.clear()
+
+        refreshed = asyncio.run(refresh_corpus(client=self.mock_client, logger=self.mock_logger))
+
+        assert refreshed is not index
+        self.mock_logger.warning.assert_called_once()
+        assert [params.get("updated_since") for params in api.calls].count(None) == 1 + len(CORPUS_FACETS)
+
+
+class TestAsyncStreamedSampleData:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.samples = [{"title": f"Sample {i}", "external_ref": {"id": f"sample{i}"}} for i in range(100)]
+
+    @pytest.fixture(autouse=True)
+    def stream_sample_data(self, monkeypatch):
+        monkeypatch.setattr(settings, "STREAM_SAMPLE_DATA", True)
+
+    def sample_data(self, body):
+        return {"ok": True, "samples": self.samples}
+
+    def test_fetch_sample_data(self):
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = AsyncWebClient(token="xoxb-test", base_url=api.base_url)
+
+            result = asyncio.run(fetch_sample_data(client=client, query="test", logger=self.mock_logger))
+
+        assert result == {"ok": True, "samples": self.samples}
+        assert api.requests == [(API_METHOD, {"query": "test"})]
+
+    def test_fetch_sample_data_api_error(self):
+        with FakeSlackAPI({API_METHOD: lambda body: {"ok": False, "error": "invalid_auth"}}) as api:
+            client = AsyncWebClient(token="xoxb-test", base_url=api.base_url)
+
+            with pytest.raises(SlackResponseError):
+                asyncio.run(fetch_sample_data(client=client, logger=self.mock_logger))
+
+    def test_fetch_sample_stops_at_match(self):
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = AsyncWebClient(token="xoxb-test", base_url=api.base_url)
+
+            sample = asyncio.run(fetch_sample(client=client, sample_id="sample3", logger=self.mock_logger))
+
+        assert sample == self.samples[3]
+        assert sample_store.get("sample3") == self.samples[3]
+        assert sample_store.get("sample4") is None
+
+
+class TestAsyncRateLimitedSampleData:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.clock = FakeClock()
+        self.samples = [{"title": f"Sample {i}", "external_ref": {"id": f"sample{i}"}} for i in range(10)]
+        self.ratelimited = 0
+
+    @pytest.fixture(autouse=True)
+    def rate_limiting(self, monkeypatch):
+        monkeypatch.setattr(settings, "RATE_LIMITING", True)
+        monkeypatch.setattr(async_sample_data_service, "upstream", fake_upstream(self.clock))
+
+    def sample_data(self, body):
+        if self.ratelimited:
+            self.ratelimited -= 1
+            return 429, {"Retry-After": "2"}, {"ok": False, "error": "ratelimited"}
+        return {"ok": True, "samples": self.samples}
+
+    def test_fetch_sample_data_retries_after_rate_limit(self):
+        self.ratelimited = 2
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = AsyncWebClient(token="xoxb-test", base_url=api.base_url)
+
+            result = asyncio.run(fetch_sample_data(client=client, query="sample", logger=self.mock_logger))
+
+        assert result["samples"] == self.samples
+        assert len(api.requests) == 3
+        assert self.clock.now >= 4
+
+    def test_fetch_sample_streamed_serves_stale_corpus_while_rate_limited(self, monkeypatch):
+        monkeypatch.setattr(settings, "STREAM_SAMPLE_DATA", True)
+        self.ratelimited = 100
+        corpus.load(samples=self.samples, facets={})
+        corpus.loaded_at -= corpus.max_age
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = AsyncWebClient(token="xoxb-test", base_url=api.base_url)
+
+            sample = asyncio.run(fetch_sample(client=client, sample_id="sample4", logger=self.mock_logger))
+
+        assert sample == self.samples[4]
+        # Waiting out a fourth Retry-After would run past the deadline
+        assert len(api.requests) == 3
+        self.mock_logger.warning.assert_called_once()
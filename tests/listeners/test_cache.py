@@ -0,0 +1,154 @@
+from unittest.mock import MagicMock
+
+from listeners.cache import TTLCache, VersionedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_miss(self):
+        assert self.cache.get("missing") is None
+        assert self.cache.stats() == {"hits": 0, "misses": 1, "size": 0}
+
+    def test_get_hit(self):
+        self.cache.set("key", "value")
+
+        assert self.cache.get("key") == "value"
+        assert self.cache.stats() == {"hits": 1, "misses": 0, "size": 1}
+
+    def test_entry_expires(self):
+        self.cache.set("key", "value")
+        self.clock.now = 10
+
+        assert self.cache.get("key") is None
+        assert len(self.cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        assert self.cache.get("a") == 1
+        assert self.cache.get("b") is None
+        assert self.cache.get("c") == 3
+
+    def test_invalidate(self):
+        self.cache.set("key", "value")
+        self.cache.invalidate("key")
+
+        assert self.cache.get("key") is None
+
+    def test_clear_resets_counters(self):
+        self.cache.set("key", "value")
+        self.cache.get("key")
+        self.cache.clear()
+
+        assert self.cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+    def test_entry(self):
+        self.cache.set("key", "value")
+        self.clock.now = 4
+
+        assert self.cache.entry("key") == (6, "value")
+        assert self.cache.entry("missing") is None
+        assert self.cache.stats() == {"hits": 0, "misses": 0, "size": 1}
+
+
+class TestTTLCacheBackend:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.backend = TTLCache(ttl=10, clock=self.clock)
+        self.cache = TTLCache(ttl=10, clock=self.clock)
+        self.cache.backend = self.backend
+
+    def test_set_writes_through(self):
+        self.cache.set("key", "value")
+
+        assert self.backend.entry("key") == (10, "value")
+
+    def test_miss_falls_through_for_what_is_left_of_the_ttl(self):
+        self.backend.set("key", "value")
+        self.clock.now = 6
+
+        assert self.cache.get("key") == "value"
+        assert self.cache.entry("key") == (4, "value")
+        self.clock.now = 10
+        assert self.cache.get("key") is None
+        assert self.cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+    def test_invalidate_reaches_backend(self):
+        self.cache.set("key", "value")
+        self.cache.invalidate("key")
+
+        assert self.backend.get("key") is None
+        assert self.cache.get("key") is None
+
+    def test_prefetch_copies_local_misses_at_once(self):
+        self.backend.set("shared", "value")
+        self.cache.set("local", "value")
+        self.backend = self.cache.backend = MagicMock(wraps=self.backend)
+
+        assert self.cache.prefetch(["local", "shared", "missing"]) == 1
+        self.backend.entries.assert_called_once_with(["shared", "missing"])
+        assert self.cache.entry("shared") == (10, "value")
+        assert self.cache.stats() == {"hits": 0, "misses": 0, "size": 2}
+
+    def test_prefetch_without_backend(self):
+        self.cache.backend = None
+
+        assert self.cache.prefetch(["key"]) == 0
+
+
+class TestVersionedCache:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.cache = VersionedCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_hit(self):
+        self.cache.set("key", "v1", "value")
+
+        assert self.cache.get("key", "v1") == "value"
+        assert self.cache.stats() == {"hits": 1, "misses": 0, "size": 1}
+
+    def test_other_version_misses(self):
+        self.cache.set("key", "v1", "value")
+
+        assert self.cache.get("key", "v2") is None
+        self.cache.set("key", "v2", "new value")
+        assert self.cache.get("key", "v2") == "new value"
+        assert self.cache.get("key", "v1") is None
+        assert len(self.cache) == 1
+
+    def test_entry_expires(self):
+        self.cache.set("key", "v1", "value")
+        self.clock.now = 10
+
+        assert self.cache.get("key", "v1") is None
+
+    def test_evicts_oldest(self):
+        self.cache.set("a", "v1", 1)
+        self.cache.set("b", "v1", 2)
+        self.cache.set("a", "v2", 3)
+        self.cache.set("c", "v1", 4)
+
+        assert self.cache.get("b", "v1") is None
+        assert self.cache.get("a", "v2") == 3
+        assert self.cache.get("c", "v1") == 4
+
+    def test_clear_resets_counters(self):
+        self.cache.set("key", "v1", "value")
+        self.cache.get("key", "v1")
+        self.cache.clear()
+
+        assert self.cache.stats() == {"hits": 0, "misses": 0, "size": 0}
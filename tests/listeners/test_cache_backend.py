@@ -0,0 +1,287 @@
+import json
+import socket
+import zlib
+from unittest.mock import MagicMock
+
+import pytest
+from slack_sdk import WebClient
+
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.fake_slack_api import FakeSlackAPI
+from listeners.cache import TTLCache
+from listeners.cache_backend import (
+    HEADER_SIZE_BYTES,
+    CacheCodecError,
+    LocalCacheBackend,
+    RedisCacheBackend,
+    decode_value,
+    encode_command,
+    encode_value,
+)
+from tests.listeners.test_cache import FakeClock
+
+
+def sample_response(count: int) -> dict:
+    return {
+        "ok": True,
+        "samples": [
+            {
+                "title": f"Bolt sample {i}",
+                "description": "A framework for building Slack apps",
+                "link": f"https://example.com/{i}",
+                "date_updated": "2025-01-01",
+                "external_ref": {"id": f"sample{i}"},
+                "language": "python",
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestCodec:
+    def test_round_trips_responses(self):
+        response = sample_response(3)
+        response["samples"].append({"title": "Nested", "external_ref": {"id": "nested", "type": "app"}})
+
+        assert decode_value(encode_value(response)) == response
+
+    def test_round_trips_other_values(self):
+        for value in ({"ok": True, "samples": []}, {"ok": False}, ["a", 1], "text", None):
+            assert decode_value(encode_value(value)) == value
+
+    def test_round_trips_samples_without_iso_dates(self):
+        response = {"ok": True, "samples": [{"title": "No date", "date_updated": "", "external_ref": {"id": "1"}}]}
+
+        assert decode_value(encode_value(response)) == response
+
+    def test_is_smaller_than_json(self):
+        response = sample_response(100)
+
+        assert len(encode_value(response)) * 5 < len(json.dumps(response))
+
+    def test_rejects_other_versions_and_corrupt_values(self):
+        data = encode_value({"ok": True})
+
+        with pytest.raises(CacheCodecError):
+            decode_value(b"\x00" + data[1:])
+        with pytest.raises(CacheCodecError):
+            decode_value(data[:-4])
+        with pytest.raises(CacheCodecError):
+            decode_value(b"")
+
+    def test_rejects_malformed_packed_samples(self):
+        data = encode_value(sample_response(3))
+        payload = zlib.decompress(data[2:])
+        size = int.from_bytes(payload[:HEADER_SIZE_BYTES], "big")
+        header = json.loads(payload[HEADER_SIZE_BYTES : HEADER_SIZE_BYTES + size])
+        buffers, start = [], HEADER_SIZE_BYTES + size
+        for length in header["sizes"]:
+            buffers.append(payload[start : start + length])
+            start += length
+
+        def packed(header, buffers: list) -> bytes:
+            header = json.dumps({**header, "sizes": [len(buffer) for buffer in buffers]}).encode("utf-8")
+            return data[:2] + zlib.compress(len(header).to_bytes(HEADER_SIZE_BYTES, "big") + header + b"".join(buffers))
+
+        without_last_date = [*buffers[:3], buffers[3][:-4], *buffers[4:]]
+        malformed = [
+            packed(header, without_last_date),
+            packed({**header, "categories": {"language": []}}, buffers),
+            packed({**header, "raw": {"0": "not a sample"}}, buffers),
+            packed({**header, "value": []}, buffers),
+            data[:2] + zlib.compress(b"\x00\x00\x00\x02[]"),
+        ]
+
+        assert decode_value(packed(header, buffers)) == sample_response(3)
+        for value in malformed:
+            with pytest.raises(CacheCodecError):
+                decode_value(value)
+
+    def test_decodes_json_only(self):
+        data = encode_value({"ok": True})
+
+        assert json.loads(zlib.decompress(data[2:])) == {"ok": True}
+        with pytest.raises(CacheCodecError):
+            decode_value(data[:2] + zlib.compress(b"\x80\x04"))
+
+    def test_rejects_values_that_are_not_builtins(self):
+        with FakeSlackAPI({"developer.sampleData.get": lambda body: sample_response(1)}) as api:
+            response = WebClient(base_url=api.base_url).api_call("developer.sampleData.get")
+
+        with pytest.raises(CacheCodecError):
+            encode_value(response)
+        assert decode_value(encode_value(response.data)) == sample_response(1)
+
+    def test_encode_command(self):
+        assert encode_command("SET", "key", b"\x01\x02", "PX", 100) == (
+            b"*5\r\n$3\r\nSET\r\n$3\r\nkey\r\n$2\r\n\x01\x02\r\n$2\r\nPX\r\n$3\r\n100\r\n"
+        )
+
+
+class TestLocalCacheBackend:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.backend = LocalCacheBackend(ttl=10, clock=self.clock)
+
+    def test_round_trip(self):
+        self.backend.set("key", {"ok": True})
+        self.backend.set("short", "value", ttl=2)
+        self.clock.now = 4
+
+        assert self.backend.entries(["key", "short", "missing"]) == [(6, {"ok": True}), None, None]
+        assert len(self.backend) == 1
+
+        self.backend.invalidate("key")
+        assert self.backend.entry("key") is None
+
+    def test_returns_copies(self):
+        value = {"ok": True, "samples": []}
+        self.backend.set("key", value)
+
+        self.backend.entry("key")[1]["samples"].append("changed")
+
+        assert self.backend.entry("key")[1] == value
+
+    def test_values_that_cannot_be_encoded_are_not_stored(self):
+        self.backend.set("key", object())
+
+        assert self.backend.entry("key") is None
+
+    def test_shares_entries_between_caches(self):
+        node1 = TTLCache(ttl=10, clock=self.clock)
+        node2 = TTLCache(ttl=10, clock=self.clock)
+        node1.backend = node2.backend = self.backend
+
+        node1.set("key", "value")
+
+        assert node2.get("key") == "value"
+
+
+class TestRedisCacheBackend:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.server = FakeRedis().start()
+        self.backend = RedisCacheBackend("127.0.0.1", self.server.port, ttl=30, logger=self.mock_logger)
+
+    def teardown_method(self):
+        self.backend.close()
+        self.server.stop()
+
+    def test_round_trip(self):
+        response = sample_response(2)
+        self.backend.set("key", response, ttl=10)
+
+        seconds_left, value = self.backend.entry("key")
+
+        assert value == response
+        assert 9 < seconds_left <= 10
+        assert self.server.commands[0][:2] == ["SET", b"sample-data:key"]
+        assert self.server.commands[0][3:] == [b"PX", b"10000"]
+
+    def test_default_ttl(self):
+        self.backend.set("key", "value")
+
+        assert 29 < self.backend.entry("key")[0] <= 30
+
+    def test_entries_are_looked_up_in_one_round_trip(self):
+        self.backend.set("a", "value a")
+        self.backend.set("c", "value c")
+        self.server.batches.clear()
+
+        entries = self.backend.entries(["a", "b", "c"])
+
+        assert [entry and entry[1] for entry in entries] == ["value a", None, "value c"]
+        assert self.server.batches == [6]
+
+    def test_reuses_connections(self):
+        for _ in range(5):
+            self.backend.set("key", "value")
+            self.backend.entry("key")
+
+        assert self.server.connections == 1
+
+    def test_invalidate(self):
+        self.backend.set("key", "value")
+        self.backend.invalidate("key")
+
+        assert self.backend.entry("key") is None
+
+    def test_expired_entries_miss(self):
+        clock = FakeClock()
+        self.server._clock = clock
+        self.backend.set("key", "value", ttl=1)
+        clock.now = 1
+
+        assert self.backend.entry("key") is None
+
+    def test_undecodable_entry_is_a_miss(self):
+        self.server.data[b"sample-data:key"] = (float("inf"), b"\xff")
+
+        assert self.backend.entry("key") is None
+        self.mock_logger.warning.assert_called_once()
+
+    def test_values_that_cannot_be_encoded_are_not_stored(self):
+        self.backend.set("key", object())
+
+        assert self.backend.entry("key") is None
+        assert self.server.commands == [["PTTL", b"sample-data:key"], ["GET", b"sample-data:key"]]
+        self.mock_logger.warning.assert_called_once()
+
+    def test_from_url(self):
+        server = FakeRedis(password="p@ss").start()
+        backend = RedisCacheBackend.from_url(f"redis://:p%40ss@127.0.0.1:{server.port}/2", ttl=30, logger=self.mock_logger)
+        try:
+            backend.set("key", "value")
+            assert backend.entry("key")[1] == "value"
+        finally:
+            backend.close()
+            server.stop()
+
+        assert server.commands[:2] == [["AUTH", b"p@ss"], ["SELECT", b"2"]]
+        with pytest.raises(ValueError):
+            RedisCacheBackend.from_url("memcached://localhost", ttl=30, logger=self.mock_logger)
+
+    def test_wrong_password_is_a_miss(self):
+        server = FakeRedis(password="secret").start()
+        backend = RedisCacheBackend("127.0.0.1", server.port, ttl=30, logger=self.mock_logger, password="wrong")
+        try:
+            assert backend.entries(["a", "b"]) == [None, None]
+        finally:
+            server.stop()
+
+        self.mock_logger.warning.assert_called_once()
+
+    def test_unreachable_server_is_skipped_until_retry(self):
+        clock = FakeClock()
+        backend = RedisCacheBackend("127.0.0.1", unused_port(), ttl=30, logger=self.mock_logger, retry_after=5, clock=clock)
+
+        assert backend.entry("key") is None
+        backend.set("key", "value")
+        clock.now = 5
+        assert backend.entry("key") is None
+
+        assert self.mock_logger.warning.call_count == 2
+
+    def test_shares_entries_between_nodes(self):
+        node2_backend = RedisCacheBackend("127.0.0.1", self.server.port, ttl=30, logger=self.mock_logger)
+        node1 = TTLCache(ttl=30)
+        node2 = TTLCache(ttl=30)
+        node1.backend = self.backend
+        node2.backend = node2_backend
+        response = sample_response(3)
+
+        node1.set("key", response)
+        try:
+            assert node2.get("key") == response
+            assert node2.get("key") == response
+        finally:
+            node2_backend.close()
+
+        assert node2.stats() == {"hits": 2, "misses": 0, "size": 1}
+        assert [command[0] for command in self.server.commands] == ["SET", "PTTL", "GET"]
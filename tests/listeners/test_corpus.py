@@ -0,0 +1,174 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from listeners.corpus import Corpus, CorpusRefresher, SnapshotWatcher, refresh_delay
+from listeners.snapshot_file import SnapshotError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCorpus:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.corpus = Corpus(max_age=60, clock=self.clock)
+        self.samples = [{"title": "Sample 1", "external_ref": {"id": "sample1"}}]
+
+    def test_empty_corpus_is_stale(self):
+        assert self.corpus.is_stale()
+
+    def test_load_builds_index(self):
+        index = self.corpus.load(self.samples, {("type", "sample"): ["sample1"]})
+
+        assert self.corpus.index is index
+        assert index.get("sample1") == self.samples[0]
+        assert not self.corpus.is_stale()
+
+    def test_corpus_goes_stale(self):
+        self.corpus.load(self.samples, {})
+        self.clock.now = 60
+
+        assert self.corpus.is_stale()
+
+    def test_save_and_restore(self, tmp_path):
+        path = str(tmp_path / "corpus.snapshot")
+        self.corpus.load(self.samples, {("type", "sample"): ["sample1"]})
+        self.clock.now = 10
+        self.corpus.save(path)
+
+        restored = Corpus(max_age=60, clock=self.clock)
+        index = restored.restore(path)
+
+        assert index.get("sample1") == self.samples[0]
+        assert 10 <= restored.age() < 11
+        assert 10 <= restored.reconciled_age() < 11
+
+    def test_update_refreshes_without_reconciling(self, tmp_path):
+        path = str(tmp_path / "corpus.snapshot")
+        self.corpus.load(self.samples, {})
+        self.clock.now = 90
+
+        changes = self.corpus.update([{"title": "Sample 2", "external_ref": {"id": "sample2"}}], {}, deleted=["sample1"])
+        self.corpus.save(path)
+        restored = Corpus(max_age=60, clock=self.clock)
+        restored.restore(path)
+
+        assert changes == 2
+        assert not self.corpus.is_stale()
+        assert self.corpus.reconciled_age() == 90
+        assert 90 <= restored.reconciled_age() < 91
+        assert restored.index.get("sample1") is None
+
+    def test_restore_missing_snapshot(self, tmp_path):
+        with pytest.raises(SnapshotError):
+            self.corpus.restore(str(tmp_path / "missing.snapshot"))
+
+        assert self.corpus.index is None
+
+    def test_snapshot_changed(self, tmp_path):
+        path = str(tmp_path / "corpus.snapshot")
+        self.corpus.load(self.samples, {})
+        assert not self.corpus.snapshot_changed(path)
+
+        self.corpus.save(path)
+        assert not self.corpus.snapshot_changed(path)
+
+        other = Corpus(max_age=60, clock=self.clock)
+        other.load(self.samples, {})
+        other.save(path)
+        assert self.corpus.snapshot_changed(path)
+
+        self.corpus.restore(path)
+        assert not self.corpus.snapshot_changed(path)
+
+    def test_clear(self):
+        self.corpus.load(self.samples, {})
+        self.corpus.clear()
+
+        assert self.corpus.index is None
+        assert self.corpus.is_stale()
+
+
+class TestCorpusRefresher:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.refreshed = threading.Event()
+        self.calls = 0
+
+    def test_refresh_delay_within_jitter(self):
+        delays = [refresh_delay(10, 2) for _ in range(100)]
+
+        assert all(8 <= delay <= 12 for delay in delays)
+        assert refresh_delay(1, 5) >= 0
+
+    def test_refreshes_immediately_and_on_interval(self):
+        def refresh():
+            self.calls += 1
+            if self.calls == 3:
+                self.refreshed.set()
+
+        refresher = CorpusRefresher(refresh=refresh, interval=0.01, jitter=0, logger=self.mock_logger).start()
+
+        assert self.refreshed.wait(timeout=5)
+        refresher.stop(timeout=5)
+        self.mock_logger.warning.assert_not_called()
+
+    def test_waits_for_initial_delay(self):
+        refresher = CorpusRefresher(
+            refresh=self.refreshed.set, interval=60, jitter=0, logger=self.mock_logger, initial_delay=60
+        ).start()
+        refresher.stop(timeout=5)
+
+        assert not self.refreshed.is_set()
+
+    def test_keeps_running_after_failure(self):
+        def refresh():
+            self.calls += 1
+            if self.calls == 1:
+                raise ValueError("upstream failure")
+            self.refreshed.set()
+
+        refresher = CorpusRefresher(refresh=refresh, interval=0.01, jitter=0, logger=self.mock_logger).start()
+
+        assert self.refreshed.wait(timeout=5)
+        refresher.stop(timeout=5)
+        self.mock_logger.warning.assert_called_once()
+
+
+class TestSnapshotWatcher:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.reloaded = threading.Event()
+
+    def test_reloads_when_changed(self):
+        changes = iter([False, True])
+
+        def changed():
+            return next(changes, False)
+
+        watcher = SnapshotWatcher(changed, self.reloaded.set, interval=0.01, logger=self.mock_logger).start()
+
+        assert self.reloaded.wait(timeout=5)
+        watcher.stop(timeout=5)
+
+    def test_keeps_watching_after_failed_reload(self):
+        calls = []
+
+        def reload():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ValueError("corrupt snapshot")
+            self.reloaded.set()
+
+        watcher = SnapshotWatcher(lambda: True, reload, interval=0.01, logger=self.mock_logger).start()
+
+        assert self.reloaded.wait(timeout=5)
+        watcher.stop(timeout=5)
+        self.mock_logger.warning.assert_called_once()
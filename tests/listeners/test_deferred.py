@@ -0,0 +1,196 @@
+import asyncio
+import threading
+
+import pytest
+
+from listeners.deferred import AsyncDeferredExecutor, DeadlineExceeded, DeferredExecutor, ExecutorSaturated
+from listeners.metrics import deferred_deadline_exceeded, deferred_rejected
+
+
+class Outcome:
+    """Collects what `finish` received so a test can wait for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def finish(self, result):
+        try:
+            self.value = result()
+        except Exception as e:
+            self.error = e
+        self.done.set()
+
+    def wait(self):
+        assert self.done.wait(2)
+        return self
+
+
+class TestDeferredExecutor:
+    def setup_method(self):
+        self.executor = DeferredExecutor(max_workers=2, max_pending=2)
+        self.release = threading.Event()
+
+    def teardown_method(self):
+        self.release.set()
+
+    def test_finishes_with_result(self):
+        outcome = Outcome()
+
+        self.executor.defer(lambda: "result", outcome.finish, deadline=2)
+
+        assert outcome.wait().value == "result"
+
+    def test_finishes_with_error(self):
+        outcome = Outcome()
+
+        def work():
+            raise ValueError("boom")
+
+        self.executor.defer(work, outcome.finish, deadline=2)
+
+        assert isinstance(outcome.wait().error, ValueError)
+
+    def test_deadline_exceeded(self):
+        outcome = Outcome()
+        before = deferred_deadline_exceeded.value(executor="thread")
+
+        self.executor.defer(self.release.wait, outcome.finish, deadline=0.01)
+
+        assert isinstance(outcome.wait().error, DeadlineExceeded)
+        assert deferred_deadline_exceeded.value(executor="thread") == before + 1
+        assert self.executor.pending() == 1
+
+    def test_expired_jobs_finish_concurrently(self):
+        outcomes = [Outcome(), Outcome()]
+        # Each `finish` waits for the other to start, which it never would if they ran one after the other
+        both_finishing = threading.Barrier(2, timeout=2)
+
+        def finish(outcome):
+            def wait_for_other(result):
+                both_finishing.wait()
+                outcome.finish(result)
+
+            return wait_for_other
+
+        for outcome in outcomes:
+            self.executor.defer(self.release.wait, finish(outcome), deadline=0.01)
+
+        assert all(isinstance(outcome.wait().error, DeadlineExceeded) for outcome in outcomes)
+
+    def test_work_finishing_after_deadline_is_ignored(self):
+        outcome = Outcome()
+        finished = threading.Event()
+
+        def work():
+            self.release.wait()
+            finished.set()
+            return "late"
+
+        self.executor.defer(work, outcome.finish, deadline=0.01)
+        outcome.wait()
+        self.release.set()
+
+        assert finished.wait(2)
+        assert isinstance(outcome.error, DeadlineExceeded)
+
+    def test_rejects_when_saturated(self):
+        outcome = Outcome()
+        before = deferred_rejected.value(executor="thread")
+        self.executor.submit(self.release.wait, deadline=2)
+        self.executor.submit(self.release.wait, deadline=2)
+
+        self.executor.defer(lambda: "result", outcome.finish, deadline=2)
+
+        assert isinstance(outcome.wait().error, ExecutorSaturated)
+        assert deferred_rejected.value(executor="thread") == before + 1
+        with pytest.raises(ExecutorSaturated):
+            self.executor.submit(lambda: None, deadline=2)
+
+    def test_accepts_again_once_jobs_finish(self):
+        first = self.executor.submit(lambda: 1, deadline=2)
+        second = self.executor.submit(lambda: 2, deadline=2)
+
+        assert (first.result(2), second.result(2)) == (1, 2)
+        assert self.executor.submit(lambda: 3, deadline=2).result(2) == 3
+
+    def test_drain_waits_for_running_jobs(self):
+        outcome = Outcome()
+        self.executor.defer(self.release.wait, outcome.finish, deadline=2)
+
+        assert not self.executor.drain(timeout=0.05)
+        threading.Timer(0.05, self.release.set).start()
+        assert self.executor.drain(timeout=2)
+        assert outcome.done.is_set()
+
+
+class TestAsyncDeferredExecutor:
+    def setup_method(self):
+        self.executor = AsyncDeferredExecutor(max_pending=1)
+
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_finishes_with_result(self):
+        async def work():
+            return "result"
+
+        async def main():
+            finished = asyncio.get_running_loop().create_future()
+
+            async def finish(result):
+                finished.set_result(await result())
+
+            self.executor.defer(work, finish, deadline=1)
+            return await finished
+
+        assert self.run(main()) == "result"
+        assert self.executor.pending() == 0
+
+    def test_deadline_exceeded(self):
+        async def main():
+            release = asyncio.Event()
+            finished = asyncio.get_running_loop().create_future()
+
+            async def work():
+                await release.wait()
+                return "late"
+
+            async def finish(result):
+                try:
+                    await result()
+                except DeadlineExceeded as e:
+                    finished.set_result(e)
+
+            self.executor.defer(work, finish, deadline=0.01)
+            error = await finished
+            pending = self.executor.pending()
+            release.set()
+            await asyncio.sleep(0)
+            return error, pending
+
+        error, pending = self.run(main())
+
+        assert isinstance(error, DeadlineExceeded)
+        assert pending == 1
+        assert self.executor.pending() == 0
+
+    def test_rejects_when_saturated(self):
+        async def main():
+            release = asyncio.Event()
+            finished = asyncio.get_running_loop().create_future()
+
+            async def finish(result):
+                try:
+                    await result()
+                except ExecutorSaturated as e:
+                    finished.set_result(e)
+
+            self.executor.defer(release.wait, lambda result: asyncio.sleep(0), deadline=1)
+            self.executor.defer(release.wait, finish, deadline=1)
+            error = await finished
+            release.set()
+            return error
+
+        assert isinstance(self.run(main()), ExecutorSaturated)
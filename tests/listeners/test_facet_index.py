@@ -0,0 +1,67 @@
+from listeners.facet_index import FacetIndex, bitset, bitset_flags, bitset_members
+
+
+class TestFacetIndex:
+    def setup_method(self):
+        self.index = FacetIndex(
+            20,
+            {
+                ("languages", "python"): [0, 1, 2, 17],
+                ("languages", "java"): [3, 18],
+                ("type", "template"): [1, 3, 19],
+                ("type", "sample"): [0, 2, 17, 18],
+            },
+        )
+
+    def test_bitset_round_trip(self):
+        assert bitset_members(bitset([0, 5, 130])) == [0, 5, 130]
+        assert bitset_members(0) == []
+
+    def test_bitset_flags(self):
+        flags = bitset_flags(bitset([1, 17]), 20)
+
+        assert len(flags) == 3
+        assert [i for i in range(20) if flags[i >> 3] >> (i & 7) & 1] == [1, 17]
+
+    def test_match_without_filters(self):
+        assert self.index.match(None) is None
+        assert self.index.match({}) is None
+
+    def test_match_languages_is_union(self):
+        assert bitset_members(self.index.match({"languages": ["python", "java"]})) == [0, 1, 2, 3, 17, 18]
+
+    def test_match_languages_and_type_is_intersection(self):
+        assert bitset_members(self.index.match({"languages": ["python"], "type": "sample"})) == [0, 2, 17]
+
+    def test_match_unknown_value(self):
+        assert self.index.match({"languages": ["cobol"]}) == 0
+        assert self.index.match({"type": "unknown"}) == 0
+
+    def test_counts(self):
+        assert self.index.counts() == {
+            ("languages", "python"): 4,
+            ("languages", "java"): 2,
+            ("type", "template"): 3,
+            ("type", "sample"): 4,
+        }
+
+    def test_counts_with_filters(self):
+        assert self.index.counts({"type": "template"}) == {
+            ("languages", "python"): 1,
+            ("languages", "java"): 1,
+            ("type", "template"): 3,
+            ("type", "sample"): 0,
+        }
+
+    def test_update_adds_and_removes_docs(self):
+        self.index.update({20: {("languages", "java"), ("type", "sample")}, 21: {("languages", "rust")}}, removed=[0, 3])
+
+        assert self.index.doc_count == 22
+        assert bitset_members(self.index.all) == [1, 2, *range(4, 22)]
+        assert bitset_members(self.index.match({"languages": ["java"]})) == [18, 20]
+        assert bitset_members(self.index.match({"type": "sample"})) == [2, 17, 18, 20]
+        assert bitset_members(self.index.bitmaps[("languages", "rust")]) == [21]
+
+    def test_facets_of(self):
+        assert self.index.facets_of(3) == {("languages", "java"), ("type", "template")}
+        assert self.index.facets_of(5) == set()
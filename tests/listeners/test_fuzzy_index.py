@@ -0,0 +1,117 @@
+import random
+
+from listeners.fuzzy_index import FuzzyIndex, edit_distance, trigrams
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class TestEditDistance:
+    def test_edit_distance(self):
+        assert edit_distance("python", "python", 2) == 0
+        assert edit_distance("pyhton", "python", 2) == 2
+        assert edit_distance("pythn", "python", 2) == 1
+        assert edit_distance("", "bolt", 5) == 4
+
+    def test_edit_distance_stops_past_limit(self):
+        assert edit_distance("javascript", "java", 2) == 3
+        assert edit_distance("slack", "block", 1) == 2
+
+    def test_edit_distance_matches_levenshtein(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            a = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+            b = "".join(rng.choices("abc", k=rng.randint(0, 8)))
+            expected = levenshtein(a, b)
+
+            assert edit_distance(a, b, 8) == expected
+            assert edit_distance(a, b, 1) == min(expected, 2)
+
+    def test_trigrams(self):
+        assert trigrams("bolt") == [" bo", "bol", "olt", "lt "]
+
+
+class TestFuzzyIndex:
+    def setup_method(self):
+        self.index = FuzzyIndex(
+            {
+                "python": 10,
+                "pythonic": 2,
+                "pyramid": 4,
+                "javascript": 6,
+                "java": 8,
+                "slack": 12,
+                "stack": 3,
+                "workflow": 5,
+                "workflows": 1,
+            },
+            max_completions=3,
+        )
+
+    def test_complete_ranks_by_frequency(self):
+        assert self.index.complete("pyth") == ["python", "pythonic"]
+        assert self.index.complete("work") == ["workflow", "workflows"]
+
+    def test_complete_short_prefix(self):
+        assert self.index.complete("py") == ["python", "pyramid", "pythonic"]
+        assert self.index.complete("j") == ["java", "javascript"]
+
+    def test_complete_without_matches(self):
+        assert self.index.complete("rust") == []
+        assert self.index.complete("zz") == []
+
+    def test_correct_single_typo(self):
+        assert self.index.correct("pyhon") == ["python"]
+        assert self.index.correct("jvaa") == []
+
+    def test_correct_ranks_by_distance_then_frequency(self):
+        assert self.index.correct("sack") == ["slack", "stack"]
+        assert self.index.correct("workflw") == ["workflow", "workflows"]
+
+    def test_correct_allows_two_typos_in_long_terms(self):
+        assert self.index.correct("javscrit") == ["javascript"]
+
+    def test_correct_respects_edit_limit(self):
+        index = FuzzyIndex(self.index.frequencies, edit_limit=1)
+
+        assert index.correct("javscrit") == []
+        assert index.correct("javscript") == ["javascript"]
+
+    def test_correct_short_terms_without_shared_trigrams(self):
+        index = FuzzyIndex({"app": 5, "api": 3, "bolt": 2, "apps": 1})
+
+        assert index.correct("aap") == ["app"]
+        assert index.correct("apo") == ["app", "api"]
+
+    def test_correct_matches_brute_force(self):
+        rng = random.Random(0)
+        vocabulary = {"".join(rng.choices("abc", k=rng.randint(1, 8))): rng.randint(1, 9) for _ in range(300)}
+        index = FuzzyIndex(vocabulary, max_completions=len(vocabulary))
+        for _ in range(200):
+            term = "".join(rng.choices("abc", k=rng.randint(3, 8)))
+            limit = 1 if len(term) <= 5 else 2
+            expected = {candidate for candidate in vocabulary if levenshtein(term, candidate) <= limit}
+
+            assert set(index.correct(term)) == expected
+
+    def test_correct_ignores_short_terms(self):
+        assert self.index.correct("jv") == []
+
+    def test_expand(self):
+        assert self.index.expand(["pyhton", "slack", "work"]) == ["python", "slack", "workflow", "workflows"]
+
+    def test_expand_keeps_terms_without_candidates(self):
+        assert self.index.expand(["rust", "zzz"]) == ["rust", "zzz"]
+
+    def test_expand_only_completes_last_term(self):
+        assert self.index.expand(["pyth", "slack"]) == ["pyth", "slack"]
+
+    def test_expand_with_known_terms(self):
+        assert self.index.expand(["pyth"], known={"pyth"}) == ["pyth"]
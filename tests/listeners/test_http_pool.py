@@ -0,0 +1,267 @@
+import asyncio
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request
+
+import pytest
+from slack_bolt import BoltRequest
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import internal_utils
+
+from benchmarks.fake_slack_api import FakeSlackAPI
+from listeners import settings
+from listeners.http_pool import (
+    ConnectionPool,
+    PooledApp,
+    PooledWebClient,
+    create_client_session,
+    create_web_client,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def sample_data(body):
+    return {"ok": True, "samples": [{"title": "Sample 1", "external_ref": {"id": "sample1"}}]}
+
+
+class TestConnectionPool:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.pool = ConnectionPool(max_idle=2, max_per_host=2, idle_timeout=10, clock=self.clock)
+        self.key = ("http", "127.0.0.1", 80)
+
+    def test_reuses_released_connection(self):
+        connection, reused = self.pool.acquire(self.key)
+        self.pool.release(self.key, connection)
+
+        assert self.pool.acquire(self.key) == (connection, True)
+        assert self.pool.stats() == {"created": 1, "reused": 1, "discarded": 0, "idle": 0, "open": 1}
+        assert not reused
+
+    def test_discards_idle_connection_after_timeout(self):
+        connection, _ = self.pool.acquire(self.key)
+        self.pool.release(self.key, connection)
+        self.clock.now = 10
+
+        new_connection, reused = self.pool.acquire(self.key)
+
+        assert new_connection is not connection
+        assert not reused
+        assert self.pool.stats()["discarded"] == 1
+
+    def test_discards_unreusable_connection(self):
+        connection, _ = self.pool.acquire(self.key)
+        self.pool.release(self.key, connection, reusable=False)
+
+        assert self.pool.stats() == {"created": 1, "reused": 0, "discarded": 1, "idle": 0, "open": 0}
+
+    def test_blocks_at_per_host_limit(self):
+        first, _ = self.pool.acquire(self.key)
+        self.pool.acquire(self.key)
+        acquired = threading.Event()
+
+        def acquire_third():
+            self.pool.acquire(self.key)
+            acquired.set()
+
+        thread = threading.Thread(target=acquire_third)
+        thread.start()
+
+        assert not acquired.wait(timeout=0.05)
+        self.pool.release(self.key, first)
+        assert acquired.wait(timeout=5)
+        thread.join()
+
+    def test_limits_idle_connections(self):
+        connections = [self.pool.acquire(("http", f"host{i}", 80))[0] for i in range(3)]
+        for i, connection in enumerate(connections):
+            self.pool.release(("http", f"host{i}", 80), connection)
+
+        assert self.pool.stats()["idle"] == 2
+
+    def test_close(self):
+        connection, _ = self.pool.acquire(self.key)
+        self.pool.release(self.key, connection)
+        self.pool.close()
+
+        assert self.pool.stats()["idle"] == 0
+        assert self.pool.stats()["open"] == 0
+
+
+class TestPooledWebClient:
+    def test_reuses_connection_across_calls(self):
+        with FakeSlackAPI({"developer.sampleData.get": sample_data}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            for _ in range(5):
+                response = client.api_call("developer.sampleData.get", params={"query": "bolt"})
+                assert response["samples"][0]["title"] == "Sample 1"
+
+        assert api.connections == 1
+        assert api.requests[0] == ("developer.sampleData.get", {"query": "bolt"})
+        assert client.pool.stats()["reused"] == 4
+
+    def test_sends_json_body(self):
+        with FakeSlackAPI({"entity.presentDetails": lambda body: {"ok": True, "echo": body}}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            response = client.api_call(api_method="entity.presentDetails", json={"trigger_id": "123"})
+
+        assert response["echo"] == {"trigger_id": "123"}
+
+    def test_concurrent_calls_respect_per_host_limit(self):
+        with FakeSlackAPI({"developer.sampleData.get": sample_data}) as api:
+            client = PooledWebClient(
+                token="xoxb-test", base_url=api.base_url, pool=ConnectionPool(max_idle=4, max_per_host=4)
+            )
+
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                list(executor.map(lambda _: client.api_call("developer.sampleData.get"), range(64)))
+
+        assert api.connections <= 4
+        assert client.pool.stats()["created"] <= 4
+
+    def test_retries_connection_closed_by_server(self):
+        with FakeSlackAPI({"developer.sampleData.get": sample_data}, close_connections=True) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            client.api_call("developer.sampleData.get")
+            response = client.api_call("developer.sampleData.get")
+
+        assert response["ok"]
+        assert api.connections == 2
+
+    def test_error_status(self):
+        def ratelimited(body):
+            return 429, {"Retry-After": "1"}, {"ok": False, "error": "ratelimited"}
+
+        with FakeSlackAPI({"developer.sampleData.get": ratelimited}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            with pytest.raises(SlackApiError) as excinfo:
+                client.api_call("developer.sampleData.get")
+
+        assert excinfo.value.response.status_code == 429
+        assert excinfo.value.response.headers["Retry-After"] == "1"
+
+
+class TestSlackSdkInternals:
+    """`PooledWebClient` and `form_request` rely on private parts of `slack_sdk`, which an upgrade may change."""
+
+    def test_transport_method_is_unchanged(self):
+        signature = inspect.signature(WebClient._perform_urllib_http_request_internal)
+
+        assert list(signature.parameters) == ["self", "url", "req"]
+        assert signature.parameters["req"].annotation is Request
+        assert inspect.signature(PooledWebClient._perform_urllib_http_request_internal).parameters.keys() == (
+            signature.parameters.keys()
+        )
+        assert "self._perform_urllib_http_request_internal(" in inspect.getsource(WebClient._perform_urllib_http_request)
+
+    def test_request_helpers_are_unchanged(self):
+        assert list(inspect.signature(internal_utils._get_headers).parameters) == [
+            "headers",
+            "token",
+            "has_json",
+            "has_files",
+            "request_specific_headers",
+        ]
+        assert list(inspect.signature(internal_utils._get_url).parameters) == ["base_url", "api_method"]
+        assert list(inspect.signature(internal_utils.convert_bool_to_0_or_1).parameters) == ["params"]
+
+
+class TestPooledApp:
+    def mention_body(self, event_id: str) -> dict:
+        return {
+            "team_id": "T111",
+            "api_app_id": "A111",
+            "type": "event_callback",
+            "event_id": event_id,
+            "authorizations": [{"team_id": "T111", "user_id": "U111", "is_bot": True}],
+            "event": {"type": "app_mention", "user": "U222", "text": "<@U111> bolt", "channel": "C111"},
+        }
+
+    def test_listener_clients_share_the_pool(self):
+        auth_test = {"ok": True, "team_id": "T111", "user_id": "U111", "bot_id": "B111"}
+        clients = []
+
+        with FakeSlackAPI({"auth.test": lambda body: auth_test, "developer.sampleData.get": sample_data}) as api:
+            app = PooledApp(
+                client=PooledWebClient(token="xoxb-test", base_url=api.base_url),
+                token_verification_enabled=False,
+                request_verification_enabled=False,
+                process_before_response=True,
+            )
+
+            @app.event("app_mention")
+            def search(client: WebClient):
+                clients.append(client)
+                client.api_call("developer.sampleData.get", params={"query": "bolt"})
+
+            for event_id in ("Ev1", "Ev2"):
+                assert app.dispatch(BoltRequest(body=self.mention_body(event_id), mode="socket_mode")).status == 200
+
+        assert len(clients) == 2 and clients[0] is not clients[1]
+        assert all(isinstance(client, PooledWebClient) and client.pool is app.client.pool for client in clients)
+        assert api.connections == 1
+        assert app.client.pool.stats()["reused"] == 2
+
+    def test_plain_client_is_left_alone(self):
+        with FakeSlackAPI() as api:
+            app = PooledApp(
+                client=WebClient(token="xoxb-test", base_url=api.base_url),
+                token_verification_enabled=False,
+                request_verification_enabled=False,
+            )
+            request = BoltRequest(body=self.mention_body("Ev1"), mode="socket_mode")
+
+            app._init_context(request)
+
+        assert type(request.context.client) is WebClient
+
+
+class TestClientFactories:
+    def test_create_web_client_default(self):
+        client = create_web_client(token="xoxb-test")
+
+        assert type(client) is WebClient
+
+    def test_create_web_client_pooled(self, monkeypatch):
+        monkeypatch.setattr(settings, "HTTP_CONNECTION_POOL", True)
+        monkeypatch.setattr(settings, "HTTP_POOL_MAX_PER_HOST", 3)
+
+        client = create_web_client(token="xoxb-test")
+
+        assert isinstance(client, PooledWebClient)
+        assert client.pool.max_per_host == 3
+
+    def test_create_web_client_logs_to_logger(self, monkeypatch):
+        logger = logging.getLogger("test-app")
+
+        assert create_web_client(token="xoxb-test", logger=logger).logger is logger
+        monkeypatch.setattr(settings, "HTTP_CONNECTION_POOL", True)
+        assert create_web_client(token="xoxb-test", logger=logger).logger is logger
+
+    def test_create_client_session_default(self):
+        assert create_client_session() is None
+
+    def test_create_client_session_pooled(self, monkeypatch):
+        monkeypatch.setattr(settings, "HTTP_CONNECTION_POOL", True)
+
+        async def run():
+            session = create_client_session()
+            limit_per_host = session.connector.limit_per_host
+            await session.close()
+            return limit_per_host
+
+        assert asyncio.run(run()) == settings.HTTP_POOL_MAX_PER_HOST
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from listeners.json_stream import ArrayStreamParser, JSONStreamError
+
+
+def parse(raw: bytes, chunk_size: int):
+    parser = ArrayStreamParser("samples")
+    items = []
+    for start in range(0, len(raw), chunk_size):
+        items.extend(parser.feed(raw[start : start + chunk_size]))
+    items.extend(parser.close())
+    return items, parser.fields
+
+
+class TestArrayStreamParser:
+    def setup_method(self):
+        self.document = {
+            "ok": True,
+            "warning": None,
+            "samples": [
+                {"title": f"Sample {i} – ☃", "external_ref": {"id": f"sample{i}"}, "score": i * 1.25e-3, "tags": []}
+                for i in range(20)
+            ],
+            "response_metadata": {"next_cursor": ""},
+            "total": 12345,
+        }
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 5, 64, 1 << 20])
+    def test_parses_any_chunking(self, chunk_size):
+        items, fields = parse(json.dumps(self.document, indent=1).encode("utf-8"), chunk_size)
+
+        assert items == self.document["samples"]
+        assert fields == {"ok": True, "warning": None, "response_metadata": {"next_cursor": ""}, "total": 12345}
+
+    def test_yields_items_before_the_document_ends(self):
+        raw = json.dumps(self.document).encode("utf-8")
+        parser = ArrayStreamParser("samples")
+
+        items = parser.feed(raw[: raw.index(b"sample2")])
+
+        assert [item["external_ref"]["id"] for item in items] == ["sample0", "sample1"]
+        assert parser.fields == {"ok": True, "warning": None}
+
+    def test_number_split_across_chunks(self):
+        parser = ArrayStreamParser("samples")
+
+        assert parser.feed(b'{"samples": [12') == []
+        assert parser.feed(b".5, 3") == [12.5]
+        assert parser.feed(b"]}") == [3]
+        assert parser.close() == []
+
+    def test_without_array(self):
+        items, fields = parse(b'{"ok": false, "error": "invalid_auth"}', 4)
+
+        assert items == []
+        assert fields == {"ok": False, "error": "invalid_auth"}
+
+    def test_empty_array(self):
+        assert parse(b'{"samples": [], "ok": true}', 3) == ([], {"ok": True})
+
+    def test_truncated_document_raises(self):
+        parser = ArrayStreamParser("samples")
+        parser.feed(b'{"ok": true, "samples": [{"id": 1}, {"id"')
+
+        with pytest.raises(JSONStreamError):
+            parser.close()
+
+    @pytest.mark.parametrize("raw", [b'["samples"]', b'{"samples": [1; 2]}', b'{"ok": true} trailing', b'{"ok" true}'])
+    def test_malformed_document_raises(self, raw):
+        with pytest.raises(JSONStreamError):
+            parse(raw, 1024)
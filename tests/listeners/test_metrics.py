@@ -0,0 +1,237 @@
+import asyncio
+import inspect
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from listeners import settings
+from listeners.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    SamplingProfiler,
+    instrumented,
+    listener_ack_latency,
+    listener_duration,
+    slack_api_duration,
+    start_metrics_server,
+)
+
+
+class TestCounter:
+    def test_counts_per_label_set(self):
+        counter = Counter("errors_total", "Errors")
+
+        counter.inc(kind="a")
+        counter.inc(kind="a")
+        counter.inc(2, kind="b")
+
+        assert counter.value(kind="a") == 2
+        assert counter.value(kind="b") == 2
+        assert counter.value(kind="c") == 0
+
+    def test_render(self):
+        counter = Counter("errors_total", "Errors")
+        counter.inc(kind="a", listener="search")
+
+        assert counter.render() == [
+            "# HELP errors_total Errors",
+            "# TYPE errors_total counter",
+            'errors_total{kind="a",listener="search"} 1',
+        ]
+
+
+class TestGauge:
+    def test_moves_up_and_down(self):
+        gauge = Gauge("jobs", "Jobs")
+
+        gauge.inc(executor="thread")
+        gauge.inc(executor="thread")
+        gauge.dec(executor="thread")
+        gauge.set(5, executor="asyncio")
+
+        assert gauge.value(executor="thread") == 1
+        assert gauge.render()[1:] == ["# TYPE jobs gauge", 'jobs{executor="asyncio"} 5', 'jobs{executor="thread"} 1']
+
+
+class TestHistogram:
+    def test_render_is_cumulative(self):
+        histogram = Histogram("duration_seconds", "Duration", buckets=(0.1, 1))
+
+        histogram.observe(0.05, method="a")
+        histogram.observe(0.5, method="a")
+        histogram.observe(5, method="a")
+
+        assert histogram.count(method="a") == 3
+        assert histogram.render()[2:] == [
+            'duration_seconds_bucket{method="a",le="0.1"} 1',
+            'duration_seconds_bucket{method="a",le="1"} 2',
+            'duration_seconds_bucket{method="a",le="+Inf"} 3',
+            'duration_seconds_sum{method="a"} 5.55',
+            'duration_seconds_count{method="a"} 3',
+        ]
+
+    def test_bucket_bounds_are_inclusive(self):
+        histogram = Histogram("duration_seconds", "Duration", buckets=(0.1, 1))
+
+        histogram.observe(1)
+
+        assert histogram.render()[3] == 'duration_seconds_bucket{le="1"} 1'
+
+    def test_time_records_on_error(self):
+        histogram = Histogram("duration_seconds", "Duration")
+
+        with pytest.raises(ValueError):
+            with histogram.time(method="a"):
+                raise ValueError()
+
+        assert histogram.count(method="a") == 1
+
+
+class TestRegistry:
+    def test_render_concatenates_metrics(self):
+        registry = Registry()
+        registry.counter("a_total", "A").inc()
+        registry.histogram("b_seconds", "B", buckets=(1,))
+
+        assert (
+            registry.render()
+            == "# HELP a_total A\n# TYPE a_total counter\na_total 1\n# HELP b_seconds B\n# TYPE b_seconds histogram\n"
+        )
+
+
+class TestInstrumented:
+    def test_records_duration_and_ack_latency(self):
+        before = listener_duration.count(listener="test_sync")
+        acks = listener_ack_latency.count(listener="test_sync")
+        completes = slack_api_duration.count(method="functions.completeSuccess")
+        ack = MagicMock()
+        complete = MagicMock()
+
+        def callback(ack, complete):
+            complete(outputs={})
+            ack()
+            return "done"
+
+        result = instrumented("test_sync", callback)(ack=ack, complete=complete)
+
+        assert result == "done"
+        ack.assert_called_once()
+        complete.assert_called_once_with(outputs={})
+        assert listener_duration.count(listener="test_sync") == before + 1
+        assert listener_ack_latency.count(listener="test_sync") == acks + 1
+        assert slack_api_duration.count(method="functions.completeSuccess") == completes + 1
+
+    def test_records_duration_when_callback_raises(self):
+        before = listener_duration.count(listener="test_raises")
+
+        def callback(logger):
+            raise ValueError()
+
+        with pytest.raises(ValueError):
+            instrumented("test_raises", callback)(logger=MagicMock())
+
+        assert listener_duration.count(listener="test_raises") == before + 1
+
+    def test_preserves_signature_for_bolt(self):
+        def callback(ack, inputs, logger):
+            pass
+
+        assert inspect.getfullargspec(inspect.unwrap(instrumented("test", callback))).args == ["ack", "inputs", "logger"]
+
+    def test_async_callback(self):
+        before = listener_duration.count(listener="test_async")
+        acks = listener_ack_latency.count(listener="test_async")
+        ack = AsyncMock()
+        fail = AsyncMock()
+
+        async def callback(ack, fail):
+            await fail(error="boom")
+            await ack()
+
+        wrapper = instrumented("test_async", callback)
+        asyncio.run(wrapper(ack=ack, fail=fail))
+
+        assert asyncio.iscoroutinefunction(wrapper)
+        ack.assert_awaited_once()
+        fail.assert_awaited_once_with(error="boom")
+        assert listener_duration.count(listener="test_async") == before + 1
+        assert listener_ack_latency.count(listener="test_async") == acks + 1
+
+
+class TestSamplingProfiler:
+    def test_collects_collapsed_stacks(self):
+        stopped = threading.Event()
+
+        def busy_worker():
+            while not stopped.is_set():
+                time.sleep(0.001)
+
+        worker = threading.Thread(target=busy_worker)
+        worker.start()
+        profiler = SamplingProfiler(interval=0.001).start()
+        try:
+            deadline = time.monotonic() + 2
+            while "busy_worker" not in profiler.render() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            profiler.stop(timeout=1)
+            stopped.set()
+            worker.join()
+
+        line = next(line for line in profiler.render().splitlines() if "busy_worker" in line)
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1
+        assert stack.split(";")[0].startswith("_bootstrap")
+
+
+class TestMetricsServer:
+    def setup_method(self):
+        self.logger = MagicMock()
+        self.server = None
+
+    def teardown_method(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def test_disabled_without_port(self, monkeypatch):
+        monkeypatch.setattr(settings, "METRICS_PORT", None)
+
+        assert start_metrics_server(logger=self.logger) is None
+
+    def test_serves_metrics(self):
+        slack_api_duration.observe(0.01, method="test.method")
+        self.server = start_metrics_server(logger=self.logger, port=0)
+
+        with urlopen(self.url("/metrics")) as response:
+            body = response.read().decode("utf-8")
+
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert 'slack_api_request_seconds_count{method="test.method"}' in body
+        self.logger.info.assert_called_once()
+
+    def test_profile_not_found_without_profiler(self, monkeypatch):
+        monkeypatch.setattr(settings, "PROFILER_INTERVAL_SECONDS", 0)
+        self.server = start_metrics_server(logger=self.logger, port=0)
+
+        with pytest.raises(HTTPError) as e:
+            urlopen(self.url("/debug/profile"))
+
+        assert e.value.code == 404
+
+    def test_serves_profile(self):
+        profiler = SamplingProfiler()
+        profiler.samples["main;handler"] = 3
+        self.server = start_metrics_server(logger=self.logger, port=0, profiler=profiler)
+
+        with urlopen(self.url("/debug/profile")) as response:
+            assert response.read() == b"main;handler 3\n"
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+from listeners.metrics import micro_batch_size
+from listeners.micro_batch import AsyncMicroBatcher, MicroBatcher
+
+
+class Flushed:
+    """Collects the batches a batcher flushed so a test can wait for them."""
+
+    def __init__(self):
+        self.batches = []
+        self._condition = threading.Condition()
+
+    def __call__(self, items):
+        with self._condition:
+            self.batches.append(items)
+            self._condition.notify_all()
+
+    def wait(self, count: int):
+        with self._condition:
+            assert self._condition.wait_for(lambda: len(self.batches) >= count, timeout=2)
+        return self.batches
+
+
+class TestMicroBatcher:
+    def setup_method(self):
+        self.flushed = Flushed()
+
+    def test_flushes_after_window(self):
+        batcher = MicroBatcher(self.flushed, window=0.02, max_size=10, max_latency=1, name="test-window")
+
+        for item in range(3):
+            batcher.submit(item)
+
+        assert self.flushed.wait(1) == [[0, 1, 2]]
+        assert batcher.pending() == 0
+
+    def test_flushes_when_full(self):
+        batcher = MicroBatcher(self.flushed, window=10, max_size=2, max_latency=10, name="test-full")
+        before = micro_batch_size.count(batcher="test-full")
+
+        for item in range(4):
+            batcher.submit(item)
+
+        assert sorted(self.flushed.wait(2)) == [[0, 1], [2, 3]]
+        assert micro_batch_size.count(batcher="test-full") == before + 2
+
+    def test_max_latency_bounds_steady_stream(self):
+        batcher = MicroBatcher(self.flushed, window=0.05, max_size=1000, max_latency=0.1, name="test-latency")
+
+        started = time.monotonic()
+        while not self.flushed.batches and time.monotonic() - started < 1:
+            batcher.submit("item")
+            time.sleep(0.005)
+
+        assert self.flushed.wait(1)
+        assert time.monotonic() - started < 0.5
+
+    def test_close_flushes_pending_items(self):
+        batcher = MicroBatcher(self.flushed, window=10, max_size=2, max_latency=10, name="test-close")
+        for item in range(3):
+            batcher.submit(item)
+
+        assert batcher.close(timeout=2)
+        assert self.flushed.batches == [[0, 1], [2]]
+        assert batcher.pending() == 0
+
+    def test_close_waits_for_flushes(self):
+        release = threading.Event()
+        batcher = MicroBatcher(lambda items: release.wait(2), window=10, max_size=10, max_latency=10, name="test-close")
+        batcher.submit("item")
+
+        assert not batcher.close(timeout=0.05)
+        release.set()
+
+    def test_items_submitted_after_close_are_flushed_alone(self):
+        batcher = MicroBatcher(self.flushed, window=10, max_size=10, max_latency=10, name="test-close")
+        batcher.close(timeout=2)
+
+        batcher.submit("late")
+
+        assert self.flushed.batches == [["late"]]
+
+
+class TestAsyncMicroBatcher:
+    def run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_flushes_after_window(self):
+        async def main():
+            batches = []
+
+            async def flush(items):
+                batches.append(items)
+
+            batcher = AsyncMicroBatcher(flush, window=0.01, max_size=10, max_latency=1)
+            for item in range(3):
+                batcher.submit(item)
+            await asyncio.sleep(0.05)
+            return batches, batcher.pending()
+
+        assert self.run(main()) == ([[0, 1, 2]], 0)
+
+    def test_flushes_when_full(self):
+        async def main():
+            batches = []
+
+            async def flush(items):
+                batches.append(items)
+
+            batcher = AsyncMicroBatcher(flush, window=10, max_size=2, max_latency=10)
+            for item in range(4):
+                batcher.submit(item)
+            await asyncio.sleep(0)
+            return batches
+
+        assert self.run(main()) == [[0, 1], [2, 3]]
+
+    def test_max_latency_bounds_steady_stream(self):
+        async def main():
+            flushed = asyncio.Event()
+
+            async def flush(items):
+                flushed.set()
+
+            batcher = AsyncMicroBatcher(flush, window=0.05, max_size=1000, max_latency=0.1)
+            started = time.monotonic()
+            while not flushed.is_set() and time.monotonic() - started < 1:
+                batcher.submit("item")
+                await asyncio.sleep(0.005)
+            return time.monotonic() - started
+
+        assert self.run(main()) < 0.5
+
+    def test_close_flushes_pending_items(self):
+        async def main():
+            batches = []
+
+            async def flush(items):
+                await asyncio.sleep(0.01)
+                batches.append(items)
+
+            batcher = AsyncMicroBatcher(flush, window=10, max_size=10, max_latency=10)
+            for item in range(3):
+                batcher.submit(item)
+            await batcher.close()
+            return batches, batcher.pending()
+
+        assert self.run(main()) == ([[0, 1, 2]], 0)
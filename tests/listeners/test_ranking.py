@@ -0,0 +1,95 @@
+import pytest
+
+from listeners.ranking import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    matches_prefixes,
+    paginate,
+    rank,
+    score_sample,
+    term_pattern,
+    top_k,
+)
+
+
+class TestRanking:
+    def setup_method(self):
+        self.samples = [
+            {"title": "Java template", "description": "Bolt app", "external_ref": {"id": "java"}},
+            {"title": "Python sample", "description": "A Bolt for Python app", "external_ref": {"id": "python"}},
+            {"title": "Workflow", "description": "No match", "external_ref": {"id": "workflow"}},
+            {"title": "Python template", "description": "Search", "external_ref": {"id": "python-template"}},
+        ]
+
+    def ids(self, samples: list) -> list:
+        return [sample["external_ref"]["id"] for sample in samples]
+
+    def test_top_k(self):
+        assert top_k([5, 1, 4, 2, 3], 3, key=lambda item: item) == [1, 2, 3]
+
+    def test_score_sample_weights_fields(self):
+        terms = ("python",)
+        pattern = term_pattern(terms)
+
+        assert score_sample(self.samples[1], terms, pattern) == 3 + 2
+        assert score_sample(self.samples[3], terms, pattern) == 3
+        assert score_sample(self.samples[2], terms, pattern) == 0
+
+    def test_matches_prefixes(self):
+        def matching(terms):
+            return self.ids([sample for sample in self.samples if matches_prefixes(sample, terms)])
+
+        assert matching(("pyth",)) == ["python", "python-template"]
+        assert matching(("py", "te")) == ["python-template"]
+        # Terms must start a word, not just appear in one
+        assert not matches_prefixes(self.samples[1], ("ython",))
+        assert matches_prefixes({"title": "ＰＹＴＨＯＮ", "external_ref": {"id": "wide"}}, ("py",))
+        assert matches_prefixes(self.samples[2], ())
+
+    def test_term_pattern_matches_whole_tokens(self):
+        pattern = term_pattern({"bolt", "bolt_js"})
+
+        assert pattern.findall("bolt, bolt bolt_js boltz rebolt bolt2 bolt") == ["bolt", "bolt", "bolt_js", "bolt"]
+
+    def test_rank_keeps_upstream_order_for_ties(self):
+        assert self.ids(rank(self.samples, "python bolt", 10)) == ["python", "python-template", "java", "workflow"]
+        assert self.ids(rank(self.samples, "python", 1)) == ["python"]
+
+    def test_rank_without_query_keeps_upstream_order(self):
+        assert rank(self.samples, "", 2) == self.samples[:2]
+        assert rank(self.samples, None, 10) == self.samples
+
+    def test_paginate_walks_all_results(self):
+        pages = []
+        offset = 0
+        while offset is not None:
+            page, cursor = paginate(self.samples, "python", {"type": "sample"}, offset, page_size=3)
+            pages.append(self.ids(page))
+            offset = decode_cursor(cursor, "python", {"type": "sample"}) if cursor else None
+
+        assert pages == [["python", "python-template", "java"], ["workflow"]]
+
+    def test_paginate_ranked_samples(self):
+        page, cursor = paginate(self.samples, "python", None, 1, page_size=2, ranked=True)
+
+        assert page == self.samples[1:3]
+        assert decode_cursor(cursor, "python", None) == 3
+
+    def test_paginate_last_page_has_no_cursor(self):
+        assert paginate(self.samples, None, None, 2, page_size=2) == (self.samples[2:], None)
+
+    def test_cursor_of_another_search(self):
+        cursor = encode_cursor(10, "python", {"languages": ["python"]})
+
+        assert decode_cursor(cursor, "python", {"languages": ["python"]}) == 10
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, "java", {"languages": ["python"]})
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, "python", None)
+
+    def test_malformed_cursor(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor("not a cursor", "python", None)
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(-1, "python", None), "python", None)
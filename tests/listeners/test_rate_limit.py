@@ -0,0 +1,340 @@
+import asyncio
+import random
+from email.message import Message
+from urllib.error import HTTPError
+
+import pytest
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from benchmarks.fake_slack_api import FakeSlackAPI
+from listeners.rate_limit import (
+    CircuitBreaker,
+    RetryBudget,
+    TokenBucket,
+    UpstreamGuard,
+    UpstreamUnavailable,
+    backoff_delay,
+    retry_after,
+)
+from listeners.sample_data_service import SlackResponseError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float):
+        self.sleep(seconds)
+
+
+def ratelimited_error(retry_after: str = None) -> SlackApiError:
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    response = (429, headers, {"ok": False, "error": "ratelimited"})
+    with FakeSlackAPI({"developer.sampleData.get": lambda body: response}) as api:
+        try:
+            WebClient(token="xoxb-test", base_url=api.base_url).api_call("developer.sampleData.get")
+        except SlackApiError as e:
+            return e
+
+
+class TestRetryAfter:
+    def test_slack_api_error(self):
+        assert retry_after(ratelimited_error("3")) == 3.0
+        assert retry_after(ratelimited_error()) == 0.0
+
+    def test_http_error(self):
+        headers = Message()
+        headers["Retry-After"] = "7"
+
+        assert retry_after(HTTPError("https://slack.com/api/", 429, "Too Many Requests", headers, None)) == 7.0
+        assert retry_after(HTTPError("https://slack.com/api/", 503, "Service Unavailable", Message(), None)) == 0.0
+        assert retry_after(HTTPError("https://slack.com/api/", 404, "Not Found", Message(), None)) is None
+
+    def test_slack_response_error(self):
+        assert retry_after(SlackResponseError("failed", error="ratelimited")) == 0.0
+        assert retry_after(SlackResponseError("failed", error="invalid_auth")) is None
+
+    def test_connection_errors(self):
+        assert retry_after(ConnectionResetError()) == 0.0
+        assert retry_after(ValueError()) is None
+
+    def test_backoff_delay_is_bounded(self):
+        rng = random.Random(0)
+
+        assert all(0 <= backoff_delay(attempt, 0.1, 1.0, rng) <= min(1.0, 0.1 * 2**attempt) for attempt in range(10))
+
+
+class TestTokenBucket:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate=2, capacity=3, clock=self.clock)
+
+    def test_bursts_then_waits(self):
+        assert [self.bucket.reserve() for _ in range(3)] == [0, 0, 0]
+        assert self.bucket.reserve() == 0.5
+        assert self.bucket.reserve() == 1.0
+
+    def test_refills_over_time(self):
+        for _ in range(3):
+            self.bucket.reserve()
+        self.clock.now += 1
+
+        assert [self.bucket.reserve() for _ in range(3)] == [0, 0, 0.5]
+
+    def test_reserve_within_max_wait(self):
+        for _ in range(3):
+            self.bucket.reserve()
+
+        assert self.bucket.reserve(max_wait=0.4) is None
+        assert self.bucket.reserve(max_wait=0.5) == 0.5
+
+    def test_pause(self):
+        self.bucket.pause(10)
+
+        assert self.bucket.reserve() == 10
+        assert self.bucket.reserve() == 10.5
+        self.clock.now += 11
+        assert self.bucket.reserve() == 0
+
+
+class TestRetryBudget:
+    def test_withdraw_spends_reserve_then_ratio(self):
+        budget = RetryBudget(ratio=0.5, reserve=2)
+
+        assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+
+        budget.deposit()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert budget.withdraw()
+
+    def test_deposits_are_capped(self):
+        budget = RetryBudget(ratio=1, reserve=2)
+        for _ in range(10):
+            budget.deposit()
+
+        assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+
+
+class TestCircuitBreaker:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        assert self.breaker.allow()
+
+        self.breaker.record_failure()
+        assert self.breaker.state == "open"
+        assert not self.breaker.allow()
+
+    def test_lets_one_probe_through_after_reset_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 30
+
+        assert self.breaker.allow()
+        assert self.breaker.state == "half_open"
+        assert not self.breaker.allow()
+
+        self.breaker.record_success()
+        assert self.breaker.state == "closed"
+        assert self.breaker.allow()
+
+    def test_failed_probe_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 30
+        self.breaker.allow()
+
+        self.breaker.record_failure()
+
+        assert self.breaker.state == "open"
+        assert not self.breaker.allow()
+
+    def test_released_probe_lets_another_through(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 30
+        assert self.breaker.acquire() == "probe"
+
+        self.breaker.release()
+
+        assert self.breaker.acquire() == "probe"
+
+
+class TestUpstreamGuard:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.guard = UpstreamGuard(
+            rate=1,
+            burst=2,
+            failure_threshold=2,
+            reset_timeout=30,
+            budget=RetryBudget(ratio=0.2, reserve=10),
+            max_attempts=4,
+            base_delay=0.1,
+            max_delay=1,
+            clock=self.clock,
+            sleep=self.clock.sleep,
+            async_sleep=self.clock.async_sleep,
+            rng=random.Random(0),
+        )
+
+    def failing(self, *errors, response="ok"):
+        errors = list(errors)
+        calls = []
+
+        def request():
+            calls.append(self.clock.now)
+            if errors:
+                raise errors.pop(0)
+            return response
+
+        request.calls = calls
+        return request
+
+    def test_retries_until_success(self):
+        request = self.failing(SlackResponseError("failed", error="ratelimited"), ConnectionResetError())
+
+        assert self.guard.call("T1", request, deadline=5) == "ok"
+        assert len(request.calls) == 3
+
+    def test_honors_retry_after(self):
+        request = self.failing(ratelimited_error("2"))
+
+        assert self.guard.call("T1", request, deadline=5) == "ok"
+        assert request.calls[1] - request.calls[0] >= 2
+
+    def test_gives_up_when_retry_after_exceeds_deadline(self):
+        request = self.failing(ratelimited_error("30"))
+
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            self.guard.call("T1", request, deadline=5)
+
+        assert excinfo.value.reason == "deadline"
+        assert len(request.calls) == 1
+
+    def test_gives_up_after_max_attempts(self):
+        request = self.failing(*[ConnectionResetError()] * 4)
+
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            self.guard.call("T1", request, deadline=60)
+
+        assert excinfo.value.reason == "attempts"
+        assert len(request.calls) == 4
+
+    def test_gives_up_when_budget_is_spent(self):
+        self.guard.budget = RetryBudget(ratio=0.2, reserve=1)
+        request = self.failing(*[ConnectionResetError()] * 3)
+
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            self.guard.call("T1", request, deadline=60)
+
+        assert excinfo.value.reason == "budget"
+        assert len(request.calls) == 2
+
+    def test_raises_errors_not_worth_retrying(self):
+        request = self.failing(SlackResponseError("failed", error="invalid_auth"))
+
+        with pytest.raises(SlackResponseError):
+            self.guard.call("T1", request, deadline=5)
+
+        assert len(request.calls) == 1
+        assert self.guard.workspace("T1").breaker.state == "closed"
+
+    def test_opens_circuit_after_repeated_failures(self):
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailable):
+                self.guard.call("T1", self.failing(*[ConnectionResetError()] * 4), deadline=60)
+        request = self.failing()
+
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            self.guard.call("T1", request, deadline=5)
+
+        assert excinfo.value.reason == "circuit_open"
+        assert request.calls == []
+        assert self.guard.call("T2", request, deadline=5) == "ok"
+
+    def open_circuit(self, key: str):
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailable):
+                self.guard.call(key, self.failing(*[ConnectionResetError()] * 4), deadline=60)
+        self.clock.now += 30
+
+    def test_rate_limited_probe_releases_the_circuit(self):
+        self.open_circuit("T1")
+        self.guard.workspace("T1").bucket.pause(10)
+        request = self.failing()
+
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            self.guard.call("T1", request, deadline=5)
+
+        assert excinfo.value.reason == "rate_limited"
+        self.clock.now += 10
+        assert self.guard.call("T1", request, deadline=5) == "ok"
+        assert self.guard.workspace("T1").breaker.state == "closed"
+
+    def test_cancelled_probe_releases_the_circuit(self):
+        self.open_circuit("T1")
+
+        async def hang():
+            await asyncio.sleep(60)
+
+        async def cancel_probe():
+            task = asyncio.create_task(self.guard.call_async("T1", hang, deadline=5))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+
+        assert self.guard.workspace("T1").breaker.acquire() == "probe"
+
+    def test_rate_limits_each_workspace_separately(self):
+        busy = [self.guard.call("T1", self.failing(), deadline=0.5) for _ in range(2)]
+
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            self.guard.call("T1", self.failing(), deadline=0.5)
+
+        assert busy == ["ok"] * 2
+        assert excinfo.value.reason == "rate_limited"
+        assert self.guard.call("T2", self.failing(), deadline=0) == "ok"
+
+    def test_retry_after_only_pauses_its_workspace(self):
+        self.guard.call("T1", self.failing(ratelimited_error("3")), deadline=5)
+        started = self.clock.now
+
+        self.guard.call("T2", self.failing(), deadline=0)
+
+        assert self.clock.now == started
+
+    def test_forgets_least_recently_used_workspaces(self):
+        self.guard.max_workspaces = 2
+        for key in ["T1", "T2", "T1", "T3"]:
+            self.guard.workspace(key)
+
+        assert list(self.guard._workspaces) == ["T1", "T3"]
+
+    def test_call_async(self):
+        attempts = []
+
+        async def request():
+            attempts.append(self.clock.now)
+            if len(attempts) == 1:
+                raise ratelimited_error("2")
+            return "ok"
+
+        assert asyncio.run(self.guard.call_async("T1", request, deadline=5)) == "ok"
+        assert attempts[1] - attempts[0] >= 2
@@ -0,0 +1,120 @@
+import json
+from unittest.mock import MagicMock
+
+from slack_bolt import App, BoltRequest
+from slack_sdk import WebClient
+
+from benchmarks.fake_slack_api import FakeSlackAPI
+from listeners import register_listeners, settings
+from listeners.recorder import PayloadRecorder, anonymize, pseudonym, query_pseudonym
+
+
+def function_executed_body(callback_id: str = "search") -> dict:
+    return {
+        "team_id": "T111",
+        "api_app_id": "A111",
+        "type": "event_callback",
+        "event_id": "Ev111",
+        "authorizations": [{"team_id": "T111", "user_id": "U111", "is_bot": True}],
+        "event": {
+            "type": "function_executed",
+            "function": {"callback_id": callback_id},
+            "inputs": {"query": "bolt python", "user_context": {"id": "U222", "secret": "c2VjcmV0"}},
+            "function_execution_id": "Fx111",
+            "bot_access_token": "xwfp-secret",
+        },
+    }
+
+
+class TestAnonymize:
+    def test_replaces_ids_and_redacts_secrets(self):
+        body = anonymize(function_executed_body(), salt="salt")
+
+        assert body["team_id"] == body["authorizations"][0]["team_id"] == pseudonym("T111", "salt")
+        assert body["team_id"].startswith("T") and body["team_id"] != "T111"
+        assert body["api_app_id"] == pseudonym("A111", "salt")
+        assert body["authorizations"][0]["user_id"] == pseudonym("U111", "salt")
+        assert body["event"]["inputs"]["user_context"] == {"id": pseudonym("U222", "salt"), "secret": "redacted"}
+        assert body["event"]["bot_access_token"] == "redacted"
+
+    def test_keeps_what_decides_the_cost_of_a_request(self):
+        body = anonymize(function_executed_body(), salt="salt")
+
+        assert body["event"]["function"] == {"callback_id": "search"}
+        assert body["event"]["function_execution_id"] == "Fx111"
+
+    def test_replaces_each_query_word(self):
+        query = anonymize(function_executed_body(), salt="salt")["event"]["inputs"]["query"]
+
+        assert query == query_pseudonym("bolt python", "salt")
+        assert len(query.split()) == 2 and "bolt" not in query and "python" not in query
+        assert query_pseudonym("Python  bolt", "salt") == " ".join(reversed(query.split()))
+
+    def test_keeps_only_the_host_of_links(self):
+        event = {
+            "type": "entity_details_requested",
+            "external_ref": {"id": "sample1"},
+            "entity_url": "https://example.com/sample1?secret=1",
+            "link": {"url": "https://example.com/sample1?secret=1", "domain": "example.com"},
+        }
+
+        body = anonymize({"event": event}, salt="salt")
+
+        assert body["event"]["external_ref"] == {"id": "sample1"}
+        assert body["event"]["link"]["domain"] == "example.com"
+        for url in (body["event"]["entity_url"], body["event"]["link"]["url"]):
+            assert url.startswith("https://example.com/") and "sample1" not in url and "secret" not in url
+
+    def test_pseudonyms_depend_on_the_salt(self):
+        assert pseudonym("U222", "salt") == pseudonym("U222", "salt")
+        assert pseudonym("U222", "salt") != pseudonym("U222", "other")
+        assert pseudonym("U222", "salt") != pseudonym("U333", "salt")
+
+    def test_does_not_change_the_body(self):
+        body = function_executed_body()
+
+        anonymize(body, salt="salt")
+
+        assert body == function_executed_body()
+
+
+class TestPayloadRecorder:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+
+    def test_records_anonymized_events(self, tmp_path):
+        path = tmp_path / "payloads.jsonl"
+        recorder = PayloadRecorder(str(path), salt="salt")
+
+        assert recorder.record(function_executed_body()) is True
+        assert recorder.record({"type": "event_callback", "event": {"type": "message"}}) is False
+        assert recorder.record({"type": "block_actions"}) is False
+
+        lines = path.read_text().splitlines()
+        assert [json.loads(line) for line in lines] == [anonymize(function_executed_body(), salt="salt")]
+        assert recorder.recorded == 1
+
+    def test_middleware_continues_when_recording_fails(self, tmp_path):
+        recorder = PayloadRecorder(str(tmp_path / "missing" / "payloads.jsonl"))
+        next = MagicMock(return_value="response")
+
+        assert recorder.middleware(logger=self.mock_logger, body=function_executed_body(), next=next) == "response"
+        self.mock_logger.warning.assert_called_once()
+
+    def test_registered_with_listeners(self, monkeypatch, tmp_path):
+        path = tmp_path / "payloads.jsonl"
+        monkeypatch.setattr(settings, "RECORD_PAYLOADS_PATH", str(path))
+        monkeypatch.setattr(settings, "RECORD_PAYLOADS_SALT", "salt")
+        auth_test = {"ok": True, "team_id": "T111", "user_id": "U111", "bot_id": "B111"}
+
+        with FakeSlackAPI({"auth.test": lambda body: auth_test}) as api:
+            app = App(
+                client=WebClient(token="xoxb-test", base_url=api.base_url),
+                token_verification_enabled=False,
+                request_verification_enabled=False,
+            )
+            register_listeners(app)
+            # No listener handles this function, so the request goes no further than the middleware
+            app.dispatch(BoltRequest(body=function_executed_body("unknown"), mode="socket_mode"))
+
+        assert json.loads(path.read_text()) == anonymize(function_executed_body("unknown"), salt="salt")
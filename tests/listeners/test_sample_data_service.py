@@ -1,10 +1,81 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock
 
 import pytest
 from slack_sdk import WebClient
 
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.fake_slack_api import FakeSlackAPI
+from listeners import sample_data_service, settings
+from listeners.cache import TTLCache
+from listeners.cache_backend import RedisCacheBackend
+from listeners.corpus import Corpus
 from listeners.filters import LANGUAGES_FILTER, SAMPLES_FILTER, TEMPLATES_FILTER
-from listeners.sample_data_service import API_METHOD, SlackResponseError, fetch_sample_data
+from listeners.http_pool import PooledWebClient
+from listeners.metrics import corpus_refreshes, corpus_sync_changes, prefix_results
+from listeners.ranking import matches_prefixes
+from listeners.rate_limit import RetryBudget, UpstreamGuard
+from listeners.sample_data_service import (
+    API_METHOD,
+    CORPUS_FACETS,
+    SharedSampleData,
+    SlackResponseError,
+    build_params,
+    cache_key,
+    corpus,
+    fetch_cached_sample_data,
+    fetch_sample,
+    fetch_sample_data,
+    fetch_samples,
+    fetch_updated_samples,
+    filters_outputs,
+    find_stored_sample,
+    initial_refresh_delay,
+    join_shared_sample_data,
+    refresh_corpus,
+    response_cache,
+    restore_corpus,
+    sample_store,
+    share_sample_data,
+    start_corpus_refresher,
+    use_shared_cache,
+)
+from listeners.search_index import tokenize
+from listeners.shared_cache import CacheClient, CacheServer
+from tests.listeners.test_rate_limit import FakeClock
+
+
+def local_api_call(api_method, params):
+    samples = {
+        "sample1": {"title": "Python sample", "description": "Description 1", "external_ref": {"id": "sample1"}},
+        "sample2": {"title": "Java template", "description": "Description 2", "external_ref": {"id": "sample2"}},
+    }
+    filters = params.get("filters", {})
+    if filters.get(LANGUAGES_FILTER["name"]) == ["python"]:
+        ids = ["sample1"]
+    elif filters.get(LANGUAGES_FILTER["name"]) == ["java"] or filters.get("type") == TEMPLATES_FILTER["name"]:
+        ids = ["sample2"]
+    elif filters:
+        ids = []
+    else:
+        ids = list(samples)
+    return {"ok": True, "samples": [samples[sample_id] for sample_id in ids]}
+
+
+def fake_upstream(clock: FakeClock) -> UpstreamGuard:
+    return UpstreamGuard(
+        rate=10,
+        burst=10,
+        failure_threshold=2,
+        reset_timeout=30,
+        budget=RetryBudget(ratio=0.2, reserve=10),
+        clock=clock,
+        sleep=clock.sleep,
+        async_sleep=clock.async_sleep,
+    )
 
 
 class TestSampleDataService:
@@ -114,3 +185,901 @@ class TestSampleDataService:
 
         # Verify exception message
         assert f"Failed to fetch sample data from Slack API: ok=false for method={API_METHOD}" in str(excinfo.value)
+
+    def test_fetch_sample_data_populates_sample_store(self):
+        fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger)
+
+        assert sample_store.get("sample2") == self.mock_response["samples"][1]
+
+    def test_fetch_sample_from_store(self):
+        sample_store.add_all(self.mock_response["samples"])
+
+        result = fetch_sample(client=self.mock_client, sample_id="sample1", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_not_called()
+        assert result == self.mock_response["samples"][0]
+
+    def test_fetch_sample_not_in_store(self):
+        result = fetch_sample(client=self.mock_client, sample_id="sample2", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_called_once_with(API_METHOD, params={"query": None})
+        assert result == self.mock_response["samples"][1]
+
+    def test_fetch_samples_with_one_request(self):
+        sample_store.add_all(self.mock_response["samples"][:1])
+
+        result = fetch_samples(
+            client=self.mock_client, sample_ids=["sample1", "sample2", "nonexistent"], logger=self.mock_logger
+        )
+
+        self.mock_client.api_call.assert_called_once_with(API_METHOD, params={"query": None})
+        assert result == {"sample1": self.mock_response["samples"][0], "sample2": self.mock_response["samples"][1]}
+
+    def test_fetch_sample_unknown_id(self):
+        result = fetch_sample(client=self.mock_client, sample_id="nonexistent", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_called_once()
+        assert result is None
+
+    def test_fetch_sample_data_cached(self):
+        first = fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger)
+        second = fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_called_once()
+        assert first is second
+        assert response_cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_fetch_sample_data_cached_with_equivalent_filters(self):
+        fetch_sample_data(
+            client=self.mock_client,
+            query="test query",
+            filters={LANGUAGES_FILTER["name"]: ["python", "java"], TEMPLATES_FILTER["name"]: True},
+            logger=self.mock_logger,
+        )
+        fetch_sample_data(
+            client=self.mock_client,
+            query="test query",
+            filters={TEMPLATES_FILTER["name"]: True, LANGUAGES_FILTER["name"]: ["java", "python"]},
+            logger=self.mock_logger,
+        )
+
+        self.mock_client.api_call.assert_called_once()
+
+    def test_fetch_sample_data_error_not_cached(self):
+        self.mock_client.api_call.return_value = {"ok": False, "error": "ratelimited"}
+
+        with pytest.raises(SlackResponseError):
+            fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger)
+
+        self.mock_client.api_call.return_value = self.mock_response
+        result = fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger)
+
+        assert self.mock_client.api_call.call_count == 2
+        assert result == self.mock_response
+
+    def test_cache_key_ignores_empty_languages(self):
+        with_empty_languages = build_params(query="test query", filters={LANGUAGES_FILTER["name"]: []})
+        without_filters = build_params(query="test query")
+
+        assert cache_key(with_empty_languages) == cache_key(without_filters)
+
+    def test_fetch_sample_data_concurrent_calls_share_request(self):
+        release = threading.Event()
+
+        def slow_api_call(*args, **kwargs):
+            release.wait(timeout=5)
+            return self.mock_response
+
+        self.mock_client.api_call.side_effect = slow_api_call
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(fetch_sample_data, client=self.mock_client, query="test query", logger=self.mock_logger)
+                for _ in range(8)
+            ]
+            time.sleep(0.05)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.mock_client.api_call.assert_called_once()
+        assert all(result == self.mock_response for result in results)
+
+    def test_fetch_sample_data_late_joiner_reads_leaders_response(self, monkeypatch):
+        release = threading.Event()
+
+        def slow_api_call(*args, **kwargs):
+            release.wait(timeout=5)
+            return self.mock_response
+
+        self.mock_client.api_call.side_effect = slow_api_call
+        leader = threading.Thread(
+            target=fetch_sample_data, kwargs={"client": self.mock_client, "query": "test query", "logger": self.mock_logger}
+        )
+
+        def leader_finishes(params):
+            # The late joiner has missed the cache, and the leader's flight ends before it joins one
+            release.set()
+            leader.join(5)
+
+        leader.start()
+        time.sleep(0.05)
+        monkeypatch.setattr(sample_data_service, "prefix_response", leader_finishes)
+        result = fetch_sample_data(client=self.mock_client, query="test query", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_called_once()
+        assert result == self.mock_response
+
+    def test_fetch_sample_data_local_mode(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        result = fetch_sample_data(client=self.mock_client, query="python", logger=self.mock_logger)
+
+        assert [sample["external_ref"]["id"] for sample in result["samples"]] == ["sample1"]
+        assert self.mock_client.api_call.call_count == 1 + len(CORPUS_FACETS)
+
+    def test_fetch_sample_data_local_mode_with_filters(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+        self.mock_client.api_call.reset_mock()
+
+        result = fetch_sample_data(
+            client=self.mock_client, filters={TEMPLATES_FILTER["name"]: True}, logger=self.mock_logger
+        )
+
+        self.mock_client.api_call.assert_not_called()
+        assert [sample["external_ref"]["id"] for sample in result["samples"]] == ["sample2"]
+
+    def test_fetch_sample_local_mode(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        result = fetch_sample(client=self.mock_client, sample_id="sample2", logger=self.mock_logger)
+
+        assert result["title"] == "Java template"
+
+    def test_fetch_sample_data_local_mode_expands_query(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        self.mock_client.api_call.side_effect = local_api_call
+
+        completed = fetch_sample_data(client=self.mock_client, query="pyth", logger=self.mock_logger)
+        corrected = fetch_sample_data(client=self.mock_client, query="jvaa tempalte", logger=self.mock_logger)
+
+        assert [sample["external_ref"]["id"] for sample in completed["samples"]] == ["sample1"]
+        assert [sample["external_ref"]["id"] for sample in corrected["samples"]] == ["sample2"]
+
+    def test_fetch_sample_data_local_mode_without_fuzzy_search(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        result = fetch_sample_data(client=self.mock_client, query="pyth", logger=self.mock_logger)
+
+        assert result["samples"] == []
+
+    def test_fetch_sample_data_answers_expanded_query_from_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        corpus.load(samples=self.mock_response["samples"], facets={})
+
+        result = fetch_sample_data(client=self.mock_client, query="descripton 2", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_not_called()
+        assert result == {"ok": True, "samples": self.mock_response["samples"][::-1], "ranked": True}
+
+    def test_fetch_sample_data_forwards_known_terms(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        corpus.load(samples=self.mock_response["samples"], facets={})
+        self.mock_client.api_call.return_value = self.mock_response
+
+        fetch_sample_data(client=self.mock_client, query="content", logger=self.mock_logger)
+        fetch_sample_data(client=self.mock_client, query="unknownterm", logger=self.mock_logger)
+
+        assert self.mock_client.api_call.call_count == 2
+
+    def test_fetch_sample_data_forwards_expanded_query_with_stale_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        corpus.load(samples=self.mock_response["samples"], facets={})
+        corpus.loaded_at -= corpus.max_age
+        self.mock_client.api_call.return_value = self.mock_response
+
+        result = fetch_sample_data(client=self.mock_client, query="descripton", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_called_once()
+        assert result == self.mock_response
+
+    def test_fetch_sample_data_local_mode_serves_stale_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        corpus.load(samples=self.mock_response["samples"], facets={})
+        corpus.loaded_at -= corpus.max_age
+        self.mock_client.api_call.return_value = {"ok": False, "error": "ratelimited"}
+
+        result = fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+        sample_data_service.revalidation.join(5)
+
+        assert result["samples"] == self.mock_response["samples"]
+        self.mock_logger.warning.assert_called_once()
+
+    def test_stale_corpus_is_refreshed_in_the_background(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        corpus.load(samples=self.mock_response["samples"], facets={})
+        corpus.loaded_at -= corpus.max_age
+        release = threading.Event()
+
+        def api_call(api_method, params):
+            release.wait(5)
+            return local_api_call(api_method, params)
+
+        self.mock_client.api_call.side_effect = api_call
+
+        first = fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+        second = fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+        revalidation = sample_data_service.revalidation
+        release.set()
+        revalidation.join(5)
+
+        assert first["samples"] == second["samples"] == self.mock_response["samples"]
+        assert self.mock_client.api_call.call_count == 1 + len(CORPUS_FACETS)
+        assert not corpus.is_stale()
+        assert corpus.index.get("sample1")["title"] == "Python sample"
+
+    def test_fetch_sample_data_local_mode_without_corpus_raises(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.return_value = {"ok": False, "error": "ratelimited"}
+
+        with pytest.raises(SlackResponseError):
+            fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+
+    def test_start_corpus_refresher_prefetches_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        self.mock_client.api_call.side_effect = local_api_call
+
+        refresher = start_corpus_refresher(client=self.mock_client, logger=self.mock_logger)
+        refresher.stop(timeout=5)
+
+        assert corpus.index.get("sample1")["title"] == "Python sample"
+        assert sample_store.get("sample2")["title"] == "Java template"
+
+    def test_corpus_is_not_refreshed_when_unused(self):
+        assert start_corpus_refresher(client=self.mock_client, logger=self.mock_logger) is None
+        self.mock_client.api_call.assert_not_called()
+
+    def test_refresh_saves_and_restores_snapshot(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", str(tmp_path / "corpus.snapshot"))
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+        corpus.clear()
+        sample_store.clear()
+
+        assert restore_corpus(logger=self.mock_logger)
+        assert find_stored_sample("sample1")["title"] == "Python sample"
+        assert len(sample_store) == 0
+        assert initial_refresh_delay() > 0
+
+        self.mock_client.api_call.reset_mock()
+        result = fetch_sample_data(client=self.mock_client, query="java", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_not_called()
+        assert [sample["external_ref"]["id"] for sample in result["samples"]] == ["sample2"]
+
+    def test_local_mode_refresh_skips_response_caches(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        self.mock_client.api_call.side_effect = local_api_call
+
+        fetch_sample_data(client=self.mock_client, logger=self.mock_logger)
+
+        assert len(corpus.index) == 2
+        assert len(sample_store) == 0
+        assert len(response_cache) == 0
+
+    def test_fetch_sample_from_fresh_corpus(self, monkeypatch):
+        monkeypatch.setattr(settings, "FUZZY_SEARCH", True)
+        self.mock_client.api_call.side_effect = local_api_call
+        start_corpus_refresher(client=self.mock_client, logger=self.mock_logger).stop(timeout=5)
+        sample_store.clear()
+        self.mock_client.api_call.reset_mock()
+
+        sample = fetch_sample(client=self.mock_client, sample_id="sample2", logger=self.mock_logger)
+
+        assert sample["title"] == "Java template"
+        self.mock_client.api_call.assert_not_called()
+
+    def test_refresh_prepares_dynamic_filters(self, monkeypatch):
+        monkeypatch.setattr(settings, "DYNAMIC_FILTERS", True)
+        self.mock_client.api_call.side_effect = local_api_call
+
+        start_corpus_refresher(client=self.mock_client, logger=self.mock_logger).stop(timeout=5)
+
+        assert corpus.index._filters_outputs is not None
+        assert filters_outputs()["filters"][0]["options"] == [
+            {"name": "Python (1)", "value": "python"},
+            {"name": "Java (1)", "value": "java"},
+        ]
+
+    def test_restore_corpus_without_snapshot(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", str(tmp_path / "missing.snapshot"))
+
+        assert not restore_corpus(logger=self.mock_logger)
+        assert initial_refresh_delay() == 0
+        self.mock_logger.info.assert_called_once()
+
+    def test_restore_corpus_disabled(self):
+        assert not restore_corpus(logger=self.mock_logger)
+
+
+class DatedAPI:
+    """Answers `developer.sampleData.get` from `samples`, honoring `updated_since` unless told to ignore it."""
+
+    def __init__(self, samples: list, ignore_updated_since: bool = False):
+        self.samples = samples
+        self.ignore_updated_since = ignore_updated_since
+        self.calls = []
+
+    def __call__(self, api_method, params):
+        self.calls.append(params)
+        since = params.get("updated_since")
+        languages = params.get("filters", {}).get(LANGUAGES_FILTER["name"])
+        sample_type = params.get("filters", {}).get("type")
+        return {
+            "ok": True,
+            "samples": [
+                sample
+                for sample in self.samples
+                if (not since or self.ignore_updated_since or sample["date_updated"] >= since)
+                and (not languages or sample.get("language") in languages)
+                and (not sample_type or sample.get("type") == sample_type)
+            ],
+        }
+
+
+class TestDeltaSync:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=WebClient)
+        self.mock_logger = MagicMock()
+        self.samples = [
+            {
+                "title": "Python sample",
+                "date_updated": "2025-01-01",
+                "external_ref": {"id": "sample1"},
+                "language": "python",
+                "type": SAMPLES_FILTER["name"],
+            },
+            {
+                "title": "Java template",
+                "date_updated": "2025-01-02",
+                "external_ref": {"id": "sample2"},
+                "language": "java",
+                "type": TEMPLATES_FILTER["name"],
+            },
+        ]
+        self.api = DatedAPI(self.samples)
+        self.mock_client.api_call.side_effect = self.api
+
+    @pytest.fixture(autouse=True)
+    def delta_sync(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_MODE", "local")
+        monkeypatch.setattr(settings, "DELTA_SYNC", True)
+
+    def ids(self, samples):
+        return [sample["external_ref"]["id"] for sample in samples]
+
+    def test_syncs_changes_since_watermark(self):
+        refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+        self.api.calls.clear()
+        before = corpus_refreshes.value(kind="delta"), corpus_sync_changes.value()
+        self.samples[0] = {
+            **self.samples[0],
+            "title": "Python template",
+            "date_updated": "2025-02-01",
+            "type": TEMPLATES_FILTER["name"],
+        }
+        self.samples[1] = {**self.samples[1], "date_updated": "2025-02-01", "deleted": True}
+        self.samples.append(
+            {"title": "Python app", "date_updated": "2025-01-02", "external_ref": {"id": "sample3"}, "language": "python"}
+        )
+
+        index = refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+
+        assert all(params["updated_since"] == "2025-01-02" for params in self.api.calls)
+        assert len(self.api.calls) == 1 + len(CORPUS_FACETS)
+        assert index is corpus.index
+        assert index.get("sample2") is None
+        assert self.ids(index.search("python")) == ["sample1", "sample3"]
+        assert self.ids(index.search(None, {"type": TEMPLATES_FILTER["name"]})) == ["sample1"]
+        assert index.watermark.isoformat() == "2025-02-01"
+        assert corpus_refreshes.value(kind="delta") == before[0] + 1
+        assert corpus_sync_changes.value() == before[1] + 3
+
+    def test_refetches_in_full_when_updated_since_is_ignored(self):
+        self.api.ignore_updated_since = True
+        index = refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+        self.samples.append({"title": "Rust sample", "date_updated": "2025-03-01", "external_ref": {"id": "sample3"}})
+
+        refreshed = refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+        self.api.calls.clear()
+        refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+
+        assert refreshed is not index
+        assert self.ids(refreshed.search("rust", {})) == ["sample3"]
+        self.mock_logger.warning.assert_called_once()
+        assert not any("updated_since" in params for params in self.api.calls)
+
+    def test_keeps_syncing_samples_of_the_watermark_day(self):
+        index = refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+        rows = len(index.samples)
+
+        assert refresh_corpus(client=self.mock_client, logger=self.mock_logger) is index
+        assert len(index.samples) == rows
+        self.mock_logger.warning.assert_not_called()
+
+    def test_refetches_in_full_once_due(self, monkeypatch):
+        monkeypatch.setattr(settings, "FULL_SYNC_SECONDS", 60)
+        index = refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+        corpus.reconciled_at -= 60
+        self.api.calls.clear()
+
+        assert refresh_corpus(client=self.mock_client, logger=self.mock_logger) is not index
+        assert not any("updated_since" in params for params in self.api.calls)
+        assert corpus.reconciled_age() < 60
+
+    def test_refetches_in_full_without_dates(self):
+        for sample in self.samples:
+            del sample["date_updated"]
+        index = refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+
+        assert index.watermark is None
+        assert refresh_corpus(client=self.mock_client, logger=self.mock_logger) is not index
+
+    def test_stale_corpus_syncs_after_search(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", str(tmp_path / "corpus.snapshot"))
+        refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+        corpus.loaded_at -= corpus.max_age
+        self.samples.append({"title": "Rust sample", "date_updated": "2025-03-01", "external_ref": {"id": "sample3"}})
+
+        fetch_sample_data(client=self.mock_client, query="rust", logger=self.mock_logger)
+        sample_data_service.revalidation.join(5)
+        result = fetch_sample_data(client=self.mock_client, query="rust", logger=self.mock_logger)
+        corpus.clear()
+
+        assert self.ids(result["samples"]) == ["sample3"]
+        assert restore_corpus(logger=self.mock_logger)
+        assert self.ids(corpus.index.search("rust")) == ["sample3"]
+
+
+class TestSharedSampleData:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=WebClient)
+        self.mock_logger = MagicMock()
+
+    @staticmethod
+    def save_corpus(path: str, sample_ids: list):
+        snapshot = Corpus(max_age=settings.CORPUS_MAX_AGE_SECONDS)
+        snapshot.load([{"title": f"Sample {i}", "external_ref": {"id": i}} for i in sample_ids], {})
+        snapshot.save(path)
+
+    def test_share_serves_response_cache(self, monkeypatch):
+        refresher = MagicMock()
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", None)
+        monkeypatch.setattr(sample_data_service, "start_corpus_refresher", refresher)
+        response_cache.set("key", {"ok": True})
+
+        shared = share_sample_data(client=self.mock_client, logger=self.mock_logger)
+
+        assert settings.CORPUS_SNAPSHOT_PATH == shared.snapshot_path
+        refresher.assert_called_once_with(client=self.mock_client, logger=self.mock_logger)
+        client = CacheClient(shared.cache_address, shared.cache_authkey, logger=self.mock_logger)
+        assert client.entry("key")[1] == {"ok": True}
+
+    def test_join_shares_cache_and_follows_snapshot(self, monkeypatch, tmp_path):
+        path = str(tmp_path / "corpus.snapshot")
+        self.save_corpus(path, ["sample1"])
+        supervisor_cache = TTLCache()
+        supervisor_cache.set("key", {"ok": True})
+        server = CacheServer(supervisor_cache).start()
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", None)
+        monkeypatch.setattr(settings, "WORKER_SNAPSHOT_POLL_SECONDS", 0.01)
+        monkeypatch.setattr(settings, "DYNAMIC_FILTERS", True)
+        monkeypatch.setattr(response_cache, "backend", None)
+
+        watcher = join_shared_sample_data(SharedSampleData(path, server.address, server.authkey), self.mock_logger)
+        try:
+            assert corpus.index.get("sample1") is not None
+            assert response_cache.get("key") == {"ok": True}
+            response_cache.set("other", {"ok": False})
+            assert supervisor_cache.get("other") == {"ok": False}
+
+            self.save_corpus(path, ["sample1", "sample2"])
+            deadline = time.monotonic() + 5
+            while corpus.index.get("sample2") is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert corpus.index.get("sample2") is not None
+        finally:
+            watcher.stop(timeout=5)
+
+
+class TestSharedCache:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=WebClient)
+        self.mock_client.api_call.side_effect = local_api_call
+        self.mock_logger = MagicMock()
+        self.server = FakeRedis().start()
+
+    def teardown_method(self):
+        if isinstance(response_cache.backend, RedisCacheBackend):
+            response_cache.backend.close()
+        self.server.stop()
+
+    def test_without_url(self, monkeypatch):
+        monkeypatch.setattr(settings, "SHARED_CACHE_URL", None)
+        monkeypatch.setattr(response_cache, "backend", None)
+
+        assert use_shared_cache(logger=self.mock_logger) is False
+        assert response_cache.backend is None
+
+    def test_responses_are_shared_between_nodes(self, monkeypatch):
+        monkeypatch.setattr(settings, "SHARED_CACHE_URL", self.server.url)
+        monkeypatch.setattr(response_cache, "backend", None)
+
+        assert use_shared_cache(logger=self.mock_logger) is True
+        fetch_sample_data(client=self.mock_client, query="python", logger=self.mock_logger)
+        assert len(self.server.data) == 1
+
+        # Another node has the response in the shared cache but not in its own
+        response_cache.clear()
+        response = fetch_sample_data(client=self.mock_client, query="python", logger=self.mock_logger)
+
+        assert [sample["external_ref"]["id"] for sample in response["samples"]] == ["sample1", "sample2"]
+        assert self.mock_client.api_call.call_count == 1
+
+    def test_slack_responses_are_shared(self, monkeypatch):
+        monkeypatch.setattr(settings, "SHARED_CACHE_URL", self.server.url)
+        monkeypatch.setattr(response_cache, "backend", None)
+        use_shared_cache(logger=self.mock_logger)
+
+        with FakeSlackAPI({API_METHOD: lambda body: local_api_call(API_METHOD, body)}) as api:
+            client = WebClient(base_url=api.base_url)
+            fetch_sample_data(client=client, query="python", logger=self.mock_logger)
+            response_cache.clear()
+            response = fetch_sample_data(client=client, query="python", logger=self.mock_logger)
+
+        assert [sample["external_ref"]["id"] for sample in response["samples"]] == ["sample1", "sample2"]
+        assert len(api.requests) == 1
+        self.mock_logger.warning.assert_not_called()
+
+    def test_refresh_prefetches_corpus_responses(self, monkeypatch):
+        monkeypatch.setattr(settings, "SHARED_CACHE_URL", self.server.url)
+        monkeypatch.setattr(response_cache, "backend", None)
+        use_shared_cache(logger=self.mock_logger)
+        keys = [cache_key(build_params()), *(cache_key(build_params(filters=filters)) for _, filters in CORPUS_FACETS)]
+        for key in keys:
+            response_cache.backend.set(key, local_api_call(API_METHOD, {}))
+        self.server.batches.clear()
+
+        refresh_corpus(client=self.mock_client, logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_not_called()
+        assert self.server.batches == [2 * len(keys)]
+        assert corpus.index.get("sample1") is not None
+
+    def test_share_and_join_use_shared_cache(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "SHARED_CACHE_URL", self.server.url)
+        monkeypatch.setattr(settings, "CORPUS_SNAPSHOT_PATH", str(tmp_path / "corpus.snapshot"))
+        monkeypatch.setattr(sample_data_service, "start_corpus_refresher", MagicMock())
+        monkeypatch.setattr(response_cache, "backend", None)
+
+        shared = share_sample_data(client=self.mock_client, logger=self.mock_logger)
+        assert shared.cache_address is None
+        response_cache.set("key", {"ok": True})
+        response_cache.backend.close()
+        response_cache.backend = None
+        response_cache.clear()
+
+        assert join_shared_sample_data(shared, self.mock_logger) is None
+        assert isinstance(response_cache.backend, RedisCacheBackend)
+        assert response_cache.get("key") == {"ok": True}
+        assert corpus.index is None
+
+
+class PrefixAPI:
+    """Matches each query term against the start of a word, as searches typed one character at a time are."""
+
+    samples = [
+        {"title": "Bolt for Python", "language": "python", "external_ref": {"id": "bolt-python"}},
+        {"title": "Python template", "language": "python", "external_ref": {"id": "python-template"}},
+        {"title": "Pytest helpers", "language": "python", "external_ref": {"id": "pytest"}},
+        {"title": "Bolt for JavaScript", "language": "javascript", "external_ref": {"id": "bolt-js"}},
+    ]
+
+    def __call__(self, api_method, params):
+        terms = tuple(tokenize(params.get("query")))
+        languages = params.get("filters", {}).get(LANGUAGES_FILTER["name"])
+        return {
+            "ok": True,
+            "samples": [
+                sample
+                for sample in self.samples
+                if matches_prefixes(sample, terms) and (not languages or sample["language"] in languages)
+            ],
+        }
+
+
+class TestPrefixResults:
+    def setup_method(self):
+        self.mock_client = MagicMock(spec=WebClient)
+        self.mock_client.api_call.side_effect = PrefixAPI()
+        self.mock_logger = MagicMock()
+
+    def search(self, query: str, filters: dict = None) -> list:
+        response = fetch_sample_data(client=self.mock_client, query=query, filters=filters, logger=self.mock_logger)
+        return [sample["external_ref"]["id"] for sample in response["samples"]]
+
+    def test_normalizes_queries(self):
+        fetch_sample_data(client=self.mock_client, query="  Ｂｏｌｔ\tPYTHON ", logger=self.mock_logger)
+        fetch_sample_data(client=self.mock_client, query="bolt python", logger=self.mock_logger)
+
+        self.mock_client.api_call.assert_called_once_with(API_METHOD, params={"query": "bolt python"})
+
+    def test_typed_query_is_answered_from_its_prefixes(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+        expansions = prefix_results.value()
+
+        assert self.search("p") == ["bolt-python", "python-template", "pytest"]
+        assert self.search("py") == ["bolt-python", "python-template", "pytest"]
+        assert self.search("pyth") == ["bolt-python", "python-template"]
+        assert self.search("python t") == ["python-template"]
+
+        self.mock_client.api_call.assert_called_once_with(API_METHOD, params={"query": "p"})
+        assert prefix_results.value() == expansions + 3
+
+    def test_derived_results_expire_with_their_prefix(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+        clock = FakeClock()
+        monkeypatch.setattr(response_cache, "_clock", clock)
+        self.search("py")
+        clock.now = 20
+
+        self.search("pyth")
+
+        assert response_cache.entry(cache_key(build_params(query="pyth")))[0] == 10
+
+    def test_slack_responses_are_answered_from_prefixes(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+
+        with FakeSlackAPI({API_METHOD: lambda body: PrefixAPI()(API_METHOD, body)}) as api:
+            client = WebClient(base_url=api.base_url)
+            fetch_sample_data(client=client, query="bolt", logger=self.mock_logger)
+            response_cache.set(cache_key(build_params(query="py")), client.api_call(API_METHOD, params={"query": "py"}))
+            bolt_python = fetch_sample_data(client=client, query="bolt p", logger=self.mock_logger)
+            pytest_helpers = fetch_sample_data(client=client, query="pyte", logger=self.mock_logger)
+
+        assert [sample["external_ref"]["id"] for sample in bolt_python["samples"]] == ["bolt-python"]
+        assert [sample["external_ref"]["id"] for sample in pytest_helpers["samples"]] == ["pytest"]
+        assert len(api.requests) == 2
+
+    def test_prefixes_must_have_the_same_filters(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+
+        self.search("bolt")
+        assert self.search("bolt j", {LANGUAGES_FILTER["name"]: ["javascript"]}) == ["bolt-js"]
+
+        assert self.mock_client.api_call.call_count == 2
+
+    def test_incomplete_prefix_results_are_not_used(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+        page = {**PrefixAPI()(API_METHOD, {"query": "py"}), "response_metadata": {"next_cursor": "page2"}}
+        response_cache.set(cache_key(build_params(query="py")), page)
+
+        self.search("pyth")
+
+        self.mock_client.api_call.assert_called_once_with(API_METHOD, params={"query": "pyth"})
+
+    def test_disabled(self):
+        self.search("py")
+        self.search("pyth")
+
+        assert self.mock_client.api_call.call_count == 2
+
+    def test_cached_results_fall_back_to_prefixes(self, monkeypatch):
+        monkeypatch.setattr(settings, "PREFIX_RESULTS", True)
+        self.search("bolt")
+
+        response = fetch_cached_sample_data(query="bolt py")
+
+        assert [sample["external_ref"]["id"] for sample in response["samples"]] == ["bolt-python"]
+
+
+class TestStreamedSampleData:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.samples = [
+            {"title": f"Sample {i}", "description": f"Description {i}", "external_ref": {"id": f"sample{i}"}}
+            for i in range(100)
+        ]
+
+    @pytest.fixture(autouse=True)
+    def stream_sample_data(self, monkeypatch):
+        monkeypatch.setattr(settings, "STREAM_SAMPLE_DATA", True)
+
+    def sample_data(self, body):
+        return {"ok": True, "samples": self.samples}
+
+    def test_fetch_sample_data(self):
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            result = fetch_sample_data(client=client, query="test", filters={LANGUAGES_FILTER["name"]: ["python"]})
+
+        assert result == {"ok": True, "samples": self.samples}
+        assert api.requests == [(API_METHOD, {"query": "test", "filters": "{'languages': ['python']}"})]
+        assert response_cache.get(cache_key(build_params(query="test", filters={"languages": ["python"]}))) == result
+
+    def test_fetch_sample_data_api_error(self):
+        with FakeSlackAPI({API_METHOD: lambda body: {"ok": False, "error": "invalid_auth"}}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            with pytest.raises(SlackResponseError):
+                fetch_sample_data(client=client, logger=self.mock_logger)
+
+        self.mock_logger.error.assert_called_once_with("Search API request failed with error: invalid_auth")
+
+    def test_fetch_updated_samples(self):
+        self.samples[7]["date_updated"] = "2025-02-01"
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            samples = fetch_updated_samples(client=client, since=datetime.date(2025, 1, 15), logger=self.mock_logger)
+
+        assert samples == self.samples
+        assert api.requests == [(API_METHOD, {"updated_since": "2025-01-15"})]
+
+    def test_fetch_updated_samples_stops_when_updated_since_is_ignored(self):
+        self.samples[8]["date_updated"] = "2025-01-01"
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            samples = fetch_updated_samples(client=client, since=datetime.date(2025, 1, 15), logger=self.mock_logger)
+
+        assert samples is None
+        # The rest of the response was left unread, so the connection cannot be reused
+        assert client.pool.stats()["discarded"] == 1
+
+    def test_fetch_sample_stops_at_match(self):
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            sample = fetch_sample(client=client, sample_id="sample3", logger=self.mock_logger)
+
+        assert sample == self.samples[3]
+        assert sample_store.get("sample3") == self.samples[3]
+        assert sample_store.get("sample4") is None
+        # The rest of the response was left unread, so the connection cannot be reused
+        assert client.pool.stats()["discarded"] == 1
+
+    def test_fetch_samples_stops_once_all_match(self):
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            samples = fetch_samples(client=client, sample_ids=["sample5", "sample2"], logger=self.mock_logger)
+
+        assert samples == {"sample2": self.samples[2], "sample5": self.samples[5]}
+        assert sample_store.get("sample5") == self.samples[5]
+        assert sample_store.get("sample6") is None
+        assert client.pool.stats()["discarded"] == 1
+
+    def test_fetch_sample_unknown_id(self):
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = PooledWebClient(token="xoxb-test", base_url=api.base_url)
+
+            assert fetch_sample(client=client, sample_id="unknown", logger=self.mock_logger) is None
+
+        assert client.pool.stats()["idle"] == 1
+
+
+class TestRateLimitedSampleData:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.clock = FakeClock()
+        self.samples = [{"title": f"Sample {i}", "external_ref": {"id": f"sample{i}"}} for i in range(10)]
+        self.ratelimited = 0
+        self.retry_after = "2"
+
+    @pytest.fixture(autouse=True)
+    def rate_limiting(self, monkeypatch):
+        monkeypatch.setattr(settings, "RATE_LIMITING", True)
+        monkeypatch.setattr(sample_data_service, "upstream", fake_upstream(self.clock))
+
+    def sample_data(self, body):
+        if self.ratelimited:
+            self.ratelimited -= 1
+            return 429, {"Retry-After": self.retry_after}, {"ok": False, "error": "ratelimited"}
+        return {"ok": True, "samples": self.samples}
+
+    def test_fetch_sample_data_retries_after_rate_limit(self):
+        self.ratelimited = 2
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            result = fetch_sample_data(client=client, query="sample", logger=self.mock_logger)
+
+        assert result["samples"] == self.samples
+        assert len(api.requests) == 3
+        assert self.clock.now >= 4
+
+    def test_fetch_sample_streamed_retries_after_rate_limit(self, monkeypatch):
+        monkeypatch.setattr(settings, "STREAM_SAMPLE_DATA", True)
+        self.ratelimited = 1
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            sample = fetch_sample(client=client, sample_id="sample3", logger=self.mock_logger)
+
+        assert sample == self.samples[3]
+        assert len(api.requests) == 2
+
+    def test_fetch_sample_data_serves_stale_corpus_while_rate_limited(self):
+        self.ratelimited, self.retry_after = 100, "30"
+        corpus.load(samples=self.samples, facets={})
+        corpus.loaded_at -= corpus.max_age
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            result = fetch_sample_data(client=client, query="sample", logger=self.mock_logger, limit=3)
+
+        assert result == {"ok": True, "samples": self.samples[:3], "ranked": True}
+        assert len(api.requests) == 1
+        self.mock_logger.warning.assert_called_once()
+
+    def test_fetch_sample_serves_stale_corpus_while_rate_limited(self):
+        self.ratelimited, self.retry_after = 100, "30"
+        corpus.load(samples=self.samples, facets={})
+        corpus.loaded_at -= corpus.max_age
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            assert fetch_sample(client=client, sample_id="sample4", logger=self.mock_logger) == self.samples[4]
+
+    def test_fetch_sample_data_fails_while_rate_limited_without_corpus(self):
+        self.ratelimited, self.retry_after = 100, "30"
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+
+            with pytest.raises(SlackResponseError):
+                fetch_sample_data(client=client, query="sample", logger=self.mock_logger)
+
+    def test_open_circuit_skips_upstream(self):
+        self.ratelimited = 100
+        self.retry_after = "0"
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            client = WebClient(token="xoxb-test", base_url=api.base_url)
+            for query in ["first", "second", "third"]:
+                with pytest.raises(SlackResponseError):
+                    fetch_sample_data(client=client, query=query, logger=self.mock_logger)
+
+        # Two searches of four attempts each opened the circuit, and the third never reached the upstream
+        assert len(api.requests) == 8
+
+    def test_rate_limited_workspace_does_not_hold_back_others(self):
+        self.ratelimited = 1
+        self.retry_after = "3"
+
+        with FakeSlackAPI({API_METHOD: self.sample_data}) as api:
+            busy = WebClient(token="xoxb-busy", base_url=api.base_url)
+            quiet = WebClient(token="xoxb-quiet", base_url=api.base_url)
+            fetch_sample_data(client=busy, query="busy", logger=self.mock_logger)
+            resumed_at = self.clock.now
+
+            fetch_sample_data(client=quiet, query="quiet", logger=self.mock_logger)
+
+        assert resumed_at >= 3
+        assert self.clock.now == resumed_at
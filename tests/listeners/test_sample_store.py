@@ -0,0 +1,74 @@
+from listeners.sample_store import SampleStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSampleStore:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.store = SampleStore(ttl=60, clock=self.clock)
+
+        self.samples = [
+            {"title": "Sample 1", "external_ref": {"id": "sample1"}},
+            {"title": "Sample 2", "external_ref": {"id": "sample2"}},
+        ]
+
+    def test_get_returns_sample_by_id(self):
+        self.store.add_all(self.samples)
+
+        assert self.store.get("sample2") == self.samples[1]
+        assert len(self.store) == 2
+
+    def test_get_unknown_id(self):
+        self.store.add_all(self.samples)
+
+        assert self.store.get("nonexistent") is None
+
+    def test_get_expired_entry(self):
+        self.store.add_all(self.samples)
+        self.clock.now = 60
+
+        assert self.store.get("sample1") is None
+        assert len(self.store) == 1
+
+    def test_add_all_refreshes_expiry(self):
+        self.store.add_all(self.samples)
+        self.clock.now = 30
+        self.store.add_all(self.samples[:1])
+        self.clock.now = 75
+
+        assert self.store.get("sample1") == self.samples[0]
+        assert self.store.get("sample2") is None
+
+    def test_add_all_drops_expired_entries(self):
+        self.store.add_all(self.samples)
+        self.clock.now = 60
+
+        self.store.add_all([{"title": "Sample 3", "external_ref": {"id": "sample3"}}])
+
+        assert len(self.store) == 1
+        assert self.store.get("sample3")["title"] == "Sample 3"
+
+    def test_add_all_drops_oldest_entries_past_max_size(self):
+        store = SampleStore(ttl=60, max_size=2, clock=self.clock)
+        store.add_all(self.samples)
+        store.add_all(self.samples[:1])
+
+        store.add_all([{"title": "Sample 3", "external_ref": {"id": "sample3"}}])
+
+        assert len(store) == 2
+        assert store.get("sample2") is None
+        assert store.get("sample1") == self.samples[0]
+
+    def test_clear(self):
+        self.store.add_all(self.samples)
+        self.store.clear()
+
+        assert self.store.get("sample1") is None
+        assert len(self.store) == 0
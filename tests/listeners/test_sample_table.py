@@ -0,0 +1,106 @@
+import datetime
+import marshal
+
+from listeners.sample_table import SampleTable, parse_date
+
+
+class TestSampleTable:
+    def setup_method(self):
+        self.samples = [
+            {
+                "title": "Bolt for Python",
+                "description": "A framework for building Slack apps in Python",
+                "link": "https://example.com/bolt-python",
+                "date_updated": "2024-05-01",
+                "external_ref": {"id": "bolt-python"},
+                "content": "Ünïcödé content ✨",
+            },
+            {"title": "Bolt for JavaScript", "external_ref": {"id": "bolt-js"}},
+            {"title": "", "description": "", "date_updated": "last week", "external_ref": {"id": "empty"}},
+        ]
+        self.table = SampleTable(self.samples)
+
+    def test_round_trips_samples(self):
+        assert len(self.table) == 3
+        assert list(self.table) == self.samples
+        assert self.table[-1] == self.samples[-1]
+        assert self.table.raw == {}
+
+    def test_round_trips_dates_that_are_not_iso(self):
+        samples = [
+            {"title": "Empty date", "date_updated": "", "external_ref": {"id": "1"}},
+            {"title": "Padded date", "date_updated": " 2024-05-01", "external_ref": {"id": "2"}},
+            {"title": "Timestamp", "date_updated": "2024-05-01T10:00:00", "external_ref": {"id": "3"}},
+        ]
+        table = SampleTable(samples)
+
+        assert list(table) == samples
+        assert list(SampleTable.from_state(marshal.loads(marshal.dumps(table.to_state())))) == samples
+        assert [table.date_updated(row) for row in range(3)] == [None, None, None]
+
+    def test_keeps_field_order(self):
+        assert list(self.table[0]) == list(self.samples[0])
+
+    def test_sample_id(self):
+        assert [self.table.sample_id(row) for row in range(3)] == ["bolt-python", "bolt-js", "empty"]
+
+    def test_date_updated(self):
+        assert self.table.date_updated(0) == datetime.date(2024, 5, 1)
+        assert self.table.date_updated(1) is None
+        assert self.table.date_updated(2) is None
+
+    def test_latest_date(self):
+        self.table.append({"title": "Nested", "date_updated": "2024-06-01", "external_ref": {"id": "x", "type": "y"}})
+
+        assert self.table.latest_date() == datetime.date(2024, 6, 1)
+        assert SampleTable(self.samples[1:]).latest_date() is None
+
+    def test_interns_extra_string_fields(self):
+        table = SampleTable(
+            [
+                {"title": "A", "external_ref": {"id": "a"}, "language": "python"},
+                {"title": "B", "external_ref": {"id": "b"}},
+                {"title": "C", "external_ref": {"id": "c"}, "language": "python", "type": "template"},
+            ]
+        )
+
+        assert table[0]["language"] is table[2]["language"]
+        assert "language" not in table[1]
+        assert table[2] == {"title": "C", "external_ref": {"id": "c"}, "language": "python", "type": "template"}
+        assert table.categories["language"].values == [None, "python"]
+
+    def test_keeps_samples_that_do_not_fit(self):
+        samples = [
+            {"title": "Nested", "external_ref": {"id": "nested"}, "tags": ["a", "b"]},
+            {"title": "None", "content": None, "external_ref": {"id": "none"}},
+            {"title": "Separator \x1f", "external_ref": {"id": "separator"}},
+            {"title": "Extra ref", "external_ref": {"id": "ref", "source": "docs"}},
+            {"title": "Numeric id", "external_ref": {"id": 7}},
+            {"title": "Packed", "external_ref": {"id": "packed"}},
+        ]
+
+        table = SampleTable(samples)
+
+        assert list(table) == samples
+        assert sorted(table.raw) == [0, 1, 2, 3, 4]
+        assert table.sample_id(4) == 7
+        assert table.sample_id(5) == "packed"
+
+    def test_state_round_trip(self):
+        self.table.append({"title": "Raw", "external_ref": {"id": "raw"}, "tags": ["a"]})
+        self.table.append({"title": "Typed", "external_ref": {"id": "typed"}, "type": "sample"})
+
+        restored = SampleTable.from_state(marshal.loads(marshal.dumps(self.table.to_state())))
+
+        assert list(restored) == list(self.table)
+        assert restored.date_updated(0) == datetime.date(2024, 5, 1)
+
+        restored.append({"title": "Appended", "external_ref": {"id": "appended"}, "type": "sample"})
+        assert restored[5]["type"] == "sample"
+        assert restored.categories["type"].values == [None, "sample"]
+
+    def test_parse_date(self):
+        assert parse_date("2024-05-01") == datetime.date(2024, 5, 1)
+        assert parse_date("20240501") is None
+        assert parse_date("2024-05-01T10:00:00") is None
+        assert parse_date(None) is None
@@ -0,0 +1,190 @@
+from listeners.search_index import SearchIndex, normalize_query, tokenize
+
+
+class TestSearchIndex:
+    def setup_method(self):
+        self.samples = [
+            {
+                "title": "Bolt for Python",
+                "description": "A framework for building Slack apps in Python",
+                "external_ref": {"id": "bolt-python"},
+            },
+            {
+                "title": "Bolt for JavaScript",
+                "description": "A framework for building Slack apps in JavaScript",
+                "external_ref": {"id": "bolt-js"},
+            },
+            {
+                "title": "Search template",
+                "description": "Enterprise search starter",
+                "content": "Uses Bolt for Python",
+                "external_ref": {"id": "search-template"},
+            },
+        ]
+        self.facets = {
+            ("languages", "python"): ["bolt-python", "search-template"],
+            ("languages", "javascript"): ["bolt-js"],
+            ("type", "template"): ["search-template"],
+            ("type", "sample"): ["bolt-python", "bolt-js"],
+        }
+        self.index = SearchIndex(self.samples, self.facets)
+
+    def ids(self, samples):
+        return [sample["external_ref"]["id"] for sample in samples]
+
+    def test_tokenize(self):
+        assert tokenize("Bolt for Python!") == ["bolt", "for", "python"]
+        assert tokenize(None) == []
+
+    def test_normalize_query(self):
+        assert normalize_query("  Bolt\tfor   PYTHON ") == "bolt for python"
+        assert normalize_query("Ｐｙｔｈｏｎ") == "python"
+        assert normalize_query("Straße") == "strasse"
+        assert normalize_query("") == ""
+        assert normalize_query(None) is None
+
+    def test_search_ranks_title_matches_first(self):
+        assert self.ids(self.index.search("python")) == ["bolt-python", "search-template"]
+
+    def test_search_with_limit(self):
+        assert self.ids(self.index.search("bolt", limit=2)) == self.ids(self.index.search("bolt"))[:2]
+        assert self.ids(self.index.search(None, {"languages": ["python"]}, limit=1)) == ["bolt-python"]
+
+    def test_filters_outputs_offer_languages_and_types_with_samples(self):
+        outputs = self.index.filters_outputs()
+        languages, template, sample = outputs["filters"]
+
+        assert languages["options"] == [
+            {"name": "Python (2)", "value": "python"},
+            {"name": "JavaScript (1)", "value": "javascript"},
+        ]
+        assert (template["name"], sample["name"]) == ("template", "sample")
+        assert self.index.filters_outputs() is outputs
+
+    def test_filters_outputs_without_facets(self):
+        assert SearchIndex(self.samples).filters_outputs() == {"filters": []}
+
+    def test_search_without_matches(self):
+        assert self.index.search("rust") == []
+
+    def test_search_without_query_returns_all(self):
+        assert self.index.search(None) == self.samples
+
+    def test_search_with_languages_filter(self):
+        result = self.index.search("bolt", {"languages": ["javascript"]})
+
+        assert self.ids(result) == ["bolt-js"]
+
+    def test_search_with_multiple_languages_is_union(self):
+        result = self.index.search(None, {"languages": ["python", "javascript"]})
+
+        assert self.ids(result) == ["bolt-python", "bolt-js", "search-template"]
+
+    def test_search_with_languages_and_type_is_intersection(self):
+        result = self.index.search(None, {"languages": ["python"], "type": "template"})
+
+        assert self.ids(result) == ["search-template"]
+
+    def test_search_with_unknown_language(self):
+        assert self.index.search(None, {"languages": ["cobol"]}) == []
+
+    def test_get(self):
+        assert self.index.get("bolt-js") == self.samples[1]
+        assert self.index.get("nonexistent") is None
+
+    def test_empty_index(self):
+        index = SearchIndex([])
+
+        assert index.search("python") == []
+        assert len(index) == 0
+
+    def test_search_with_filters_over_many_docs(self):
+        samples = [{"title": f"Bolt sample {i}", "external_ref": {"id": f"sample{i}"}} for i in range(20)]
+        index = SearchIndex(samples, {("languages", "python"): ["sample3", "sample17"]})
+
+        result = index.search("bolt", {"languages": ["python"]})
+
+        assert self.ids(result) == ["sample3", "sample17"]
+
+    def test_vocabulary_counts_title_and_description_terms(self):
+        assert self.index.vocabulary["bolt"] == 2
+        assert self.index.vocabulary["search"] == 1
+        assert "uses" not in self.index.vocabulary
+
+    def test_expand_keeps_indexed_terms(self):
+        terms = ["uses", "bolt"]
+
+        assert self.index.expand(terms) is terms
+
+    def test_expand_completes_and_corrects_terms(self):
+        assert self.index.expand(["framwork", "jav"]) == ["framework", "javascript"]
+
+    def test_state_round_trip(self):
+        index = SearchIndex.from_state(self.index.to_state())
+
+        assert index.vocabulary == self.index.vocabulary
+        assert index.expand(["serch"]) == ["search"]
+
+        assert self.ids(index.search("python", {"languages": ["python"]})) == ["bolt-python", "search-template"]
+        assert index.get("bolt-js") == self.samples[1]
+        assert [index.idf(term) for term in index.postings] == [self.index.idf(term) for term in self.index.postings]
+        assert index.avg_doc_length == self.index.avg_doc_length
+
+    def test_update_adds_replaces_and_deletes_samples(self):
+        added = {"title": "Bolt for Java", "date_updated": "2025-03-01", "external_ref": {"id": "bolt-java"}}
+        replaced = {**self.samples[1], "title": "Bolt for TypeScript", "description": "Slack apps in TypeScript"}
+
+        changes = self.index.update(
+            [added, replaced, self.samples[2]],
+            {
+                ("languages", "java"): ["bolt-java"],
+                ("languages", "javascript"): ["bolt-js"],
+                ("languages", "python"): ["search-template"],
+                ("type", "template"): ["search-template"],
+            },
+            deleted=["bolt-python", "nonexistent"],
+        )
+
+        assert changes == 3
+        assert len(self.index) == 3
+        assert self.index.get("bolt-python") is None
+        assert self.index.get("bolt-js") == replaced
+        assert self.ids(self.index.search("bolt")) == ["bolt-java", "bolt-js", "search-template"]
+        assert self.ids(self.index.search("typescript")) == ["bolt-js"]
+        assert self.index.search("javascript") == []
+        assert self.ids(self.index.search(None)) == ["search-template", "bolt-java", "bolt-js"]
+        assert self.ids(self.index.search(None, {"languages": ["python", "java"]})) == ["search-template", "bolt-java"]
+        assert self.index.vocabulary["bolt"] == 2
+        assert "typescript" in self.index.vocabulary and "javascript" not in self.index.vocabulary
+        assert self.index.watermark.isoformat() == "2025-03-01"
+
+    def test_update_skips_unchanged_samples(self):
+        outputs = self.index.filters_outputs()
+
+        changes = self.index.update(
+            self.samples[:1], {("languages", "python"): ["bolt-python"], ("type", "sample"): ["bolt-python"]}
+        )
+
+        assert changes == 0
+        assert len(self.index.samples) == 3
+        assert self.index.filters_outputs() is outputs
+
+    def test_update_moves_sample_between_facets(self):
+        self.index.update(self.samples[:1], {("languages", "javascript"): ["bolt-python"]})
+
+        assert self.ids(self.index.search(None, {"languages": ["javascript"]})) == ["bolt-js", "bolt-python"]
+        assert self.ids(self.index.search(None, {"type": "sample"})) == ["bolt-js"]
+        assert self.index.filters_outputs()["filters"][0]["options"] == [
+            {"name": "Python (1)", "value": "python"},
+            {"name": "JavaScript (2)", "value": "javascript"},
+        ]
+
+    def test_updated_state_round_trip(self):
+        self.index.update([{**self.samples[0], "title": "Bolt"}], deleted=["bolt-js"])
+
+        index = SearchIndex.from_state(self.index.to_state())
+
+        assert len(index) == 2
+        assert index.get("bolt-js") is None
+        assert self.ids(index.search(None)) == ["search-template", "bolt-python"]
+        assert self.ids(index.search("bolt")) == self.ids(self.index.search("bolt"))
@@ -0,0 +1,53 @@
+import logging
+import multiprocessing
+from unittest.mock import MagicMock
+
+from listeners.cache import TTLCache
+from listeners.shared_cache import CacheClient, CacheServer
+
+
+def set_from_another_process(address, authkey: bytes):
+    CacheClient(address, authkey, logger=logging.getLogger(__name__)).set("key", {"samples": [1, 2]})
+
+
+class TestSharedCache:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.cache = TTLCache(ttl=30)
+        self.server = CacheServer(self.cache).start()
+        self.client = CacheClient(self.server.address, self.server.authkey, logger=self.mock_logger)
+
+    def test_round_trip(self):
+        self.client.set("key", {"ok": True}, ttl=10)
+
+        seconds_left, value = self.client.entry("key")
+        assert value == {"ok": True}
+        assert 0 < seconds_left <= 10
+        assert self.client.entry("missing") is None
+
+        self.client.invalidate("key")
+        assert self.cache.get("key") is None
+
+    def test_shared_between_processes(self):
+        process = multiprocessing.get_context("spawn").Process(
+            target=set_from_another_process, args=(self.server.address, self.server.authkey)
+        )
+        process.start()
+        process.join(30)
+
+        assert process.exitcode == 0
+        assert self.client.entry("key")[1] == {"samples": [1, 2]}
+
+    def test_backs_a_local_cache(self):
+        local = TTLCache(ttl=30)
+        local.backend = self.client
+        self.cache.set("key", "value")
+
+        assert local.get("key") == "value"
+        assert len(local) == 1
+
+    def test_failed_call_is_a_miss(self):
+        self.client._cache = MagicMock(entry=MagicMock(side_effect=EOFError()))
+
+        assert self.client.entry("key") is None
+        self.mock_logger.warning.assert_called_once()
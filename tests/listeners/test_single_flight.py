@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from listeners.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    def setup_method(self):
+        self.flights = SingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow_call(self):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        return "result"
+
+    def failing_call(self):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        raise ValueError("upstream failure")
+
+    def release_after_followers_join(self):
+        time.sleep(0.05)
+        self.release.set()
+
+    def test_concurrent_calls_share_result(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(self.flights.do, "key", self.slow_call) for _ in range(8)]
+            self.release_after_followers_join()
+            results = [future.result() for future in futures]
+
+        assert results == ["result"] * 8
+        assert self.calls == 1
+        assert len(self.flights) == 0
+
+    def test_concurrent_calls_share_error(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(self.flights.do, "key", self.failing_call) for _ in range(4)]
+            self.release_after_followers_join()
+
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+
+        assert self.calls == 1
+
+    def test_failed_flight_is_not_reused(self):
+        self.release.set()
+
+        with pytest.raises(ValueError):
+            self.flights.do("key", self.failing_call)
+
+        assert self.flights.do("key", self.slow_call) == "result"
+        assert self.calls == 2
+
+    def test_different_keys_do_not_share(self):
+        self.release.set()
+
+        self.flights.do("a", self.slow_call)
+        self.flights.do("b", self.slow_call)
+
+        assert self.calls == 2
+
+
+class TestAsyncSingleFlight:
+    def setup_method(self):
+        self.flights = AsyncSingleFlight()
+        self.calls = 0
+
+    async def slow_call(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def failing_call(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failure")
+
+    def test_concurrent_calls_share_result(self):
+        async def run():
+            return await asyncio.gather(*(self.flights.do("key", self.slow_call) for _ in range(8)))
+
+        assert asyncio.run(run()) == ["result"] * 8
+        assert self.calls == 1
+        assert len(self.flights) == 0
+
+    def test_concurrent_calls_share_error(self):
+        async def run():
+            return await asyncio.gather(
+                *(self.flights.do("key", self.failing_call) for _ in range(4)), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert self.calls == 1
+
+    def test_failed_flight_is_not_reused(self):
+        with pytest.raises(ValueError):
+            asyncio.run(self.flights.do("key", self.failing_call))
+
+        assert asyncio.run(self.flights.do("key", self.slow_call)) == "result"
+        assert self.calls == 2
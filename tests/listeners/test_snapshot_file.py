@@ -0,0 +1,76 @@
+import pytest
+
+from listeners.snapshot_file import HEADER, SnapshotError, load_snapshot, save_snapshot
+
+
+class TestSnapshotFile:
+    def setup_method(self):
+        self.state = {
+            "samples": [{"title": "Sample 1", "external_ref": {"id": "sample1"}}],
+            "facets": {("languages", "python"): 1 << 70},
+        }
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        save_snapshot(str(path), self.state, saved_at=1000)
+
+        state, saved_at = load_snapshot(str(path), max_age=60, clock=lambda: 1030)
+
+        assert state == self.state
+        assert saved_at == 1000
+
+    def test_missing_snapshot(self, tmp_path):
+        with pytest.raises(SnapshotError):
+            load_snapshot(str(tmp_path / "missing.snapshot"), max_age=60)
+
+    def test_stale_snapshot(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        save_snapshot(str(path), self.state, saved_at=1000)
+
+        with pytest.raises(SnapshotError, match="stale"):
+            load_snapshot(str(path), max_age=60, clock=lambda: 1060)
+
+    def test_corrupt_snapshot(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        save_snapshot(str(path), self.state)
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(SnapshotError, match="checksum"):
+            load_snapshot(str(path), max_age=60)
+
+    def test_truncated_snapshot(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        save_snapshot(str(path), self.state)
+        path.write_bytes(path.read_bytes()[:-4])
+
+        with pytest.raises(SnapshotError, match="truncated"):
+            load_snapshot(str(path), max_age=60)
+
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        path.write_bytes(b"x" * (HEADER.size + 10))
+
+        with pytest.raises(SnapshotError, match="not a sample corpus snapshot"):
+            load_snapshot(str(path), max_age=60)
+
+    def test_unsupported_version(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        save_snapshot(str(path), self.state)
+        data = bytearray(path.read_bytes())
+        data[4] += 1
+        path.write_bytes(bytes(data))
+
+        with pytest.raises(SnapshotError, match="not supported"):
+            load_snapshot(str(path), max_age=60)
+
+    def test_save_replaces_previous_snapshot(self, tmp_path):
+        path = tmp_path / "corpus.snapshot"
+        save_snapshot(str(path), {"samples": []})
+        save_snapshot(str(path), self.state)
+
+        state, _ = load_snapshot(str(path), max_age=60)
+
+        assert state == self.state
+        assert [p.name for p in tmp_path.iterdir()] == ["corpus.snapshot"]
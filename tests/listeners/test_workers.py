@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from slack_bolt import App
+from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_sdk import WebClient
+
+from listeners import deferred
+from listeners.events import entity_details_requested
+from listeners.micro_batch import MicroBatcher
+from listeners.workers import InFlight, Supervisor, WorkerSocketModeHandler, serve_worker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeHandler:
+    """Stands in for a worker's Socket Mode handler, leaving a file behind once drained."""
+
+    def __init__(self, directory: str, index: int):
+        self.path = os.path.join(directory, f"{index}-{os.getpid()}")
+
+    def connect(self):
+        pass
+
+    def drain(self, timeout: float) -> bool:
+        with open(self.path, "w"):
+            pass
+        return True
+
+
+def serve_fake_worker(index: int, ready, directory: str):
+    serve_worker(FakeHandler(directory, index), ready, drain_timeout=1, logger=logging.getLogger(__name__))
+
+
+class TestInFlight:
+    def test_close_waits_for_requests_in_flight(self):
+        in_flight = InFlight()
+        assert in_flight.enter()
+
+        assert not in_flight.close(timeout=0.01)
+        assert not in_flight.enter()
+
+        threading.Timer(0.05, in_flight.exit).start()
+        assert in_flight.close(timeout=2)
+        assert in_flight.count == 0
+
+
+class TestWorkerSocketModeHandler:
+    def setup_method(self):
+        app = App(client=WebClient(token="xoxb-test"), token_verification_enabled=False)
+        self.handler = WorkerSocketModeHandler(app, "xapp-test")
+        self.release = threading.Event()
+        self.handled = []
+
+    def teardown_method(self):
+        self.release.set()
+
+    @pytest.fixture(autouse=True)
+    def unfurl_batcher(self, monkeypatch):
+        self.unfurls = []
+        batcher = MicroBatcher(self.unfurls.extend, window=10, max_size=10, max_latency=10, name="test-drain")
+        monkeypatch.setattr(entity_details_requested, "unfurl_batcher", batcher)
+        monkeypatch.setattr(entity_details_requested, "fanout", ThreadPoolExecutor(max_workers=1))
+
+    def fake_handle(self, client, req):
+        self.handled.append(req)
+        self.release.wait(2)
+
+    def test_drain_waits_for_envelopes_in_flight(self, monkeypatch):
+        monkeypatch.setattr(SocketModeHandler, "handle", self.fake_handle)
+        thread = threading.Thread(target=self.handler.handle, args=(MagicMock(), "envelope"))
+        thread.start()
+
+        threading.Timer(0.05, self.release.set).start()
+        assert self.handler.drain(timeout=2)
+        assert self.handled == ["envelope"]
+        thread.join(2)
+
+    def test_leaves_envelopes_arriving_while_draining_unacknowledged(self, monkeypatch):
+        monkeypatch.setattr(SocketModeHandler, "handle", self.fake_handle)
+        assert self.handler.drain(timeout=2)
+
+        self.handler.handle(MagicMock(), "envelope")
+
+        assert self.handled == []
+
+    def test_drain_flushes_unfurl_batches(self):
+        entity_details_requested.unfurl_batcher.submit("unfurl")
+
+        assert self.handler.drain(timeout=2)
+        assert self.unfurls == ["unfurl"]
+
+    def test_drain_waits_for_fanned_out_unfurls(self):
+        entity_details_requested.fanout.submit(self.release.wait, 2)
+
+        assert not self.handler.drain(timeout=0.05)
+
+    def test_drain_waits_for_deferred_jobs(self, monkeypatch):
+        monkeypatch.setattr(deferred, "executor", deferred.DeferredExecutor(max_workers=1))
+        deferred.executor.submit(self.release.wait, deadline=2)
+
+        assert not self.handler.drain(timeout=0.05)
+
+
+class TestSupervisor:
+    def setup_method(self):
+        self.mock_logger = MagicMock()
+        self.clock = FakeClock()
+        self.supervisors = []
+
+    def teardown_method(self):
+        for supervisor in self.supervisors:
+            supervisor.stop()
+
+    def supervisor(self, directory, processes: int = 2) -> Supervisor:
+        supervisor = Supervisor(
+            serve_fake_worker,
+            processes=processes,
+            logger=self.mock_logger,
+            args=(str(directory),),
+            drain_timeout=5,
+            ready_timeout=30,
+            restart_delay=1,
+            min_uptime=10,
+            clock=self.clock,
+        )
+        self.supervisors.append(supervisor)
+        return supervisor
+
+    def test_stop_drains_every_worker(self, tmp_path):
+        supervisor = self.supervisor(tmp_path)
+        supervisor.start()
+        assert all(worker.ready.wait(30) for worker in supervisor.workers)
+        pids = [worker.process.pid for worker in supervisor.workers]
+
+        supervisor.stop()
+
+        assert [worker.process.exitcode for worker in supervisor.workers] == [0, 0]
+        assert sorted(os.listdir(tmp_path)) == sorted(f"{index}-{pid}" for index, pid in enumerate(pids))
+
+    def test_restart_replaces_workers_once_their_replacements_are_ready(self, tmp_path):
+        supervisor = self.supervisor(tmp_path)
+        supervisor.start()
+        old = list(supervisor.workers)
+        assert all(worker.ready.wait(30) for worker in old)
+
+        supervisor.restart()
+
+        assert all(worker.process.exitcode == 0 for worker in old)
+        assert all(worker.ready.is_set() and worker.process.is_alive() for worker in supervisor.workers)
+        assert sorted(os.listdir(tmp_path)) == sorted(f"{index}-{w.process.pid}" for index, w in enumerate(old))
+
+    def test_restarts_exited_workers_with_backoff(self, tmp_path):
+        supervisor = self.supervisor(tmp_path, processes=1)
+        supervisor.start()
+
+        delays = []
+        for _ in range(3):
+            crashed = supervisor.workers[0]
+            crashed.process.kill()
+            crashed.process.join()
+
+            supervisor.supervise()
+            delays.append(supervisor._restart_at[0] - self.clock.now)
+            assert supervisor.workers[0] is crashed
+
+            self.clock.now += delays[-1]
+            supervisor.supervise()
+            assert supervisor.workers[0] is not crashed
+
+        assert delays == [1, 2, 4]
+        assert self.mock_logger.warning.call_count == 3
+
+    def test_rejects_more_workers_than_socket_mode_connections(self):
+        with pytest.raises(ValueError):
+            Supervisor(serve_fake_worker, processes=10, logger=self.mock_logger)